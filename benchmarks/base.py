@@ -1,14 +1,194 @@
-import functools
+import argparse
+import asyncio
 import itertools
+import json
+import math
+import os
+import platform
 import sys
-import timeit
+import time
+import tracemalloc
 
 import redis
+from redis.utils import HIREDIS_AVAILABLE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_stand_in_server = None
+_stand_in_cluster = None
+
+# results of every benchmark run by this process, written out as a whole
+# each time a benchmark finishes so a script may run several of them
+_results = []
+
+# the metrics a run can be compared to a baseline on, lower is better
+COMPARABLE_METRICS = ("p50_ns", "p99_ns", "p999_ns", "mean_ns")
+
+
+def stand_in_module():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.append(root)
+    from tests import stand_in_server
+
+    return stand_in_server
+
+
+def stand_in_server():
+    """
+    Return the in-process stand-in for a Redis server shared by the
+    benchmarks, started on first use
+    """
+    global _stand_in_server
+    if _stand_in_server is None:
+        _stand_in_server = stand_in_module().StandInServer().start()
+    return _stand_in_server
+
+
+def stand_in_cluster():
+    "Return the in-process stand-in for a Redis cluster, started on first use"
+    global _stand_in_cluster
+    if _stand_in_cluster is None:
+        _stand_in_cluster = stand_in_module().StandInCluster().start()
+    return _stand_in_cluster
+
+
+def percentile(ordered, fraction):
+    "Return the nearest-rank percentile of the sorted sequence ``ordered``"
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def max_rss():
+    "Return the peak resident set size of this process in bytes, if known"
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(timings, operations):
+    """
+    Summarize the durations in nanoseconds of the timed iterations, each of
+    which performed ``operations`` operations, as per-operation latencies
+    """
+    ordered = sorted(t / operations for t in timings)
+    total = sum(timings)
+    return {
+        "iterations": len(timings),
+        "operations": len(timings) * operations,
+        "ops_per_sec": len(timings) * operations * 1e9 / total if total else None,
+        "mean_ns": total / (len(timings) * operations),
+        "min_ns": ordered[0],
+        "p50_ns": percentile(ordered, 0.5),
+        "p99_ns": percentile(ordered, 0.99),
+        "p999_ns": percentile(ordered, 0.999),
+        "max_ns": ordered[-1],
+    }
+
+
+def result_key(result):
+    return result["benchmark"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline, metric="p50_ns", threshold=0.1):
+    """
+    Compare ``results`` to those of a ``baseline`` run on ``metric``.
+
+    Returns (result, baseline result, change) tuples for every result which
+    got slower by more than ``threshold``, a fraction of the baseline value.
+    Results missing from the baseline are ignored.
+    """
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if not before or not before.get(metric):
+            continue
+        change = result[metric] / before[metric] - 1
+        if change > threshold:
+            regressions.append((result, before, change))
+    return regressions
+
+
+def _value_name(value):
+    return getattr(value, "__name__", value)
+
+
+def _parse_only(only):
+    values = {}
+    for item in only:
+        name, _, value = item.partition("=")
+        values.setdefault(name, []).append(value)
+    return values
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--json", metavar="PATH", help="write the results as JSON to PATH"
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="PATH",
+        help="compare the results to those saved with --json in PATH and "
+        "exit with status 1 if any regressed",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="the slowdown, as a fraction of the baseline, that is reported "
+        "as a regression (default 0.1)",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=COMPARABLE_METRICS,
+        default="p50_ns",
+        help="the metric compared to the baseline (default p50_ns)",
+    )
+    parser.add_argument("--iterations", type=int, help="timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, help="untimed runs per benchmark")
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        default=None,
+        help="record the peak memory allocated by one more run",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="only run the benchmarks with the argument NAME set to VALUE, "
+        "may be repeated",
+    )
+    return parser.parse_args(argv)
 
 
 class Benchmark:
+    """
+    Runs ``run()`` for every combination of the ARGUMENTS values, after
+    ``setup()`` and WARMUP untimed runs, ITERATIONS times, and reports the
+    latency percentiles, throughput and memory use of each combination.
+
+    ``setup()``, ``run()`` and ``teardown()`` may be coroutines, they are then
+    all run in one event loop per combination.
+    """
+
     ARGUMENTS = ()
 
+    ITERATIONS = 1000
+    WARMUP = 100
+    # the clock the runs are timed with, in nanoseconds
+    TIMER = time.perf_counter_ns
+    # whether to trace the memory allocated by one more run
+    TRACEMALLOC = False
+
     def __init__(self):
         self._client = None
 
@@ -17,28 +197,162 @@ class Benchmark:
         # argparse
         if self._client is None or kwargs:
             defaults = {"db": 9}
+            if os.environ.get("REDIS_STAND_IN"):
+                # no Redis server needed
+                defaults["port"] = stand_in_server().port
             defaults.update(kwargs)
-            pool = redis.ConnectionPool(**kwargs)
+            pool = redis.ConnectionPool(**defaults)
             self._client = redis.Redis(connection_pool=pool)
         return self._client
 
+    def supports(self, **kwargs):
+        "Whether the combination of arguments can be benchmarked"
+        return True
+
+    def operations(self, **kwargs):
+        "The number of operations every call to run() performs"
+        return 1
+
     def setup(self, **kwargs):
         pass
 
     def run(self, **kwargs):
         pass
 
-    def run_benchmark(self):
+    def teardown(self, **kwargs):
+        pass
+
+    def measure(self, iterations, warmup, trace):
+        """
+        Time the runs with the arguments from ``self.ARGUMENTS``, returning
+        the durations in nanoseconds and the peak memory traced
+        """
+        timer = self.TIMER
+        self.setup(**self.kwargs)
+        try:
+            for _ in range(warmup):
+                self.run(**self.kwargs)
+            timings = []
+            for _ in range(iterations):
+                start = timer()
+                self.run(**self.kwargs)
+                timings.append(timer() - start)
+            return timings, self._trace() if trace else None
+        finally:
+            self.teardown(**self.kwargs)
+
+    async def measure_async(self, iterations, warmup, trace):
+        timer = self.TIMER
+        await self.setup(**self.kwargs)
+        try:
+            for _ in range(warmup):
+                await self.run(**self.kwargs)
+            timings = []
+            for _ in range(iterations):
+                start = timer()
+                await self.run(**self.kwargs)
+                timings.append(timer() - start)
+            if not trace:
+                return timings, None
+            tracemalloc.start()
+            try:
+                await self.run(**self.kwargs)
+                return timings, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        finally:
+            await self.teardown(**self.kwargs)
+
+    def _trace(self):
+        tracemalloc.start()
+        try:
+            self.run(**self.kwargs)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def combinations(self, only=None):
+        only = only or {}
         group_names = [group["name"] for group in self.ARGUMENTS]
-        group_values = [group["values"] for group in self.ARGUMENTS]
+        group_values = [
+            [
+                value
+                for value in group["values"]
+                if group["name"] not in only
+                or str(_value_name(value)) in only[group["name"]]
+            ]
+            for group in self.ARGUMENTS
+        ]
         for value_set in itertools.product(*group_values):
-            pairs = list(zip(group_names, value_set))
-            arg_string = ", ".join(f"{p[0]}={p[1]}" for p in pairs)
+            kwargs = dict(zip(group_names, value_set))
+            if self.supports(**kwargs):
+                yield kwargs
+
+    def run_benchmark(self, argv=None):
+        args = parse_args(argv)
+        iterations = args.iterations or self.ITERATIONS
+        warmup = self.WARMUP if args.warmup is None else args.warmup
+        trace = self.TRACEMALLOC if args.tracemalloc is None else args.tracemalloc
+        is_async = asyncio.iscoroutinefunction(self.run)
+        results = []
+        for kwargs in self.combinations(_parse_only(args.only)):
+            params = {k: _value_name(v) for k, v in kwargs.items()}
+            arg_string = ", ".join(f"{k}={v}" for k, v in params.items())
             sys.stdout.write(f"Benchmark: {arg_string}... ")
             sys.stdout.flush()
-            kwargs = dict(pairs)
-            setup = functools.partial(self.setup, **kwargs)
-            run = functools.partial(self.run, **kwargs)
-            t = timeit.timeit(stmt=run, setup=setup, number=1000)
-            sys.stdout.write(f"{t:f}\n")
+            self.kwargs = kwargs
+            if is_async:
+                measured = asyncio.run(self.measure_async(iterations, warmup, trace))
+            else:
+                measured = self.measure(iterations, warmup, trace)
+            timings, peak = measured
+            result = {"benchmark": type(self).__name__, "params": params}
+            result.update(summarize(timings, self.operations(**kwargs)))
+            result["tracemalloc_peak_bytes"] = peak
+            result["max_rss_bytes"] = max_rss()
+            results.append(result)
+            sys.stdout.write(self.format_result(result) + "\n")
             sys.stdout.flush()
+
+        _results.extend(results)
+        if args.json:
+            self.write_json(args.json)
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+            regressions = compare(results, baseline, args.metric, args.threshold)
+            for result, before, change in regressions:
+                arg_string = ", ".join(f"{k}={v}" for k, v in result["params"].items())
+                sys.stdout.write(
+                    f"Regression: {result['benchmark']}: {arg_string}: "
+                    f"{args.metric} {before[args.metric]:.0f}ns -> "
+                    f"{result[args.metric]:.0f}ns ({change:+.1%})\n"
+                )
+            if regressions:
+                sys.exit(1)
+        return results
+
+    @staticmethod
+    def format_result(result):
+        text = (
+            f"p50={result['p50_ns'] / 1000:.2f}us "
+            f"p99={result['p99_ns'] / 1000:.2f}us "
+            f"p999={result['p999_ns'] / 1000:.2f}us "
+            f"{result['ops_per_sec']:.0f} ops/sec"
+        )
+        if result["tracemalloc_peak_bytes"] is not None:
+            text += f", {result['tracemalloc_peak_bytes'] / 1024:.1f}KiB peak"
+        return text
+
+    @staticmethod
+    def write_json(path):
+        report = {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "redis_py": redis.__version__,
+            "hiredis": HIREDIS_AVAILABLE,
+            "results": _results,
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
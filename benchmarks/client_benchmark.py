@@ -0,0 +1,134 @@
+import os
+
+from base import Benchmark, stand_in_cluster, stand_in_server
+from parser_benchmark import AsyncBytearrayPythonParser, BytearrayPythonParser
+
+import redis
+import redis.asyncio
+from redis.asyncio import connection as async_connection
+from redis.cluster import ClusterNode, RedisCluster
+from redis.connection import DefaultParser, HiredisParser, PythonParser
+from redis.utils import HIREDIS_AVAILABLE
+
+# name -> (sync parser class, asyncio parser class)
+PARSERS = {
+    "PythonParser": (PythonParser, async_connection.PythonParser),
+    "BytearrayPythonParser": (BytearrayPythonParser, AsyncBytearrayPythonParser),
+}
+if HIREDIS_AVAILABLE:
+    PARSERS["HiredisParser"] = (HiredisParser, async_connection.HiredisParser)
+
+# all keys hash to the same slot, pipelines are sent to a single node
+KEY = "{benchmark}:key"
+
+
+class ClientBenchmark(Benchmark):
+    """
+    Sends GET or SET commands carrying values of various sizes one at a time
+    or in pipelines, with the sync and cluster clients and every parser. The
+    cluster client always uses its own parser, based on the default one.
+
+    Runs against the Redis server at localhost:6379 and the cluster at
+    localhost:16379, or against the in-process stand-ins for them when the
+    REDIS_STAND_IN environment variable is set.
+    """
+
+    ARGUMENTS = (
+        {"name": "client", "values": ["sync", "cluster"]},
+        {"name": "command", "values": ["get", "set"]},
+        {"name": "pipeline_depth", "values": [1, 10, 100]},
+        {"name": "value_size", "values": [16, 1024, 65536]},
+        {"name": "parser", "values": list(PARSERS)},
+    )
+
+    ITERATIONS = 200
+    WARMUP = 20
+
+    def supports(self, client, command, pipeline_depth, value_size, parser):
+        return client != "cluster" or PARSERS[parser][0] is DefaultParser
+
+    def operations(self, client, command, pipeline_depth, value_size, parser):
+        return pipeline_depth
+
+    def connection_kwargs(self):
+        if os.environ.get("REDIS_STAND_IN"):
+            return {"port": stand_in_server().port}
+        return {"port": 6379, "db": 9}
+
+    def cluster_nodes(self):
+        if os.environ.get("REDIS_STAND_IN"):
+            return [ClusterNode(*node) for node in stand_in_cluster().startup_nodes]
+        return [ClusterNode("localhost", 16379)]
+
+    def setup(self, client, command, pipeline_depth, value_size, parser):
+        if client == "cluster":
+            self.client = RedisCluster(startup_nodes=self.cluster_nodes())
+        else:
+            pool = redis.ConnectionPool(
+                parser_class=PARSERS[parser][0], **self.connection_kwargs()
+            )
+            self.client = redis.Redis(connection_pool=pool)
+        self.value = b"v" * value_size
+        self.client.set(KEY, self.value)
+
+    def run(self, client, command, pipeline_depth, value_size, parser):
+        if pipeline_depth == 1:
+            if command == "get":
+                self.client.get(KEY)
+            else:
+                self.client.set(KEY, self.value)
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for _ in range(pipeline_depth):
+            if command == "get":
+                pipe.get(KEY)
+            else:
+                pipe.set(KEY, self.value)
+        pipe.execute()
+
+    def teardown(self, client, command, pipeline_depth, value_size, parser):
+        if client == "cluster":
+            self.client.close()
+        else:
+            self.client.connection_pool.disconnect()
+
+
+class AsyncClientBenchmark(ClientBenchmark):
+    "ClientBenchmark for the asyncio client"
+
+    ARGUMENTS = (
+        {"name": "client", "values": ["asyncio"]},
+        *ClientBenchmark.ARGUMENTS[1:],
+    )
+
+    async def setup(self, client, command, pipeline_depth, value_size, parser):
+        pool = redis.asyncio.ConnectionPool(
+            parser_class=PARSERS[parser][1], **self.connection_kwargs()
+        )
+        self.client = redis.asyncio.Redis(connection_pool=pool)
+        self.value = b"v" * value_size
+        await self.client.set(KEY, self.value)
+
+    async def run(self, client, command, pipeline_depth, value_size, parser):
+        if pipeline_depth == 1:
+            if command == "get":
+                await self.client.get(KEY)
+            else:
+                await self.client.set(KEY, self.value)
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for _ in range(pipeline_depth):
+            if command == "get":
+                pipe.get(KEY)
+            else:
+                pipe.set(KEY, self.value)
+        await pipe.execute()
+
+    async def teardown(self, client, command, pipeline_depth, value_size, parser):
+        await self.client.close(close_connection_pool=True)
+
+
+if __name__ == "__main__":
+    # the results of both are written to the --json file
+    ClientBenchmark().run_benchmark()
+    AsyncClientBenchmark().run_benchmark()
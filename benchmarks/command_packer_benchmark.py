@@ -82,7 +82,7 @@ class CommandPackerBenchmark(Benchmark):
     ARGUMENTS = (
         {
             "name": "connection_class",
-            "values": [StringJoiningConnection, ListJoiningConnection],
+            "values": [StringJoiningConnection, ListJoiningConnection, Connection],
         },
         {
             "name": "value_size",
@@ -99,5 +99,31 @@ class CommandPackerBenchmark(Benchmark):
         r.set("benchmark", x)
 
 
+class PackCommandBenchmark(Benchmark):
+    "Packs commands with small arguments, without sending them to a server"
+
+    COMMANDS = {
+        "get": ("GET", "key:1"),
+        "set": ("SET", "key:1", "value", "EX", 100),
+        "hset": ("HSET", "hash", "f1", "v1", "f2", "v2"),
+        "lrange": ("LRANGE", "list", 0, 10),
+    }
+
+    ARGUMENTS = (
+        {
+            "name": "connection_class",
+            "values": [StringJoiningConnection, ListJoiningConnection, Connection],
+        },
+        {"name": "command", "values": list(COMMANDS)},
+    )
+
+    def setup(self, connection_class, command):
+        self.connection = connection_class()
+
+    def run(self, connection_class, command):
+        self.connection.pack_command(*self.COMMANDS[command])
+
+
 if __name__ == "__main__":
+    PackCommandBenchmark().run_benchmark()
     CommandPackerBenchmark().run_benchmark()
@@ -0,0 +1,41 @@
+import time
+
+from base import Benchmark, stand_in_server
+
+import redis
+
+
+class ExecuteCommandBenchmark(Benchmark):
+    """
+    Measures the CPU time the client thread spends per command, on the
+    fast path taken by commands without options on connections that don't
+    retry, and through Retry.call_with_retry() with retry_on_error set
+    """
+
+    ARGUMENTS = (
+        {"name": "path", "values": ["fast", "call_with_retry"]},
+        {"name": "command", "values": ["get", "set"]},
+    )
+
+    ITERATIONS = 20000
+    WARMUP = 1000
+    # the stand-in server runs in other threads, only the CPU time of the
+    # client thread is counted
+    TIMER = time.thread_time_ns
+
+    def setup(self, path, command):
+        kwargs = {"port": stand_in_server().port}
+        if path == "call_with_retry":
+            kwargs["retry_on_error"] = [redis.ConnectionError]
+        self._client = redis.Redis(connection_pool=redis.ConnectionPool(**kwargs))
+        self._client.ping()
+
+    def run(self, path, command):
+        if command == "get":
+            self._client.get("key")
+        else:
+            self._client.set("key", "value")
+
+
+if __name__ == "__main__":
+    ExecuteCommandBenchmark().run_benchmark()
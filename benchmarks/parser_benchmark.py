@@ -0,0 +1,201 @@
+import asyncio
+import types
+
+from base import Benchmark
+
+from redis.asyncio import connection as async_connection
+from redis.connection import BytearraySocketBuffer, Encoder, HiredisParser, PythonParser
+from redis.utils import HIREDIS_AVAILABLE
+
+
+def resp(reply):
+    "Encode ``reply`` the way a Redis server would send it"
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n%s" % (len(reply), b"".join(map(resp, reply)))
+    raise TypeError(f"Can't encode a {type(reply).__name__} reply")
+
+
+def nested(depth):
+    reply = [b"leaf", 1]
+    for level in range(depth):
+        reply = [level, reply, b"sibling"]
+    return reply
+
+
+def xread(entries):
+    return [
+        [
+            b"mystream",
+            [
+                [b"1526985054069-%d" % i, [b"sensor", b"1234", b"temp", b"19.8"]]
+                for i in range(entries)
+            ],
+        ]
+    ]
+
+
+def ft_search(documents):
+    reply = [documents]
+    for i in range(documents):
+        reply.append(b"doc:%d" % i)
+        reply.append([b"title", b"hello world %d" % i, b"body", b"lorem ipsum" * 8])
+    return reply
+
+
+def graph_query_compact(rows):
+    # GRAPH.QUERY --compact: a header of (column type, name), rows of
+    # (value type, value) pairs and node values, then the statistics
+    header = [[1, b"n"], [1, b"n.age"]]
+    node = [8, [7, [0], [[0, 2, b"alice"], [1, 3, 33]]]]
+    result = [[node, [3, i]] for i in range(rows)]
+    statistics = [b"Cached execution: 1", b"Query internal execution time: 0.1 ms"]
+    return [header, result, statistics]
+
+
+# name -> (encoded reply, number of times it is replayed per run)
+PAYLOADS = {
+    "small_int": (resp(42), 10000),
+    "bulk_16b": (resp(b"v" * 16), 10000),
+    "bulk_10mb": (resp(b"v" * 10 * 1024 * 1024), 5),
+    "array_1k": (resp([b"member:%d" % i for i in range(1000)]), 100),
+    "deep_array": (resp(nested(200)), 100),
+    "xread_100": (resp(xread(100)), 100),
+    "ft_search_100": (resp(ft_search(100)), 100),
+    "graph_compact_100": (resp(graph_query_compact(100)), 100),
+}
+
+
+class ReplaySocket:
+    """
+    A socket replaying ``data``, handing out at most the number of bytes
+    asked for on every recv() or recv_into() call
+    """
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def recv(self, size):
+        chunk = self.data[self.pos : self.pos + size]
+        self.pos += len(chunk)
+        return bytes(chunk)
+
+    def recv_into(self, buffer, size=0):
+        size = min(size or len(buffer), len(self.data) - self.pos)
+        buffer[:size] = self.data[self.pos : self.pos + size]
+        self.pos += size
+        return size
+
+    def settimeout(self, timeout):
+        pass
+
+
+class BytearrayPythonParser(PythonParser):
+    socket_buffer_class = BytearraySocketBuffer
+
+
+class AsyncBytearrayPythonParser(async_connection.PythonParser):
+    socket_buffer_class = async_connection.BytearraySocketBuffer
+
+
+def fake_connection(**kwargs):
+    return types.SimpleNamespace(
+        socket_timeout=None,
+        encoder=Encoder("utf-8", "strict", False),
+        protocol=2,
+        **kwargs,
+    )
+
+
+def read_sync(parser_class, data, count, read_size):
+    parser = parser_class(read_size)
+    parser.on_connect(fake_connection(_sock=ReplaySocket(data)))
+    read_response = parser.read_response
+    for _ in range(count):
+        read_response()
+    parser.on_disconnect()
+
+
+def read_async(parser_class, data, count, read_size):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        parser = parser_class(read_size)
+        parser.on_connect(fake_connection(_reader=reader))
+        read_response = parser.read_response
+        for _ in range(count):
+            await read_response()
+        parser.on_disconnect()
+
+    asyncio.run(read())
+
+
+def read_incremental(reader_class, data, count, read_size):
+    # how ProtocolConnection parses: chunks are fed as they are received
+    reader = reader_class()
+    replies = 0
+    view = memoryview(data)
+    for pos in range(0, len(data), read_size):
+        reader.feed(view[pos : pos + read_size])
+        while reader.gets() is not False:
+            replies += 1
+    assert replies == count
+
+
+PARSERS = {
+    "PythonParser": (read_sync, PythonParser),
+    "BytearrayPythonParser": (read_sync, BytearrayPythonParser),
+    "async PythonParser": (read_async, async_connection.PythonParser),
+    "async BytearrayPythonParser": (read_async, AsyncBytearrayPythonParser),
+    "PythonReader": (read_incremental, async_connection.PythonReader),
+}
+if HIREDIS_AVAILABLE:
+    import hiredis
+
+    PARSERS.update(
+        {
+            "HiredisParser": (read_sync, HiredisParser),
+            "async HiredisParser": (read_async, async_connection.HiredisParser),
+            "hiredis.Reader": (read_incremental, hiredis.Reader),
+        }
+    )
+
+
+class ParserBenchmark(Benchmark):
+    """
+    Replays recorded replies through every parser, without a server, and
+    reports the time spent per reply and the peak memory allocated while
+    parsing, as traced by tracemalloc. Use --only parser=<name> to only
+    benchmark some of the parsers
+    """
+
+    ARGUMENTS = (
+        {"name": "parser", "values": list(PARSERS)},
+        {"name": "payload", "values": list(PAYLOADS)},
+        {"name": "read_size", "values": [4096, 65536]},
+    )
+
+    ITERATIONS = 10
+    WARMUP = 1
+    TRACEMALLOC = True
+
+    def operations(self, parser, payload, read_size):
+        return PAYLOADS[payload][1]
+
+    def setup(self, parser, payload, read_size):
+        reply, count = PAYLOADS[payload]
+        self.data = reply * count
+
+    def run(self, parser, payload, read_size):
+        read, parser_class = PARSERS[parser]
+        read(parser_class, self.data, PAYLOADS[payload][1], read_size)
+
+
+if __name__ == "__main__":
+    # e.g. --only parser=PythonParser to benchmark a single parser
+    ParserBenchmark().run_benchmark()
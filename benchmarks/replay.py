@@ -0,0 +1,323 @@
+"""
+Replays a recording of Redis traffic, made by passing a
+redis.capture.TrafficRecorder as ``recorder`` to a client, against the
+in-process stand-in server, with the sync, asyncio or cluster client:
+
+    python replay.py traffic.cap --client asyncio --speed 10
+
+Every recorded connection is replayed by its own thread (or task), sending
+the commands it sent at the time they were sent, scaled by --speed (0 sends
+them as fast as possible). Commands sent together, such as pipelines, are
+sent together again. Connections which subscribed to channels receive the
+messages the others publish until all of them are done.
+
+Reports the latency of every batch of commands, and how long the sync and
+asyncio clients waited for a connection from their pool, to compare pool
+sizes (--max-connections), parsers (--parser) and read sizes (--read-size) on
+the command mix of a real application.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from base import stand_in_cluster, stand_in_module, stand_in_server, summarize
+from client_benchmark import PARSERS
+
+import redis
+import redis.asyncio
+from redis.capture import SEND, read_capture, split_records
+from redis.cluster import ClusterNode, RedisCluster
+
+# sent by connections on their own when connecting or following redirects,
+# which the replaying clients do as well
+HANDSHAKE_COMMANDS = {
+    "ASKING",
+    "AUTH",
+    "CLIENT",
+    "CLUSTER",
+    "COMMAND",
+    "HELLO",
+    "READONLY",
+    "SELECT",
+}
+PUBSUB_COMMANDS = {"PSUBSCRIBE", "PUNSUBSCRIBE", "SUBSCRIBE", "UNSUBSCRIBE"}
+# cluster pipelines don't support transactions
+TRANSACTION_COMMANDS = {"DISCARD", "EXEC", "MULTI", "UNWATCH", "WATCH"}
+
+
+def load(path, cluster=False):
+    """
+    Return the batches of commands sent by every recorded connection, as
+    lists of (timestamp, commands, transaction) tuples. Transactions are
+    batches sent between MULTI and EXEC, which are left out.
+    """
+    parse_command = stand_in_module().parse_command
+    connections = []
+    for description, records in split_records(read_capture(path)).values():
+        batches = []
+        for record in records:
+            if record.kind != SEND:
+                continue
+            commands = []
+            pos = 0
+            while pos < len(record.data):
+                args, pos = parse_command(record.data, pos)
+                name = args[0].decode().upper()
+                if name in HANDSHAKE_COMMANDS:
+                    continue
+                if cluster and name in TRANSACTION_COMMANDS:
+                    continue
+                commands.append((name, *args[1:]))
+            transaction = (
+                len(commands) > 2
+                and commands[0][0] == "MULTI"
+                and commands[-1][0] == "EXEC"
+            )
+            if transaction:
+                commands = commands[1:-1]
+            if commands:
+                batches.append((record.timestamp, commands, transaction))
+        if batches:
+            connections.append(batches)
+    return connections
+
+
+class Replay:
+    def __init__(self, connections, speed):
+        self.connections = connections
+        self.speed = speed
+        self.timings = []
+        self.commands = 0
+        self.errors = 0
+        self.messages = 0
+        self.start = None
+        # when the first replayed command was recorded
+        self.origin = min(batches[0][0] for batches in connections)
+
+    def delay(self, timestamp):
+        "The time to wait until the batch sent at ``timestamp`` is due"
+        if not self.speed:
+            return 0
+        due = self.start + (timestamp - self.origin) / self.speed
+        return due - time.perf_counter()
+
+    def report(self, elapsed):
+        batches = len(self.timings)
+        print(
+            f"{len(self.connections)} connections, {batches} batches, "
+            f"{self.commands} commands, {self.errors} errors, "
+            f"{self.messages} messages received in {elapsed:.3f}s "
+            f"({self.commands / elapsed:.0f} commands/sec)"
+        )
+        if batches:
+            result = summarize(self.timings, 1)
+            print(
+                f"batch latency: p50={result['p50_ns'] / 1000:.2f}us "
+                f"p99={result['p99_ns'] / 1000:.2f}us "
+                f"p999={result['p999_ns'] / 1000:.2f}us "
+                f"max={result['max_ns'] / 1000:.2f}us"
+            )
+
+
+def report_pool(stats):
+    "Print the use of a connection pool, as returned by its stats()"
+    wait = stats["checkout_wait"]
+    print(
+        f"pool: {stats['connections']} connections, {stats['checkouts']} "
+        f"checkouts, {stats['timeouts']} timeouts, "
+        f"checkout wait p99={wait['p99_ns'] / 1000:.2f}us "
+        f"max={wait['max_ns'] / 1000:.2f}us"
+    )
+
+
+class SyncReplay(Replay):
+    "Replays the connections from threads sharing a sync or cluster client"
+
+    def run(self, client):
+        self.lock = threading.Lock()
+        self.pending = len(self.connections)
+        self.done = threading.Event()
+        threads = [
+            threading.Thread(target=self.replay_connection, args=(client, batches))
+            for batches in self.connections
+        ]
+        self.start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - self.start
+
+    def replay_connection(self, client, batches):
+        pubsub = None
+        for timestamp, commands, transaction in batches:
+            delay = self.delay(timestamp)
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter_ns()
+            try:
+                if commands[0][0] in PUBSUB_COMMANDS:
+                    pubsub = pubsub or client.pubsub()
+                    for name, *args in commands:
+                        getattr(pubsub, name.lower())(*args)
+                elif len(commands) == 1 and not transaction:
+                    client.execute_command(*commands[0])
+                else:
+                    pipe = client.pipeline(transaction=transaction)
+                    for args in commands:
+                        pipe.execute_command(*args)
+                    pipe.execute(raise_on_error=False)
+            except Exception:
+                # including replies the stand-in answers differently from
+                # Redis, which the response callbacks choke on
+                errors = 1
+            else:
+                errors = 0
+            elapsed = time.perf_counter_ns() - start
+            with self.lock:
+                self.timings.append(elapsed)
+                self.commands += len(commands)
+                self.errors += errors
+        with self.lock:
+            self.pending -= 1
+            if not self.pending:
+                self.done.set()
+        if pubsub is not None:
+            messages = 0
+            while not self.done.is_set():
+                messages += pubsub.get_message(timeout=0.01) is not None
+            while pubsub.get_message(timeout=0.05) is not None:
+                messages += 1
+            pubsub.close()
+            with self.lock:
+                self.messages += messages
+
+
+class AsyncReplay(Replay):
+    "Replays the connections from tasks sharing an asyncio client"
+
+    async def run(self, client):
+        self.pending = len(self.connections)
+        self.done = asyncio.Event()
+        self.start = time.perf_counter()
+        await asyncio.gather(
+            *(self.replay_connection(client, batches) for batches in self.connections)
+        )
+        return time.perf_counter() - self.start
+
+    async def replay_connection(self, client, batches):
+        pubsub = None
+        for timestamp, commands, transaction in batches:
+            delay = self.delay(timestamp)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = time.perf_counter_ns()
+            try:
+                if commands[0][0] in PUBSUB_COMMANDS:
+                    pubsub = pubsub or client.pubsub()
+                    for name, *args in commands:
+                        await getattr(pubsub, name.lower())(*args)
+                elif len(commands) == 1 and not transaction:
+                    await client.execute_command(*commands[0])
+                else:
+                    pipe = client.pipeline(transaction=transaction)
+                    for args in commands:
+                        pipe.execute_command(*args)
+                    await pipe.execute(raise_on_error=False)
+            except Exception:
+                self.errors += 1
+            self.timings.append(time.perf_counter_ns() - start)
+            self.commands += len(commands)
+        self.pending -= 1
+        if not self.pending:
+            self.done.set()
+        if pubsub is not None:
+            while not self.done.is_set():
+                message = await pubsub.get_message(timeout=0.01)
+                self.messages += message is not None
+            while await pubsub.get_message(timeout=0.05) is not None:
+                self.messages += 1
+            await pubsub.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="the recording to replay")
+    parser.add_argument(
+        "--client", choices=["sync", "asyncio", "cluster"], default="sync"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="how many times faster than recorded to replay, 0 for as fast as "
+        "possible (default 1)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=list(PARSERS),
+        help="the parser class of the sync and asyncio clients",
+    )
+    parser.add_argument("--read-size", type=int, default=65536)
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        help="the size of the connection pool, which blocks when exhausted",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    connections = load(args.capture, cluster=args.client == "cluster")
+    if not connections:
+        print("No commands to replay")
+        return
+    kwargs = {"socket_read_size": args.read_size}
+    if args.client == "cluster":
+        nodes = [ClusterNode(*node) for node in stand_in_cluster().startup_nodes]
+        if args.max_connections:
+            kwargs["max_connections"] = args.max_connections
+        client = RedisCluster(startup_nodes=nodes, **kwargs)
+        replay = SyncReplay(connections, args.speed)
+        elapsed = replay.run(client)
+        pool_stats = None
+        client.close()
+    elif args.client == "sync":
+        if args.parser:
+            kwargs["parser_class"] = PARSERS[args.parser][0]
+        pool = redis.BlockingConnectionPool(
+            port=stand_in_server().port,
+            max_connections=args.max_connections or len(connections),
+            **kwargs,
+        )
+        replay = SyncReplay(connections, args.speed)
+        elapsed = replay.run(redis.Redis(connection_pool=pool))
+        pool_stats = pool.stats()
+        pool.disconnect()
+    else:
+        if args.parser:
+            kwargs["parser_class"] = PARSERS[args.parser][1]
+
+        async def run():
+            pool = redis.asyncio.BlockingConnectionPool(
+                port=stand_in_server().port,
+                max_connections=args.max_connections or len(connections),
+                **kwargs,
+            )
+            client = redis.asyncio.Redis(connection_pool=pool)
+            try:
+                return await replay.run(client), pool.stats()
+            finally:
+                await pool.disconnect()
+
+        replay = AsyncReplay(connections, args.speed)
+        elapsed, pool_stats = asyncio.run(run())
+    replay.report(elapsed)
+    if pool_stats and pool_stats["checkouts"]:
+        report_pool(pool_stats)
+
+
+if __name__ == "__main__":
+    main()
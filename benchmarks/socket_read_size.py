@@ -1,12 +1,19 @@
 from base import Benchmark
 
-from redis.connection import HiredisParser, PythonParser
+from redis.connection import BytearraySocketBuffer, HiredisParser, PythonParser
+
+
+class BytearrayPythonParser(PythonParser):
+    socket_buffer_class = BytearraySocketBuffer
 
 
 class SocketReadBenchmark(Benchmark):
 
     ARGUMENTS = (
-        {"name": "parser", "values": [PythonParser, HiredisParser]},
+        {
+            "name": "parser",
+            "values": [PythonParser, BytearrayPythonParser, HiredisParser],
+        },
         {
             "name": "value_size",
             "values": [10, 100, 1000, 10000, 100000, 1000000, 10000000, 100000000],
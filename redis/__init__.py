@@ -6,6 +6,8 @@ from redis.connection import (
     BlockingConnectionPool,
     Connection,
     ConnectionPool,
+    FairConnectionPool,
+    MultiplexedConnectionPool,
     SSLConnection,
     UnixDomainSocketConnection,
 )
@@ -63,8 +65,10 @@ __all__ = [
     "ConnectionError",
     "ConnectionPool",
     "DataError",
+    "FairConnectionPool",
     "from_url",
     "InvalidResponse",
+    "MultiplexedConnectionPool",
     "PubSubError",
     "ReadOnlyError",
     "Redis",
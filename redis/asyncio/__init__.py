@@ -4,6 +4,7 @@ from redis.asyncio.connection import (
     BlockingConnectionPool,
     Connection,
     ConnectionPool,
+    ProtocolConnection,
     SSLConnection,
     UnixDomainSocketConnection,
 )
@@ -44,6 +45,7 @@ __all__ = [
     "DataError",
     "from_url",
     "InvalidResponse",
+    "ProtocolConnection",
     "PubSubError",
     "ReadOnlyError",
     "Redis",
@@ -35,9 +35,15 @@ from redis.asyncio.retry import Retry
 from redis.client import (
     EMPTY_RESPONSE,
     NEVER_DECODE,
+    RAW_RESPONSE,
+    RESPONSE_SHAPES,
+    STREAM_INTO,
     AbstractRedis,
     CaseInsensitiveDict,
     bool_ok,
+    decode_response,
+    stream_transaction_replies,
+    validate_response_decoding,
 )
 from redis.commands import (
     AsyncCoreCommands,
@@ -46,8 +52,10 @@ from redis.commands import (
     list_or_args,
 )
 from redis.compat import Protocol, TypedDict
+from redis.connection import DEDICATED_CONNECTION_COMMANDS
 from redis.exceptions import (
     ConnectionError,
+    DataError,
     ExecAbortError,
     PubSubError,
     RedisError,
@@ -55,6 +63,7 @@ from redis.exceptions import (
     TimeoutError,
     WatchError,
 )
+from redis.instrumentation import CommandEvent, Instrumentation
 from redis.typing import ChannelT, EncodableT, KeyT
 from redis.utils import safe_str, str_if_bytes
 
@@ -174,6 +183,12 @@ class Redis(
         retry: Optional[Retry] = None,
         auto_close_connection_pool: bool = True,
         redis_connect_func=None,
+        protocol: int = 2,
+        auto_pipeline: bool = False,
+        auto_pipeline_window: float = 0,
+        recorder: Optional[Any] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        drain_timeout: Optional[float] = None,
     ):
         """
         Initialize a new Redis client.
@@ -181,6 +196,17 @@ class Redis(
         `retry_on_error` to a list of the error/s to retry on, then set
         `retry` to a valid `Retry` object.
         To retry on TimeoutError, `retry_on_timeout` can also be set to `True`.
+        Set `protocol` to 3 to talk RESP3 (Redis 6.0+), which returns maps,
+        sets, doubles and booleans natively.
+        With `auto_pipeline` set, commands issued concurrently are written
+        to a connection together, see `AutoPipeliner`.
+        Pass a `redis.capture.TrafficRecorder` as `recorder` to record the
+        commands sent and the replies received by the client's connections.
+        Pass a `redis.instrumentation.Instrumentation` as `instrumentation` to
+        have it called before and after every command and pipeline.
+        With a `drain_timeout`, connections whose read timed out or was
+        cancelled drain the replies left unread, for up to `drain_timeout`
+        seconds, and go on using their socket instead of reconnecting.
         """
         kwargs: Dict[str, Any]
         # auto_close_connection_pool only has an effect if connection_pool is
@@ -210,6 +236,10 @@ class Redis(
                 "health_check_interval": health_check_interval,
                 "client_name": client_name,
                 "redis_connect_func": redis_connect_func,
+                "protocol": protocol,
+                "recorder": recorder,
+                "instrumentation": instrumentation,
+                "drain_timeout": drain_timeout,
             }
             # based on input, setup appropriate connection args
             if unix_socket_path is not None:
@@ -245,10 +275,16 @@ class Redis(
                     )
             connection_pool = ConnectionPool(**kwargs)
         self.connection_pool = connection_pool
+        instrumentation = connection_pool.connection_kwargs.get("instrumentation")
+        self.instrumentation: Optional[Instrumentation] = instrumentation
         self.single_connection_client = single_connection_client
         self.connection: Optional[Connection] = None
+        self.auto_pipeliner: Optional[AutoPipeliner] = None
+        if auto_pipeline:
+            self.auto_pipeliner = AutoPipeliner(self, window=auto_pipeline_window)
 
-        self.response_callbacks = CaseInsensitiveDict(self.__class__.RESPONSE_CALLBACKS)
+        self.response_callbacks = self.response_callback_table()
+        self.response_decoding = CaseInsensitiveDict({})
 
     def __repr__(self):
         return f"{self.__class__.__name__}<{self.connection_pool!r}>"
@@ -265,6 +301,52 @@ class Redis(
         """Set a custom Response Callback"""
         self.response_callbacks[command] = callback
 
+    def set_response_shape(self, command: str, shape: Optional[str]):
+        """
+        Set the shape of the replies to ``command``, a command returning
+        fields and values such as HGETALL or CONFIG GET: ``"list"`` returns
+        a flat list of fields and values, ``"pairs"`` a list of (field,
+        value) tuples, ``"dict"`` a dict and ``"raw"`` the reply as read,
+        without running any callback. ``None`` restores the default
+        response callback of the command.
+        """
+        if shape is None:
+            callback = self.response_callback_table().get(command)
+            if callback is not None:
+                self.response_callbacks[command] = callback
+            elif command in self.response_callbacks:
+                del self.response_callbacks[command]
+            return
+        if shape not in RESPONSE_SHAPES:
+            raise DataError(
+                f"Response shape must be one of {', '.join(RESPONSE_SHAPES)}"
+            )
+        callback = RESPONSE_SHAPES[shape]
+        if callback is None:
+            if command in self.response_callbacks:
+                del self.response_callbacks[command]
+        else:
+            self.response_callbacks[command] = callback
+
+    def set_response_decoding(self, command: str, decode: Union[bool, str, None]):
+        """
+        Set how the replies to ``command`` are decoded, whatever the
+        ``decode_responses`` setting of the client: ``True`` decodes them
+        entirely, ``False`` leaves them as bytes and ``"fields"`` only
+        decodes the field names (and stream entry ids) of commands returning
+        fields and values, such as HGETALL or XRANGE, leaving the values as
+        bytes. ``None`` restores the default.
+
+        Response callbacks run on the decoded replies. Commands sent in
+        transactions are always decoded according to ``decode_responses``.
+        """
+        if decode is None:
+            if command in self.response_decoding:
+                del self.response_decoding[command]
+            return
+        validate_response_decoding(command, decode)
+        self.response_decoding[command] = decode
+
     def get_encoder(self):
         """Get the connection pool's encoder"""
         return self.connection_pool.get_encoder()
@@ -297,7 +379,10 @@ class Redis(
         setattr(self, funcname, func)
 
     def pipeline(
-        self, transaction: bool = True, shard_hint: Optional[str] = None
+        self,
+        transaction: bool = True,
+        shard_hint: Optional[str] = None,
+        raw: bool = False,
     ) -> "Pipeline":
         """
         Return a new pipeline object that can queue multiple commands for
@@ -305,10 +390,16 @@ class Redis(
         should be executed atomically. Apart from making a group of operations
         atomic, pipelines are useful for reducing the back-and-forth overhead
         between the client and server.
+
+        With ``raw`` set, the replies of the pipeline are returned as read,
+        undecoded and without running their response callbacks.
         """
-        return Pipeline(
+        pipe = Pipeline(
             self.connection_pool, self.response_callbacks, transaction, shard_hint
         )
+        pipe.response_decoding.update(self.response_decoding)
+        pipe.raw = raw
+        return pipe
 
     async def transaction(
         self,
@@ -446,6 +537,8 @@ class Redis(
         let Redis.auto_close_connection_pool decide whether to close the connection
         pool.
         """
+        if self.auto_pipeliner is not None:
+            await self.auto_pipeliner.flush()
         conn = self.connection
         if conn:
             self.connection = None
@@ -468,7 +561,7 @@ class Redis(
         if retry_on_timeout is not set or the error
         is not a TimeoutError
         """
-        await conn.disconnect()
+        await conn.disconnect(error)
         if (
             conn.retry_on_error is None
             or isinstance(error, tuple(conn.retry_on_error)) is False
@@ -477,13 +570,40 @@ class Redis(
 
     # COMMAND EXECUTION AND PROTOCOL PARSING
     async def execute_command(self, *args, **options):
-        """Execute a command and return a parsed response"""
+        """
+        Execute a command and return a parsed response. With ``raw=True``,
+        the reply is returned as read, undecoded and without running its
+        response callback.
+
+        Commands without options sent on connections that don't retry on
+        errors (no ``retry_on_error`` nor ``retry_on_timeout``) take a fast
+        path, sending the command and parsing its response directly instead
+        of through ``Retry.call_with_retry()``. Errors are handled the same
+        way: the connection is disconnected and the error raised. Clients
+        with an ``instrumentation`` always go through ``call_with_retry()``,
+        so the timings they record include its overhead.
+        """
         await self.initialize()
+        if self.instrumentation is not None:
+            return await self._execute_instrumented_command(*args, **options)
         pool = self.connection_pool
         command_name = args[0]
+        if (
+            self.auto_pipeliner is not None
+            and not self.connection
+            and command_name.upper() not in DEDICATED_CONNECTION_COMMANDS
+        ):
+            return await self.auto_pipeliner.execute_command(*args, **options)
         conn = self.connection or await pool.get_connection(command_name, **options)
 
         try:
+            if not options and not conn.retry_on_error:
+                try:
+                    await conn.send_command(*args)
+                    return await self.parse_response(conn, command_name)
+                except conn.retry.get_supported_errors() as error:
+                    # what call_with_retry() does when errors aren't retried
+                    await self._disconnect_raise(conn, error)
             return await conn.retry.call_with_retry(
                 lambda: self._send_command_parse_response(
                     conn, command_name, *args, **options
@@ -494,23 +614,76 @@ class Redis(
             if not self.connection:
                 await pool.release(conn)
 
+    async def _execute_instrumented_command(self, *args, **options):
+        """
+        Execute a command like execute_command(), calling the client's
+        instrumentation before and after it and timing its phases
+        """
+        instrumentation = cast(Instrumentation, self.instrumentation)
+        event = CommandEvent(args[0])
+        instrumentation.before_command(event)
+        try:
+            pool = self.connection_pool
+            command_name = args[0]
+            if (
+                self.auto_pipeliner is not None
+                and not self.connection
+                and command_name.upper() not in DEDICATED_CONNECTION_COMMANDS
+            ):
+                response = await self.auto_pipeliner.execute_command(*args, **options)
+            else:
+                conn = self.connection or await pool.get_connection(
+                    command_name, **options
+                )
+                event.connection_acquired(conn)
+                try:
+                    response = await conn.retry.call_with_retry(
+                        lambda: self._send_command_parse_response(
+                            conn, command_name, *args, **options
+                        ),
+                        lambda error: self._disconnect_raise(conn, error),
+                    )
+                finally:
+                    event.connection_released(conn)
+                    if not self.connection:
+                        await pool.release(conn)
+        except BaseException as error:
+            event.finish(error)
+            instrumentation.after_command(event)
+            raise
+        event.finish()
+        instrumentation.after_command(event)
+        return response
+
     async def parse_response(
         self, connection: Connection, command_name: Union[str, bytes], **options
     ):
         """Parses a response from the Redis server"""
         try:
+            if STREAM_INTO in options:
+                sink = options[STREAM_INTO]
+                return sink.finish(await connection.read_response(sink=sink))
+            if options.get(RAW_RESPONSE):
+                return await connection.read_response(disable_decoding=True)
             if NEVER_DECODE in options:
                 response = await connection.read_response(disable_decoding=True)
+            elif self.response_decoding and command_name in self.response_decoding:
+                response = decode_response(
+                    await connection.read_response(disable_decoding=True),
+                    connection.encoder,
+                    command_name,
+                    self.response_decoding[command_name],
+                )
             else:
                 response = await connection.read_response()
         except ResponseError:
             if EMPTY_RESPONSE in options:
                 return options[EMPTY_RESPONSE]
             raise
-        if command_name in self.response_callbacks:
-            # Mypy bug: https://github.com/python/mypy/issues/10977
-            command_name = cast(str, command_name)
-            retval = self.response_callbacks[command_name](response, **options)
+        # Mypy bug: https://github.com/python/mypy/issues/10977
+        callback = self.response_callbacks.get(cast(str, command_name))
+        if callback is not None:
+            retval = callback(response, **options)
             return await retval if inspect.isawaitable(retval) else retval
         return response
 
@@ -518,6 +691,99 @@ class Redis(
 StrictRedis = Redis
 
 
+class AutoPipeliner:
+    """
+    Gathers the commands a client runs concurrently and writes them to a
+    connection together, so that many coroutines issuing single commands
+    get the throughput of a :class:`Pipeline`.
+
+    Commands issued in the same iteration of the event loop, or within
+    ``window`` seconds of the first of them, make up a batch. A batch is
+    packed into a single buffer and sent on a connection of the client's
+    pool, the replies are then handed to the waiting callers in order. While
+    a batch waits for its replies, the next one is gathered and sent on
+    another connection.
+
+    Commands that block or change the state of their connection are never
+    batched. Unlike single commands, batched commands are not retried on
+    connection errors, as they might have been executed already.
+    """
+
+    def __init__(self, client: Redis, window: float = 0):
+        self.client = client
+        self.window = window
+        self._batch: List[Tuple[Tuple[EncodableT, ...], Dict, asyncio.Future]] = []
+        self._scheduled: Optional[asyncio.Handle] = None
+        self._sending: Set[asyncio.Task] = set()
+
+    async def execute_command(self, *args, **options):
+        # TODO: Change to get_running_loop() when dropping support for py3.6
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._batch.append((args, options, future))
+        if self._scheduled is None:
+            if self.window:
+                self._scheduled = loop.call_later(self.window, self._send_batch)
+            else:
+                self._scheduled = loop.call_soon(self._send_batch)
+        return await future
+
+    async def flush(self):
+        """Send the commands gathered so far and wait for every reply"""
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._send_batch()
+        if self._sending:
+            await asyncio.wait(self._sending)
+
+    def _send_batch(self):
+        batch = self._batch
+        self._batch = []
+        self._scheduled = None
+        task = asyncio.ensure_future(self._execute_batch(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _execute_batch(self, batch):
+        client = self.client
+        pool = client.connection_pool
+        conn = None
+        try:
+            conn = await pool.get_connection("_")
+            await conn.send_packed_command(
+                conn.pack_commands([args for args, _, _ in batch])
+            )
+            for i, (args, options, future) in enumerate(batch):
+                try:
+                    response = await client.parse_response(conn, args[0], **options)
+                except ResponseError as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                except BaseException:
+                    # the replies still unread are lost with the connection
+                    batch = batch[i:]
+                    raise
+                if not future.done():
+                    future.set_result(response)
+        except BaseException as e:
+            if conn is not None:
+                await conn.disconnect(e)
+            cancelled = isinstance(e, asyncio.CancelledError)
+            for _, _, future in batch:
+                if future.done():
+                    continue
+                if cancelled:
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+            if cancelled:
+                raise
+        finally:
+            if conn is not None:
+                await pool.release(conn)
+
+
 class MonitorCommandInfo(TypedDict):
     time: float
     db: int
@@ -1036,6 +1302,9 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
 
     UNWATCH_COMMANDS = {"DISCARD", "EXEC", "UNWATCH"}
 
+    # set by Redis.pipeline(raw=True) to return the replies as read
+    raw = False
+
     def __init__(
         self,
         connection_pool: ConnectionPool,
@@ -1046,6 +1315,11 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
         self.connection_pool = connection_pool
         self.connection = None
         self.response_callbacks = response_callbacks
+        # filled by Redis.pipeline() with the decoding set for the commands
+        # of the client
+        self.response_decoding = CaseInsensitiveDict({})
+        instrumentation = connection_pool.connection_kwargs.get("instrumentation")
+        self.instrumentation: Optional[Instrumentation] = instrumentation
         self.is_transaction = transaction
         self.shard_hint = shard_hint
         self.watching = False
@@ -1210,9 +1484,16 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
                     self.annotate_exception(err, i + 1, command[0])
                     errors.append((i, err))
 
-        # parse the EXEC.
+        # parse the EXEC. the replies of the commands streaming them into a
+        # sink are written to it as they are, so read them without decoding
+        streamed = any(STREAM_INTO in options for _, options in commands)
         try:
-            response = await self.parse_response(connection, "_")
+            if streamed:
+                response = await self.parse_response(
+                    connection, "_", **{NEVER_DECODE: []}
+                )
+            else:
+                response = await self.parse_response(connection, "_")
         except ExecAbortError as err:
             if errors:
                 raise errors[0][1] from err
@@ -1239,14 +1520,23 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
         if raise_on_error:
             self.raise_first_error(commands, response)
 
+        if streamed:
+            encoder = connection.encoder
+            decode = encoder.decode_responses and not self.raw
+            response = stream_transaction_replies(response, commands, encoder, decode)
+
+        if self.raw:
+            return response
+
         # We have to run response callbacks manually
         data = []
+        get_callback = self.response_callbacks.get
         for r, cmd in zip(response, commands):
-            if not isinstance(r, Exception):
-                args, options = cmd
-                command_name = args[0]
-                if command_name in self.response_callbacks:
-                    r = self.response_callbacks[command_name](r, **options)
+            args, options = cmd
+            if not isinstance(r, Exception) and STREAM_INTO not in options:
+                callback = get_callback(args[0])
+                if callback is not None:
+                    r = callback(r, **options)
                     if inspect.isawaitable(r):
                         r = await r
             data.append(r)
@@ -1288,6 +1578,8 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
     async def parse_response(
         self, connection: Connection, command_name: Union[str, bytes], **options
     ):
+        if self.raw:
+            options.setdefault(RAW_RESPONSE, True)
         result = await super().parse_response(connection, command_name, **options)
         if command_name in self.UNWATCH_COMMANDS:
             self.watching = False
@@ -1302,11 +1594,13 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
         shas = [s.sha for s in scripts]
         # we can't use the normal script_* methods because they would just
         # get buffered in the pipeline.
-        exists = await immediate("SCRIPT EXISTS", *shas)
+        exists = await immediate("SCRIPT EXISTS", *shas, **{RAW_RESPONSE: False})
         if not all(exists):
             for s, exist in zip(scripts, exists):
                 if not exist:
-                    s.sha = await immediate("SCRIPT LOAD", s.script)
+                    s.sha = await immediate(
+                        "SCRIPT LOAD", s.script, **{RAW_RESPONSE: False}
+                    )
 
     async def _disconnect_raise_reset(self, conn: Connection, error: Exception):
         """
@@ -1314,7 +1608,7 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
         and raise an exception if retry_on_timeout is not set,
         or the error is not a TimeoutError
         """
-        await conn.disconnect()
+        await conn.disconnect(error)
         # if we were watching a variable, the watch is no longer valid
         # since this connection has died. raise a WatchError, which
         # indicates the user should retry this transaction.
@@ -1340,6 +1634,9 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
         else:
             execute = self._execute_pipeline
 
+        if self.instrumentation is not None:
+            return await self._execute_instrumented(execute, stack, raise_on_error)
+
         conn = self.connection
         if not conn:
             conn = await self.connection_pool.get_connection("MULTI", self.shard_hint)
@@ -1356,6 +1653,40 @@ class Pipeline(Redis):  # lgtm [py/init-calls-subclass]
         finally:
             await self.reset()
 
+    async def _execute_instrumented(self, execute, stack, raise_on_error: bool):
+        """
+        Execute the pipeline like execute(), calling the client's
+        instrumentation before and after it and timing its phases
+        """
+        instrumentation = cast(Instrumentation, self.instrumentation)
+        name = "PIPELINE" if execute == self._execute_pipeline else "MULTI"
+        event = CommandEvent(name, commands=len(stack))
+        instrumentation.before_pipeline(event)
+        try:
+            conn = self.connection
+            if not conn:
+                conn = await self.connection_pool.get_connection(
+                    "MULTI", self.shard_hint
+                )
+                self.connection = conn
+            conn = cast(Connection, conn)
+            event.connection_acquired(conn)
+            try:
+                response = await conn.retry.call_with_retry(
+                    lambda: execute(conn, stack, raise_on_error),
+                    lambda error: self._disconnect_raise_reset(conn, error),
+                )
+            finally:
+                event.connection_released(conn)
+                await self.reset()
+        except BaseException as error:
+            event.finish(error)
+            instrumentation.after_pipeline(event)
+            raise
+        event.finish()
+        instrumentation.after_pipeline(event)
+        return response
+
     async def discard(self):
         """Flushes all previously queued commands
         See: https://redis.io/commands/DISCARD
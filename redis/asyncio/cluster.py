@@ -19,7 +19,7 @@ from typing import (
 from redis.asyncio.client import ResponseCallbackT
 from redis.asyncio.connection import Connection, DefaultParser, Encoder, parse_url
 from redis.asyncio.parser import CommandsParser
-from redis.client import EMPTY_RESPONSE, NEVER_DECODE, AbstractRedis
+from redis.client import EMPTY_RESPONSE, NEVER_DECODE, STREAM_INTO, AbstractRedis
 from redis.cluster import (
     PIPELINE_BLOCKED_COMMANDS,
     PRIMARY,
@@ -49,6 +49,7 @@ from redis.exceptions import (
     TimeoutError,
     TryAgainError,
 )
+from redis.instrumentation import CommandEvent, PoolStats
 from redis.typing import AnyKeyT, EncodableT, KeyT
 from redis.utils import dict_merge, safe_str, str_if_bytes
 
@@ -60,12 +61,16 @@ CONNECTION_ALLOWED_KEYS = (
     "client_name",
     "db",
     "decode_responses",
+    "drain_timeout",
     "encoder_class",
     "encoding",
     "encoding_errors",
     "health_check_interval",
+    "instrumentation",
     "parser_class",
     "password",
+    "protocol",
+    "recorder",
     "redis_connect_func",
     "retry",
     "retry_on_timeout",
@@ -221,6 +226,7 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
         "commands_parser",
         "connection_kwargs",
         "encoder",
+        "instrumentation",
         "node_flags",
         "nodes_manager",
         "read_from_replicas",
@@ -284,6 +290,7 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
         # method should be run
         kwargs["redis_connect_func"] = self.on_connect
         self.connection_kwargs = kwargs = cleanup_kwargs(**kwargs)
+        self.instrumentation = kwargs.get("instrumentation")
         self.response_callbacks = kwargs[
             "response_callbacks"
         ] = self.__class__.RESPONSE_CALLBACKS.copy()
@@ -382,6 +389,13 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
         """Get all nodes of the cluster."""
         return list(self.nodes_manager.nodes_cache.values())
 
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the snapshots of the connections of the nodes of the cluster,
+        as returned by :meth:`ClusterNode.stats`, keyed by node name.
+        """
+        return {node.name: node.stats() for node in self.get_nodes()}
+
     def get_primaries(self) -> List["ClusterNode"]:
         """Get the primary nodes of the cluster."""
         return self.nodes_manager.get_nodes_by_server_type(PRIMARY)
@@ -601,6 +615,10 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
             target_nodes_specified = True
             retry_attempts = 1
 
+        if self.instrumentation is None:
+            execute = self._execute_command
+        else:
+            execute = self._execute_instrumented_command
         for _ in range(retry_attempts):
             if self._initialize:
                 await self.initialize()
@@ -617,7 +635,7 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
 
                 if len(target_nodes) == 1:
                     # Return the processed result
-                    ret = await self._execute_command(target_nodes[0], *args, **kwargs)
+                    ret = await execute(target_nodes[0], *args, **kwargs)
                     if command in self.result_callbacks:
                         return self.result_callbacks[command](
                             command, {target_nodes[0].name: ret}, **kwargs
@@ -627,9 +645,7 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
                     keys = [node.name for node in target_nodes]
                     values = await asyncio.gather(
                         *(
-                            asyncio.ensure_future(
-                                self._execute_command(node, *args, **kwargs)
-                            )
+                            asyncio.ensure_future(execute(node, *args, **kwargs))
                             for node in target_nodes
                         )
                     )
@@ -651,6 +667,26 @@ class RedisCluster(AbstractRedis, AbstractRedisCluster, AsyncRedisClusterCommand
         # to caller of this method
         raise exception
 
+    async def _execute_instrumented_command(
+        self, target_node: "ClusterNode", *args: Union[KeyT, EncodableT], **kwargs: Any
+    ) -> Any:
+        """
+        Send a command to a node like _execute_command(), calling the
+        instrumentation before and after it
+        """
+        instrumentation = self.instrumentation
+        event = CommandEvent(args[0], node=target_node.name)
+        instrumentation.before_command(event)
+        try:
+            response = await self._execute_command(target_node, *args, **kwargs)
+        except BaseException as error:
+            event.finish(error)
+            instrumentation.after_command(event)
+            raise
+        event.finish()
+        instrumentation.after_command(event)
+        return response
+
     async def _execute_command(
         self, target_node: "ClusterNode", *args: Union[KeyT, EncodableT], **kwargs: Any
     ) -> Any:
@@ -758,6 +794,7 @@ class ClusterNode:
         "_command_stack",
         "_connections",
         "_free",
+        "_stats",
         "connection_class",
         "connection_kwargs",
         "host",
@@ -797,6 +834,7 @@ class ClusterNode:
         self._connections: List[Connection] = []
         self._free: Deque[Connection] = collections.deque(maxlen=self.max_connections)
         self._command_stack: List["PipelineCommand"] = []
+        self._stats = PoolStats()
 
     def __repr__(self) -> str:
         return (
@@ -847,15 +885,37 @@ class ClusterNode:
 
         if len(self._connections) < self.max_connections:
             connection = self.connection_class(**self.connection_kwargs)
+            connection.pool_stats = self._stats
             self._connections.append(connection)
             return connection
 
         raise ConnectionError("Too many connections")
 
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the connections of the node, as returned by
+        :meth:`~redis.asyncio.connection.ConnectionPool.stats`. Connections
+        are handed out without waiting, so no checkouts are counted.
+        """
+        idle = len(self._free)
+        stats: Dict[str, Any] = {
+            "max_connections": self.max_connections,
+            "connections": len(self._connections),
+            "in_use": len(self._connections) - idle,
+            "idle": idle,
+        }
+        stats.update(self._stats.snapshot())
+        return stats
+
     async def parse_response(
         self, connection: Connection, command: str, **kwargs: Any
     ) -> Any:
         try:
+            if STREAM_INTO in kwargs:
+                sink = kwargs[STREAM_INTO]
+                return sink.finish(
+                    await connection.read_response_without_lock(sink=sink)
+                )
             if NEVER_DECODE in kwargs:
                 response = await connection.read_response_without_lock(
                     disable_decoding=True
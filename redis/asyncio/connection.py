@@ -9,12 +9,16 @@ import socket
 import ssl
 import sys
 import threading
+import time
 import weakref
+from collections import deque
 from itertools import chain
 from types import MappingProxyType
 from typing import (
     Any,
     Callable,
+    Deque,
+    Dict,
     Iterable,
     List,
     Mapping,
@@ -24,6 +28,7 @@ from typing import (
     Type,
     TypeVar,
     Union,
+    cast,
 )
 from urllib.parse import ParseResult, parse_qs, unquote, urlparse
 
@@ -31,7 +36,14 @@ import async_timeout
 
 from redis.asyncio.retry import Retry
 from redis.backoff import NoBackoff
+from redis.capture import (
+    SEND,
+    CapturingProtocol,
+    CapturingStreamReader,
+    TrafficRecorder,
+)
 from redis.compat import Protocol, TypedDict
+from redis.connection import BLOCKING_COMMANDS
 from redis.exceptions import (
     AuthenticationError,
     AuthenticationWrongNumberOfArgsError,
@@ -49,12 +61,24 @@ from redis.exceptions import (
     ResponseError,
     TimeoutError,
 )
+from redis.instrumentation import (
+    ConnectionMeter,
+    Instrumentation,
+    MeteredProtocol,
+    MeteredStreamReader,
+    PoolStats,
+    perf_counter_ns,
+)
 from redis.typing import EncodableT, EncodedT
 from redis.utils import HIREDIS_AVAILABLE, str_if_bytes
 
 hiredis = None
+HIREDIS_SUPPORTS_RESP3 = False
 if HIREDIS_AVAILABLE:
     import hiredis
+    from packaging.version import Version
+
+    HIREDIS_SUPPORTS_RESP3 = Version(hiredis.__version__) >= Version("3.0.0")
 
 NONBLOCKING_EXCEPTION_ERROR_NUMBERS = {
     BlockingIOError: errno.EWOULDBLOCK,
@@ -72,8 +96,31 @@ SYM_CRLF = b"\r\n"
 SYM_LF = b"\n"
 SYM_EMPTY = b""
 
+# encodings of the integers most often sent as arguments, such as indexes,
+# counts and timeouts, and of the bulk string headers of short arguments
+SMALL_INT_ENCODINGS = {i: str(i).encode() for i in range(-1, 1024)}
+BULK_STRING_HEADERS = tuple(b"$%d\r\n" % i for i in range(1024))
+
+# packed headers of the commands sent so far, by command name and number of
+# arguments, each holding the argument count and the words of the name
+COMMAND_HEADERS: Dict[Tuple[Any, int], bytes] = {}
+COMMAND_HEADERS_MAX_SIZE = 4096
+
+# RESP2 and RESP3 aggregate reply types
+RESP_ARRAY = b"*"
+RESP_MAP = b"%"
+RESP_SET = b"~"
+RESP_PUSH = b">"
+RESP_ATTRIBUTE = b"|"
+RESP_AGGREGATE_TYPES = (RESP_ARRAY, RESP_MAP, RESP_SET, RESP_PUSH, RESP_ATTRIBUTE)
+
 SERVER_CLOSED_CONNECTION_ERROR = "Connection closed by server."
 
+# the only push messages that arrive on a connection that isn't subscribed
+# to any channel. hiredis hands pushes out as plain lists, so they are
+# recognized by their kind.
+OUT_OF_BAND_PUSH_KINDS = (b"invalidate", "invalidate")
+
 
 class _Sentinel(enum.Enum):
     sentinel = object()
@@ -97,6 +144,34 @@ class _HiredisReaderArgs(TypedDict, total=False):
     errors: Optional[str]
 
 
+def command_header(name: Union[str, bytes], argc: int) -> bytes:
+    """
+    Return the packed header of a command named ``name`` that is sent with
+    ``argc`` arguments. A name of several words, e.g. 'CONFIG GET', is split
+    into separate arguments, as the server expects. Headers are cached.
+    """
+    try:
+        return COMMAND_HEADERS[name, argc]
+    except KeyError:
+        cacheable = True
+    except TypeError:
+        # unhashable names, e.g. bytearrays
+        cacheable = False
+    if isinstance(name, str):
+        words = name.encode().split()
+    elif b" " in name:
+        words = name.split()
+    else:
+        words = [name]
+    pieces = [b"*%d\r\n" % (len(words) + argc)]
+    for word in words:
+        pieces.extend((b"$%d\r\n" % len(word), word, SYM_CRLF))
+    header = SYM_EMPTY.join(pieces)
+    if cacheable and len(COMMAND_HEADERS) < COMMAND_HEADERS_MAX_SIZE:
+        COMMAND_HEADERS[name, argc] = header
+    return header
+
+
 class Encoder:
     """Encode strings to bytes-like and decode bytes-like to strings"""
 
@@ -109,6 +184,15 @@ class Encoder:
 
     def encode(self, value: EncodableT) -> EncodedT:
         """Return a bytestring or bytes-like representation of the value"""
+        # exact type checks first, for the most common arguments
+        value_type = type(value)
+        if value_type is bytes:
+            return value
+        if value_type is str:
+            return value.encode(self.encoding, self.encoding_errors)
+        if value_type is int:
+            encoded = SMALL_INT_ENCODINGS.get(value)
+            return encoded if encoded is not None else repr(value).encode()
         if isinstance(value, str):
             return value.encode(self.encoding, self.encoding_errors)
         if isinstance(value, (bytes, memoryview)):
@@ -144,7 +228,7 @@ ExceptionMappingT = Mapping[str, Union[Type[Exception], Mapping[str, Type[Except
 class BaseParser:
     """Plain Python parsing class"""
 
-    __slots__ = "_stream", "_buffer", "_read_size"
+    __slots__ = "_stream", "_buffer", "_read_size", "push_handler_func"
 
     EXCEPTION_CLASSES: ExceptionMappingT = {
         "ERR": {
@@ -174,6 +258,15 @@ class BaseParser:
         self._stream: Optional[asyncio.StreamReader] = None
         self._buffer: Optional[SocketBuffer] = None
         self._read_size = socket_read_size
+        # called with RESP3 push messages (e.g. client tracking
+        # invalidations) that arrive in between replies. when unset, push
+        # messages are returned by read_response() like any other reply,
+        # which is what the PubSub connections expect.
+        self.push_handler_func: Optional[Callable[[List[Any]], None]] = None
+
+    def set_push_handler(self, push_handler_func: Callable[[List[Any]], None]):
+        """Route out-of-band RESP3 push messages to ``push_handler_func``"""
+        self.push_handler_func = push_handler_func
 
     def __del__(self):
         try:
@@ -206,6 +299,44 @@ class BaseParser:
     ) -> Union[EncodableT, ResponseError, None, List[EncodableT]]:
         raise NotImplementedError()
 
+    async def read_response_into(
+        self, sink: Any
+    ) -> Union[EncodableT, ResponseError, None, List[EncodableT]]:
+        """
+        Read a reply, handing it to ``sink`` (a `BufferSink` or `FileSink`)
+        if it is a bulk string, in which case its length is returned. This
+        implementation receives the whole bulk string first.
+        """
+        response = await self.read_response(disable_decoding=True)
+        if isinstance(response, bytes):
+            sink.begin(len(response))
+            sink.write(response)
+            return len(response)
+        return response
+
+
+async def _read_into_sink(
+    stream: asyncio.StreamReader,
+    sink: Any,
+    length: int,
+    read_size: int,
+    timeout: Optional[float],
+):
+    """Read the next ``length`` bytes of a bulk string from ``stream``"""
+    try:
+        while length:
+            async with async_timeout.timeout(timeout):
+                data = await stream.read(min(length, read_size))
+            # an empty string indicates the server shutdown the socket
+            if not data:
+                raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+            sink.write(data)
+            length -= len(data)
+    except (socket.timeout, asyncio.TimeoutError):
+        raise TimeoutError("Timeout reading from socket")
+    except NONBLOCKING_EXCEPTIONS as ex:
+        raise ConnectionError(f"Error while reading from socket: {ex.args}")
+
 
 class SocketBuffer:
     """Async-friendly re-impl of redis-py's SocketBuffer.
@@ -281,6 +412,31 @@ class SocketBuffer:
             timeout=timeout, raise_on_timeout=False
         )
 
+    def read_buffered(self, length: int) -> Optional[bytes]:
+        """Read a bulk payload if it is already buffered, without awaiting"""
+        if self._buffer is None or length + 2 > self.length:
+            return None
+        self._buffer.seek(self.bytes_read)
+        data = self._buffer.read(length + 2)
+        self.bytes_read += len(data)
+        if self.bytes_read == self.bytes_written:
+            self.purge()
+        return data[:-2]
+
+    def readline_buffered(self) -> Optional[bytes]:
+        """Read a line if it is already buffered, without awaiting"""
+        buf = self._buffer
+        if buf is None or not self.length:
+            return None
+        buf.seek(self.bytes_read)
+        data = buf.readline()
+        if not data.endswith(SYM_CRLF):
+            return None
+        self.bytes_read += len(data)
+        if self.bytes_read == self.bytes_written:
+            self.purge()
+        return data[:-2]
+
     async def read(self, length: int) -> bytes:
         length = length + 2  # make sure to read the \r\n terminator
         # make sure we've read enough data from the socket
@@ -301,6 +457,29 @@ class SocketBuffer:
 
         return data[:-2]
 
+    async def read_into(self, length: int, sink: Any) -> int:
+        """Read a bulk string of ``length`` bytes into ``sink``"""
+        if self._buffer is None or self._stream is None:
+            raise RedisError("Buffer is closed.")
+        sink.begin(length)
+        # hand over what was already received, then the rest in chunks
+        buffered = min(self.length, length)
+        if buffered:
+            self._buffer.seek(self.bytes_read)
+            sink.write(self._buffer.read(buffered))
+            self.bytes_read += buffered
+        if length > buffered:
+            await _read_into_sink(
+                self._stream,
+                sink,
+                length - buffered,
+                self.socket_read_size,
+                self.socket_timeout,
+            )
+        # the \r\n terminator
+        await self.read(0)
+        return length
+
     async def readline(self) -> bytes:
         buf = self._buffer
         if buf is None:
@@ -347,11 +526,183 @@ class SocketBuffer:
         self._stream = None
 
 
+class BytearraySocketBuffer:
+    """Async re-impl of redis-py's BytearraySocketBuffer.
+
+    ``asyncio.StreamReader`` only hands out fresh ``bytes`` objects, so data is
+    appended to a single reusable ``bytearray`` and replies are sliced out by
+    offset instead of going through ``io.BytesIO`` seeks, reads and re-slicing.
+    """
+
+    def __init__(
+        self,
+        stream_reader: asyncio.StreamReader,
+        socket_read_size: int,
+        socket_timeout: Optional[float],
+    ):
+        self._stream: Optional[asyncio.StreamReader] = stream_reader
+        self.socket_read_size = socket_read_size
+        self.socket_timeout = socket_timeout
+        self._buffer: Optional[bytearray] = bytearray()
+        # offset of the first byte not yet consumed by the parser
+        self.bytes_read = 0
+
+    @property
+    def bytes_written(self) -> int:
+        return len(self._buffer) if self._buffer is not None else 0
+
+    @property
+    def length(self):
+        return self.bytes_written - self.bytes_read
+
+    async def _read_from_socket(
+        self,
+        length: Optional[int] = None,
+        timeout: Union[float, None, _Sentinel] = SENTINEL,
+        raise_on_timeout: bool = True,
+    ) -> bool:
+        buf = self._buffer
+        if buf is None or self._stream is None:
+            raise RedisError("Buffer is closed.")
+        marker = 0
+        timeout = timeout if timeout is not SENTINEL else self.socket_timeout
+
+        # drop the consumed prefix once it dominates the buffer so appends
+        # don't keep growing it
+        if self.bytes_read and self.bytes_read >= len(buf) // 2:
+            del buf[: self.bytes_read]
+            self.bytes_read = 0
+
+        try:
+            while True:
+                async with async_timeout.timeout(timeout):
+                    data = await self._stream.read(self.socket_read_size)
+                # an empty string indicates the server shutdown the socket
+                if isinstance(data, bytes) and len(data) == 0:
+                    raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+                buf += data
+                marker += len(data)
+
+                if length is not None and length > marker:
+                    continue
+                return True
+        except (socket.timeout, asyncio.TimeoutError):
+            if raise_on_timeout:
+                raise TimeoutError("Timeout reading from socket")
+            return False
+        except NONBLOCKING_EXCEPTIONS as ex:
+            # if we're in nonblocking mode and the recv raises a
+            # blocking error, simply return False indicating that
+            # there's no data to be read. otherwise raise the
+            # original exception.
+            allowed = NONBLOCKING_EXCEPTION_ERROR_NUMBERS.get(ex.__class__, -1)
+            if not raise_on_timeout and ex.errno == allowed:
+                return False
+            raise ConnectionError(f"Error while reading from socket: {ex.args}")
+
+    async def can_read(self, timeout: float) -> bool:
+        return bool(self.length) or await self._read_from_socket(
+            timeout=timeout, raise_on_timeout=False
+        )
+
+    def _consume(self, start: int, end: int, skip: int) -> bytes:
+        """Copy ``[start:end]`` out of the buffer and advance past ``skip``"""
+        with memoryview(self._buffer) as view:
+            data = view[start:end].tobytes()
+        self.bytes_read = skip
+        # purge the buffer when we've consumed it all so it doesn't
+        # grow forever
+        if self.bytes_read == self.bytes_written:
+            self.purge()
+        return data
+
+    def read_buffered(self, length: int) -> Optional[bytes]:
+        """Read a bulk payload if it is already buffered, without awaiting"""
+        if self._buffer is None or length + 2 > self.length:
+            return None
+        start = self.bytes_read
+        return self._consume(start, start + length, start + length + 2)
+
+    def readline_buffered(self) -> Optional[bytes]:
+        """Read a line if it is already buffered, without awaiting"""
+        if self._buffer is None:
+            return None
+        index = self._buffer.find(SYM_CRLF, self.bytes_read)
+        if index < 0:
+            return None
+        return self._consume(self.bytes_read, index, index + 2)
+
+    async def read(self, length: int) -> bytes:
+        # make sure we've read enough data from the socket, including the
+        # \r\n terminator
+        if length + 2 > self.length:
+            await self._read_from_socket(length + 2 - self.length)
+
+        if self._buffer is None:
+            raise RedisError("Buffer is closed.")
+
+        start = self.bytes_read
+        return self._consume(start, start + length, start + length + 2)
+
+    async def read_into(self, length: int, sink: Any) -> int:
+        """Read a bulk string of ``length`` bytes into ``sink``"""
+        if self._buffer is None or self._stream is None:
+            raise RedisError("Buffer is closed.")
+        sink.begin(length)
+        # hand over what was already received, then the rest in chunks
+        buffered = min(self.length, length)
+        if buffered:
+            with memoryview(self._buffer) as view:
+                sink.write(view[self.bytes_read : self.bytes_read + buffered])
+            self.bytes_read += buffered
+        if length > buffered:
+            await _read_into_sink(
+                self._stream,
+                sink,
+                length - buffered,
+                self.socket_read_size,
+                self.socket_timeout,
+            )
+        # the \r\n terminator
+        await self.read(0)
+        return length
+
+    async def readline(self) -> bytes:
+        buf = self._buffer
+        if buf is None:
+            raise RedisError("Buffer is closed.")
+
+        index = buf.find(SYM_CRLF, self.bytes_read)
+        while index < 0:
+            # there's more data in the socket that we need. reading may
+            # compact the buffer, so remember how far we've already looked
+            # relative to the read offset
+            scanned = max(self.length - 1, 0)
+            await self._read_from_socket()
+            index = buf.find(SYM_CRLF, self.bytes_read + scanned)
+        return self._consume(self.bytes_read, index, index + 2)
+
+    def purge(self):
+        if self._buffer is None:
+            raise RedisError("Buffer is closed.")
+
+        self._buffer.clear()
+        self.bytes_read = 0
+
+    def close(self):
+        self._buffer = None
+        self._stream = None
+
+
 class PythonParser(BaseParser):
     """Plain Python parsing class"""
 
     __slots__ = BaseParser.__slots__ + ("encoder",)
 
+    # the buffer class wrapping the stream reader. set this to
+    # BytearraySocketBuffer in a subclass to skip the io.BytesIO layer
+    socket_buffer_class: Type[Union[SocketBuffer, BytearraySocketBuffer]] = SocketBuffer
+
     def __init__(self, socket_read_size: int):
         super().__init__(socket_read_size)
         self.encoder: Optional[Encoder] = None
@@ -362,7 +713,7 @@ class PythonParser(BaseParser):
         if self._stream is None:
             raise RedisError("Buffer is closed.")
 
-        self._buffer = SocketBuffer(
+        self._buffer = self.socket_buffer_class(
             self._stream, self._read_size, connection.socket_timeout
         )
         self.encoder = connection.encoder
@@ -380,55 +731,159 @@ class PythonParser(BaseParser):
         return self._buffer and bool(await self._buffer.can_read(timeout))
 
     async def read_response(
-        self, disable_decoding: bool = False
+        self, disable_decoding: bool = False, sink: Any = None
     ) -> Union[EncodableT, ResponseError, None]:
+        """
+        Read a reply. When ``sink`` is given, a bulk string reply is handed
+        to it as it is received and its length is returned instead.
+        """
         if not self._buffer or not self.encoder:
             raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
-        raw = await self._buffer.readline()
-        if not raw:
-            raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+        buffer = self._buffer
+        decode = None if disable_decoding else self.encoder.decode
+        # aggregate replies still being filled, innermost last, as
+        # (items, length, type) tuples. nested replies are parsed iteratively
+        # and lines that are already buffered are consumed without awaiting.
+        stack: List[Tuple[List[Any], int, bytes]] = []
         response: Any
-        byte, response = raw[:1], raw[1:]
-
-        if byte not in (b"-", b"+", b":", b"$", b"*"):
-            raise InvalidResponse(f"Protocol Error: {raw!r}")
-
-        # server returned an error
-        if byte == b"-":
-            response = response.decode("utf-8", errors="replace")
-            error = self.parse_error(response)
-            # if the error is a ConnectionError, raise immediately so the user
-            # is notified
-            if isinstance(error, ConnectionError):
-                raise error
-            # otherwise, we're dealing with a ResponseError that might belong
-            # inside a pipeline response. the connection's read_response()
-            # and/or the pipeline's execute() will raise this error if
-            # necessary, so just return the exception instance here.
-            return error
-        # single value
-        elif byte == b"+":
-            pass
-        # int value
-        elif byte == b":":
-            response = int(response)
-        # bulk response
-        elif byte == b"$":
-            length = int(response)
-            if length == -1:
-                return None
-            response = await self._buffer.read(length)
-        # multi-bulk response
-        elif byte == b"*":
-            length = int(response)
-            if length == -1:
-                return None
-            response = [
-                (await self.read_response(disable_decoding)) for _ in range(length)
-            ]
-        if isinstance(response, bytes) and disable_decoding is False:
-            response = self.encoder.decode(response)
-        return response
+
+        while True:
+            raw = buffer.readline_buffered()
+            if raw is None:
+                raw = await buffer.readline()
+            if not raw:
+                raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+
+            byte, response = raw[:1], raw[1:]
+
+            # bulk response
+            if byte == b"$":
+                length = int(response)
+                if length == -1:
+                    response = None
+                elif sink is not None and not stack:
+                    response = await buffer.read_into(length, sink)
+                else:
+                    response = await self._read_bulk(length)
+                    if decode is not None:
+                        response = decode(response)
+            # int value
+            elif byte == b":":
+                response = int(response)
+            # multi-bulk response, or a RESP3 map, set, push or attribute
+            elif byte in RESP_AGGREGATE_TYPES:
+                length = int(response)
+                if byte == RESP_MAP or byte == RESP_ATTRIBUTE:
+                    length *= 2
+                if length > 0:
+                    stack.append(([], length, byte))
+                    continue
+                if length == -1:
+                    response = None
+                else:
+                    response = _aggregate_response([], byte)
+                    if response is NotImplemented:
+                        # an empty attribute, the actual reply follows
+                        continue
+            # single value
+            elif byte == b"+":
+                if decode is not None:
+                    response = decode(response)
+            # server returned an error, or a RESP3 blob error
+            elif byte == b"-" or byte == b"!":
+                if byte == b"!":
+                    response = await self._read_bulk(int(response))
+                response = response.decode("utf-8", errors="replace")
+                error = self.parse_error(response)
+                # if the error is a ConnectionError, raise immediately so the
+                # user is notified
+                if isinstance(error, ConnectionError):
+                    raise error
+                # otherwise, we're dealing with a ResponseError that might
+                # belong inside a pipeline response. the connection's
+                # read_response() and/or the pipeline's execute() will raise
+                # this error if necessary, so just return the exception
+                # instance here.
+                response = error
+            # RESP3 null
+            elif byte == b"_":
+                response = None
+            # RESP3 double
+            elif byte == b",":
+                response = float(response)
+            # RESP3 boolean
+            elif byte == b"#":
+                response = response == b"t"
+            # RESP3 big number
+            elif byte == b"(":
+                response = int(response)
+            # RESP3 verbatim string, strip the "txt:" style format prefix
+            elif byte == b"=":
+                response = (await self._read_bulk(int(response)))[4:]
+                if decode is not None:
+                    response = decode(response)
+            else:
+                raise InvalidResponse(f"Protocol Error: {raw!r}")
+
+            # add the value to its enclosing aggregate replies, closing
+            # every reply that is now complete
+            while stack:
+                items, length, byte = stack[-1]
+                items.append(response)
+                if len(items) < length:
+                    break
+                stack.pop()
+                response = _aggregate_response(items, byte)
+                if response is NotImplemented:
+                    # attributes only annotate the reply that follows them
+                    break
+                if (
+                    byte == RESP_PUSH
+                    and not stack
+                    and self.push_handler_func is not None
+                ):
+                    self.push_handler_func(response)
+                    break
+            else:
+                return response
+
+    async def read_response_into(
+        self, sink: Any
+    ) -> Union[EncodableT, ResponseError, None]:
+        return await self.read_response(disable_decoding=True, sink=sink)
+
+    async def _read_bulk(self, length: int) -> bytes:
+        data = self._buffer.read_buffered(length)
+        if data is None:
+            data = await self._buffer.read(length)
+        return data
+
+
+def _aggregate_response(items: List[Any], byte: bytes) -> Any:
+    """
+    Build the Python value of a complete aggregate reply. Returns
+    ``NotImplemented`` for RESP3 attributes, which carry no reply of their own.
+    """
+    if byte == RESP_ARRAY or byte == RESP_PUSH:
+        return items
+    if byte == RESP_MAP:
+        it = iter(items)
+        try:
+            return dict(zip(it, it))
+        except TypeError:
+            # aggregate keys aren't hashable, use tuples for them instead
+            it = iter(items)
+            return {
+                tuple(key) if isinstance(key, list) else key: value
+                for key, value in zip(it, it)
+            }
+    if byte == RESP_SET:
+        try:
+            return set(items)
+        except TypeError:
+            # sets may hold unhashable aggregates, keep those as a list
+            return items
+    return NotImplemented
 
 
 class HiredisParser(BaseParser):
@@ -446,6 +901,8 @@ class HiredisParser(BaseParser):
         self._socket_timeout: Optional[float] = None
 
     def on_connect(self, connection: "Connection"):
+        if getattr(connection, "protocol", 2) == 3 and not HIREDIS_SUPPORTS_RESP3:
+            raise RedisError("RESP3 requires hiredis 3.0.0 or newer")
         self._stream = connection._reader
         kwargs: _HiredisReaderArgs = {
             "protocolError": InvalidResponse,
@@ -474,6 +931,14 @@ class HiredisParser(BaseParser):
             return await self.read_from_socket(timeout=timeout, raise_on_timeout=False)
         return True
 
+    def _is_out_of_band_push(self, response: Any) -> bool:
+        return (
+            self.push_handler_func is not None
+            and isinstance(response, list)
+            and bool(response)
+            and response[0] in OUT_OF_BAND_PUSH_KINDS
+        )
+
     async def read_from_socket(
         self,
         timeout: Union[float, None, _Sentinel] = SENTINEL,
@@ -519,12 +984,18 @@ class HiredisParser(BaseParser):
         if self._next_response is not False:
             response = self._next_response
             self._next_response = False
+            if self._is_out_of_band_push(response):
+                self.push_handler_func(response)
+                return await self.read_response(disable_decoding)
             return response
 
         response = self._reader.gets()
         while response is False:
             await self.read_from_socket()
             response = self._reader.gets()
+        if self._is_out_of_band_push(response):
+            self.push_handler_func(response)
+            return await self.read_response(disable_decoding)
 
         # if the response is a ConnectionError or the response is a list and
         # the first item is a ConnectionError, raise it as something bad
@@ -547,6 +1018,315 @@ else:
     DefaultParser = PythonParser
 
 
+class PythonReader:
+    """
+    An incremental RESP2/RESP3 reader with the interface of
+    ``hiredis.Reader``, used by `ProtocolParser` when hiredis isn't
+    installed: data is handed to feed() as it arrives and gets() returns the
+    next complete reply, or False until one has been received entirely.
+    Partially received aggregate replies are kept, so no data is parsed
+    twice. Replies are never decoded.
+    """
+
+    __slots__ = "_buffer", "_pos", "_stack", "_protocol_error", "_reply_error"
+
+    def __init__(
+        self,
+        protocolError: Type[Exception] = InvalidResponse,
+        replyError: Callable[[str], Exception] = ResponseError,
+    ):
+        self._buffer = bytearray()
+        self._pos = 0
+        # aggregate replies still being filled, innermost last, as
+        # (items, length, type) tuples
+        self._stack: List[Tuple[List[Any], int, bytes]] = []
+        self._protocol_error = protocolError
+        self._reply_error = replyError
+
+    def feed(self, data: bytes):
+        buffer = self._buffer
+        if self._pos == len(buffer):
+            buffer.clear()
+            self._pos = 0
+        elif self._pos > 65536:
+            del buffer[: self._pos]
+            self._pos = 0
+        buffer += data
+
+    def gets(self) -> Any:
+        buffer = self._buffer
+        stack = self._stack
+        response: Any
+        while True:
+            pos = self._pos
+            end = buffer.find(SYM_CRLF, pos)
+            if end == -1:
+                return False
+            byte = bytes(buffer[pos : pos + 1])
+            line = bytes(buffer[pos + 1 : end])
+            next_pos = end + 2
+
+            # bulk string, RESP3 blob error or verbatim string
+            if byte == b"$" or byte == b"!" or byte == b"=":
+                length = int(line)
+                if length == -1:
+                    response = None
+                else:
+                    if len(buffer) < next_pos + length + 2:
+                        return False
+                    response = bytes(buffer[next_pos : next_pos + length])
+                    next_pos += length + 2
+                    if byte == b"!":
+                        response = self._reply_error(
+                            response.decode("utf-8", errors="replace")
+                        )
+                    elif byte == b"=":
+                        response = response[4:]
+            # integer or RESP3 big number
+            elif byte == b":" or byte == b"(":
+                response = int(line)
+            # multi-bulk response, or a RESP3 map, set, push or attribute
+            elif byte in RESP_AGGREGATE_TYPES:
+                length = int(line)
+                if byte == RESP_MAP or byte == RESP_ATTRIBUTE:
+                    length *= 2
+                if length > 0:
+                    self._pos = next_pos
+                    stack.append(([], length, byte))
+                    continue
+                if length == -1:
+                    response = None
+                else:
+                    response = _aggregate_response([], byte)
+                    if response is NotImplemented:
+                        self._pos = next_pos
+                        continue
+            elif byte == b"+":
+                response = line
+            elif byte == b"-":
+                response = self._reply_error(line.decode("utf-8", errors="replace"))
+            elif byte == b"_":
+                response = None
+            elif byte == b",":
+                response = float(line)
+            elif byte == b"#":
+                response = line == b"t"
+            else:
+                raise self._protocol_error(f"Protocol Error: {byte + line!r}")
+            self._pos = next_pos
+
+            while stack:
+                items, length, byte = stack[-1]
+                items.append(response)
+                if len(items) < length:
+                    break
+                stack.pop()
+                response = _aggregate_response(items, byte)
+                if response is NotImplemented:
+                    break
+            else:
+                return response
+
+
+class ProtocolParser(BaseParser, asyncio.Protocol):
+    """
+    The parser of `ProtocolConnection`, which also serves as its
+    :class:`asyncio.Protocol`. Received data is fed into a
+    ``hiredis.Reader``, or a `PythonReader` without hiredis, and every
+    complete reply resolves the oldest pending read_response() call.
+    Replies are decoded when they are read.
+    """
+
+    def __init__(self, socket_read_size: int):
+        super().__init__(socket_read_size)
+        self.transport: Optional[asyncio.Transport] = None
+        self.encoder: Optional[Encoder] = None
+        self._reader: Any = None
+        self._replies: Deque[Any] = deque()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._has_replies = asyncio.Event()
+        self._drain_waiter: Optional[asyncio.Future] = None
+        # whether the connection was closed by the server or broke, rather
+        # than by on_disconnect()
+        self.lost = False
+
+    def on_connect(self, connection: "Connection"):
+        if (
+            HIREDIS_AVAILABLE
+            and getattr(connection, "protocol", 2) == 3
+            and not HIREDIS_SUPPORTS_RESP3
+        ):
+            raise RedisError("RESP3 requires hiredis 3.0.0 or newer")
+        self.encoder = connection.encoder
+
+    def on_disconnect(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self._replies.clear()
+        self._has_replies.clear()
+        error = ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+        self._fail_waiters(error)
+        # the closed transport's connection_lost() is dropped, see
+        # TransportProtocol
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_exception(error)
+        self._drain_waiter = None
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self.transport = cast(asyncio.Transport, transport)
+        self.lost = False
+        if HIREDIS_AVAILABLE:
+            self._reader = hiredis.Reader(
+                protocolError=InvalidResponse, replyError=self.parse_error
+            )
+        else:
+            self._reader = PythonReader(
+                protocolError=InvalidResponse, replyError=self.parse_error
+            )
+
+    def data_received(self, data: bytes):
+        self._reader.feed(data)
+        try:
+            response = self._reader.gets()
+            while response is not False:
+                if (
+                    self.push_handler_func is not None
+                    and isinstance(response, list)
+                    and response
+                    and response[0] in OUT_OF_BAND_PUSH_KINDS
+                ):
+                    self.push_handler_func(response)
+                else:
+                    self._deliver(response)
+                response = self._reader.gets()
+        except InvalidResponse as e:
+            self._fail_waiters(e)
+            self.transport.close()
+
+    def connection_lost(self, exc: Optional[Exception]):
+        if self.transport is not None:
+            self.lost = True
+        self.transport = None
+        if exc is None:
+            error = ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+        else:
+            error = ConnectionError(f"Error while reading from socket: {exc}")
+        self._fail_waiters(error)
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_exception(error)
+
+    def pause_writing(self):
+        self._drain_waiter = asyncio.get_event_loop().create_future()
+
+    def resume_writing(self):
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        self._drain_waiter = None
+
+    async def drain(self):
+        """Wait until the transport's write buffer has room again"""
+        if self._drain_waiter is not None:
+            await self._drain_waiter
+
+    async def can_read(self, timeout: float) -> bool:
+        if not self._replies and timeout:
+            try:
+                await asyncio.wait_for(self._has_replies.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return bool(self._replies)
+
+    async def read_response(
+        self, disable_decoding: bool = False
+    ) -> Union[EncodableT, ResponseError, None, List[EncodableT]]:
+        if self._replies:
+            response = self._replies.popleft()
+            if not self._replies:
+                self._has_replies.clear()
+        elif self.transport is None:
+            raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+        else:
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            response = await waiter
+        if isinstance(response, ConnectionError):
+            raise response
+        if not disable_decoding and self.encoder and self.encoder.decode_responses:
+            response = _decode_response(self.encoder, response)
+        return response
+
+    def _deliver(self, response: Any):
+        # a reader that was cancelled, e.g. by a timeout, would have
+        # consumed this reply
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(response)
+                return
+        self._replies.append(response)
+        self._has_replies.set()
+
+    def _fail_waiters(self, error: Exception):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(error)
+
+
+class TransportProtocol(asyncio.Protocol):
+    """
+    The :class:`asyncio.Protocol` of one transport of a `ProtocolParser`,
+    passing its callbacks on to ``protocol``, the parser or a wrapper of
+    it, while the transport is the parser's. Those of a transport closed
+    since, which can come after the parser got a new one, are dropped.
+    """
+
+    def __init__(self, parser: ProtocolParser, protocol: Any):
+        self._parser = parser
+        self._protocol = protocol
+        self._transport: Optional[asyncio.BaseTransport] = None
+
+    def _current(self) -> bool:
+        return self._transport is not None and self._parser.transport is self._transport
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self._transport = transport
+        self._protocol.connection_made(transport)
+
+    def data_received(self, data: bytes):
+        if self._current():
+            self._protocol.data_received(data)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        if self._current():
+            self._protocol.connection_lost(exc)
+        self._transport = None
+
+    def pause_writing(self):
+        if self._current():
+            self._protocol.pause_writing()
+
+    def resume_writing(self):
+        if self._current():
+            self._protocol.resume_writing()
+
+
+def _decode_response(encoder: Encoder, response: Any) -> Any:
+    if isinstance(response, bytes):
+        return encoder.decode(response)
+    if isinstance(response, list):
+        return [_decode_response(encoder, item) for item in response]
+    if isinstance(response, dict):
+        return {
+            _decode_response(encoder, key): _decode_response(encoder, value)
+            for key, value in response.items()
+        }
+    if isinstance(response, set):
+        return {_decode_response(encoder, item) for item in response}
+    return response
+
+
 class ConnectCallbackProtocol(Protocol):
     def __call__(self, connection: "Connection"):
         ...
@@ -591,6 +1371,18 @@ class Connection:
         "_buffer_cutoff",
         "_lock",
         "_socket_read_size",
+        "protocol",
+        "recorder",
+        "_capture_id",
+        "meter",
+        "pool_stats",
+        "_reconnect_cause",
+        "connected_at",
+        "released_at",
+        "drain_timeout",
+        "_drain",
+        "_replies_pending",
+        "_blocking_pending",
         "__dict__",
     )
 
@@ -619,6 +1411,10 @@ class Connection:
         retry: Optional[Retry] = None,
         redis_connect_func: Optional[ConnectCallbackT] = None,
         encoder_class: Type[Encoder] = Encoder,
+        protocol: int = 2,
+        recorder: Optional[TrafficRecorder] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        drain_timeout: Optional[float] = None,
     ):
         self.pid = os.getpid()
         self.host = host
@@ -651,6 +1447,28 @@ class Connection:
         self.health_check_interval = health_check_interval
         self.next_health_check: float = -1
         self.ssl_context: Optional[RedisSSLContext] = None
+        protocol = int(protocol)
+        if protocol not in (2, 3):
+            raise DataError("protocol must be either 2 or 3")
+        self.protocol = protocol
+        self.recorder = recorder
+        self._capture_id: Optional[int] = None
+        self.meter = None if instrumentation is None else ConnectionMeter()
+        # the PoolStats of the pool the connection belongs to, if any, and
+        # why it was last disconnected
+        self.pool_stats: Optional[PoolStats] = None
+        self._reconnect_cause: Optional[str] = None
+        # when the connection connected, and was last returned to its pool
+        self.connected_at: Optional[float] = None
+        self.released_at: Optional[float] = None
+        self.drain_timeout = drain_timeout
+        # the streams set aside when a read timed out or was cancelled, to
+        # drain their replies
+        self._drain: Optional[_ReplyDrain] = None
+        # with a drain_timeout, the replies to read, and how many of them
+        # are to read up to that of the last blocking command sent
+        self._replies_pending = 0
+        self._blocking_pending = 0
         self.encoder = encoder_class(encoding, encoding_errors, decode_responses)
         self.redis_connect_func = redis_connect_func
         self._reader: Optional[asyncio.StreamReader] = None
@@ -705,6 +1523,8 @@ class Connection:
         """Connects to the Redis server if not already connected"""
         if self.is_connected:
             return
+        if self._drain is not None and await self._reuse_drained():
+            return
         try:
             await self._connect()
         except asyncio.CancelledError:
@@ -715,6 +1535,11 @@ class Connection:
             raise ConnectionError(self._error_message(e))
         except Exception as exc:
             raise ConnectionError(exc) from exc
+        self.connected_at = time.monotonic()
+        self._replies_pending = self._blocking_pending = 0
+        if self.pool_stats is not None:
+            self.pool_stats.connection_opened(self._reconnect_cause)
+        self._reconnect_cause = None
 
         try:
             if not self.redis_connect_func:
@@ -726,7 +1551,10 @@ class Connection:
                     self.redis_connect_func
                 ) else self.redis_connect_func(self)
         except RedisError:
-            # clean up after any error in on_connect
+            # clean up after any error in on_connect. streams which timed out
+            # before the connection was initialized are of no use drained
+            if self._drain is not None:
+                self._drain.error = None
             await self.disconnect()
             raise
 
@@ -738,6 +1566,32 @@ class Connection:
             if task and inspect.isawaitable(task):
                 await task
 
+    async def _reuse_drained(self) -> bool:
+        """
+        Go on using the streams set aside when a read timed out or was
+        cancelled once the replies left unread are drained, waiting for them,
+        or draining them if nothing did yet. Return whether they were, the
+        streams are closed otherwise.
+        """
+        drain = cast(_ReplyDrain, self._drain)
+        self._drain = None
+        self._reader, self._writer = drain.reader, drain.writer
+        try:
+            drained = await drain.wait()
+        except BaseException:
+            await self._disconnect_on_error()
+            raise
+        if not drained:
+            if self.pool_stats is not None:
+                self.pool_stats.drain_failed()
+            await self._disconnect_on_error()
+            return False
+        self._parser.on_connect(self)
+        self._replies_pending = self._blocking_pending = 0
+        if self.pool_stats is not None:
+            self.pool_stats.connection_drained()
+        return True
+
     async def _connect(self):
         """Create a TCP socket connection"""
         async with async_timeout.timeout(self.socket_connect_timeout):
@@ -746,9 +1600,36 @@ class Connection:
                 port=self.port,
                 ssl=self.ssl_context.get() if self.ssl_context else None,
             )
-        self._reader = reader
+        self._reader = self._instrument(self._capture(reader))
         self._writer = writer
-        sock = writer.transport.get_extra_info("socket")
+        self._set_socket_options(writer.transport)
+
+    def _capture(self, reader):
+        """
+        Start recording the traffic of the connection, if it has a recorder,
+        and wrap ``reader``, a StreamReader or Protocol, to record the data
+        received with it
+        """
+        if self.recorder is None:
+            return reader
+        self._capture_id = self.recorder.connection_opened(self)
+        if isinstance(reader, asyncio.StreamReader):
+            return CapturingStreamReader(reader, self.recorder, self._capture_id)
+        return CapturingProtocol(reader, self.recorder, self._capture_id)
+
+    def _instrument(self, reader):
+        """
+        Wrap ``reader``, a StreamReader or Protocol, to time and count the
+        data received with it, if the connection is instrumented
+        """
+        if self.meter is None:
+            return reader
+        if isinstance(reader, (asyncio.StreamReader, CapturingStreamReader)):
+            return MeteredStreamReader(reader, self.meter)
+        return MeteredProtocol(reader, self.meter)
+
+    def _set_socket_options(self, transport: asyncio.BaseTransport):
+        sock = transport.get_extra_info("socket")
         if sock:
             sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             try:
@@ -761,7 +1642,7 @@ class Connection:
             except (OSError, TypeError):
                 # `socket_keepalive_options` might contain invalid options
                 # causing an error. Do not leave the connection open.
-                writer.close()
+                transport.close()
                 raise
 
     def _error_message(self, exception):
@@ -779,8 +1660,25 @@ class Connection:
         """Initialize the connection, authenticate and select a database"""
         self._parser.on_connect(self)
 
+        if self.protocol == 3:
+            # HELLO switches the protocol and, if needed, authenticates at
+            # the same time. it is only available on Redis 6.0 and newer.
+            hello_args: List[EncodableT] = ["HELLO", 3]
+            if self.username or self.password:
+                hello_args.extend(
+                    ["AUTH", self.username or "default", self.password or ""]
+                )
+            # avoid checking health here -- PING will fail if we try
+            # to check the health prior to the AUTH
+            await self.send_command(*hello_args, check_health=False)
+            response = await self.read_response()
+            if not isinstance(response, dict) or (
+                response.get(b"proto", response.get("proto")) != 3
+            ):
+                raise ConnectionError("Invalid RESP3 handshake response")
+
         # if username and/or password are set, authenticate
-        if self.username or self.password:
+        elif self.username or self.password:
             auth_args: Union[Tuple[str], Tuple[str, str]]
             if self.username:
                 auth_args = (self.username, self.password or "")
@@ -816,11 +1714,33 @@ class Connection:
             if str_if_bytes(await self.read_response()) != "OK":
                 raise ConnectionError("Invalid Database")
 
-    async def disconnect(self) -> None:
-        """Disconnects from the Redis server"""
+    async def disconnect(self, error: Optional[BaseException] = None) -> None:
+        """
+        Disconnects from the Redis server. Given the ``error`` a read timed
+        out or was cancelled with, the replies it left unread are drained in
+        the background instead, when the connection has a ``drain_timeout``,
+        for connect() to go on using the streams.
+        """
+        drain = self._drain
+        if drain is not None:
+            if not drain.started and error is not None and error is drain.error:
+                drain.start()
+                return
+            self._drain = None
+            drain.cancel()
+            self._reader, self._writer = drain.reader, drain.writer
         try:
             async with async_timeout.timeout(self.socket_connect_timeout):
+                # protocol connections are closed by their parser
+                was_connected = self.is_connected
                 self._parser.on_disconnect()
+                if self._capture_id is not None:
+                    self.recorder.connection_closed(self._capture_id)
+                    self._capture_id = None
+                if was_connected:
+                    self.connected_at = None
+                    if self.pool_stats is not None:
+                        self.pool_stats.connection_closed()
                 if not self.is_connected:
                     return
                 try:
@@ -839,6 +1759,31 @@ class Connection:
                 f"Timed out closing connection after {self.socket_connect_timeout}"
             ) from None
 
+    async def _disconnect_on_error(self):
+        """Disconnect after failing to send or read, as a cause of reconnecting"""
+        self._reconnect_cause = "error"
+        await self.disconnect()
+
+    async def _read_interrupted(self, error: BaseException):
+        """
+        Disconnect after a read timed out or was cancelled with ``error``.
+        With a ``drain_timeout``, the streams are set aside instead, to drain
+        the replies left unread once disconnect() is called with ``error``,
+        or on the next connect(). Connections with the reply to a blocking
+        command left unread always disconnect, the drain would discard it.
+        """
+        if (
+            self.drain_timeout is None
+            or self._blocking_pending
+            or not self.is_connected
+        ):
+            await self._disconnect_on_error()
+            return
+        self._parser.on_disconnect()
+        self._drain = _ReplyDrain(self._reader, self._writer, error, self.drain_timeout)
+        self._reader = None
+        self._writer = None
+
     async def _send_ping(self):
         """Send PING, expect PONG in return"""
         await self.send_command("PING", check_health=False)
@@ -847,6 +1792,7 @@ class Connection:
 
     async def _ping_failed(self, error):
         """Function to call when PING fails"""
+        self._reconnect_cause = "health_check"
         await self.disconnect()
 
     async def check_health(self):
@@ -876,18 +1822,25 @@ class Connection:
                 command = command.encode()
             if isinstance(command, bytes):
                 command = [command]
+            if self.recorder is not None:
+                self.recorder.record(SEND, self._capture_id, command)
+            meter = self.meter
+            if meter is not None:
+                start = perf_counter_ns()
             if self.socket_timeout:
                 await asyncio.wait_for(
                     self._send_packed_command(command), self.socket_timeout
                 )
             else:
-                self._writer.writelines(command)
-                await self._writer.drain()
+                await self._send_packed_command(command)
+            if meter is not None:
+                meter.send_ns += perf_counter_ns() - start
+                meter.bytes_sent += sum(memoryview(c).nbytes for c in command)
         except asyncio.TimeoutError:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise TimeoutError("Timeout writing to socket") from None
         except OSError as e:
-            await self.disconnect()
+            await self._disconnect_on_error()
             if len(e.args) == 1:
                 err_no, errmsg = "UNKNOWN", e.args[0]
             else:
@@ -897,13 +1850,20 @@ class Connection:
                 f"Error {err_no} while writing to socket. {errmsg}."
             ) from e
         except BaseException:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise
 
     async def send_command(self, *args: Any, **kwargs: Any) -> None:
         """Pack and send a command to the Redis server"""
+        meter = self.meter
+        if meter is None:
+            packed = self.pack_command(*args)
+        else:
+            start = perf_counter_ns()
+            packed = self.pack_command(*args)
+            meter.pack_ns += perf_counter_ns() - start
         await self.send_packed_command(
-            self.pack_command(*args), check_health=kwargs.get("check_health", True)
+            packed, check_health=kwargs.get("check_health", True)
         )
 
     async def can_read(self, timeout: float = 0):
@@ -913,34 +1873,38 @@ class Connection:
         try:
             return await self._parser.can_read(timeout)
         except OSError as e:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise ConnectionError(
                 f"Error while reading from {self.host}:{self.port}: {e.args}"
             )
 
-    async def read_response(self, disable_decoding: bool = False):
-        """Read the response from a previously sent command"""
+    async def read_response(self, disable_decoding: bool = False, sink: Any = None):
+        """
+        Read the response from a previously sent command. A bulk string
+        response is streamed into ``sink``, a `BufferSink` or `FileSink`, if
+        one is given, and its length is returned instead.
+        """
         try:
             async with self._lock:
                 if self.socket_timeout:
                     async with async_timeout.timeout(self.socket_timeout):
-                        response = await self._parser.read_response(
-                            disable_decoding=disable_decoding
-                        )
+                        response = await self._read_from_parser(disable_decoding, sink)
                 else:
-                    response = await self._parser.read_response(
-                        disable_decoding=disable_decoding
-                    )
+                    response = await self._read_from_parser(disable_decoding, sink)
         except asyncio.TimeoutError:
-            await self.disconnect()
-            raise TimeoutError(f"Timeout reading from {self.host}:{self.port}")
+            error = TimeoutError(f"Timeout reading from {self.host}:{self.port}")
+            await self._read_interrupted(error)
+            raise error
         except OSError as e:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise ConnectionError(
                 f"Error while reading from {self.host}:{self.port} : {e.args}"
             )
+        except asyncio.CancelledError as error:
+            await self._read_interrupted(error)
+            raise
         except BaseException:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise
 
         if self.health_check_interval:
@@ -949,33 +1913,37 @@ class Connection:
             else:
                 func = asyncio.get_running_loop
             self.next_health_check = func().time() + self.health_check_interval
+        if self.drain_timeout is not None:
+            self._reply_read()
 
         if isinstance(response, ResponseError):
             raise response from None
         return response
 
-    async def read_response_without_lock(self, disable_decoding: bool = False):
+    async def read_response_without_lock(
+        self, disable_decoding: bool = False, sink: Any = None
+    ):
         """Read the response from a previously sent command"""
         try:
             if self.socket_timeout:
                 async with async_timeout.timeout(self.socket_timeout):
-                    response = await self._parser.read_response(
-                        disable_decoding=disable_decoding
-                    )
+                    response = await self._read_from_parser(disable_decoding, sink)
             else:
-                response = await self._parser.read_response(
-                    disable_decoding=disable_decoding
-                )
+                response = await self._read_from_parser(disable_decoding, sink)
         except asyncio.TimeoutError:
-            await self.disconnect()
-            raise TimeoutError(f"Timeout reading from {self.host}:{self.port}")
+            error = TimeoutError(f"Timeout reading from {self.host}:{self.port}")
+            await self._read_interrupted(error)
+            raise error
         except OSError as e:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise ConnectionError(
                 f"Error while reading from {self.host}:{self.port} : {e.args}"
             )
+        except asyncio.CancelledError as error:
+            await self._read_interrupted(error)
+            raise
         except BaseException:
-            await self.disconnect()
+            await self._disconnect_on_error()
             raise
 
         if self.health_check_interval:
@@ -984,59 +1952,77 @@ class Connection:
             else:
                 func = asyncio.get_running_loop
             self.next_health_check = func().time() + self.health_check_interval
+        if self.drain_timeout is not None:
+            self._reply_read()
 
         if isinstance(response, ResponseError):
             raise response from None
         return response
 
+    async def _read_from_parser(self, disable_decoding: bool, sink: Any):
+        meter = self.meter
+        if meter is not None:
+            start = perf_counter_ns()
+        if sink is None:
+            response = await self._parser.read_response(
+                disable_decoding=disable_decoding
+            )
+        else:
+            response = await self._parser.read_response_into(sink)
+        if meter is not None:
+            meter.read_ns += perf_counter_ns() - start
+        return response
+
+    def _count_reply(self, name: EncodableT):
+        """Count the reply to the command ``name`` about to be sent"""
+        self._replies_pending += 1
+        if isinstance(name, bytes):
+            name = name.decode("utf-8", "replace")
+        if isinstance(name, str) and name.upper() in BLOCKING_COMMANDS:
+            self._blocking_pending = self._replies_pending
+
+    def _reply_read(self):
+        # out of band messages, e.g. those of pubsub, aren't counted as sent
+        if self._replies_pending:
+            self._replies_pending -= 1
+        if self._blocking_pending:
+            self._blocking_pending -= 1
+
     def pack_command(self, *args: EncodableT) -> List[bytes]:
         """Pack a series of arguments into the Redis protocol"""
+        if self.drain_timeout is not None:
+            self._count_reply(args[0])
         output = []
-        # the client might have included 1 or more literal arguments in
-        # the command name, e.g., 'CONFIG GET'. The Redis server expects these
-        # arguments to be sent separately, so split the first argument
-        # manually. These arguments should be bytestrings so that they are
-        # not encoded.
         assert not isinstance(args[0], float)
-        if isinstance(args[0], str):
-            args = tuple(args[0].encode().split()) + args[1:]
-        elif b" " in args[0]:
-            args = tuple(args[0].split()) + args[1:]
-
-        buff = SYM_EMPTY.join((SYM_STAR, str(len(args)).encode(), SYM_CRLF))
-
+        # the header of the command includes its name, which the client
+        # might have made of several words, e.g. 'CONFIG GET'
+        pieces = [command_header(args[0], len(args) - 1)]
         buffer_cutoff = self._buffer_cutoff
-        for arg in map(self.encoder.encode, args):
-            # to avoid large string mallocs, chunk the command into the
-            # output list if we're sending large values or memoryviews
+        for arg in map(self.encoder.encode, args[1:]):
+            if isinstance(arg, memoryview):
+                pieces.append(b"$%d\r\n" % arg.nbytes)
+                output.append(SYM_EMPTY.join(pieces))
+                output.append(arg)
+                pieces = [SYM_CRLF]
+                continue
             arg_length = len(arg)
-            if (
-                len(buff) > buffer_cutoff
-                or arg_length > buffer_cutoff
-                or isinstance(arg, memoryview)
-            ):
-                buff = SYM_EMPTY.join(
-                    (buff, SYM_DOLLAR, str(arg_length).encode(), SYM_CRLF)
-                )
-                output.append(buff)
+            if arg_length > buffer_cutoff:
+                pieces.append(b"$%d\r\n" % arg_length)
+                output.append(SYM_EMPTY.join(pieces))
                 output.append(arg)
-                buff = SYM_CRLF
+                pieces = [SYM_CRLF]
+            elif arg_length < 1024:
+                pieces.extend((BULK_STRING_HEADERS[arg_length], arg, SYM_CRLF))
             else:
-                buff = SYM_EMPTY.join(
-                    (
-                        buff,
-                        SYM_DOLLAR,
-                        str(arg_length).encode(),
-                        SYM_CRLF,
-                        arg,
-                        SYM_CRLF,
-                    )
-                )
-        output.append(buff)
+                pieces.extend((b"$%d\r\n" % arg_length, arg, SYM_CRLF))
+        output.append(SYM_EMPTY.join(pieces))
         return output
 
     def pack_commands(self, commands: Iterable[Iterable[EncodableT]]) -> List[bytes]:
         """Pack multiple commands into the Redis protocol"""
+        meter = self.meter
+        if meter is not None:
+            start = perf_counter_ns()
         output: List[bytes] = []
         pieces: List[bytes] = []
         buffer_length = 0
@@ -1044,17 +2030,18 @@ class Connection:
 
         for cmd in commands:
             for chunk in self.pack_command(*cmd):
-                chunklen = len(chunk)
-                if (
-                    buffer_length > buffer_cutoff
-                    or chunklen > buffer_cutoff
-                    or isinstance(chunk, memoryview)
-                ):
-                    output.append(SYM_EMPTY.join(pieces))
+                if isinstance(chunk, memoryview):
+                    large = True
+                else:
+                    chunklen = len(chunk)
+                    large = chunklen > buffer_cutoff
+                if large or buffer_length > buffer_cutoff:
+                    if pieces:
+                        output.append(SYM_EMPTY.join(pieces))
                     buffer_length = 0
                     pieces = []
 
-                if chunklen > buffer_cutoff or isinstance(chunk, memoryview):
+                if large:
                     output.append(chunk)
                 else:
                     pieces.append(chunk)
@@ -1062,9 +2049,73 @@ class Connection:
 
         if pieces:
             output.append(SYM_EMPTY.join(pieces))
+        if meter is not None:
+            meter.pack_ns += perf_counter_ns() - start
         return output
 
 
+class _ReplyDrain:
+    """
+    The streams of a connection whose read timed out or was cancelled with
+    ``error``, leaving replies unread, which a task drains once started,
+    within ``timeout`` seconds
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        error: Optional[BaseException],
+        timeout: float,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.error = error
+        self.timeout = timeout
+        self.started = False
+        self._task: Optional[asyncio.Future] = None
+
+    def start(self):
+        self.started = True
+        self._task = asyncio.ensure_future(self._drain())
+
+    async def _drain(self) -> bool:
+        """
+        Send PING with a random token and discard what is received until the
+        reply to the PING, which follows the replies left unread. Return
+        whether the reply came in time and nothing after it.
+        """
+        token = os.urandom(8).hex().encode()
+        # a bulk string, both in the PING and in its reply
+        marker = b"$%d\r\n%s\r\n" % (len(token), token)
+        try:
+            async with async_timeout.timeout(self.timeout):
+                self.writer.write(b"*2\r\n$4\r\nPING\r\n" + marker)
+                await self.writer.drain()
+                received = b""
+                while True:
+                    data = await self.reader.read(65536)
+                    if not data:
+                        return False
+                    # keeping enough of what came before to find a split marker
+                    received = received[-len(marker) :] + data
+                    end = received.find(marker)
+                    if end != -1:
+                        return end + len(marker) == len(received)
+        except (asyncio.TimeoutError, OSError):
+            return False
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def wait(self) -> bool:
+        """Wait for the replies to be drained, starting now if not yet started"""
+        if not self.started:
+            self.start()
+        return await cast(asyncio.Future, self._task)
+
+
 class SSLConnection(Connection):
     def __init__(
         self,
@@ -1185,6 +2236,10 @@ class UnixDomainSocketConnection(Connection):  # lgtm [py/missing-call-to-init]
         client_name: str = None,
         retry: Optional[Retry] = None,
         redis_connect_func=None,
+        protocol: int = 2,
+        recorder: Optional[TrafficRecorder] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        drain_timeout: Optional[float] = None,
     ):
         """
         Initialize a new UnixDomainSocketConnection.
@@ -1218,6 +2273,21 @@ class UnixDomainSocketConnection(Connection):  # lgtm [py/missing-call-to-init]
         self.health_check_interval = health_check_interval
         self.next_health_check = -1
         self.redis_connect_func = redis_connect_func
+        protocol = int(protocol)
+        if protocol not in (2, 3):
+            raise DataError("protocol must be either 2 or 3")
+        self.protocol = protocol
+        self.recorder = recorder
+        self._capture_id: Optional[int] = None
+        self.meter = None if instrumentation is None else ConnectionMeter()
+        self.pool_stats = None
+        self._reconnect_cause = None
+        self.connected_at = None
+        self.released_at = None
+        self.drain_timeout = drain_timeout
+        self._drain = None
+        self._replies_pending = 0
+        self._blocking_pending = 0
         self.encoder = Encoder(encoding, encoding_errors, decode_responses)
         self._sock = None
         self._reader = None
@@ -1237,7 +2307,7 @@ class UnixDomainSocketConnection(Connection):  # lgtm [py/missing-call-to-init]
     async def _connect(self):
         async with async_timeout.timeout(self.socket_connect_timeout):
             reader, writer = await asyncio.open_unix_connection(path=self.path)
-        self._reader = reader
+        self._reader = self._instrument(self._capture(reader))
         self._writer = writer
         await self.on_connect()
 
@@ -1253,6 +2323,87 @@ class UnixDomainSocketConnection(Connection):  # lgtm [py/missing-call-to-init]
             )
 
 
+class ProtocolConnection(Connection):
+    """
+    A TCP connection driven by an :class:`asyncio.Protocol` instead of
+    streams. Replies are parsed as soon as the event loop receives them,
+    without waking up the task reading them until a reply is complete, and
+    commands are written straight to the transport.
+
+    The parser class must be a `ProtocolParser`. Unix sockets are not
+    supported.
+    """
+
+    def __init__(self, *, parser_class: Type[BaseParser] = ProtocolParser, **kwargs):
+        if not issubclass(parser_class, ProtocolParser):
+            raise RedisError("ProtocolConnection requires a ProtocolParser")
+        super().__init__(parser_class=parser_class, **kwargs)
+        if self.drain_timeout is not None:
+            # the parser owns the transport, it can't be set aside
+            raise RedisError("ProtocolConnection doesn't support drain_timeout")
+
+    @property
+    def is_connected(self):
+        return self._parser.transport is not None
+
+    async def connect(self):
+        if self._parser.lost:
+            # count the connection the server closed as closed, and as gone
+            # stale unless it failed while in use
+            self._parser.lost = False
+            if self.pool_stats is not None:
+                self.pool_stats.connection_closed()
+            if self._reconnect_cause is None:
+                self._reconnect_cause = "stale"
+        await super().connect()
+
+    async def _connect(self):
+        """Create a TCP connection driven by the parser"""
+        loop = asyncio.get_event_loop()
+        async with async_timeout.timeout(self.socket_connect_timeout):
+            transport, _ = await loop.create_connection(
+                lambda: TransportProtocol(
+                    self._parser, self._instrument(self._capture(self._parser))
+                ),
+                host=self.host,
+                port=self.port,
+                ssl=self.ssl_context.get() if self.ssl_context else None,
+            )
+        self._set_socket_options(transport)
+
+    async def _send_packed_command(self, command: Iterable[bytes]) -> None:
+        transport = self._parser.transport
+        if transport is None:
+            raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+        transport.writelines(command)
+        await self._parser.drain()
+
+    async def read_response(self, disable_decoding: bool = False, sink: Any = None):
+        """Read the response from a previously sent command"""
+        # the parser hands replies out in the order they are asked for, so
+        # concurrent readers don't need to take the lock
+        return await self.read_response_without_lock(disable_decoding, sink)
+
+    async def _read_from_parser(self, disable_decoding: bool, sink: Any):
+        meter = self.meter
+        if meter is None:
+            return await super()._read_from_parser(disable_decoding, sink)
+        # replies are parsed as the data arrives, which the protocol counts
+        # as reading, the rest of the time spent here is spent waiting
+        start = perf_counter_ns()
+        parsed = meter.read_ns
+        if sink is None:
+            response = await self._parser.read_response(
+                disable_decoding=disable_decoding
+            )
+        else:
+            response = await self._parser.read_response_into(sink)
+        waited = max(perf_counter_ns() - start - (meter.read_ns - parsed), 0)
+        meter.wait_ns += waited
+        meter.read_ns += waited
+        return response
+
+
 FALSE_STRINGS = ("0", "F", "FALSE", "N", "NO")
 
 
@@ -1274,6 +2425,13 @@ URL_QUERY_ARGUMENT_PARSERS: Mapping[str, Callable[..., object]] = MappingProxyTy
         "max_connections": int,
         "health_check_interval": int,
         "ssl_check_hostname": to_bool,
+        "protocol": int,
+        "min_idle": int,
+        "max_idle_time": float,
+        "max_connection_age": float,
+        "reaper_interval": float,
+        "background_health_checks": to_bool,
+        "drain_timeout": float,
     }
 )
 
@@ -1343,6 +2501,52 @@ def parse_url(url: str) -> ConnectKwargs:
 _CP = TypeVar("_CP", bound="ConnectionPool")
 
 
+async def _connect_all(connections: Iterable[Connection]) -> None:
+    """Connect ``connections`` concurrently, ignoring those which fail"""
+    await asyncio.gather(
+        *(connection.connect() for connection in connections),
+        return_exceptions=True,
+    )
+
+
+async def _run_reaper(pool_ref: "weakref.ref[ConnectionPool]", interval: float):
+    """
+    Reap the connection pool referenced by ``pool_ref`` every ``interval``
+    seconds, checking the health of its idle connections first if asked to,
+    until cancelled or the pool is garbage collected
+    """
+    while True:
+        pool = pool_ref()
+        if pool is None:
+            return
+        try:
+            if pool.background_health_checks:
+                await pool.check_health()
+            await pool.reap()
+        except Exception:
+            # such as a fork while reaping, try again next time
+            pass
+        del pool
+        await asyncio.sleep(interval)
+
+
+# pools alive in this process, which forked children reset as soon as they
+# start instead of checking the process id on every checkout
+_pools = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    for pool in list(_pools):
+        pool._after_fork()
+
+
+# os.register_at_fork() is missing before Python 3.7 and on Windows, where the
+# pools fall back to checking the process id
+FORK_HOOKS = hasattr(os, "register_at_fork")
+if FORK_HOOKS:
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
 class ConnectionPool:
     """
     Create a connection pool. ``If max_connections`` is set, then this
@@ -1353,6 +2557,23 @@ class ConnectionPool:
     is specified. Use :py:class:`~redis.UnixDomainSocketConnection` for
     unix sockets.
 
+    Connections are created on demand and kept for reuse. ``min_idle``,
+    ``max_idle_time`` and ``max_connection_age`` start a reaper task with the
+    first ``get_connection()``, which runs every ``reaper_interval`` seconds
+    to close the idle connections which went unused for ``max_idle_time``
+    seconds, or connected more than ``max_connection_age`` seconds ago, and
+    to connect new ones, concurrently, until ``min_idle`` connections are
+    idle. Idle connections past ``max_idle_time`` are kept as needed to stay
+    at ``min_idle``. The reaper stops when the pool is disconnected, until
+    the pool is used again.
+
+    With ``background_health_checks``, the reaper also checks the health of
+    the idle connections, instead of the connections checking it with a PING
+    before sending a command: it PINGs, concurrently, every idle connection
+    due for a health check, every ``health_check_interval`` seconds, before
+    its next run, and closes and evicts those which fail, so that they aren't
+    handed out.
+
     Any additional keyword arguments are passed to the constructor of
     ``connection_class``.
     """
@@ -1405,30 +2626,52 @@ class ConnectionPool:
         self,
         connection_class: Type[Connection] = Connection,
         max_connections: Optional[int] = None,
+        min_idle: int = 0,
+        max_idle_time: Optional[float] = None,
+        max_connection_age: Optional[float] = None,
+        reaper_interval: float = 1,
+        background_health_checks: bool = False,
         **connection_kwargs,
     ):
         max_connections = max_connections or 2**31
         if not isinstance(max_connections, int) or max_connections < 0:
             raise ValueError('"max_connections" must be a positive integer')
+        if not isinstance(min_idle, int) or not 0 <= min_idle <= max_connections:
+            raise ValueError(
+                '"min_idle" must be a positive integer no greater than '
+                '"max_connections"'
+            )
+        if background_health_checks and not connection_kwargs.get(
+            "health_check_interval"
+        ):
+            raise ValueError(
+                '"background_health_checks" requires a "health_check_interval"'
+            )
 
         self.connection_class = connection_class
         self.connection_kwargs = connection_kwargs
         self.max_connections = max_connections
+        self.min_idle = min_idle
+        self.max_idle_time = max_idle_time
+        self.max_connection_age = max_connection_age
+        self.reaper_interval = reaper_interval
+        self.background_health_checks = background_health_checks
+        self._reaping = bool(
+            min_idle or max_idle_time or max_connection_age or background_health_checks
+        )
 
-        # a lock to protect the critical section in _checkpid().
-        # this lock is acquired when the process id changes, such as
-        # after a fork. during this time, multiple threads in the child
-        # process could attempt to acquire this lock. the first thread
-        # to acquire the lock will reset the data structures and lock
-        # object of this pool. subsequent threads acquiring this lock
-        # will notice the first thread already did the work and simply
-        # release the lock.
+        # forked children reset the pool in _after_fork(), which the
+        # os.register_at_fork() hook runs. where fork hooks are unavailable,
+        # _checkpid() resets it once it notices the process id changed, and
+        # this lock keeps the threads of the child noticing it at the same
+        # time from resetting the pool more than once.
         self._fork_lock = threading.Lock()
         self._lock = asyncio.Lock()
         self._created_connections: int
         self._available_connections: List[Connection]
         self._in_use_connections: Set[Connection]
         self.reset()  # lgtm [py/init-calls-subclass]
+        _pools.add(self)
         self.encoder_class = self.connection_kwargs.get("encoder_class", Encoder)
 
     def __repr__(self):
@@ -1442,53 +2685,40 @@ class ConnectionPool:
         self._created_connections = 0
         self._available_connections = []
         self._in_use_connections = set()
-
-        # this must be the last operation in this method. while reset() is
-        # called when holding _fork_lock, other threads in this process
-        # can call _checkpid() which compares self.pid and os.getpid() without
-        # holding any lock (for performance reasons). keeping this assignment
-        # as the last operation ensures that those other threads will also
-        # notice a pid difference and block waiting for the first thread to
-        # release _fork_lock. when each of these threads eventually acquire
-        # _fork_lock, they will notice that another thread already called
-        # reset() and they will immediately release _fork_lock and continue on.
+        self._stats = PoolStats()
+        self._reaper: Optional[asyncio.Task] = None
+
+        # this must be the last operation in this method. where fork hooks
+        # are unavailable, _checkpid() calls reset() when holding _fork_lock,
+        # while other threads of the child compare self.pid and os.getpid()
+        # without holding any lock (for performance reasons). keeping this
+        # assignment last ensures that those threads also notice a pid
+        # difference and block waiting for the first thread to release
+        # _fork_lock, after which they see that reset() was already called.
         self.pid = os.getpid()
 
     def _checkpid(self):
-        # _checkpid() attempts to keep ConnectionPool fork-safe on modern
-        # systems. this is called by all ConnectionPool methods that
-        # manipulate the pool's state such as get_connection() and release().
-        #
-        # _checkpid() determines whether the process has forked by comparing
-        # the current process id to the process id saved on the ConnectionPool
-        # instance. if these values are the same, _checkpid() simply returns.
-        #
-        # when the process ids differ, _checkpid() assumes that the process
-        # has forked and that we're now running in the child process. the child
-        # process cannot use the parent's file descriptors (e.g., sockets).
-        # therefore, when _checkpid() sees the process id change, it calls
-        # reset() in order to reinitialize the child's ConnectionPool. this
-        # will cause the child to make all new connection objects.
+        # os.register_at_fork() resets the pools of forked children, with
+        # _after_fork(), as soon as they start. _checkpid() is the fallback
+        # keeping ConnectionPool fork-safe where fork hooks are unavailable
+        # (before Python 3.7 and on Windows), and returns straight away
+        # elsewhere, sparing every checkout asking for the process id. it is
+        # called by all the methods that manipulate the pool's state such as
+        # get_connection() and release().
         #
-        # _checkpid() is protected by self._fork_lock to ensure that multiple
-        # threads in the child process do not call reset() multiple times.
+        # the fallback compares the current process id to the one reset()
+        # saved on the pool. when they differ, the process has forked and
+        # this is the child, which cannot use the parent's sockets, so the
+        # pool is reset() to make all new connections. this is protected by
+        # self._fork_lock so that the threads of the child don't reset() the
+        # pool more than once.
         #
-        # there is an extremely small chance this could fail in the following
-        # scenario:
-        #   1. process A calls _checkpid() for the first time and acquires
-        #      self._fork_lock.
-        #   2. while holding self._fork_lock, process A forks (the fork()
-        #      could happen in a different thread owned by process A)
-        #   3. process B (the forked child process) inherits the
-        #      ConnectionPool's state from the parent. that state includes
-        #      a locked _fork_lock. process B will not be notified when
-        #      process A releases the _fork_lock and will thus never be
-        #      able to acquire the _fork_lock.
-        #
-        # to mitigate this possible deadlock, _checkpid() will only wait 5
-        # seconds to acquire _fork_lock. if _fork_lock cannot be acquired in
-        # that time it is assumed that the child is deadlocked and a
-        # redis.ChildDeadlockedError error is raised.
+        # should the parent fork while one of its threads holds _fork_lock,
+        # the child inherits the lock locked, with no thread to ever release
+        # it. so _checkpid() only waits 5 seconds to acquire _fork_lock, and
+        # raises a redis.ChildDeadlockedError if it can't.
+        if FORK_HOOKS:
+            return
         if self.pid != os.getpid():
             acquired = self._fork_lock.acquire(timeout=5)
             if not acquired:
@@ -1501,9 +2731,19 @@ class ConnectionPool:
             finally:
                 self._fork_lock.release()
 
+    def _after_fork(self):
+        # run in the child, by the only thread it has. the event loop of the
+        # parent is unusable in the child, so the reaper, if any, restarts
+        # when the pool is first used by the loop of the child.
+        self._fork_lock = threading.Lock()
+        self.reset()
+
     async def get_connection(self, command_name, *keys, **options):
         """Get a connection from the pool"""
+        start = perf_counter_ns()
         self._checkpid()
+        if self._reaping:
+            self._start_reaper()
         async with self._lock:
             try:
                 connection = self._available_connections.pop()
@@ -1522,6 +2762,7 @@ class ConnectionPool:
                 if await connection.can_read():
                     raise ConnectionError("Connection has data") from None
             except ConnectionError:
+                connection._reconnect_cause = "stale"
                 await connection.disconnect()
                 await connection.connect()
                 if await connection.can_read():
@@ -1532,6 +2773,7 @@ class ConnectionPool:
             await self.release(connection)
             raise
 
+        self._stats.checked_out(perf_counter_ns() - start)
         return connection
 
     def get_encoder(self):
@@ -1548,7 +2790,9 @@ class ConnectionPool:
         if self._created_connections >= self.max_connections:
             raise ConnectionError("Too many connections")
         self._created_connections += 1
-        return self.connection_class(**self.connection_kwargs)
+        connection = self.connection_class(**self.connection_kwargs)
+        connection.pool_stats = self._stats
+        return connection
 
     async def release(self, connection: Connection):
         """Releases the connection back to the pool"""
@@ -1562,6 +2806,7 @@ class ConnectionPool:
                 pass
 
             if self.owns_connection(connection):
+                connection.released_at = time.monotonic()
                 self._available_connections.append(connection)
             else:
                 # pool doesn't own this connection. do not add it back
@@ -1574,6 +2819,173 @@ class ConnectionPool:
     def owns_connection(self, connection: Connection):
         return connection.pid == self.pid
 
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the use of the pool, as a dict of:
+
+        - ``max_connections``: the size of the pool
+        - ``connections``, ``in_use`` and ``idle``: the connections created
+          by the pool, and how many of them are checked out and available
+        - ``connections_created`` and ``connections_destroyed``: the sockets
+          opened and closed by the connections of the pool
+        - ``reconnects``: how many times the connections reconnected, by the
+          cause of their disconnection, as described by ``PoolStats``
+        - ``checkouts``: the connections handed out by ``get_connection()``
+        - ``checkout_wait``: the count, mean, percentiles and extremes of the
+          time in nanoseconds ``get_connection()`` took to hand them out,
+          connecting included
+        - ``timeouts``: the checkouts which gave up waiting for a connection
+        """
+        self._checkpid()
+        in_use = len(self._in_use_connections)
+        idle = len(self._available_connections)
+        return self._make_stats(in_use, idle)
+
+    def _make_stats(self, in_use: int, idle: int) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "max_connections": self.max_connections,
+            "connections": in_use + idle,
+            "in_use": in_use,
+            "idle": idle,
+        }
+        stats.update(self._stats.snapshot())
+        return stats
+
+    async def reap(self):
+        """
+        Close the idle connections past ``max_idle_time`` or
+        ``max_connection_age``, then connect new ones, concurrently, until
+        ``min_idle`` connections are idle. Run by the reaper task.
+        """
+        self._checkpid()
+        now = time.monotonic()
+        async with self._lock:
+            idle, expired = self._expire(self._available_connections, now)
+            self._available_connections = idle
+            self._created_connections -= len(expired)
+            missing = min(
+                self.min_idle - len(idle),
+                self.max_connections - self._created_connections,
+            )
+            warming = [self.make_connection() for _ in range(missing)]
+        try:
+            await asyncio.gather(
+                *(connection.disconnect() for connection in expired),
+                return_exceptions=True,
+            )
+            await _connect_all(warming)
+        finally:
+            async with self._lock:
+                for connection in warming:
+                    if connection.is_connected:
+                        connection.released_at = now
+                        self._available_connections.insert(0, connection)
+                    else:
+                        self._created_connections -= 1
+
+    def _expire(
+        self, connections: Iterable[Connection], now: float
+    ) -> Tuple[List[Connection], List[Connection]]:
+        """
+        Split the idle ``connections``, least recently used first, into those
+        to keep and those past ``max_connection_age`` or ``max_idle_time``,
+        keeping the most recently used of the latter as needed to stay at
+        ``min_idle``
+        """
+        keep: List[Connection] = []
+        too_old: List[Connection] = []
+        too_idle: List[Connection] = []
+        for connection in connections:
+            connected_at = connection.connected_at
+            released_at = connection.released_at
+            if (
+                self.max_connection_age is not None
+                and connected_at is not None
+                and now - connected_at > self.max_connection_age
+            ):
+                too_old.append(connection)
+            elif (
+                self.max_idle_time is not None
+                and released_at is not None
+                and now - released_at > self.max_idle_time
+            ):
+                too_idle.append(connection)
+            else:
+                keep.append(connection)
+        spared = min(max(self.min_idle - len(keep), 0), len(too_idle))
+        if spared:
+            keep[:0] = too_idle[-spared:]
+            del too_idle[-spared:]
+        return keep, too_old + too_idle
+
+    async def check_health(self):
+        """
+        PING, concurrently, the idle connections due for a health check
+        before the next run of the reaper, closing and evicting those which
+        fail. Run by the reaper task with ``background_health_checks``.
+        """
+        self._checkpid()
+        deadline = asyncio.get_event_loop().time() + self.reaper_interval
+        due = await self._take_due(deadline)
+        await asyncio.gather(*(self._probe(connection) for connection in due))
+
+    def _health_check_due(self, connection: Connection, deadline: float) -> bool:
+        return bool(
+            connection.is_connected
+            and connection.health_check_interval
+            and connection.next_health_check <= deadline
+        )
+
+    async def _probe(self, connection: Connection):
+        start = perf_counter_ns()
+        healthy = False
+        try:
+            await connection._send_ping()
+            healthy = True
+        except (RedisError, OSError):
+            self._stats.health_check_failed()
+        finally:
+            # including when cancelled, leaving a reply unread
+            if healthy:
+                self._stats.health_checked(perf_counter_ns() - start)
+            else:
+                await connection.disconnect()
+            await self._return_probed(connection, healthy)
+
+    async def _take_due(self, deadline: float) -> List[Connection]:
+        """Check out the idle connections due for a health check"""
+        async with self._lock:
+            due = [
+                connection
+                for connection in self._available_connections
+                if self._health_check_due(connection, deadline)
+            ]
+            for connection in due:
+                self._available_connections.remove(connection)
+                self._in_use_connections.add(connection)
+        return due
+
+    async def _return_probed(self, connection: Connection, healthy: bool):
+        """Return a connection after its health check, evicting it if it failed"""
+        async with self._lock:
+            self._in_use_connections.discard(connection)
+            if healthy:
+                self._available_connections.insert(0, connection)
+            else:
+                self._created_connections -= 1
+
+    def _start_reaper(self):
+        # the task is gone with the event loop it ran in
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.ensure_future(
+                _run_reaper(weakref.ref(self), self.reaper_interval)
+            )
+
+    def _stop_reaper(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
     async def disconnect(self, inuse_connections: bool = True):
         """
         Disconnects connections in the pool
@@ -1583,6 +2995,7 @@ class ConnectionPool:
         connections that are idle in the pool.
         """
         self._checkpid()
+        self._stop_reaper()
         async with self._lock:
             if inuse_connections:
                 connections: Iterable[Connection] = chain(
@@ -1663,21 +3076,22 @@ class BlockingConnectionPool(ConnectionPool):
         # Keep a list of actual connection instances so that we can
         # disconnect them later.
         self._connections = []
-
-        # this must be the last operation in this method. while reset() is
-        # called when holding _fork_lock, other threads in this process
-        # can call _checkpid() which compares self.pid and os.getpid() without
-        # holding any lock (for performance reasons). keeping this assignment
-        # as the last operation ensures that those other threads will also
-        # notice a pid difference and block waiting for the first thread to
-        # release _fork_lock. when each of these threads eventually acquire
-        # _fork_lock, they will notice that another thread already called
-        # reset() and they will immediately release _fork_lock and continue on.
+        self._stats = PoolStats()
+        self._reaper = None
+
+        # this must be the last operation in this method. where fork hooks
+        # are unavailable, _checkpid() calls reset() when holding _fork_lock,
+        # while other threads of the child compare self.pid and os.getpid()
+        # without holding any lock (for performance reasons). keeping this
+        # assignment last ensures that those threads also notice a pid
+        # difference and block waiting for the first thread to release
+        # _fork_lock, after which they see that reset() was already called.
         self.pid = os.getpid()
 
     def make_connection(self):
         """Make a fresh connection."""
         connection = self.connection_class(**self.connection_kwargs)
+        connection.pool_stats = self._stats
         self._connections.append(connection)
         return connection
 
@@ -1693,8 +3107,11 @@ class BlockingConnectionPool(ConnectionPool):
         create new connections when we need to, i.e.: the actual number of
         connections will only increase in response to demand.
         """
+        start = perf_counter_ns()
         # Make sure we haven't changed process.
         self._checkpid()
+        if self._reaping:
+            self._start_reaper()
 
         # Try and get a connection from the pool. If one isn't available within
         # self.timeout then raise a ``ConnectionError``.
@@ -1703,6 +3120,7 @@ class BlockingConnectionPool(ConnectionPool):
             async with async_timeout.timeout(self.timeout):
                 connection = await self.pool.get()
         except (asyncio.QueueEmpty, asyncio.TimeoutError):
+            self._stats.timed_out()
             # Note that this is not caught by the redis client and will be
             # raised unless handled by application code. If you want never to
             raise ConnectionError("No connection available.")
@@ -1723,6 +3141,7 @@ class BlockingConnectionPool(ConnectionPool):
                 if await connection.can_read():
                     raise ConnectionError("Connection has data") from None
             except ConnectionError:
+                connection._reconnect_cause = "stale"
                 await connection.disconnect()
                 await connection.connect()
                 if await connection.can_read():
@@ -1732,6 +3151,7 @@ class BlockingConnectionPool(ConnectionPool):
             await self.release(connection)
             raise
 
+        self._stats.checked_out(perf_counter_ns() - start)
         return connection
 
     async def release(self, connection: Connection):
@@ -1748,6 +3168,7 @@ class BlockingConnectionPool(ConnectionPool):
             return
 
         # Put the connection back into the pool.
+        connection.released_at = time.monotonic()
         try:
             self.pool.put_nowait(connection)
         except asyncio.QueueFull:
@@ -1758,6 +3179,7 @@ class BlockingConnectionPool(ConnectionPool):
     async def disconnect(self, inuse_connections: bool = True):
         """Disconnects all connections in the pool."""
         self._checkpid()
+        self._stop_reaper()
         async with self._lock:
             resp = await asyncio.gather(
                 *(connection.disconnect() for connection in self._connections),
@@ -1766,3 +3188,90 @@ class BlockingConnectionPool(ConnectionPool):
             exc = next((r for r in resp if isinstance(r, BaseException)), None)
             if exc:
                 raise exc
+
+    def _take_queued(self) -> Tuple[List[Connection], int]:
+        """
+        Take everything out of the queue of the pool. Return the idle
+        connections, least recently used first, and the number of None
+        placeholders for the connections not made yet.
+        """
+        items = []
+        while True:
+            try:
+                items.append(self.pool.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        if isinstance(self.pool, asyncio.LifoQueue):
+            items.reverse()
+        connections = [item for item in items if item is not None]
+        return connections, len(items) - len(connections)
+
+    def _put_queued(self, connections: List[Connection], placeholders: int):
+        """
+        Put the idle ``connections``, least recently used first, and
+        ``placeholders`` None placeholders back in the queue of the pool, in
+        the order that hands out the connections before making new ones
+        """
+        if isinstance(self.pool, asyncio.LifoQueue):
+            items: List[Optional[Connection]] = [None] * placeholders
+            items.extend(connections)
+        else:
+            items = list(connections)
+            items.extend([None] * placeholders)
+        for item in items:
+            self.pool.put_nowait(item)
+
+    async def reap(self):
+        self._checkpid()
+        now = time.monotonic()
+        connections, placeholders = self._take_queued()
+        idle, expired = self._expire(connections, now)
+        placeholders += len(expired)
+        missing = max(min(self.min_idle - len(idle), placeholders), 0)
+        self._put_queued(idle, placeholders - missing)
+        for connection in expired:
+            self._connections.remove(connection)
+        warming = [self.make_connection() for _ in range(missing)]
+        try:
+            await asyncio.gather(
+                *(connection.disconnect() for connection in expired),
+                return_exceptions=True,
+            )
+            await _connect_all(warming)
+        finally:
+            connections, placeholders = self._take_queued()
+            for connection in warming:
+                if connection.is_connected:
+                    connection.released_at = now
+                    connections.append(connection)
+                else:
+                    self._connections.remove(connection)
+                    placeholders += 1
+            self._put_queued(connections, placeholders)
+
+    async def _take_due(self, deadline: float) -> List[Connection]:
+        connections, placeholders = self._take_queued()
+        due = [
+            connection
+            for connection in connections
+            if self._health_check_due(connection, deadline)
+        ]
+        idle = [connection for connection in connections if connection not in due]
+        self._put_queued(idle, placeholders)
+        return due
+
+    async def _return_probed(self, connection: Connection, healthy: bool):
+        connections, placeholders = self._take_queued()
+        if healthy:
+            connections.append(connection)
+        else:
+            self._connections.remove(connection)
+            placeholders += 1
+        self._put_queued(connections, placeholders)
+
+    def stats(self) -> Dict[str, Any]:
+        self._checkpid()
+        connections, placeholders = self._take_queued()
+        self._put_queued(connections, placeholders)
+        idle = len(connections)
+        return self._make_stats(len(self._connections) - idle, idle)
@@ -35,6 +35,12 @@ class Retry:
         self._retries = retries
         self._supported_errors = supported_errors
 
+    def get_supported_errors(self):
+        """
+        Return the types of the errors that trigger a retry
+        """
+        return self._supported_errors
+
     def update_supported_errors(self, specified_errors: list):
         """
         Updates the supported errors with the specified error types
@@ -0,0 +1,358 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from redis.connection import Encoder
+from redis.exceptions import ConnectionError, DataError, TimeoutError
+from redis.utils import str_if_bytes
+
+# read-only commands whose replies only depend on the keys they name, mapped
+# to the position of those keys in the command
+DEFAULT_CACHEABLE_COMMANDS = {
+    "BITCOUNT": slice(1, 2),
+    "BITPOS": slice(1, 2),
+    "EXISTS": slice(1, None),
+    "GET": slice(1, 2),
+    "GETBIT": slice(1, 2),
+    "GETRANGE": slice(1, 2),
+    "HEXISTS": slice(1, 2),
+    "HGET": slice(1, 2),
+    "HGETALL": slice(1, 2),
+    "HKEYS": slice(1, 2),
+    "HLEN": slice(1, 2),
+    "HMGET": slice(1, 2),
+    "HSTRLEN": slice(1, 2),
+    "HVALS": slice(1, 2),
+    "LINDEX": slice(1, 2),
+    "LLEN": slice(1, 2),
+    "LRANGE": slice(1, 2),
+    "MGET": slice(1, None),
+    "SCARD": slice(1, 2),
+    "SISMEMBER": slice(1, 2),
+    "SMEMBERS": slice(1, 2),
+    "SMISMEMBER": slice(1, 2),
+    "STRLEN": slice(1, 2),
+    "TYPE": slice(1, 2),
+    "ZCARD": slice(1, 2),
+    "ZCOUNT": slice(1, 2),
+    "ZMSCORE": slice(1, 2),
+    "ZRANGE": slice(1, 2),
+    "ZRANGEBYSCORE": slice(1, 2),
+    "ZRANK": slice(1, 2),
+    "ZREVRANGE": slice(1, 2),
+    "ZREVRANGEBYSCORE": slice(1, 2),
+    "ZREVRANK": slice(1, 2),
+    "ZSCORE": slice(1, 2),
+}
+
+INVALIDATION_CHANNEL = "__redis__:invalidate"
+
+
+class LocalCache:
+    """
+    A client side cache of read-only command replies, kept coherent with
+    server assisted invalidation (``CLIENT TRACKING``).
+
+    Pass an instance as ``client_cache`` to :class:`~redis.Redis` (or to a
+    ``ConnectionPool``) to enable it. Every connection of the pool turns on
+    tracking and redirects its invalidation messages to a dedicated
+    connection owned by the cache: with ``protocol=3`` those arrive as RESP3
+    push messages, with RESP2 the connection subscribes to the
+    ``__redis__:invalidate`` channel. Pending invalidations are processed
+    before every lookup.
+
+    At most ``max_size`` replies are kept, the least recently used one is
+    evicted first. When ``ttl`` is set, replies also expire after ``ttl``
+    seconds. ``cacheable_commands`` maps the names of the commands to cache
+    to a slice locating their keys in the command.
+
+    A cache serves a single connection pool. ``RedisCluster`` gives every
+    node its own copy of the cache it is created with.
+    """
+
+    def __init__(
+        self, max_size=10000, ttl=None, cacheable_commands=DEFAULT_CACHEABLE_COMMANDS
+    ):
+        if max_size <= 0:
+            raise DataError("max_size must be a positive integer")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cacheable_commands = cacheable_commands
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.connection_pool = None
+        self._encoder = Encoder("utf-8", "strict", False)
+        self.pid = os.getpid()
+        self._lock = threading.RLock()
+        # command -> (reply, expiry time, keys, connection that read it)
+        self._entries = OrderedDict()
+        # commands that missed and whose replies may still be stored
+        self._pending = {}
+        # encoded key -> commands depending on it, cached or pending
+        self._key_index = {}
+        # connection -> commands cached from the replies it read
+        self._connection_index = {}
+        # connection -> id of the client its invalidations are redirected to
+        self._tracked = {}
+        self._connection = None
+        self._redirect_id = None
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}<max_size={self.max_size},ttl={self.ttl},"
+            f"size={len(self._entries)}>"
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def copy(self):
+        "Return a new empty cache with the same settings"
+        return type(self)(
+            max_size=self.max_size,
+            ttl=self.ttl,
+            cacheable_commands=self.cacheable_commands,
+        )
+
+    def stats(self):
+        "Return the hit, miss, eviction and invalidation counters of the cache"
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+    def attach(self, connection_pool):
+        "Bind the cache to the connection pool whose replies it caches"
+        if self.connection_pool is None:
+            self.connection_pool = connection_pool
+            self._encoder = connection_pool.get_encoder()
+        elif self.connection_pool is not connection_pool:
+            raise DataError("A client cache can only serve one connection pool")
+
+    def is_cacheable(self, command):
+        "Return whether the reply to ``command`` (the command args) is cached"
+        name = command[0]
+        return isinstance(name, str) and name.upper() in self.cacheable_commands
+
+    def get(self, command, default=None):
+        """
+        Return the cached reply to ``command`` or ``default`` if there is
+        none, in which case the command's reply may be stored with set().
+        """
+        with self._lock:
+            self._process_invalidations()
+            try:
+                entry = self._entries.get(command)
+            except TypeError:
+                # unhashable arguments are never cached
+                return default
+            if entry is not None:
+                if entry[1] is None or entry[1] > time.monotonic():
+                    self._entries.move_to_end(command)
+                    self.hits += 1
+                    return _copy_reply(entry[0])
+                self._remove(command)
+            self.misses += 1
+            if command not in self._pending:
+                if len(self._pending) >= self.max_size:
+                    # replies that never came back, e.g. errors
+                    for pending in list(self._pending):
+                        self._remove(pending)
+                keys = self._command_keys(command)
+                self._pending[command] = keys
+                self._index(command, keys)
+            return default
+
+    def set(self, command, response, connection):
+        """
+        Store the ``response`` ``connection`` read for ``command`` after a
+        get() miss, unless its keys were invalidated in the meantime.
+        """
+        with self._lock:
+            self._process_invalidations()
+            redirect_id = self._redirect_id
+            if redirect_id is None or self._tracked.get(connection) != redirect_id:
+                # the connection's invalidations went to a connection that
+                # was lost since, or nowhere after a reset, so it needs to
+                # redirect them again
+                try:
+                    self.enable_tracking(connection)
+                except (ConnectionError, TimeoutError):
+                    return
+                self._remove(command)
+                return
+            keys = self._pending.pop(command, None)
+            if keys is None:
+                return
+            expires_at = None
+            if self.ttl is not None:
+                expires_at = time.monotonic() + self.ttl
+            self._entries[command] = (
+                _copy_reply(response),
+                expires_at,
+                keys,
+                connection,
+            )
+            self._connection_index.setdefault(connection, set()).add(command)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, keys):
+        "Drop every reply depending on one of ``keys``"
+        with self._lock:
+            encode = self._encoder.encode
+            for key in keys:
+                for command in self._key_index.pop(encode(key), ()):
+                    self._remove(command)
+            self.invalidations += 1
+
+    def flush(self):
+        "Drop every cached reply"
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._key_index.clear()
+            self._connection_index.clear()
+            self.invalidations += 1
+
+    def enable_tracking(self, connection):
+        """
+        Turn on tracking for ``connection``, redirecting its invalidation
+        messages to the cache. Called by every connection of the pool once
+        it is connected.
+        """
+        with self._lock:
+            redirect_id = self._get_redirect_id()
+            if getattr(connection, "protocol", 2) == 3:
+                # the server tells the connection when its redirection
+                # target goes away
+                connection._parser.set_push_handler(self._handle_push)
+            connection.send_command(
+                "CLIENT", "TRACKING", "ON", "REDIRECT", redirect_id, check_health=False
+            )
+            if str_if_bytes(connection.read_response()) != "OK":
+                raise ConnectionError("Error enabling client tracking")
+            self._tracked[connection] = redirect_id
+
+    def connection_lost(self, connection):
+        """
+        Forget a connection of the pool that was disconnected. The server
+        stops tracking the keys a connection read once it is gone, so the
+        replies it read are dropped.
+        """
+        with self._lock:
+            self._tracked.pop(connection, None)
+            for command in self._connection_index.pop(connection, ()):
+                self._remove(command)
+
+    def close(self):
+        "Disconnect the invalidation connection and drop every cached reply"
+        with self._lock:
+            self._reset()
+
+    def _get_redirect_id(self):
+        if self._connection is None:
+            pool = self.connection_pool
+            if pool is None:
+                raise ConnectionError("The client cache isn't attached to a pool")
+            kwargs = pool.connection_kwargs.copy()
+            kwargs.pop("client_cache", None)
+            connection = pool.connection_class(**kwargs)
+            try:
+                connection.connect()
+                connection.send_command("CLIENT", "ID")
+                redirect_id = int(connection.read_response())
+                if getattr(connection, "protocol", 2) == 2:
+                    connection.send_command("SUBSCRIBE", INVALIDATION_CHANNEL)
+                    connection.read_response()
+            except BaseException:
+                connection.disconnect()
+                raise
+            self._connection = connection
+            self._redirect_id = redirect_id
+        return self._redirect_id
+
+    def _process_invalidations(self):
+        if self.pid != os.getpid():
+            # the parent process owns the invalidation connection
+            self.pid = os.getpid()
+            self._reset()
+            return
+        connection = self._connection
+        if connection is None:
+            return
+        try:
+            while connection.can_read(timeout=0):
+                self._handle_invalidation(connection.read_response())
+        except (ConnectionError, TimeoutError):
+            # invalidations might have been lost with the connection
+            self._reset()
+
+    def _handle_invalidation(self, message):
+        kind = str_if_bytes(message[0])
+        if kind == "invalidate":
+            # RESP3 push message
+            keys = message[1]
+        elif kind == "message":
+            # RESP2 message from the invalidation channel
+            keys = message[2]
+        else:
+            return
+        if keys is None:
+            # the server flushed its tracking table, e.g. on FLUSHALL
+            self.flush()
+        else:
+            self.invalidate(keys)
+
+    def _handle_push(self, message):
+        if str_if_bytes(message[0]) == "tracking-redir-broken":
+            with self._lock:
+                self._reset()
+        else:
+            self._handle_invalidation(message)
+
+    def _reset(self):
+        if self._connection is not None:
+            self._connection.disconnect()
+        self._connection = None
+        self._redirect_id = None
+        self._tracked.clear()
+        self.flush()
+
+    def _command_keys(self, command):
+        key_slice = self.cacheable_commands[command[0].upper()]
+        return tuple(map(self._encoder.encode, command[key_slice]))
+
+    def _index(self, command, keys):
+        for key in keys:
+            self._key_index.setdefault(key, set()).add(command)
+
+    def _remove(self, command):
+        entry = self._entries.pop(command, None)
+        if entry is not None:
+            keys = entry[2]
+            commands = self._connection_index.get(entry[3])
+            if commands is not None:
+                commands.discard(command)
+        else:
+            keys = self._pending.pop(command, ())
+        for key in keys:
+            commands = self._key_index.get(key)
+            if commands is not None:
+                commands.discard(command)
+                if not commands:
+                    del self._key_index[key]
+
+
+def _copy_reply(reply):
+    # cached aggregates are shared between callers, so each one gets a copy
+    if isinstance(reply, (list, dict, set)):
+        return reply.copy()
+    return reply
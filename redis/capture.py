@@ -0,0 +1,218 @@
+"""
+Recording of the traffic between clients and Redis servers.
+
+A :class:`TrafficRecorder` passed as ``recorder`` to a client (or to a
+connection pool) logs, for every connection of the client, the commands it
+sends, exactly as they are packed, and the bytes it receives from the
+server, with timestamps, to a compact binary file:
+
+    with TrafficRecorder("traffic.cap") as recorder:
+        r = redis.Redis(recorder=recorder)
+        r.set("foo", "bar")
+
+``read_capture()`` reads the records back. ``benchmarks/replay.py`` replays
+a recording against the in-process stand-in server, to reproduce the
+command mix of an application when tuning pools, parsers and read sizes.
+
+The file starts with ``MAGIC``, followed by the records, each made of a
+``RECORD_HEADER`` (kind, connection id, seconds since the recording started
+and payload length) and the payload. A CONNECT record's payload describes
+the connection as JSON, SEND records hold what one
+``send_packed_command()`` call sent and RECEIVE records what one read from
+the socket returned. DISCONNECT records have no payload.
+"""
+import itertools
+import json
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from redis.exceptions import DataError
+
+MAGIC = b"REDISCAP\x01"
+RECORD_HEADER = struct.Struct("<BIdI")
+
+CONNECT = 1
+SEND = 2
+RECEIVE = 3
+DISCONNECT = 4
+
+CaptureRecord = namedtuple("CaptureRecord", "kind connection_id timestamp data")
+
+
+class TrafficRecorder:
+    """
+    Records the traffic of connections to ``file``, a path or a binary file
+    object. Recording can be shared by any number of connections, sync or
+    asyncio, from any thread. Call ``close()`` once done to flush it.
+    """
+
+    def __init__(self, file, clock=time.monotonic):
+        if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+            self._file = open(file, "wb")
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._clock = clock
+        self._start = clock()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # shared, not copied: see NodesManager.initialize()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        "Stop recording and flush the recording, closing it if it was opened"
+        with self._lock:
+            if self._file is None:
+                return
+            if self._owns_file:
+                self._file.close()
+            else:
+                self._file.flush()
+            self._file = None
+
+    def record(self, kind, connection_id, data=b""):
+        """
+        Record ``data``, bytes or a list of buffers, as an event of ``kind``
+        on the connection ``connection_id``
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = b"".join(data)
+        header = RECORD_HEADER.pack(
+            kind, connection_id, self._clock() - self._start, len(data)
+        )
+        with self._lock:
+            # connections may outlive the recording
+            if self._file is not None:
+                self._file.write(header)
+                self._file.write(data)
+
+    def connection_opened(self, connection):
+        "Record the opening of ``connection`` and return the id it's recorded as"
+        connection_id = next(self._ids)
+        description = json.dumps(dict(connection.repr_pieces()), default=str)
+        self.record(CONNECT, connection_id, description.encode())
+        return connection_id
+
+    def connection_closed(self, connection_id):
+        self.record(DISCONNECT, connection_id)
+
+
+def read_capture(file):
+    """
+    Iterate over the records of a recording, a path or a binary file object,
+    as ``CaptureRecord`` tuples
+    """
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "rb") as f:
+            yield from read_capture(f)
+        return
+    if file.read(len(MAGIC)) != MAGIC:
+        raise DataError("Not a recording of Redis traffic")
+    read = file.read
+    while True:
+        header = read(RECORD_HEADER.size)
+        if not header:
+            return
+        if len(header) < RECORD_HEADER.size:
+            raise DataError("Truncated recording")
+        kind, connection_id, timestamp, length = RECORD_HEADER.unpack(header)
+        data = read(length)
+        if len(data) < length:
+            raise DataError("Truncated recording")
+        yield CaptureRecord(kind, connection_id, timestamp, data)
+
+
+class CapturingSocket:
+    "Wraps a socket to record the bytes received from it"
+
+    def __init__(self, sock, recorder, connection_id):
+        self._sock = sock
+        self._recorder = recorder
+        self._connection_id = connection_id
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def recv(self, *args):
+        data = self._sock.recv(*args)
+        if data:
+            self._recorder.record(RECEIVE, self._connection_id, data)
+        return data
+
+    def recv_into(self, buffer, *args):
+        received = self._sock.recv_into(buffer, *args)
+        if received:
+            data = memoryview(buffer).cast("B")[:received]
+            self._recorder.record(RECEIVE, self._connection_id, data)
+        return received
+
+
+class CapturingStreamReader:
+    "Wraps an asyncio.StreamReader to record the bytes read from it"
+
+    def __init__(self, reader, recorder, connection_id):
+        self._reader = reader
+        self._recorder = recorder
+        self._connection_id = connection_id
+
+    def __getattr__(self, name):
+        return getattr(self._reader, name)
+
+    def _record(self, data):
+        if data:
+            self._recorder.record(RECEIVE, self._connection_id, data)
+        return data
+
+    async def read(self, *args):
+        return self._record(await self._reader.read(*args))
+
+    async def readexactly(self, *args):
+        return self._record(await self._reader.readexactly(*args))
+
+    async def readline(self):
+        return self._record(await self._reader.readline())
+
+    async def readuntil(self, *args):
+        return self._record(await self._reader.readuntil(*args))
+
+
+class CapturingProtocol:
+    "Wraps an asyncio.Protocol to record the data it receives"
+
+    def __init__(self, protocol, recorder, connection_id):
+        self._protocol = protocol
+        self._recorder = recorder
+        self._connection_id = connection_id
+
+    def __getattr__(self, name):
+        return getattr(self._protocol, name)
+
+    def data_received(self, data):
+        self._recorder.record(RECEIVE, self._connection_id, data)
+        self._protocol.data_received(data)
+
+
+def split_records(records):
+    """
+    Group ``records`` by connection, returning a dict mapping the ids of the
+    connections to their description and their records
+    """
+    connections = {}
+    for record in records:
+        if record.kind == CONNECT:
+            connections[record.connection_id] = (json.loads(record.data), [])
+        elif record.connection_id in connections:
+            connections[record.connection_id][1].append(record)
+    return connections
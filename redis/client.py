@@ -4,6 +4,7 @@ import re
 import threading
 import time
 import warnings
+from collections.abc import MutableMapping
 from itertools import chain
 
 from redis.commands import (
@@ -15,6 +16,7 @@ from redis.commands import (
 from redis.connection import ConnectionPool, SSLConnection, UnixDomainSocketConnection
 from redis.exceptions import (
     ConnectionError,
+    DataError,
     ExecAbortError,
     ModuleError,
     PubSubError,
@@ -23,6 +25,7 @@ from redis.exceptions import (
     TimeoutError,
     WatchError,
 )
+from redis.instrumentation import CommandEvent
 from redis.lock import Lock
 from redis.utils import safe_str, str_if_bytes
 
@@ -32,6 +35,17 @@ EMPTY_RESPONSE = "EMPTY_RESPONSE"
 # some responses (ie. dump) are binary, and just meant to never be decoded
 NEVER_DECODE = "NEVER_DECODE"
 
+# streams a bulk string reply into the BufferSink or FileSink it is set to,
+# instead of returning it
+STREAM_INTO = "STREAM_INTO"
+
+# returns the reply as read, undecoded and without running its response
+# callback, when set to a true value: execute_command("HGETALL", key, raw=True)
+RAW_RESPONSE = "raw"
+
+# returned by the client side cache for replies it doesn't hold
+_CACHE_MISS = object()
+
 
 def timestamp_to_datetime(response):
     "Converts a unix timestamp to a Python datetime object"
@@ -75,6 +89,78 @@ class CaseInsensitiveDict(dict):
         super().update(data)
 
 
+_MISSING = object()
+
+
+class ResponseCallbacks(MutableMapping):
+    """
+    The response callbacks of a client, by upper case command name.
+
+    Command names are looked up as given first, which is a hit for the upper
+    case names the commands send. Other names are upper cased, so lookups
+    stay case insensitive.
+
+    The table starts out sharing the dict it is built from, which is only
+    copied on the first change, so that clients and pipelines don't copy
+    every callback when they are created.
+    """
+
+    __slots__ = ("_callbacks", "_shared")
+
+    def __init__(self, callbacks, normalized=False):
+        if normalized:
+            # shared with every table built from it until changed
+            self._callbacks = callbacks
+            self._shared = True
+        else:
+            self._callbacks = {k.upper(): v for k, v in callbacks.items()}
+            self._shared = False
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._callbacks!r})"
+
+    def __contains__(self, command):
+        return self.get(command, _MISSING) is not _MISSING
+
+    def __getitem__(self, command):
+        callback = self.get(command, _MISSING)
+        if callback is _MISSING:
+            raise KeyError(command)
+        return callback
+
+    def get(self, command, default=None):
+        callback = self._callbacks.get(command, _MISSING)
+        if callback is _MISSING:
+            name = command.upper()
+            if name == command:
+                return default
+            return self._callbacks.get(name, default)
+        return callback
+
+    def __setitem__(self, command, callback):
+        self._own()[command.upper()] = callback
+
+    def __delitem__(self, command):
+        del self._own()[command.upper()]
+
+    def __iter__(self):
+        return iter(self._callbacks)
+
+    def __len__(self):
+        return len(self._callbacks)
+
+    def copy(self):
+        "Return a table sharing the callbacks of this one until changed"
+        self._shared = True
+        return type(self)(self._callbacks, normalized=True)
+
+    def _own(self):
+        if self._shared:
+            self._callbacks = self._callbacks.copy()
+            self._shared = False
+        return self._callbacks
+
+
 def parse_debug_object(response):
     "Parse the results of Redis's DEBUG OBJECT command into a Python dict"
     # The 'type' of the object is the first item in the response, but isn't
@@ -222,6 +308,16 @@ def pairs_to_dict(response, decode_keys=False, decode_string_values=False):
     """Create a dict given a list of key/value pairs"""
     if response is None:
         return {}
+    if isinstance(response, dict):
+        # RESP3 map replies are parsed into dicts already
+        if not (decode_keys or decode_string_values):
+            return response
+        return {
+            (str_if_bytes(k) if decode_keys else k): (
+                str_if_bytes(v) if decode_string_values else v
+            )
+            for k, v in response.items()
+        }
     if decode_keys or decode_string_values:
         # the iter form is faster, but I don't know how to make that work
         # with a str_if_bytes() map
@@ -237,6 +333,24 @@ def pairs_to_dict(response, decode_keys=False, decode_string_values=False):
         return dict(zip(it, it))
 
 
+def flatten_pairs(response):
+    """
+    Turn a RESP3 map reply back into the flat key/value list RESP2 returns,
+    for the replies whose documented result is a list
+    """
+    if isinstance(response, dict):
+        return [item for pair in response.items() for item in pair]
+    return response
+
+
+def pairs_to_tuples(response):
+    "Turn a flat key/value list, or a RESP3 map reply, into a list of pairs"
+    if isinstance(response, dict):
+        return list(response.items())
+    it = iter(response)
+    return list(zip(it, it))
+
+
 def pairs_to_dict_typed(response, type_info):
     it = iter(response)
     result = {}
@@ -260,6 +374,9 @@ def zset_score_pairs(response, **options):
     if not response or not options.get("withscores"):
         return response
     score_cast_func = options.get("score_cast_func", float)
+    if isinstance(response[0], list):
+        # RESP3 already pairs every member with its score
+        return [(member, score_cast_func(score)) for member, score in response]
     it = iter(response)
     return list(zip(it, map(score_cast_func, it)))
 
@@ -334,6 +451,9 @@ def parse_xinfo_stream(response, **options):
 def parse_xread(response):
     if response is None:
         return []
+    if isinstance(response, dict):
+        # RESP3 maps each stream name to its entries
+        return [[name, parse_stream_list(r)] for name, r in response.items()]
     return [[r[0], parse_stream_list(r[1])] for r in response]
 
 
@@ -381,6 +501,8 @@ def parse_client_list(response, **options):
 
 
 def parse_config_get(response, **options):
+    if isinstance(response, dict):
+        return {str_if_bytes(k): str_if_bytes(v) for k, v in response.items()}
     response = [str_if_bytes(i) if i is not None else None for i in response]
     return response and pairs_to_dict(response) or {}
 
@@ -440,6 +562,7 @@ def parse_stralgo(response, **options):
     if options.get("len", False):
         return int(response)
     if options.get("idx", False):
+        response = flatten_pairs(response)
         if options.get("withmatchlen", False):
             matches = [
                 [(int(match[-1]))] + list(map(tuple, match[:-1]))
@@ -679,7 +802,151 @@ def parse_set_result(response, **options):
     return response and str_if_bytes(response) == "OK"
 
 
+def _decode_all(decode, response):
+    if isinstance(response, bytes):
+        return decode(response)
+    if isinstance(response, list):
+        return [_decode_all(decode, item) for item in response]
+    if isinstance(response, dict):
+        return {
+            _decode_all(decode, key): _decode_all(decode, value)
+            for key, value in response.items()
+        }
+    if isinstance(response, set):
+        return {_decode_all(decode, item) for item in response}
+    return response
+
+
+def _decode_pair_fields(decode, response):
+    # a flat list of fields and values, or a RESP3 map
+    if isinstance(response, dict):
+        return {decode(field): value for field, value in response.items()}
+    if isinstance(response, list):
+        response[::2] = map(decode, response[::2])
+    return response
+
+
+def _decode_stream_entry_fields(decode, response):
+    # a list of [id, fields and values] entries. deleted entries and the
+    # replies of XCLAIM with JUSTID don't have fields
+    if response is None:
+        return None
+    entries = []
+    for entry in response:
+        if isinstance(entry, list):
+            entry = [decode(entry[0]), _decode_pair_fields(decode, entry[1])]
+        elif isinstance(entry, bytes):
+            entry = decode(entry)
+        entries.append(entry)
+    return entries
+
+
+def _decode_stream_read_fields(decode, response):
+    # the entries of every stream read, by stream name
+    if isinstance(response, dict):
+        return {
+            decode(name): _decode_stream_entry_fields(decode, entries)
+            for name, entries in response.items()
+        }
+    if isinstance(response, list):
+        return [
+            [decode(name), _decode_stream_entry_fields(decode, entries)]
+            for name, entries in response
+        ]
+    return response
+
+
+def _decode_autoclaim_fields(decode, response):
+    # the next id to claim from, the claimed entries and, since Redis 7, the
+    # ids of deleted entries
+    return [
+        decode(response[0]),
+        _decode_stream_entry_fields(decode, response[1]),
+        *response[2:],
+    ]
+
+
+# how the field names of the replies to commands returning fields and values
+# are decoded when their decoding is set to "fields"
+FIELD_NAME_DECODERS = {
+    "CONFIG GET": _decode_pair_fields,
+    "HGETALL": _decode_pair_fields,
+    "XAUTOCLAIM": _decode_autoclaim_fields,
+    "XCLAIM": _decode_stream_entry_fields,
+    "XRANGE": _decode_stream_entry_fields,
+    "XREAD": _decode_stream_read_fields,
+    "XREADGROUP": _decode_stream_read_fields,
+    "XREVRANGE": _decode_stream_entry_fields,
+}
+
+
+# the response callbacks of the shapes replies of fields and values can be
+# returned as. "raw" returns the reply as read: a flat list with RESP2, a
+# dict with RESP3
+RESPONSE_SHAPES = {
+    "raw": None,
+    "list": lambda r, **options: r and flatten_pairs(r) or [],
+    "pairs": lambda r, **options: r and pairs_to_tuples(r) or [],
+    "dict": lambda r, **options: r and pairs_to_dict(r) or {},
+}
+
+
+def validate_response_decoding(command, decode):
+    "Raise a DataError unless ``decode`` is a valid decoding for ``command``"
+    if decode not in (True, False, "fields"):
+        raise DataError('Response decoding must be True, False or "fields"')
+    if decode == "fields" and command.upper() not in FIELD_NAME_DECODERS:
+        raise DataError(f"The replies to {command} have no field names to decode")
+
+
+def decode_response(response, encoder, command_name, decode):
+    """
+    Decode ``response``, a reply to ``command_name`` that was read without
+    decoding, according to ``decode``: ``True`` decodes it entirely, with
+    ``encoder``, ``False`` leaves it as it is, and ``"fields"`` only decodes
+    its field names.
+    """
+    if decode is False or isinstance(response, Exception):
+        return response
+
+    def decode_value(value):
+        return encoder.decode(value, force=True)
+
+    if decode == "fields":
+        return FIELD_NAME_DECODERS[command_name.upper()](decode_value, response)
+    return _decode_all(decode_value, response)
+
+
+def stream_transaction_replies(response, commands, encoder, decode):
+    """
+    Hand the replies in ``response``, the EXEC of a transaction, to the
+    sinks of its ``commands`` that stream them (see ``STREAM_INTO``), and
+    return the replies with these replaced by their lengths. EXEC is read
+    without decoding when some of the commands stream their replies, so the
+    other replies are decoded with ``encoder`` here if ``decode`` is set.
+    """
+    replies = []
+    for reply, (args, options) in zip(response, commands):
+        if isinstance(reply, Exception):
+            pass
+        elif STREAM_INTO in options:
+            sink = options[STREAM_INTO]
+            if isinstance(reply, bytes):
+                sink.begin(len(reply))
+                sink.write(reply)
+                reply = len(reply)
+            reply = sink.finish(reply)
+        elif decode:
+            reply = decode_response(reply, encoder, args[0], True)
+        replies.append(reply)
+    return replies
+
+
 class AbstractRedis:
+    # the RESPONSE_CALLBACKS of the class, upper cased once and shared by its
+    # clients, see response_callback_table()
+    _response_callback_table = (None, None, None)
+
     RESPONSE_CALLBACKS = {
         **string_keys_to_dict(
             "AUTH COPY EXPIRE EXPIREAT PEXPIRE PEXPIREAT "
@@ -745,7 +1012,7 @@ class AbstractRedis:
         "CLIENT UNBLOCK": lambda r: r and int(r) == 1 or False,
         "CLIENT PAUSE": bool_ok,
         "CLIENT GETREDIR": int,
-        "CLIENT TRACKINGINFO": lambda r: list(map(str_if_bytes, r)),
+        "CLIENT TRACKINGINFO": lambda r: list(map(str_if_bytes, flatten_pairs(r))),
         "CLUSTER ADDSLOTS": bool_ok,
         "CLUSTER ADDSLOTSRANGE": bool_ok,
         "CLUSTER COUNT-FAILURE-REPORTS": lambda x: int(x),
@@ -838,6 +1105,25 @@ class AbstractRedis:
         "ZMSCORE": parse_zmscore,
     }
 
+    @classmethod
+    def response_callback_table(cls):
+        """
+        Return a new table of the RESPONSE_CALLBACKS of the class, sharing
+        the callbacks with the other tables of the class until changed.
+
+        The shared callbacks are rebuilt when RESPONSE_CALLBACKS is replaced
+        or changed in place, so that patching the class dict still applies
+        to the clients created afterwards.
+        """
+        source, snapshot, callbacks = cls.__dict__.get(
+            "_response_callback_table", AbstractRedis._response_callback_table
+        )
+        if source is not cls.RESPONSE_CALLBACKS or source != snapshot:
+            source = cls.RESPONSE_CALLBACKS
+            callbacks = {k.upper(): v for k, v in source.items()}
+            cls._response_callback_table = (source, dict(source), callbacks)
+        return ResponseCallbacks(callbacks, normalized=True)
+
 
 class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
     """
@@ -936,6 +1222,11 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
         username=None,
         retry=None,
         redis_connect_func=None,
+        protocol=2,
+        client_cache=None,
+        recorder=None,
+        instrumentation=None,
+        drain_timeout=None,
     ):
         """
         Initialize a new Redis client.
@@ -943,6 +1234,17 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
         `retry_on_error` to a list of the error/s to retry on, then set
         `retry` to a valid `Retry` object.
         To retry on TimeoutError, `retry_on_timeout` can also be set to `True`.
+        Set `protocol` to 3 to talk RESP3 (Redis 6.0+), which returns maps,
+        sets, doubles and booleans natively.
+        Pass a `redis.cache.LocalCache` as `client_cache` to serve read-only
+        commands from a local cache, invalidated by the server (Redis 6.0+).
+        Pass a `redis.capture.TrafficRecorder` as `recorder` to record the
+        commands sent and the replies received by the client's connections.
+        Pass a `redis.instrumentation.Instrumentation` as `instrumentation` to
+        have it called before and after every command and pipeline.
+        With a `drain_timeout`, connections whose read timed out drain the
+        replies left unread, for up to `drain_timeout` seconds, and go on
+        using their socket instead of reconnecting.
         """
         if not connection_pool:
             if charset is not None:
@@ -977,6 +1279,11 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
                 "health_check_interval": health_check_interval,
                 "client_name": client_name,
                 "redis_connect_func": redis_connect_func,
+                "protocol": protocol,
+                "client_cache": client_cache,
+                "recorder": recorder,
+                "instrumentation": instrumentation,
+                "drain_timeout": drain_timeout,
             }
             # based on input, setup appropriate connection args
             if unix_socket_path is not None:
@@ -1018,11 +1325,16 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
                     )
             connection_pool = ConnectionPool(**kwargs)
         self.connection_pool = connection_pool
+        self.client_cache = connection_pool.connection_kwargs.get("client_cache")
+        if self.client_cache is not None:
+            self.client_cache.attach(connection_pool)
+        self.instrumentation = connection_pool.connection_kwargs.get("instrumentation")
         self.connection = None
         if single_connection_client:
             self.connection = self.connection_pool.get_connection("_")
 
-        self.response_callbacks = CaseInsensitiveDict(self.__class__.RESPONSE_CALLBACKS)
+        self.response_callbacks = self.response_callback_table()
+        self.response_decoding = CaseInsensitiveDict({})
 
     def __repr__(self):
         return f"{type(self).__name__}<{repr(self.connection_pool)}>"
@@ -1039,6 +1351,53 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
         """Set a custom Response Callback"""
         self.response_callbacks[command] = callback
 
+    def set_response_shape(self, command, shape):
+        """
+        Set the shape of the replies to ``command``, a command returning
+        fields and values such as HGETALL or CONFIG GET: ``"list"`` returns
+        a flat list of fields and values, ``"pairs"`` a list of (field,
+        value) tuples, ``"dict"`` a dict and ``"raw"`` the reply as read,
+        without running any callback. ``None`` restores the default
+        response callback of the command.
+        """
+        if shape is None:
+            callback = self.response_callback_table().get(command)
+            if callback is not None:
+                self.response_callbacks[command] = callback
+            elif command in self.response_callbacks:
+                del self.response_callbacks[command]
+            return
+        if shape not in RESPONSE_SHAPES:
+            raise DataError(
+                f"Response shape must be one of {', '.join(RESPONSE_SHAPES)}"
+            )
+        callback = RESPONSE_SHAPES[shape]
+        if callback is None:
+            if command in self.response_callbacks:
+                del self.response_callbacks[command]
+        else:
+            self.response_callbacks[command] = callback
+
+    def set_response_decoding(self, command, decode):
+        """
+        Set how the replies to ``command`` are decoded, whatever the
+        ``decode_responses`` setting of the client: ``True`` decodes them
+        entirely, ``False`` leaves them as bytes and ``"fields"`` only
+        decodes the field names (and stream entry ids) of commands returning
+        fields and values, such as HGETALL or XRANGE, leaving the values as
+        bytes. ``None`` restores the default.
+
+        Response callbacks run on the decoded replies. Commands sent in
+        transactions or served by the client side cache are always decoded
+        according to ``decode_responses``.
+        """
+        if decode is None:
+            if command in self.response_decoding:
+                del self.response_decoding[command]
+            return
+        validate_response_decoding(command, decode)
+        self.response_decoding[command] = decode
+
     def load_external_module(self, funcname, func):
         """
         This function can be used to add externally defined redis modules,
@@ -1062,17 +1421,23 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
         """
         setattr(self, funcname, func)
 
-    def pipeline(self, transaction=True, shard_hint=None):
+    def pipeline(self, transaction=True, shard_hint=None, raw=False):
         """
         Return a new pipeline object that can queue multiple commands for
         later execution. ``transaction`` indicates whether all commands
         should be executed atomically. Apart from making a group of operations
         atomic, pipelines are useful for reducing the back-and-forth overhead
         between the client and server.
+
+        With ``raw`` set, the replies of the pipeline are returned as read,
+        undecoded and without running their response callbacks.
         """
-        return Pipeline(
+        pipe = Pipeline(
             self.connection_pool, self.response_callbacks, transaction, shard_hint
         )
+        pipe.response_decoding.update(self.response_decoding)
+        pipe.raw = raw
+        return pipe
 
     def transaction(self, func, *watches, **kwargs):
         """
@@ -1220,7 +1585,7 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
         if retry_on_error is not set or the error
         is not one of the specified error types
         """
-        conn.disconnect()
+        conn.disconnect(error)
         if (
             conn.retry_on_error is None
             or isinstance(error, tuple(conn.retry_on_error)) is False
@@ -1229,12 +1594,35 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
 
     # COMMAND EXECUTION AND PROTOCOL PARSING
     def execute_command(self, *args, **options):
-        """Execute a command and return a parsed response"""
+        """
+        Execute a command and return a parsed response. With ``raw=True``,
+        the reply is returned as read, undecoded and without running its
+        response callback.
+
+        Commands without options sent on connections that don't retry on
+        errors (no ``retry_on_error`` nor ``retry_on_timeout``) take a fast
+        path, sending the command and parsing its response directly instead
+        of through ``Retry.call_with_retry()``. Errors are handled the same
+        way: the connection is disconnected and the error raised. Clients
+        with an ``instrumentation`` always go through ``call_with_retry()``,
+        so the timings they record include its overhead.
+        """
+        if self.instrumentation is not None:
+            return self._execute_instrumented_command(*args, **options)
+        if self._use_client_cache(args, options):
+            return self._execute_cached_command(*args, **options)
         pool = self.connection_pool
         command_name = args[0]
         conn = self.connection or pool.get_connection(command_name, **options)
 
         try:
+            if not options and not conn.retry_on_error:
+                try:
+                    conn.send_command(*args)
+                    return self.parse_response(conn, command_name)
+                except conn.retry.get_supported_errors() as error:
+                    # what call_with_retry() does when errors aren't retried
+                    self._disconnect_raise(conn, error)
             return conn.retry.call_with_retry(
                 lambda: self._send_command_parse_response(
                     conn, command_name, *args, **options
@@ -1245,19 +1633,123 @@ class Redis(AbstractRedis, RedisModuleCommands, CoreCommands, SentinelCommands):
             if not self.connection:
                 pool.release(conn)
 
+    def _execute_instrumented_command(self, *args, **options):
+        """
+        Execute a command like execute_command(), calling the client's
+        instrumentation before and after it and timing its phases
+        """
+        instrumentation = self.instrumentation
+        event = CommandEvent(args[0])
+        instrumentation.before_command(event)
+        try:
+            if self._use_client_cache(args, options):
+                response = self._execute_cached_command(*args, **options)
+            else:
+                pool = self.connection_pool
+                command_name = args[0]
+                conn = self.connection or pool.get_connection(command_name, **options)
+                event.connection_acquired(conn)
+                try:
+                    response = conn.retry.call_with_retry(
+                        lambda: self._send_command_parse_response(
+                            conn, command_name, *args, **options
+                        ),
+                        lambda error: self._disconnect_raise(conn, error),
+                    )
+                finally:
+                    event.connection_released(conn)
+                    if not self.connection:
+                        pool.release(conn)
+        except BaseException as error:
+            event.finish(error)
+            instrumentation.after_command(event)
+            raise
+        event.finish()
+        instrumentation.after_command(event)
+        return response
+
+    def _use_client_cache(self, args, options):
+        "Whether the command can be served from the client side cache"
+        return (
+            self.client_cache is not None
+            and STREAM_INTO not in options
+            and not options.get(RAW_RESPONSE)
+            and self.client_cache.is_cacheable(args)
+        )
+
+    def _execute_cached_command(self, *args, **options):
+        """
+        Execute a read-only command through the client side cache. MGET is
+        looked up key by key and only the missing keys are fetched.
+        """
+        cache = self.client_cache
+        command_name = args[0]
+        per_key = command_name.upper() == "MGET" and len(args) > 1
+        if per_key:
+            commands = [("GET", key) for key in args[1:]]
+        else:
+            commands = [args]
+        responses = [cache.get(command, _CACHE_MISS) for command in commands]
+        missing = [i for i, r in enumerate(responses) if r is _CACHE_MISS]
+        if missing:
+            if per_key:
+                fetch = ("MGET", *(commands[i][1] for i in missing))
+            else:
+                fetch = args
+            pool = self.connection_pool
+            conn = self.connection or pool.get_connection(command_name, **options)
+            try:
+                fetched = conn.retry.call_with_retry(
+                    lambda: self._send_command_read_response(conn, *fetch),
+                    lambda error: self._disconnect_raise(conn, error),
+                )
+                if not per_key:
+                    fetched = [fetched]
+                for i, response in zip(missing, fetched):
+                    cache.set(commands[i], response, conn)
+                    responses[i] = response
+            finally:
+                if not self.connection:
+                    pool.release(conn)
+        response = responses if per_key else responses[0]
+        callback = self.response_callbacks.get(command_name)
+        if callback is not None:
+            return callback(response, **options)
+        return response
+
+    def _send_command_read_response(self, conn, *args):
+        """
+        Send a command and return its unparsed response
+        """
+        conn.send_command(*args)
+        return conn.read_response()
+
     def parse_response(self, connection, command_name, **options):
         """Parses a response from the Redis server"""
         try:
+            if STREAM_INTO in options:
+                sink = options[STREAM_INTO]
+                return sink.finish(connection.read_response(sink=sink))
+            if options.get(RAW_RESPONSE):
+                return connection.read_response(disable_decoding=True)
             if NEVER_DECODE in options:
                 response = connection.read_response(disable_decoding=True)
+            elif self.response_decoding and command_name in self.response_decoding:
+                response = decode_response(
+                    connection.read_response(disable_decoding=True),
+                    connection.encoder,
+                    command_name,
+                    self.response_decoding[command_name],
+                )
             else:
                 response = connection.read_response()
         except ResponseError:
             if EMPTY_RESPONSE in options:
                 return options[EMPTY_RESPONSE]
             raise
-        if command_name in self.response_callbacks:
-            return self.response_callbacks[command_name](response, **options)
+        callback = self.response_callbacks.get(command_name)
+        if callback is not None:
+            return callback(response, **options)
         return response
 
 
@@ -1789,10 +2281,17 @@ class Pipeline(Redis):
 
     UNWATCH_COMMANDS = {"DISCARD", "EXEC", "UNWATCH"}
 
+    # set by Redis.pipeline(raw=True) to return the replies as read
+    raw = False
+
     def __init__(self, connection_pool, response_callbacks, transaction, shard_hint):
         self.connection_pool = connection_pool
         self.connection = None
         self.response_callbacks = response_callbacks
+        # filled by Redis.pipeline() with the decoding set for the commands
+        # of the client
+        self.response_decoding = CaseInsensitiveDict({})
+        self.instrumentation = connection_pool.connection_kwargs.get("instrumentation")
         self.transaction = transaction
         self.shard_hint = shard_hint
 
@@ -1945,9 +2444,14 @@ class Pipeline(Redis):
                     self.annotate_exception(e, i + 1, command[0])
                     errors.append((i, e))
 
-        # parse the EXEC.
+        # parse the EXEC. the replies of the commands streaming them into a
+        # sink are written to it as they are, so read them without decoding
+        streamed = any(STREAM_INTO in options for _, options in commands)
         try:
-            response = self.parse_response(connection, "_")
+            if streamed:
+                response = self.parse_response(connection, "_", **{NEVER_DECODE: []})
+            else:
+                response = self.parse_response(connection, "_")
         except ExecAbortError:
             if errors:
                 raise errors[0][1]
@@ -1973,14 +2477,23 @@ class Pipeline(Redis):
         if raise_on_error:
             self.raise_first_error(commands, response)
 
+        if streamed:
+            encoder = connection.encoder
+            decode = encoder.decode_responses and not self.raw
+            response = stream_transaction_replies(response, commands, encoder, decode)
+
+        if self.raw:
+            return response
+
         # We have to run response callbacks manually
         data = []
+        get_callback = self.response_callbacks.get
         for r, cmd in zip(response, commands):
-            if not isinstance(r, Exception):
-                args, options = cmd
-                command_name = args[0]
-                if command_name in self.response_callbacks:
-                    r = self.response_callbacks[command_name](r, **options)
+            args, options = cmd
+            if not isinstance(r, Exception) and STREAM_INTO not in options:
+                callback = get_callback(args[0])
+                if callback is not None:
+                    r = callback(r, **options)
             data.append(r)
         return data
 
@@ -2015,6 +2528,8 @@ class Pipeline(Redis):
         exception.args = (msg,) + exception.args[1:]
 
     def parse_response(self, connection, command_name, **options):
+        if self.raw:
+            options.setdefault(RAW_RESPONSE, True)
         result = Redis.parse_response(self, connection, command_name, **options)
         if command_name in self.UNWATCH_COMMANDS:
             self.watching = False
@@ -2029,11 +2544,11 @@ class Pipeline(Redis):
         shas = [s.sha for s in scripts]
         # we can't use the normal script_* methods because they would just
         # get buffered in the pipeline.
-        exists = immediate("SCRIPT EXISTS", *shas)
+        exists = immediate("SCRIPT EXISTS", *shas, **{RAW_RESPONSE: False})
         if not all(exists):
             for s, exist in zip(scripts, exists):
                 if not exist:
-                    s.sha = immediate("SCRIPT LOAD", s.script)
+                    s.sha = immediate("SCRIPT LOAD", s.script, **{RAW_RESPONSE: False})
 
     def _disconnect_raise_reset(self, conn, error):
         """
@@ -2041,7 +2556,7 @@ class Pipeline(Redis):
         and raise an exception if retry_on_timeout is not set,
         or the error is not a TimeoutError
         """
-        conn.disconnect()
+        conn.disconnect(error)
         # if we were watching a variable, the watch is no longer valid
         # since this connection has died. raise a WatchError, which
         # indicates the user should retry this transaction.
@@ -2067,6 +2582,9 @@ class Pipeline(Redis):
         else:
             execute = self._execute_pipeline
 
+        if self.instrumentation is not None:
+            return self._execute_instrumented(execute, stack, raise_on_error)
+
         conn = self.connection
         if not conn:
             conn = self.connection_pool.get_connection("MULTI", self.shard_hint)
@@ -2082,6 +2600,37 @@ class Pipeline(Redis):
         finally:
             self.reset()
 
+    def _execute_instrumented(self, execute, stack, raise_on_error):
+        """
+        Execute the pipeline like execute(), calling the client's
+        instrumentation before and after it and timing its phases
+        """
+        instrumentation = self.instrumentation
+        name = "PIPELINE" if execute == self._execute_pipeline else "MULTI"
+        event = CommandEvent(name, commands=len(stack))
+        instrumentation.before_pipeline(event)
+        try:
+            conn = self.connection
+            if not conn:
+                conn = self.connection_pool.get_connection("MULTI", self.shard_hint)
+                self.connection = conn
+            event.connection_acquired(conn)
+            try:
+                response = conn.retry.call_with_retry(
+                    lambda: execute(conn, stack, raise_on_error),
+                    lambda error: self._disconnect_raise_reset(conn, error),
+                )
+            finally:
+                event.connection_released(conn)
+                self.reset()
+        except BaseException as error:
+            event.finish(error)
+            instrumentation.after_pipeline(event)
+            raise
+        event.finish()
+        instrumentation.after_pipeline(event)
+        return response
+
     def discard(self):
         """
         Flushes all previously queued commands
@@ -8,7 +8,14 @@ import time
 from collections import OrderedDict
 from typing import Any, Callable, Dict, Tuple
 
-from redis.client import CaseInsensitiveDict, PubSub, Redis, parse_scan
+from redis.client import (
+    _CACHE_MISS,
+    STREAM_INTO,
+    CaseInsensitiveDict,
+    PubSub,
+    Redis,
+    parse_scan,
+)
 from redis.commands import READ_COMMANDS, CommandsParser, RedisClusterCommands
 from redis.connection import ConnectionPool, DefaultParser, Encoder, parse_url
 from redis.crc import REDIS_CLUSTER_HASH_SLOTS, key_slot
@@ -30,6 +37,7 @@ from redis.exceptions import (
     TimeoutError,
     TryAgainError,
 )
+from redis.instrumentation import CommandEvent
 from redis.lock import Lock
 from redis.utils import (
     dict_merge,
@@ -122,20 +130,25 @@ SLOT_ID = "slot-id"
 
 REDIS_ALLOWED_KEYS = (
     "charset",
+    "client_cache",
     "connection_class",
     "connection_pool",
     "client_name",
     "db",
     "decode_responses",
+    "drain_timeout",
     "encoding",
     "encoding_errors",
     "errors",
     "host",
+    "instrumentation",
     "max_connections",
     "nodes_flag",
     "redis_connect_func",
     "password",
     "port",
+    "protocol",
+    "recorder",
     "retry",
     "retry_on_timeout",
     "socket_connect_timeout",
@@ -544,6 +557,7 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
         self.user_on_connect_func = kwargs.pop("redis_connect_func", None)
         kwargs.update({"redis_connect_func": self.on_connect})
         kwargs = cleanup_kwargs(**kwargs)
+        self.instrumentation = kwargs.get("instrumentation")
 
         self.encoder = Encoder(
             kwargs.get("encoding", "utf-8"),
@@ -633,6 +647,17 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
     def get_nodes(self):
         return list(self.nodes_manager.nodes_cache.values())
 
+    def pool_stats(self):
+        """
+        Return the snapshots of the connection pools of the nodes connected
+        to so far, as returned by their ``stats()``, keyed by node name
+        """
+        return {
+            node.name: node.redis_connection.connection_pool.stats()
+            for node in self.get_nodes()
+            if node.redis_connection is not None
+        }
+
     def get_node_from_key(self, key, replica=False):
         """
         Get the node that holds the key's slot.
@@ -1003,6 +1028,10 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
             1 if target_nodes_specified else self.cluster_error_retry_attempts
         )
         exception = None
+        if self.instrumentation is None:
+            execute = self._execute_command
+        else:
+            execute = self._execute_instrumented_command
         for _ in range(0, retry_attempts):
             try:
                 res = {}
@@ -1016,7 +1045,7 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
                             f"No targets were found to execute {args} command on"
                         )
                 for node in target_nodes:
-                    res[node.name] = self._execute_command(node, *args, **kwargs)
+                    res[node.name] = execute(node, *args, **kwargs)
                 # Return the processed result
                 return self._process_result(args[0], res, **kwargs)
             except BaseException as e:
@@ -1032,6 +1061,24 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
         # to caller of this method
         raise exception
 
+    def _execute_instrumented_command(self, target_node, *args, **kwargs):
+        """
+        Send a command to a node in the cluster like _execute_command(),
+        calling the instrumentation before and after it
+        """
+        instrumentation = self.instrumentation
+        event = CommandEvent(args[0], node=target_node.name)
+        instrumentation.before_command(event)
+        try:
+            response = self._execute_command(target_node, *args, **kwargs)
+        except BaseException as error:
+            event.finish(error)
+            instrumentation.after_command(event)
+            raise
+        event.finish()
+        instrumentation.after_command(event)
+        return response
+
     def _execute_command(self, target_node, *args, **kwargs):
         """
         Send a command to a node in the cluster
@@ -1064,14 +1111,35 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
                     f"{target_node.server_type} {target_node.name}"
                 )
                 redis_node = self.get_redis_connection(target_node)
-                connection = get_connection(redis_node, *args, **kwargs)
-                if asking:
-                    connection.send_command("ASKING")
-                    redis_node.parse_response(connection, "ASKING", **kwargs)
-                    asking = False
-
-                connection.send_command(*args)
-                response = redis_node.parse_response(connection, command, **kwargs)
+                cache = redis_node.client_cache
+                if cache is not None and (
+                    asking or STREAM_INTO in kwargs or not cache.is_cacheable(args)
+                ):
+                    cache = None
+                response = _CACHE_MISS
+                if cache is not None:
+                    connection = None
+                    response = cache.get(args, _CACHE_MISS)
+                if response is _CACHE_MISS:
+                    connection = get_connection(redis_node, *args, **kwargs)
+                    if asking:
+                        connection.send_command("ASKING")
+                        redis_node.parse_response(connection, "ASKING", **kwargs)
+                        asking = False
+
+                    connection.send_command(*args)
+                    if cache is None:
+                        response = redis_node.parse_response(
+                            connection, command, **kwargs
+                        )
+                    else:
+                        response = connection.read_response()
+                        cache.set(args, response, connection)
+                if cache is not None and command in redis_node.response_callbacks:
+                    # cached replies are stored unparsed
+                    response = redis_node.response_callbacks[command](
+                        response, **kwargs
+                    )
                 if command in self.cluster_response_callbacks:
                     response = self.cluster_response_callbacks[command](
                         response, **kwargs
@@ -1087,7 +1155,7 @@ class RedisCluster(AbstractRedisCluster, RedisClusterCommands):
                 # connection from the pool before timing out, so check that
                 # this is an actual connection before attempting to disconnect.
                 if connection is not None:
-                    connection.disconnect()
+                    connection.disconnect(e)
                 connection_error_retry_counter += 1
 
                 # Give the node 0.25 seconds to get back up and retry again
@@ -1402,6 +1470,10 @@ class NodesManager:
                 )
 
     def create_redis_node(self, host, port, **kwargs):
+        if kwargs.get("client_cache") is not None:
+            # every node invalidates its own keys, so each one gets its own
+            # cache and invalidation connection
+            kwargs["client_cache"] = kwargs["client_cache"].copy()
         if self.from_url:
             # Create a redis node with a costumed connection pool
             kwargs.update({"host": host})
@@ -1446,7 +1518,10 @@ class NodesManager:
                     r = startup_node.redis_connection
                 else:
                     # Create a new Redis connection and let Redis decode the
-                    # responses so we won't need to handle that
+                    # responses so we won't need to handle that. Objects meant
+                    # to be shared by every connection of the cluster, like
+                    # instrumentations and traffic recorders, return
+                    # themselves from __deepcopy__ to survive this copy
                     copy_kwargs = copy.deepcopy(kwargs)
                     copy_kwargs.update({"decode_responses": True, "encoding": "utf-8"})
                     r = self.create_redis_node(
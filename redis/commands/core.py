@@ -1603,6 +1603,37 @@ class BasicKeyCommands(CommandsProtocol):
         options[NEVER_DECODE] = []
         return self.execute_command("DUMP", name, **options)
 
+    def dump_into(self, name: KeyT, buffer: Any) -> ResponseT:
+        """
+        Like ``dump``, but read the serialized value into ``buffer``, a
+        writable bytes-like object, rather than returning it. Returns the
+        length of the serialized value, or None if the key doesn't exist.
+        Raises DataError if the value is larger than ``buffer``.
+
+        For more information see https://redis.io/commands/dump
+        """
+        from redis.client import STREAM_INTO
+        from redis.connection import BufferSink
+
+        return self.execute_command("DUMP", name, **{STREAM_INTO: BufferSink(buffer)})
+
+    def stream_dump(
+        self, name: KeyT, fileobj: Any, chunk_size: int = 65536
+    ) -> ResponseT:
+        """
+        Like ``dump``, but write the serialized value to ``fileobj``, a
+        binary file-like object, in chunks of at most ``chunk_size`` bytes.
+        Returns the length of the serialized value, or None if the key
+        doesn't exist.
+
+        For more information see https://redis.io/commands/dump
+        """
+        from redis.client import STREAM_INTO
+        from redis.connection import FileSink
+
+        sink = FileSink(fileobj, chunk_size)
+        return self.execute_command("DUMP", name, **{STREAM_INTO: sink})
+
     def exists(self, *names: KeyT) -> ResponseT:
         """
         Returns the number of ``names`` that exist
@@ -1704,6 +1735,38 @@ class BasicKeyCommands(CommandsProtocol):
         """
         return self.execute_command("GET", name)
 
+    def get_into(self, name: KeyT, buffer: Any) -> ResponseT:
+        """
+        Read the value at key ``name`` into ``buffer``, a writable
+        bytes-like object such as a bytearray, a memoryview or a numpy array,
+        without building an intermediate bytes object. Returns the length of
+        the value, or None if the key doesn't exist. Raises DataError if the
+        value is larger than ``buffer``.
+
+        For more information see https://redis.io/commands/get
+        """
+        from redis.client import STREAM_INTO
+        from redis.connection import BufferSink
+
+        return self.execute_command("GET", name, **{STREAM_INTO: BufferSink(buffer)})
+
+    def stream_get(
+        self, name: KeyT, fileobj: Any, chunk_size: int = 65536
+    ) -> ResponseT:
+        """
+        Write the value at key ``name`` to ``fileobj``, a binary file-like
+        object, in chunks of at most ``chunk_size`` bytes, so that large
+        values never have to fit in memory. Returns the length of the value,
+        or None if the key doesn't exist.
+
+        For more information see https://redis.io/commands/get
+        """
+        from redis.client import STREAM_INTO
+        from redis.connection import FileSink
+
+        sink = FileSink(fileobj, chunk_size)
+        return self.execute_command("GET", name, **{STREAM_INTO: sink})
+
     def getdel(self, name: KeyT) -> ResponseT:
         """
         Get the value at key ``name`` and delete the key. This command
@@ -1809,6 +1872,36 @@ class BasicKeyCommands(CommandsProtocol):
         """
         return self.execute_command("GETRANGE", key, start, end)
 
+    def getrange_into(self, key: KeyT, start: int, end: int, buffer: Any) -> ResponseT:
+        """
+        Like ``getrange``, but read the substring into ``buffer``, a writable
+        bytes-like object, rather than returning it. Returns the length of
+        the substring. Raises DataError if it is larger than ``buffer``.
+
+        For more information see https://redis.io/commands/getrange
+        """
+        from redis.client import STREAM_INTO
+        from redis.connection import BufferSink
+
+        sink = BufferSink(buffer)
+        return self.execute_command("GETRANGE", key, start, end, **{STREAM_INTO: sink})
+
+    def stream_getrange(
+        self, key: KeyT, start: int, end: int, fileobj: Any, chunk_size: int = 65536
+    ) -> ResponseT:
+        """
+        Like ``getrange``, but write the substring to ``fileobj``, a binary
+        file-like object, in chunks of at most ``chunk_size`` bytes. Returns
+        the length of the substring.
+
+        For more information see https://redis.io/commands/getrange
+        """
+        from redis.client import STREAM_INTO
+        from redis.connection import FileSink
+
+        sink = FileSink(fileobj, chunk_size)
+        return self.execute_command("GETRANGE", key, start, end, **{STREAM_INTO: sink})
+
     def getset(self, name: KeyT, value: EncodableT) -> ResponseT:
         """
         Sets the value at key ``name`` to ``value``
@@ -5,14 +5,17 @@ import os
 import socket
 import threading
 import weakref
+from collections import deque
+from contextlib import contextmanager
 from itertools import chain
 from queue import Empty, Full, LifoQueue
-from time import time
+from time import monotonic, time
 from urllib.parse import parse_qs, unquote, urlparse
 
 from packaging.version import Version
 
 from redis.backoff import NoBackoff
+from redis.capture import SEND, CapturingSocket
 from redis.exceptions import (
     AuthenticationError,
     AuthenticationWrongNumberOfArgsError,
@@ -30,6 +33,12 @@ from redis.exceptions import (
     ResponseError,
     TimeoutError,
 )
+from redis.instrumentation import (
+    ConnectionMeter,
+    MeteredSocket,
+    PoolStats,
+    perf_counter_ns,
+)
 from redis.retry import Retry
 from redis.utils import CRYPTOGRAPHY_AVAILABLE, HIREDIS_AVAILABLE, str_if_bytes
 
@@ -58,6 +67,7 @@ if HIREDIS_AVAILABLE:
     HIREDIS_SUPPORTS_CALLABLE_ERRORS = hiredis_version >= Version("0.1.3")
     HIREDIS_SUPPORTS_BYTE_BUFFER = hiredis_version >= Version("0.1.4")
     HIREDIS_SUPPORTS_ENCODING_ERRORS = hiredis_version >= Version("1.0.0")
+    HIREDIS_SUPPORTS_RESP3 = hiredis_version >= Version("3.0.0")
 
     HIREDIS_USE_BYTE_BUFFER = True
     # only use byte buffer if hiredis supports it
@@ -69,8 +79,101 @@ SYM_DOLLAR = b"$"
 SYM_CRLF = b"\r\n"
 SYM_EMPTY = b""
 
+# encodings of the integers most often sent as arguments, such as indexes,
+# counts and timeouts, and of the bulk string headers of short arguments
+SMALL_INT_ENCODINGS = {i: str(i).encode() for i in range(-1, 1024)}
+BULK_STRING_HEADERS = tuple(b"$%d\r\n" % i for i in range(1024))
+
+# packed headers of the commands sent so far, by command name and number of
+# arguments, each holding the argument count and the words of the name
+COMMAND_HEADERS = {}
+COMMAND_HEADERS_MAX_SIZE = 4096
+
+# the most buffers a single sendmsg() call accepts
+try:
+    IOV_MAX = max(os.sysconf("SC_IOV_MAX"), 16)
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 16
+
+# RESP2 and RESP3 aggregate reply types
+RESP_ARRAY = b"*"
+RESP_MAP = b"%"
+RESP_SET = b"~"
+RESP_PUSH = b">"
+RESP_ATTRIBUTE = b"|"
+RESP_AGGREGATE_TYPES = (RESP_ARRAY, RESP_MAP, RESP_SET, RESP_PUSH, RESP_ATTRIBUTE)
+
 SERVER_CLOSED_CONNECTION_ERROR = "Connection closed by server."
 
+# commands that block the connection they are sent on or change its state,
+# so they can't share a connection with other callers' commands
+DEDICATED_CONNECTION_COMMANDS = frozenset(
+    (
+        "AUTH",
+        "BLMOVE",
+        "BLMPOP",
+        "BLPOP",
+        "BRPOP",
+        "BRPOPLPUSH",
+        "BZMPOP",
+        "BZPOPMAX",
+        "BZPOPMIN",
+        "CLIENT NO-EVICT",
+        "CLIENT REPLY",
+        "CLIENT SETNAME",
+        "CLIENT TRACKING",
+        "DISCARD",
+        "EXEC",
+        "HELLO",
+        "MONITOR",
+        "MULTI",
+        "PSUBSCRIBE",
+        "QUIT",
+        "READONLY",
+        "READWRITE",
+        "RESET",
+        "SELECT",
+        "SSUBSCRIBE",
+        "SUBSCRIBE",
+        "UNWATCH",
+        "WAIT",
+        "WATCH",
+        "XREAD",
+        "XREADGROUP",
+    )
+)
+
+# commands which the server may still answer after the client gave up
+# waiting, having popped or acknowledged something in the meantime: the
+# replies left unread when reading theirs times out are never drained, as
+# that would discard them. XREAD and XREADGROUP only block with BLOCK.
+BLOCKING_COMMANDS = frozenset(
+    (
+        "BLMOVE",
+        "BLMPOP",
+        "BLPOP",
+        "BRPOP",
+        "BRPOPLPUSH",
+        "BZMPOP",
+        "BZPOPMAX",
+        "BZPOPMIN",
+        "WAIT",
+        "WAITAOF",
+        "XREAD",
+        "XREADGROUP",
+    )
+)
+
+# the only push messages that arrive on a connection that isn't subscribed
+# to any channel. hiredis hands pushes out as plain lists, so they are
+# recognized by their kind.
+OUT_OF_BAND_PUSH_KINDS = (
+    b"invalidate",
+    "invalidate",
+    b"tracking-redir-broken",
+    "tracking-redir-broken",
+)
+
 SENTINEL = object()
 MODULE_LOAD_ERROR = "Error loading the extension. " "Please check the server logs."
 NO_SUCH_MODULE_ERROR = "Error unloading module: no such module with that name"
@@ -82,6 +185,34 @@ MODULE_EXPORTS_DATA_TYPES_ERROR = (
 )
 
 
+def command_header(name, argc):
+    """
+    Return the packed header of a command named ``name`` that is sent with
+    ``argc`` arguments. A name of several words, e.g. 'CONFIG GET', is split
+    into separate arguments, as the server expects. Headers are cached.
+    """
+    try:
+        return COMMAND_HEADERS[name, argc]
+    except KeyError:
+        cacheable = True
+    except TypeError:
+        # unhashable names, e.g. bytearrays
+        cacheable = False
+    if isinstance(name, str):
+        words = name.encode().split()
+    elif b" " in name:
+        words = name.split()
+    else:
+        words = [name]
+    pieces = [b"*%d\r\n" % (len(words) + argc)]
+    for word in words:
+        pieces.extend((b"$%d\r\n" % len(word), word, SYM_CRLF))
+    header = SYM_EMPTY.join(pieces)
+    if cacheable and len(COMMAND_HEADERS) < COMMAND_HEADERS_MAX_SIZE:
+        COMMAND_HEADERS[name, argc] = header
+    return header
+
+
 class Encoder:
     "Encode strings to bytes-like and decode bytes-like to strings"
 
@@ -92,6 +223,15 @@ class Encoder:
 
     def encode(self, value):
         "Return a bytestring or bytes-like representation of the value"
+        # exact type checks first, for the most common arguments
+        value_type = type(value)
+        if value_type is bytes:
+            return value
+        if value_type is str:
+            return value.encode(self.encoding, self.encoding_errors)
+        if value_type is int:
+            encoded = SMALL_INT_ENCODINGS.get(value)
+            return encoded if encoded is not None else repr(value).encode()
         if isinstance(value, (bytes, memoryview)):
             return value
         elif isinstance(value, bool):
@@ -150,6 +290,16 @@ class BaseParser:
         "NOPERM": NoPermissionError,
     }
 
+    # called with RESP3 push messages (e.g. client tracking invalidations)
+    # that arrive in between replies. when unset, push messages are
+    # returned by read_response() like any other reply, which is what the
+    # PubSub connections expect.
+    push_handler_func = None
+
+    def set_push_handler(self, push_handler_func):
+        "Route out-of-band RESP3 push messages to ``push_handler_func``"
+        self.push_handler_func = push_handler_func
+
     def parse_error(self, response):
         "Parse an error response"
         error_code = response.split(" ")[0]
@@ -161,6 +311,137 @@ class BaseParser:
             return exception_class(response)
         return ResponseError(response)
 
+    def read_response_into(self, sink):
+        """
+        Read a reply, handing it to ``sink`` (a `BufferSink` or `FileSink`)
+        if it is a bulk string, in which case its length is returned. This
+        implementation receives the whole bulk string first.
+        """
+        response = self.read_response(disable_decoding=True)
+        if isinstance(response, bytes):
+            sink.begin(len(response))
+            sink.write(response)
+            return len(response)
+        return response
+
+
+class BufferSink:
+    """
+    Receives a bulk string reply into ``buffer``, a writable bytes-like
+    object such as a bytearray, a memoryview, an mmap or a numpy array.
+    With the `PythonParser` the data goes from the socket straight into the
+    buffer. A value larger than the buffer is still read from the
+    connection, but raises a DataError.
+    """
+
+    def __init__(self, buffer):
+        with memoryview(buffer) as view:
+            if view.readonly:
+                raise DataError("The buffer to read the value into is read-only")
+            self.capacity = view.nbytes
+        self.buffer = buffer
+        self.received = 0
+        self._view = None
+        self._overflow = False
+
+    def begin(self, length):
+        "Prepare to receive a bulk string of ``length`` bytes"
+        self.received = 0
+        self._overflow = length > self.capacity
+        if self._overflow:
+            # somewhere to discard the value into
+            self._view = memoryview(bytearray(min(length, 65536)))
+        else:
+            self._view = memoryview(self.buffer).cast("B")
+
+    def chunk(self, size):
+        "Return a writable view of at most ``size`` bytes to receive into"
+        if self._overflow:
+            return self._view[:size]
+        return self._view[self.received : self.received + size]
+
+    def commit(self, size):
+        "Record that ``size`` bytes were received into the last chunk"
+        self.received += size
+
+    def write(self, data):
+        "Copy ``data``, the next bytes of the bulk string, into the buffer"
+        size = len(data)
+        if not self._overflow:
+            self._view[self.received : self.received + size] = data
+        self.received += size
+
+    def finish(self, response):
+        """
+        Return the reply to the command, the length of the value or None if
+        there was none, or raise a DataError if the value didn't fit.
+        """
+        self._view = None
+        if self._overflow:
+            self._overflow = False
+            raise DataError(
+                f"The value is {response} bytes long, "
+                f"the buffer only holds {self.capacity}"
+            )
+        return response
+
+
+class FileSink:
+    """
+    Receives a bulk string reply into ``fileobj``, a binary file-like object
+    opened for writing, in chunks of at most ``chunk_size`` bytes, so that
+    the value never has to fit in memory.
+    """
+
+    def __init__(self, fileobj, chunk_size=65536):
+        if chunk_size <= 0:
+            raise DataError("chunk_size must be a positive integer")
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.received = 0
+        self._chunk = None
+
+    def begin(self, length):
+        "Prepare to receive a bulk string of ``length`` bytes"
+        self.received = 0
+        if self._chunk is None:
+            self._chunk = memoryview(bytearray(min(length, self.chunk_size)))
+
+    def chunk(self, size):
+        "Return a writable view of at most ``size`` bytes to receive into"
+        return self._chunk[:size]
+
+    def commit(self, size):
+        "Write the ``size`` bytes received into the last chunk to the file"
+        self.write(self._chunk[:size])
+
+    def write(self, data):
+        "Write ``data``, the next bytes of the bulk string, to the file"
+        self.fileobj.write(data)
+        self.received += len(data)
+
+    def finish(self, response):
+        "Return the reply to the command, the length of the value or None"
+        self._chunk = None
+        return response
+
+
+def _recv_into_sink(sock, sink, length):
+    "Receive the next ``length`` bytes of a bulk string from ``sock``"
+    try:
+        while length:
+            view = sink.chunk(length)
+            received = sock.recv_into(view, len(view))
+            # zero bytes indicates the server shutdown the socket
+            if not received:
+                raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+            sink.commit(received)
+            length -= received
+    except socket.timeout:
+        raise TimeoutError("Timeout reading from socket")
+    except NONBLOCKING_EXCEPTIONS as ex:
+        raise ConnectionError(f"Error while reading from socket: {ex.args}")
+
 
 class SocketBuffer:
     def __init__(self, socket, socket_read_size, socket_timeout):
@@ -240,6 +521,22 @@ class SocketBuffer:
 
         return data[:-2]
 
+    def read_into(self, length, sink):
+        "Read a bulk string of ``length`` bytes into ``sink``"
+        sink.begin(length)
+        # hand over what was already received, then receive the rest
+        # straight into the sink
+        buffered = min(self.length, length)
+        if buffered:
+            self._buffer.seek(self.bytes_read)
+            sink.write(self._buffer.read(buffered))
+            self.bytes_read += buffered
+        if length > buffered:
+            _recv_into_sink(self._sock, sink, length - buffered)
+        # the \r\n terminator
+        self.read(0)
+        return length
+
     def readline(self):
         buf = self._buffer
         buf.seek(self.bytes_read)
@@ -280,9 +577,162 @@ class SocketBuffer:
         self._sock = None
 
 
+class BytearraySocketBuffer:
+    """
+    A drop-in alternative to :class:`SocketBuffer` backed by one reusable
+    ``bytearray``.
+
+    Data is received with ``sock.recv_into`` directly into the free tail of
+    the buffer and replies are sliced out by offset, so a payload is copied
+    only once on its way from the kernel to the caller. Select it by setting
+    ``socket_buffer_class`` on a :class:`PythonParser` subclass.
+    """
+
+    def __init__(self, socket, socket_read_size, socket_timeout):
+        self._sock = socket
+        self.socket_read_size = socket_read_size
+        self.socket_timeout = socket_timeout
+        self._buffer = bytearray(socket_read_size)
+        # offset just past the last byte received from the socket
+        self.bytes_written = 0
+        # offset of the first byte not yet consumed by the parser
+        self.bytes_read = 0
+
+    @property
+    def length(self):
+        return self.bytes_written - self.bytes_read
+
+    def _reserve(self, size):
+        "Ensure there is room for ``size`` more bytes after ``bytes_written``"
+        buf = self._buffer
+        if len(buf) - self.bytes_written >= size:
+            return
+        # move the unconsumed bytes to the front of the buffer first, that
+        # alone usually frees enough space
+        if self.bytes_read:
+            length = self.length
+            buf[:length] = buf[self.bytes_read : self.bytes_written]
+            self.bytes_read = 0
+            self.bytes_written = length
+        missing = self.bytes_written + size - len(buf)
+        if missing > 0:
+            buf.extend(bytes(missing))
+
+    def _read_from_socket(self, length=None, timeout=SENTINEL, raise_on_timeout=True):
+        sock = self._sock
+        socket_read_size = self.socket_read_size
+        marker = 0
+        custom_timeout = timeout is not SENTINEL
+
+        try:
+            if custom_timeout:
+                sock.settimeout(timeout)
+            while True:
+                # when the size of the pending payload is known, make room
+                # for all of it so large values are received in place
+                size = socket_read_size
+                if length is not None and length - marker > size:
+                    size = length - marker
+                self._reserve(size)
+                with memoryview(self._buffer) as view:
+                    data_length = sock.recv_into(view[self.bytes_written :], size)
+                # zero bytes indicates the server shutdown the socket
+                if data_length == 0:
+                    raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+                self.bytes_written += data_length
+                marker += data_length
+
+                if length is not None and length > marker:
+                    continue
+                return True
+        except socket.timeout:
+            if raise_on_timeout:
+                raise TimeoutError("Timeout reading from socket")
+            return False
+        except NONBLOCKING_EXCEPTIONS as ex:
+            # if we're in nonblocking mode and the recv raises a
+            # blocking error, simply return False indicating that
+            # there's no data to be read. otherwise raise the
+            # original exception.
+            allowed = NONBLOCKING_EXCEPTION_ERROR_NUMBERS.get(ex.__class__, -1)
+            if not raise_on_timeout and ex.errno == allowed:
+                return False
+            raise ConnectionError(f"Error while reading from socket: {ex.args}")
+        finally:
+            if custom_timeout:
+                sock.settimeout(self.socket_timeout)
+
+    def can_read(self, timeout):
+        return bool(self.length) or self._read_from_socket(
+            timeout=timeout, raise_on_timeout=False
+        )
+
+    def _consume(self, start, end, skip):
+        "Copy ``[start:end]`` out of the buffer and advance past ``skip``"
+        with memoryview(self._buffer) as view:
+            data = view[start:end].tobytes()
+        self.bytes_read = skip
+        # rewind the buffer when we've consumed it all so it doesn't grow
+        if self.bytes_read == self.bytes_written:
+            self.purge()
+        return data
+
+    def read(self, length):
+        # make sure we've read enough data from the socket, including the
+        # \r\n terminator
+        if length + 2 > self.length:
+            self._read_from_socket(length + 2 - self.length)
+        start = self.bytes_read
+        return self._consume(start, start + length, start + length + 2)
+
+    def read_into(self, length, sink):
+        "Read a bulk string of ``length`` bytes into ``sink``"
+        sink.begin(length)
+        # hand over what was already received, then receive the rest
+        # straight into the sink
+        buffered = min(self.length, length)
+        if buffered:
+            with memoryview(self._buffer) as view:
+                sink.write(view[self.bytes_read : self.bytes_read + buffered])
+            self.bytes_read += buffered
+        if length > buffered:
+            _recv_into_sink(self._sock, sink, length - buffered)
+        # the \r\n terminator
+        self.read(0)
+        return length
+
+    def readline(self):
+        buf = self._buffer
+        index = buf.find(SYM_CRLF, self.bytes_read, self.bytes_written)
+        while index < 0:
+            # there's more data in the socket that we need. reading may
+            # compact the buffer, so remember how far we've already looked
+            # relative to the read offset. back up a byte in case the
+            # buffer ended between the \r and the \n.
+            scanned = max(self.length - 1, 0)
+            self._read_from_socket()
+            index = buf.find(SYM_CRLF, self.bytes_read + scanned, self.bytes_written)
+        return self._consume(self.bytes_read, index, index + 2)
+
+    def purge(self):
+        self.bytes_written = 0
+        self.bytes_read = 0
+        # give back the memory used by an oversized reply
+        if len(self._buffer) > self.socket_read_size:
+            del self._buffer[self.socket_read_size :]
+
+    def close(self):
+        self._buffer = None
+        self._sock = None
+
+
 class PythonParser(BaseParser):
     "Plain Python parsing class"
 
+    # the buffer class wrapping the socket. set this to
+    # BytearraySocketBuffer in a subclass to receive replies with recv_into
+    socket_buffer_class = SocketBuffer
+
     def __init__(self, socket_read_size):
         self.socket_read_size = socket_read_size
         self.encoder = None
@@ -298,7 +748,7 @@ class PythonParser(BaseParser):
     def on_connect(self, connection):
         "Called when the socket connects"
         self._sock = connection._sock
-        self._buffer = SocketBuffer(
+        self._buffer = self.socket_buffer_class(
             self._sock, self.socket_read_size, connection.socket_timeout
         )
         self.encoder = connection.encoder
@@ -314,53 +764,147 @@ class PythonParser(BaseParser):
     def can_read(self, timeout):
         return self._buffer and self._buffer.can_read(timeout)
 
-    def read_response(self, disable_decoding=False):
-        raw = self._buffer.readline()
-        if not raw:
-            raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+    def read_response(self, disable_decoding=False, sink=None):
+        """
+        Read a reply. When ``sink`` is given, a bulk string reply is handed
+        to it as it is received and its length is returned instead.
+        """
+        buffer = self._buffer
+        readline = buffer.readline
+        read = buffer.read
+        decode = None if disable_decoding else self.encoder.decode
+        # aggregate replies still being filled, innermost last, as
+        # (items, length, type) tuples. nested replies are parsed iteratively
+        # rather than with one recursive call per element.
+        stack = []
 
-        byte, response = raw[:1], raw[1:]
-
-        if byte not in (b"-", b"+", b":", b"$", b"*"):
-            raise InvalidResponse(f"Protocol Error: {raw!r}")
-
-        # server returned an error
-        if byte == b"-":
-            response = response.decode("utf-8", errors="replace")
-            error = self.parse_error(response)
-            # if the error is a ConnectionError, raise immediately so the user
-            # is notified
-            if isinstance(error, ConnectionError):
-                raise error
-            # otherwise, we're dealing with a ResponseError that might belong
-            # inside a pipeline response. the connection's read_response()
-            # and/or the pipeline's execute() will raise this error if
-            # necessary, so just return the exception instance here.
-            return error
-        # single value
-        elif byte == b"+":
-            pass
-        # int value
-        elif byte == b":":
-            response = int(response)
-        # bulk response
-        elif byte == b"$":
-            length = int(response)
-            if length == -1:
-                return None
-            response = self._buffer.read(length)
-        # multi-bulk response
-        elif byte == b"*":
-            length = int(response)
-            if length == -1:
-                return None
-            response = [
-                self.read_response(disable_decoding=disable_decoding)
-                for i in range(length)
-            ]
-        if isinstance(response, bytes) and disable_decoding is False:
-            response = self.encoder.decode(response)
-        return response
+        while True:
+            raw = readline()
+            if not raw:
+                raise ConnectionError(SERVER_CLOSED_CONNECTION_ERROR)
+
+            byte, response = raw[:1], raw[1:]
+
+            # bulk response
+            if byte == b"$":
+                length = int(response)
+                if length == -1:
+                    response = None
+                elif sink is not None and not stack:
+                    response = buffer.read_into(length, sink)
+                else:
+                    response = read(length)
+                    if decode is not None:
+                        response = decode(response)
+            # int value
+            elif byte == b":":
+                response = int(response)
+            # multi-bulk response, or a RESP3 map, set, push or attribute
+            elif byte in RESP_AGGREGATE_TYPES:
+                length = int(response)
+                if byte == RESP_MAP or byte == RESP_ATTRIBUTE:
+                    length *= 2
+                if length > 0:
+                    stack.append(([], length, byte))
+                    continue
+                if length == -1:
+                    response = None
+                else:
+                    response = _aggregate_response([], byte)
+                    if response is NotImplemented:
+                        # an empty attribute, the actual reply follows
+                        continue
+            # single value
+            elif byte == b"+":
+                if decode is not None:
+                    response = decode(response)
+            # server returned an error, or a RESP3 blob error
+            elif byte == b"-" or byte == b"!":
+                if byte == b"!":
+                    response = read(int(response))
+                response = response.decode("utf-8", errors="replace")
+                error = self.parse_error(response)
+                # if the error is a ConnectionError, raise immediately so the
+                # user is notified
+                if isinstance(error, ConnectionError):
+                    raise error
+                # otherwise, we're dealing with a ResponseError that might
+                # belong inside a pipeline response. the connection's
+                # read_response() and/or the pipeline's execute() will raise
+                # this error if necessary, so just return the exception
+                # instance here.
+                response = error
+            # RESP3 null
+            elif byte == b"_":
+                response = None
+            # RESP3 double
+            elif byte == b",":
+                response = float(response)
+            # RESP3 boolean
+            elif byte == b"#":
+                response = response == b"t"
+            # RESP3 big number
+            elif byte == b"(":
+                response = int(response)
+            # RESP3 verbatim string, strip the "txt:" style format prefix
+            elif byte == b"=":
+                response = read(int(response))[4:]
+                if decode is not None:
+                    response = decode(response)
+            else:
+                raise InvalidResponse(f"Protocol Error: {raw!r}")
+
+            # add the value to its enclosing aggregate replies, closing
+            # every reply that is now complete
+            while stack:
+                items, length, byte = stack[-1]
+                items.append(response)
+                if len(items) < length:
+                    break
+                stack.pop()
+                response = _aggregate_response(items, byte)
+                if response is NotImplemented:
+                    # attributes only annotate the reply that follows them
+                    break
+                if (
+                    byte == RESP_PUSH
+                    and not stack
+                    and self.push_handler_func is not None
+                ):
+                    self.push_handler_func(response)
+                    break
+            else:
+                return response
+
+    def read_response_into(self, sink):
+        return self.read_response(disable_decoding=True, sink=sink)
+
+
+def _aggregate_response(items, byte):
+    """
+    Build the Python value of a complete aggregate reply. Returns
+    ``NotImplemented`` for RESP3 attributes, which carry no reply of their own.
+    """
+    if byte == RESP_ARRAY or byte == RESP_PUSH:
+        return items
+    if byte == RESP_MAP:
+        it = iter(items)
+        try:
+            return dict(zip(it, it))
+        except TypeError:
+            # aggregate keys aren't hashable, use tuples for them instead
+            it = iter(items)
+            return {
+                tuple(key) if isinstance(key, list) else key: value
+                for key, value in zip(it, it)
+            }
+    if byte == RESP_SET:
+        try:
+            return set(items)
+        except TypeError:
+            # sets may hold unhashable aggregates, keep those as a list
+            return items
+    return NotImplemented
 
 
 class HiredisParser(BaseParser):
@@ -381,6 +925,8 @@ class HiredisParser(BaseParser):
             pass
 
     def on_connect(self, connection, **kwargs):
+        if getattr(connection, "protocol", 2) == 3 and not HIREDIS_SUPPORTS_RESP3:
+            raise RedisError("RESP3 requires hiredis 3.0.0 or newer")
         self._sock = connection._sock
         self._socket_timeout = connection.socket_timeout
         kwargs = {"protocolError": InvalidResponse, "replyError": self.parse_error}
@@ -411,6 +957,14 @@ class HiredisParser(BaseParser):
                 return self.read_from_socket(timeout=timeout, raise_on_timeout=False)
         return True
 
+    def _is_out_of_band_push(self, response):
+        return (
+            self.push_handler_func is not None
+            and isinstance(response, list)
+            and response
+            and response[0] in OUT_OF_BAND_PUSH_KINDS
+        )
+
     def read_from_socket(self, timeout=SENTINEL, raise_on_timeout=True):
         sock = self._sock
         custom_timeout = timeout is not SENTINEL
@@ -456,6 +1010,9 @@ class HiredisParser(BaseParser):
         if self._next_response is not False:
             response = self._next_response
             self._next_response = False
+            if self._is_out_of_band_push(response):
+                self.push_handler_func(response)
+                return self.read_response(disable_decoding=disable_decoding)
             return response
 
         if disable_decoding:
@@ -469,6 +1026,9 @@ class HiredisParser(BaseParser):
                 response = self._reader.gets(False)
             else:
                 response = self._reader.gets()
+        if self._is_out_of_band_push(response):
+            self.push_handler_func(response)
+            return self.read_response(disable_decoding=disable_decoding)
         # if an older version of hiredis is installed, we need to attempt
         # to convert ResponseErrors to their appropriate types.
         if not HIREDIS_SUPPORTS_CALLABLE_ERRORS:
@@ -503,6 +1063,10 @@ else:
 class Connection:
     "Manages TCP communication to and from a Redis server"
 
+    # whether packed commands made of several buffers are sent with a single
+    # sendmsg() call rather than one sendall() per buffer
+    _vectored_send = hasattr(socket.socket, "sendmsg")
+
     def __init__(
         self,
         host="localhost",
@@ -526,6 +1090,11 @@ class Connection:
         username=None,
         retry=None,
         redis_connect_func=None,
+        protocol=2,
+        client_cache=None,
+        recorder=None,
+        instrumentation=None,
+        drain_timeout=None,
     ):
         """
         Initialize a new Connection.
@@ -533,6 +1102,15 @@ class Connection:
         `retry_on_error` to a list of the error/s to retry on, then set
         `retry` to a valid `Retry` object.
         To retry on TimeoutError, `retry_on_timeout` can also be set to `True`.
+        Set `protocol` to 3 to switch the connection to RESP3 with HELLO.
+        `client_cache` is the `redis.cache.LocalCache` the connection tracks
+        its keys for. `recorder` is a `redis.capture.TrafficRecorder` logging
+        the traffic of the connection. With an `instrumentation`, the
+        connection measures the time spent in every phase of its commands and
+        counts the bytes it sends and receives. With a `drain_timeout`, a
+        connection whose read timed out doesn't reconnect: the replies left
+        unread are drained in the background, for up to `drain_timeout`
+        seconds, and the socket is used again once they are.
         """
         self.pid = os.getpid()
         self.host = host
@@ -566,6 +1144,28 @@ class Connection:
         self.health_check_interval = health_check_interval
         self.next_health_check = 0
         self.redis_connect_func = redis_connect_func
+        protocol = int(protocol)
+        if protocol not in (2, 3):
+            raise DataError("protocol must be either 2 or 3")
+        self.protocol = protocol
+        self.client_cache = client_cache
+        self.recorder = recorder
+        self._capture_id = None
+        self.meter = None if instrumentation is None else ConnectionMeter()
+        # the PoolStats of the pool the connection belongs to, if any, and
+        # why it was last disconnected
+        self.pool_stats = None
+        self._reconnect_cause = None
+        # when the connection connected, and was last returned to its pool
+        self.connected_at = None
+        self.released_at = None
+        self.drain_timeout = drain_timeout
+        # the socket set aside when a read timed out, to drain its replies
+        self._drain = None
+        # with a drain_timeout, the replies to read, and how many of them
+        # are to read up to that of the last blocking command sent
+        self._replies_pending = 0
+        self._blocking_pending = 0
         self.encoder = Encoder(encoding, encoding_errors, decode_responses)
         self._sock = None
         self._socket_read_size = socket_read_size
@@ -607,6 +1207,8 @@ class Connection:
         "Connects to the Redis server if not already connected"
         if self._sock:
             return
+        if self._drain is not None and self._reuse_drained():
+            return
         try:
             sock = self.retry.call_with_retry(
                 lambda: self._connect(), lambda error: self.disconnect(error)
@@ -616,7 +1218,17 @@ class Connection:
         except OSError as e:
             raise ConnectionError(self._error_message(e))
 
+        if self.recorder is not None:
+            self._capture_id = self.recorder.connection_opened(self)
+            sock = CapturingSocket(sock, self.recorder, self._capture_id)
+        if self.meter is not None:
+            sock = MeteredSocket(sock, self.meter)
         self._sock = sock
+        self.connected_at = monotonic()
+        self._replies_pending = self._blocking_pending = 0
+        if self.pool_stats is not None:
+            self.pool_stats.connection_opened(self._reconnect_cause)
+        self._reconnect_cause = None
         try:
             if self.redis_connect_func is None:
                 # Use the default on_connect function
@@ -625,7 +1237,10 @@ class Connection:
                 # Use the passed function redis_connect_func
                 self.redis_connect_func(self)
         except RedisError:
-            # clean up after any error in on_connect
+            # clean up after any error in on_connect. a socket which timed out
+            # before the connection was initialized is of no use drained
+            if self._drain is not None:
+                self._drain.error = None
             self.disconnect()
             raise
 
@@ -636,6 +1251,27 @@ class Connection:
             if callback:
                 callback(self)
 
+    def _reuse_drained(self):
+        """
+        Go on using the socket set aside when a read timed out once the
+        replies left unread are drained, waiting for them, or draining them
+        if nothing did yet. Return whether they were, the socket is closed
+        otherwise.
+        """
+        drain = self._drain
+        self._drain = None
+        self._sock = drain.sock
+        if not drain.wait():
+            if self.pool_stats is not None:
+                self.pool_stats.drain_failed()
+            self._disconnect_on_error()
+            return False
+        self._parser.on_connect(self)
+        self._replies_pending = self._blocking_pending = 0
+        if self.pool_stats is not None:
+            self.pool_stats.connection_drained()
+        return True
+
     def _connect(self):
         "Create a TCP socket connection"
         # we want to mimic what socket.create_connection does to support
@@ -699,8 +1335,25 @@ class Connection:
         "Initialize the connection, authenticate and select a database"
         self._parser.on_connect(self)
 
+        if self.protocol == 3:
+            # HELLO switches the protocol and, if needed, authenticates at
+            # the same time. it is only available on Redis 6.0 and newer.
+            hello_args = ["HELLO", 3]
+            if self.username or self.password:
+                hello_args.extend(
+                    ["AUTH", self.username or "default", self.password or ""]
+                )
+            # avoid checking health here -- PING will fail if we try
+            # to check the health prior to the AUTH
+            self.send_command(*hello_args, check_health=False)
+            response = self.read_response()
+            if not isinstance(response, dict) or (
+                response.get(b"proto", response.get("proto")) != 3
+            ):
+                raise ConnectionError("Invalid RESP3 handshake response")
+
         # if username and/or password are set, authenticate
-        if self.username or self.password:
+        elif self.username or self.password:
             if self.username:
                 auth_args = (self.username, self.password or "")
             else:
@@ -734,11 +1387,34 @@ class Connection:
             if str_if_bytes(self.read_response()) != "OK":
                 raise ConnectionError("Invalid Database")
 
+        # have the server tell the client side cache when the keys read
+        # through this connection change
+        if self.client_cache is not None:
+            self.client_cache.enable_tracking(self)
+
     def disconnect(self, *args):
-        "Disconnects from the Redis server"
+        """
+        Disconnects from the Redis server. Given the error a read timed out
+        with, the replies it left unread are drained in the background
+        instead, when the connection has a ``drain_timeout``, for connect()
+        to go on using the socket.
+        """
+        drain = self._drain
+        if drain is not None:
+            if not drain.started and args and args[0] is drain.error:
+                drain.start()
+                return
+            self._drain = None
+            self._sock = drain.sock
         self._parser.on_disconnect()
+        if self._capture_id is not None:
+            self.recorder.connection_closed(self._capture_id)
+            self._capture_id = None
         if self._sock is None:
             return
+        self.connected_at = None
+        if self.pool_stats is not None:
+            self.pool_stats.connection_closed()
 
         if os.getpid() == self.pid:
             try:
@@ -752,6 +1428,34 @@ class Connection:
             pass
         self._sock = None
 
+        if self.client_cache is not None:
+            self.client_cache.connection_lost(self)
+
+    def _disconnect_on_error(self):
+        "Disconnect after failing to send or read, as a cause of reconnecting"
+        self._reconnect_cause = "error"
+        self.disconnect()
+
+    def _read_interrupted(self, error):
+        """
+        Disconnect after a read timed out with ``error``. With a
+        ``drain_timeout``, the socket is set aside instead, to drain the
+        replies left unread once disconnect() is called with ``error``, or on
+        the next connect(). Connections tracking keys for a client side cache
+        always disconnect, the drain would discard invalidations, as do those
+        with the reply to a blocking command left unread.
+        """
+        if (
+            self.drain_timeout is None
+            or self.client_cache is not None
+            or self._blocking_pending
+        ):
+            self._disconnect_on_error()
+            return
+        self._parser.on_disconnect()
+        self._drain = _ReplyDrain(self._sock, error, self.drain_timeout)
+        self._sock = None
+
     def _send_ping(self):
         """Send PING, expect PONG in return"""
         self.send_command("PING", check_health=False)
@@ -760,6 +1464,7 @@ class Connection:
 
     def _ping_failed(self, error):
         """Function to call when PING fails"""
+        self._reconnect_cause = "health_check"
         self.disconnect()
 
     def check_health(self):
@@ -775,15 +1480,20 @@ class Connection:
         if check_health:
             self.check_health()
         try:
-            if isinstance(command, str):
+            if isinstance(command, (bytes, str)):
                 command = [command]
-            for item in command:
-                self._sock.sendall(item)
+            if self.recorder is not None:
+                self.recorder.record(SEND, self._capture_id, command)
+            if len(command) > 1 and self._vectored_send:
+                _sendmsg_all(self._sock, command)
+            else:
+                for item in command:
+                    self._sock.sendall(item)
         except socket.timeout:
-            self.disconnect()
+            self._disconnect_on_error()
             raise TimeoutError("Timeout writing to socket")
         except OSError as e:
-            self.disconnect()
+            self._disconnect_on_error()
             if len(e.args) == 1:
                 errno, errmsg = "UNKNOWN", e.args[0]
             else:
@@ -791,14 +1501,19 @@ class Connection:
                 errmsg = e.args[1]
             raise ConnectionError(f"Error {errno} while writing to socket. {errmsg}.")
         except BaseException:
-            self.disconnect()
+            self._disconnect_on_error()
             raise
 
     def send_command(self, *args, **kwargs):
         """Pack and send a command to the Redis server"""
-        self.send_packed_command(
-            self.pack_command(*args), check_health=kwargs.get("check_health", True)
-        )
+        meter = self.meter
+        if meter is None:
+            packed = self.pack_command(*args)
+        else:
+            start = perf_counter_ns()
+            packed = self.pack_command(*args)
+            meter.pack_ns += perf_counter_ns() - start
+        self.send_packed_command(packed, check_health=kwargs.get("check_health", True))
 
     def can_read(self, timeout=0):
         """Poll the socket to see if there's data that can be read."""
@@ -808,84 +1523,105 @@ class Connection:
         try:
             return self._parser.can_read(timeout)
         except OSError as e:
-            self.disconnect()
+            self._disconnect_on_error()
             raise ConnectionError(
                 f"Error while reading from {self.host}:{self.port}: {e.args}"
             )
 
-    def read_response(self, disable_decoding=False):
-        """Read the response from a previously sent command"""
+    def read_response(self, disable_decoding=False, sink=None):
+        """
+        Read the response from a previously sent command. A bulk string
+        response is streamed into ``sink``, a `BufferSink` or `FileSink`, if
+        one is given, and its length is returned instead.
+        """
         try:
             hosterr = f"{self.host}:{self.port}"
         except AttributeError:
             hosterr = "connection"
 
+        meter = self.meter
+        if meter is not None:
+            start = perf_counter_ns()
         try:
-            response = self._parser.read_response(disable_decoding=disable_decoding)
+            if sink is None:
+                response = self._parser.read_response(disable_decoding=disable_decoding)
+            else:
+                response = self._parser.read_response_into(sink)
         except socket.timeout:
-            self.disconnect()
-            raise TimeoutError(f"Timeout reading from {hosterr}")
+            error = TimeoutError(f"Timeout reading from {hosterr}")
+            self._read_interrupted(error)
+            raise error
         except OSError as e:
-            self.disconnect()
+            self._disconnect_on_error()
             raise ConnectionError(f"Error while reading from {hosterr}" f" : {e.args}")
+        except TimeoutError as error:
+            # raised by the parsers
+            self._read_interrupted(error)
+            raise
         except BaseException:
-            self.disconnect()
+            self._disconnect_on_error()
             raise
 
+        if meter is not None:
+            meter.read_ns += perf_counter_ns() - start
         if self.health_check_interval:
             self.next_health_check = time() + self.health_check_interval
+        if self.drain_timeout is not None:
+            self._reply_read()
 
         if isinstance(response, ResponseError):
             raise response
         return response
 
+    def _count_reply(self, name):
+        "Count the reply to the command ``name`` about to be sent"
+        self._replies_pending += 1
+        if isinstance(name, bytes):
+            name = name.decode("utf-8", "replace")
+        if isinstance(name, str) and name.upper() in BLOCKING_COMMANDS:
+            self._blocking_pending = self._replies_pending
+
+    def _reply_read(self):
+        # out of band messages, e.g. those of pubsub, aren't counted as sent
+        if self._replies_pending:
+            self._replies_pending -= 1
+        if self._blocking_pending:
+            self._blocking_pending -= 1
+
     def pack_command(self, *args):
         """Pack a series of arguments into the Redis protocol"""
+        if self.drain_timeout is not None:
+            self._count_reply(args[0])
         output = []
-        # the client might have included 1 or more literal arguments in
-        # the command name, e.g., 'CONFIG GET'. The Redis server expects these
-        # arguments to be sent separately, so split the first argument
-        # manually. These arguments should be bytestrings so that they are
-        # not encoded.
-        if isinstance(args[0], str):
-            args = tuple(args[0].encode().split()) + args[1:]
-        elif b" " in args[0]:
-            args = tuple(args[0].split()) + args[1:]
-
-        buff = SYM_EMPTY.join((SYM_STAR, str(len(args)).encode(), SYM_CRLF))
-
+        # the header of the command includes its name, which the client
+        # might have made of several words, e.g. 'CONFIG GET'
+        pieces = [command_header(args[0], len(args) - 1)]
         buffer_cutoff = self._buffer_cutoff
-        for arg in map(self.encoder.encode, args):
-            # to avoid large string mallocs, chunk the command into the
-            # output list if we're sending large values or memoryviews
+        for arg in map(self.encoder.encode, args[1:]):
+            if isinstance(arg, memoryview):
+                pieces.append(b"$%d\r\n" % arg.nbytes)
+                output.append(SYM_EMPTY.join(pieces))
+                output.append(arg)
+                pieces = [SYM_CRLF]
+                continue
             arg_length = len(arg)
-            if (
-                len(buff) > buffer_cutoff
-                or arg_length > buffer_cutoff
-                or isinstance(arg, memoryview)
-            ):
-                buff = SYM_EMPTY.join(
-                    (buff, SYM_DOLLAR, str(arg_length).encode(), SYM_CRLF)
-                )
-                output.append(buff)
+            if arg_length > buffer_cutoff:
+                pieces.append(b"$%d\r\n" % arg_length)
+                output.append(SYM_EMPTY.join(pieces))
                 output.append(arg)
-                buff = SYM_CRLF
+                pieces = [SYM_CRLF]
+            elif arg_length < 1024:
+                pieces.extend((BULK_STRING_HEADERS[arg_length], arg, SYM_CRLF))
             else:
-                buff = SYM_EMPTY.join(
-                    (
-                        buff,
-                        SYM_DOLLAR,
-                        str(arg_length).encode(),
-                        SYM_CRLF,
-                        arg,
-                        SYM_CRLF,
-                    )
-                )
-        output.append(buff)
+                pieces.extend((b"$%d\r\n" % arg_length, arg, SYM_CRLF))
+        output.append(SYM_EMPTY.join(pieces))
         return output
 
     def pack_commands(self, commands):
         """Pack multiple commands into the Redis protocol"""
+        meter = self.meter
+        if meter is not None:
+            start = perf_counter_ns()
         output = []
         pieces = []
         buffer_length = 0
@@ -893,17 +1629,18 @@ class Connection:
 
         for cmd in commands:
             for chunk in self.pack_command(*cmd):
-                chunklen = len(chunk)
-                if (
-                    buffer_length > buffer_cutoff
-                    or chunklen > buffer_cutoff
-                    or isinstance(chunk, memoryview)
-                ):
-                    output.append(SYM_EMPTY.join(pieces))
+                if isinstance(chunk, memoryview):
+                    large = True
+                else:
+                    chunklen = len(chunk)
+                    large = chunklen > buffer_cutoff
+                if large or buffer_length > buffer_cutoff:
+                    if pieces:
+                        output.append(SYM_EMPTY.join(pieces))
                     buffer_length = 0
                     pieces = []
 
-                if chunklen > buffer_cutoff or isinstance(chunk, memoryview):
+                if large:
                     output.append(chunk)
                 else:
                     pieces.append(chunk)
@@ -911,15 +1648,109 @@ class Connection:
 
         if pieces:
             output.append(SYM_EMPTY.join(pieces))
+        if meter is not None:
+            meter.pack_ns += perf_counter_ns() - start
         return output
 
 
+def _sendmsg_all(sock, buffers):
+    """
+    Send all of ``buffers`` with as few sendmsg() calls as possible, without
+    joining them.
+    """
+    views = [memoryview(buffer).cast("B") for buffer in buffers]
+    start = 0
+    while start < len(views):
+        sent = sock.sendmsg(views[start : start + IOV_MAX])
+        # skip what was sent, which might end in the middle of a buffer
+        while sent:
+            length = views[start].nbytes
+            if sent < length:
+                views[start] = views[start][sent:]
+                break
+            sent -= length
+            start += 1
+        # skip empty buffers, which the loop above can't tell were sent
+        while start < len(views) and not views[start].nbytes:
+            start += 1
+
+
+def _drain_socket(sock, deadline):
+    """
+    Send PING with a random token on ``sock`` and discard what it receives
+    until the reply to the PING, which follows the replies left unread.
+    Return whether the reply came before ``deadline`` and nothing after it.
+    """
+    token = os.urandom(8).hex().encode()
+    # a bulk string, both in the PING and in its reply
+    marker = b"$%d\r\n%s\r\n" % (len(token), token)
+    timeout = sock.gettimeout()
+    try:
+        sock.sendall(b"*2\r\n$4\r\nPING\r\n" + marker)
+        received = b""
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return False
+            sock.settimeout(remaining)
+            data = sock.recv(65536)
+            if not data:
+                return False
+            # keeping enough of what came before to find a split marker
+            received = received[-len(marker) :] + data
+            end = received.find(marker)
+            if end != -1:
+                return end + len(marker) == len(received)
+    finally:
+        sock.settimeout(timeout)
+
+
+class _ReplyDrain:
+    """
+    The socket of a connection whose read timed out with ``error``, leaving
+    replies unread, which a thread drains once started, within ``timeout``
+    seconds
+    """
+
+    def __init__(self, sock, error, timeout):
+        self.sock = sock
+        self.error = error
+        self.timeout = timeout
+        self.started = False
+        self.drained = False
+        self._deadline = None
+        self._thread = None
+
+    def start(self):
+        self.started = True
+        self._deadline = monotonic() + self.timeout
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.drained = _drain_socket(self.sock, self._deadline)
+        except OSError:
+            # including the socket closed by a disconnect() meanwhile
+            pass
+
+    def wait(self):
+        "Wait for the replies to be drained, starting now if not yet started"
+        if not self.started:
+            self.start()
+        self._thread.join(max(self._deadline - monotonic(), 0))
+        return self.drained
+
+
 class SSLConnection(Connection):
     """Manages SSL connections to and from the Redis server(s).
     This class extends the Connection class, adding SSL functionality, and making
     use of ssl.SSLContext (https://docs.python.org/3/library/ssl.html#ssl.SSLContext)
     """  # noqa
 
+    # SSL sockets don't implement sendmsg()
+    _vectored_send = False
+
     def __init__(
         self,
         ssl_keyfile=None,
@@ -1074,6 +1905,11 @@ class UnixDomainSocketConnection(Connection):
         client_name=None,
         retry=None,
         redis_connect_func=None,
+        protocol=2,
+        client_cache=None,
+        recorder=None,
+        instrumentation=None,
+        drain_timeout=None,
     ):
         """
         Initialize a new UnixDomainSocketConnection.
@@ -1081,6 +1917,15 @@ class UnixDomainSocketConnection(Connection):
         `retry_on_error` to a list of the error/s to retry on, then set
         `retry` to a valid `Retry` object.
         To retry on TimeoutError, `retry_on_timeout` can also be set to `True`.
+        Set `protocol` to 3 to switch the connection to RESP3 with HELLO.
+        `client_cache` is the `redis.cache.LocalCache` the connection tracks
+        its keys for. `recorder` is a `redis.capture.TrafficRecorder` logging
+        the traffic of the connection. With an `instrumentation`, the
+        connection measures the time spent in every phase of its commands and
+        counts the bytes it sends and receives. With a `drain_timeout`, a
+        connection whose read timed out doesn't reconnect: the replies left
+        unread are drained in the background, for up to `drain_timeout`
+        seconds, and the socket is used again once they are.
         """
         self.pid = os.getpid()
         self.path = path
@@ -1109,6 +1954,28 @@ class UnixDomainSocketConnection(Connection):
         self.health_check_interval = health_check_interval
         self.next_health_check = 0
         self.redis_connect_func = redis_connect_func
+        protocol = int(protocol)
+        if protocol not in (2, 3):
+            raise DataError("protocol must be either 2 or 3")
+        self.protocol = protocol
+        self.client_cache = client_cache
+        self.recorder = recorder
+        self._capture_id = None
+        self.meter = None if instrumentation is None else ConnectionMeter()
+        # the PoolStats of the pool the connection belongs to, if any, and
+        # why it was last disconnected
+        self.pool_stats = None
+        self._reconnect_cause = None
+        # when the connection connected, and was last returned to its pool
+        self.connected_at = None
+        self.released_at = None
+        self.drain_timeout = drain_timeout
+        # the socket set aside when a read timed out, to drain its replies
+        self._drain = None
+        # with a drain_timeout, the replies to read, and how many of them
+        # are to read up to that of the last blocking command sent
+        self._replies_pending = 0
+        self._blocking_pending = 0
         self.encoder = Encoder(encoding, encoding_errors, decode_responses)
         self._sock = None
         self._socket_read_size = socket_read_size
@@ -1162,6 +2029,13 @@ URL_QUERY_ARGUMENT_PARSERS = {
     "max_connections": int,
     "health_check_interval": int,
     "ssl_check_hostname": to_bool,
+    "protocol": int,
+    "min_idle": int,
+    "max_idle_time": float,
+    "max_connection_age": float,
+    "reaper_interval": float,
+    "background_health_checks": to_bool,
+    "drain_timeout": float,
 }
 
 
@@ -1217,6 +2091,67 @@ def parse_url(url):
     return kwargs
 
 
+def _connect_all(connections):
+    "Connect ``connections`` in parallel, returning those which connected"
+    connected = []
+
+    def connect(connection):
+        try:
+            connection.connect()
+        except (RedisError, OSError):
+            return
+        connected.append(connection)
+
+    threads = [
+        threading.Thread(target=connect, args=(connection,), daemon=True)
+        for connection in connections
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return connected
+
+
+def _run_reaper(pool_ref, interval, stopped):
+    """
+    Reap the connection pool referenced by ``pool_ref`` every ``interval``
+    seconds, checking the health of its idle connections first if asked to,
+    until ``stopped`` is set or the pool is garbage collected
+    """
+    while True:
+        pool = pool_ref()
+        if pool is None:
+            return
+        try:
+            if pool.background_health_checks:
+                pool.check_health()
+            pool.reap()
+        except Exception:
+            # such as a fork while reaping, try again next time
+            pass
+        del pool
+        if stopped.wait(interval):
+            return
+
+
+# pools alive in this process, which forked children reset as soon as they
+# start instead of checking the process id on every checkout
+_pools = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    for pool in list(_pools):
+        pool._after_fork()
+
+
+# os.register_at_fork() is missing before Python 3.7 and on Windows, where the
+# pools fall back to checking the process id
+FORK_HOOKS = hasattr(os, "register_at_fork")
+if FORK_HOOKS:
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
 class ConnectionPool:
     """
     Create a connection pool. ``If max_connections`` is set, then this
@@ -1227,6 +2162,23 @@ class ConnectionPool:
     is specified. Use class:`.UnixDomainSocketConnection` for
     unix sockets.
 
+    Connections are created on demand and kept for reuse. ``min_idle``,
+    ``max_idle_time`` and ``max_connection_age`` start a reaper thread, which
+    runs every ``reaper_interval`` seconds to close the idle connections which
+    went unused for ``max_idle_time`` seconds, or connected more than
+    ``max_connection_age`` seconds ago, and to connect new ones, in parallel,
+    until ``min_idle`` connections are idle. It first runs when the pool is
+    created, so that the first commands don't wait for connections to be made.
+    Idle connections past ``max_idle_time`` are kept as needed to stay at
+    ``min_idle``. The reaper stops when the pool is disconnected, until the
+    pool is used again.
+
+    With ``background_health_checks``, the reaper also checks the health of
+    the idle connections, instead of the connections checking it with a PING
+    before sending a command: it PINGs every idle connection due for a health
+    check, every ``health_check_interval`` seconds, before its next run, and
+    closes and evicts those which fail, so that they aren't handed out.
+
     Any additional keyword arguments are passed to the constructor of
     ``connection_class``.
     """
@@ -1281,26 +2233,54 @@ class ConnectionPool:
         return cls(**kwargs)
 
     def __init__(
-        self, connection_class=Connection, max_connections=None, **connection_kwargs
+        self,
+        connection_class=Connection,
+        max_connections=None,
+        min_idle=0,
+        max_idle_time=None,
+        max_connection_age=None,
+        reaper_interval=1,
+        background_health_checks=False,
+        **connection_kwargs,
     ):
         max_connections = max_connections or 2**31
         if not isinstance(max_connections, int) or max_connections < 0:
             raise ValueError('"max_connections" must be a positive integer')
+        if not isinstance(min_idle, int) or not 0 <= min_idle <= max_connections:
+            raise ValueError(
+                '"min_idle" must be a positive integer no greater than '
+                '"max_connections"'
+            )
+        if background_health_checks and not connection_kwargs.get(
+            "health_check_interval"
+        ):
+            raise ValueError(
+                '"background_health_checks" requires a "health_check_interval"'
+            )
 
         self.connection_class = connection_class
         self.connection_kwargs = connection_kwargs
         self.max_connections = max_connections
+        self.min_idle = min_idle
+        self.max_idle_time = max_idle_time
+        self.max_connection_age = max_connection_age
+        self.reaper_interval = reaper_interval
+        self.background_health_checks = background_health_checks
+        self._reaping = bool(
+            min_idle or max_idle_time or max_connection_age or background_health_checks
+        )
+        self._reaper_lock = threading.Lock()
 
-        # a lock to protect the critical section in _checkpid().
-        # this lock is acquired when the process id changes, such as
-        # after a fork. during this time, multiple threads in the child
-        # process could attempt to acquire this lock. the first thread
-        # to acquire the lock will reset the data structures and lock
-        # object of this pool. subsequent threads acquiring this lock
-        # will notice the first thread already did the work and simply
-        # release the lock.
+        # forked children reset the pool in _after_fork(), which the
+        # os.register_at_fork() hook runs. where fork hooks are unavailable,
+        # _checkpid() resets it once it notices the process id changed, and
+        # this lock keeps the threads of the child noticing it at the same
+        # time from resetting the pool more than once.
         self._fork_lock = threading.Lock()
         self.reset()
+        _pools.add(self)
+        if self._reaping:
+            self._start_reaper()
 
     def __repr__(self):
         return (
@@ -1313,53 +2293,41 @@ class ConnectionPool:
         self._created_connections = 0
         self._available_connections = []
         self._in_use_connections = set()
-
-        # this must be the last operation in this method. while reset() is
-        # called when holding _fork_lock, other threads in this process
-        # can call _checkpid() which compares self.pid and os.getpid() without
-        # holding any lock (for performance reasons). keeping this assignment
-        # as the last operation ensures that those other threads will also
-        # notice a pid difference and block waiting for the first thread to
-        # release _fork_lock. when each of these threads eventually acquire
-        # _fork_lock, they will notice that another thread already called
-        # reset() and they will immediately release _fork_lock and continue on.
+        self._stats = PoolStats()
+        # the reaper thread of the parent process doesn't survive a fork
+        self._reaper = None
+
+        # this must be the last operation in this method. where fork hooks
+        # are unavailable, _checkpid() calls reset() when holding _fork_lock,
+        # while other threads of the child compare self.pid and os.getpid()
+        # without holding any lock (for performance reasons). keeping this
+        # assignment last ensures that those threads also notice a pid
+        # difference and block waiting for the first thread to release
+        # _fork_lock, after which they see that reset() was already called.
         self.pid = os.getpid()
 
     def _checkpid(self):
-        # _checkpid() attempts to keep ConnectionPool fork-safe on modern
-        # systems. this is called by all ConnectionPool methods that
-        # manipulate the pool's state such as get_connection() and release().
-        #
-        # _checkpid() determines whether the process has forked by comparing
-        # the current process id to the process id saved on the ConnectionPool
-        # instance. if these values are the same, _checkpid() simply returns.
-        #
-        # when the process ids differ, _checkpid() assumes that the process
-        # has forked and that we're now running in the child process. the child
-        # process cannot use the parent's file descriptors (e.g., sockets).
-        # therefore, when _checkpid() sees the process id change, it calls
-        # reset() in order to reinitialize the child's ConnectionPool. this
-        # will cause the child to make all new connection objects.
-        #
-        # _checkpid() is protected by self._fork_lock to ensure that multiple
-        # threads in the child process do not call reset() multiple times.
+        # os.register_at_fork() resets the pools of forked children, with
+        # _after_fork(), as soon as they start. _checkpid() is the fallback
+        # keeping ConnectionPool fork-safe where fork hooks are unavailable
+        # (before Python 3.7 and on Windows), and returns straight away
+        # elsewhere, sparing every checkout asking for the process id. it is
+        # called by all the methods that manipulate the pool's state such as
+        # get_connection() and release().
         #
-        # there is an extremely small chance this could fail in the following
-        # scenario:
-        #   1. process A calls _checkpid() for the first time and acquires
-        #      self._fork_lock.
-        #   2. while holding self._fork_lock, process A forks (the fork()
-        #      could happen in a different thread owned by process A)
-        #   3. process B (the forked child process) inherits the
-        #      ConnectionPool's state from the parent. that state includes
-        #      a locked _fork_lock. process B will not be notified when
-        #      process A releases the _fork_lock and will thus never be
-        #      able to acquire the _fork_lock.
+        # the fallback compares the current process id to the one reset()
+        # saved on the pool. when they differ, the process has forked and
+        # this is the child, which cannot use the parent's sockets, so the
+        # pool is reset() to make all new connections. this is protected by
+        # self._fork_lock so that the threads of the child don't reset() the
+        # pool more than once.
         #
-        # to mitigate this possible deadlock, _checkpid() will only wait 5
-        # seconds to acquire _fork_lock. if _fork_lock cannot be acquired in
-        # that time it is assumed that the child is deadlocked and a
-        # redis.ChildDeadlockedError error is raised.
+        # should the parent fork while one of its threads holds _fork_lock,
+        # the child inherits the lock locked, with no thread to ever release
+        # it. so _checkpid() only waits 5 seconds to acquire _fork_lock, and
+        # raises a redis.ChildDeadlockedError if it can't.
+        if FORK_HOOKS:
+            return
         if self.pid != os.getpid():
             acquired = self._fork_lock.acquire(timeout=5)
             if not acquired:
@@ -1372,9 +2340,23 @@ class ConnectionPool:
             finally:
                 self._fork_lock.release()
 
+    def _after_fork(self):
+        # run in the child, by the only thread it has, so no lock is needed.
+        # the locks themselves may have been held by other threads of the
+        # parent, which don't exist in the child to release them.
+        self._fork_lock = threading.Lock()
+        self._reaper_lock = threading.Lock()
+        self.reset()
+        # the child makes its own ``min_idle`` connections in the background
+        if self._reaping:
+            self._start_reaper()
+
     def get_connection(self, command_name, *keys, **options):
         "Get a connection from the pool"
+        start = perf_counter_ns()
         self._checkpid()
+        if self._reaper is None and self._reaping:
+            self._start_reaper()
         with self._lock:
             try:
                 connection = self._available_connections.pop()
@@ -1393,6 +2375,7 @@ class ConnectionPool:
                 if connection.can_read():
                     raise ConnectionError("Connection has data")
             except (ConnectionError, OSError):
+                connection._reconnect_cause = "stale"
                 connection.disconnect()
                 connection.connect()
                 if connection.can_read():
@@ -1403,6 +2386,7 @@ class ConnectionPool:
             self.release(connection)
             raise
 
+        self._stats.checked_out(perf_counter_ns() - start)
         return connection
 
     def get_encoder(self):
@@ -1419,7 +2403,9 @@ class ConnectionPool:
         if self._created_connections >= self.max_connections:
             raise ConnectionError("Too many connections")
         self._created_connections += 1
-        return self.connection_class(**self.connection_kwargs)
+        connection = self.connection_class(**self.connection_kwargs)
+        connection.pool_stats = self._stats
+        return connection
 
     def release(self, connection):
         "Releases the connection back to the pool"
@@ -1433,6 +2419,7 @@ class ConnectionPool:
                 pass
 
             if self.owns_connection(connection):
+                connection.released_at = monotonic()
                 self._available_connections.append(connection)
             else:
                 # pool doesn't own this connection. do not add it back
@@ -1445,6 +2432,173 @@ class ConnectionPool:
     def owns_connection(self, connection):
         return connection.pid == self.pid
 
+    def stats(self):
+        """
+        Return a snapshot of the use of the pool, as a dict of:
+
+        - ``max_connections``: the size of the pool
+        - ``connections``, ``in_use`` and ``idle``: the connections created
+          by the pool, and how many of them are checked out and available
+        - ``connections_created`` and ``connections_destroyed``: the sockets
+          opened and closed by the connections of the pool
+        - ``reconnects``: how many times the connections reconnected, by the
+          cause of their disconnection, as described by ``PoolStats``
+        - ``checkouts``: the connections handed out by ``get_connection()``
+        - ``checkout_wait``: the count, mean, percentiles and extremes of the
+          time in nanoseconds ``get_connection()`` took to hand them out,
+          connecting included
+        - ``timeouts``: the checkouts which gave up waiting for a connection
+        """
+        self._checkpid()
+        with self._lock:
+            in_use = len(self._in_use_connections)
+            idle = len(self._available_connections)
+        return self._make_stats(in_use, idle)
+
+    def _make_stats(self, in_use, idle):
+        stats = {
+            "max_connections": self.max_connections,
+            "connections": in_use + idle,
+            "in_use": in_use,
+            "idle": idle,
+        }
+        stats.update(self._stats.snapshot())
+        return stats
+
+    def reap(self):
+        """
+        Close the idle connections past ``max_idle_time`` or
+        ``max_connection_age``, then connect new ones, in parallel, until
+        ``min_idle`` connections are idle. Run by the reaper thread.
+        """
+        self._checkpid()
+        now = monotonic()
+        with self._lock:
+            idle, expired = self._expire(self._available_connections, now)
+            self._available_connections = idle
+            self._created_connections -= len(expired)
+            missing = min(
+                self.min_idle - len(idle),
+                self.max_connections - self._created_connections,
+            )
+            warming = [self.make_connection() for _ in range(missing)]
+        for connection in expired:
+            connection.disconnect()
+        connected = _connect_all(warming)
+        with self._lock:
+            for connection in warming:
+                if connection in connected:
+                    connection.released_at = now
+                    self._available_connections.insert(0, connection)
+                else:
+                    self._created_connections -= 1
+
+    def _expire(self, connections, now):
+        """
+        Split the idle ``connections``, least recently used first, into those
+        to keep and those past ``max_connection_age`` or ``max_idle_time``,
+        keeping the most recently used of the latter as needed to stay at
+        ``min_idle``
+        """
+        keep, too_old, too_idle = [], [], []
+        for connection in connections:
+            connected_at = connection.connected_at
+            released_at = connection.released_at
+            if (
+                self.max_connection_age is not None
+                and connected_at is not None
+                and now - connected_at > self.max_connection_age
+            ):
+                too_old.append(connection)
+            elif (
+                self.max_idle_time is not None
+                and released_at is not None
+                and now - released_at > self.max_idle_time
+            ):
+                too_idle.append(connection)
+            else:
+                keep.append(connection)
+        spared = min(max(self.min_idle - len(keep), 0), len(too_idle))
+        if spared:
+            keep[:0] = too_idle[-spared:]
+            del too_idle[-spared:]
+        return keep, too_old + too_idle
+
+    def check_health(self):
+        """
+        PING the idle connections due for a health check before the next run
+        of the reaper, closing and evicting those which fail. Run by the
+        reaper thread with ``background_health_checks``.
+        """
+        self._checkpid()
+        deadline = time() + self.reaper_interval
+        for connection in self._take_due(deadline):
+            self._probe(connection)
+
+    def _health_check_due(self, connection, deadline):
+        return (
+            connection._sock is not None
+            and connection.health_check_interval
+            and connection.next_health_check <= deadline
+        )
+
+    def _probe(self, connection):
+        start = perf_counter_ns()
+        healthy = False
+        try:
+            connection._send_ping()
+            healthy = True
+        except (RedisError, OSError):
+            self._stats.health_check_failed()
+        finally:
+            if healthy:
+                self._stats.health_checked(perf_counter_ns() - start)
+            else:
+                connection.disconnect()
+            self._return_probed(connection, healthy)
+
+    def _take_due(self, deadline):
+        "Check out the idle connections due for a health check"
+        with self._lock:
+            due = [
+                connection
+                for connection in self._available_connections
+                if self._health_check_due(connection, deadline)
+            ]
+            for connection in due:
+                self._available_connections.remove(connection)
+                self._in_use_connections.add(connection)
+        return due
+
+    def _return_probed(self, connection, healthy):
+        "Return a connection after its health check, evicting it if it failed"
+        with self._lock:
+            self._in_use_connections.discard(connection)
+            if healthy:
+                self._available_connections.insert(0, connection)
+            else:
+                self._created_connections -= 1
+
+    def _start_reaper(self):
+        with self._reaper_lock:
+            if self._reaper is not None:
+                return
+            stopped = threading.Event()
+            thread = threading.Thread(
+                target=_run_reaper,
+                args=(weakref.ref(self), self.reaper_interval, stopped),
+                name=f"{type(self).__name__} reaper",
+                daemon=True,
+            )
+            self._reaper = (thread, stopped)
+            thread.start()
+
+    def _stop_reaper(self):
+        with self._reaper_lock:
+            if self._reaper is not None:
+                self._reaper[1].set()
+                self._reaper = None
+
     def disconnect(self, inuse_connections=True):
         """
         Disconnects connections in the pool
@@ -1454,6 +2608,7 @@ class ConnectionPool:
         connections that are idle in the pool.
         """
         self._checkpid()
+        self._stop_reaper()
         with self._lock:
             if inuse_connections:
                 connections = chain(
@@ -1529,21 +2684,22 @@ class BlockingConnectionPool(ConnectionPool):
         # Keep a list of actual connection instances so that we can
         # disconnect them later.
         self._connections = []
-
-        # this must be the last operation in this method. while reset() is
-        # called when holding _fork_lock, other threads in this process
-        # can call _checkpid() which compares self.pid and os.getpid() without
-        # holding any lock (for performance reasons). keeping this assignment
-        # as the last operation ensures that those other threads will also
-        # notice a pid difference and block waiting for the first thread to
-        # release _fork_lock. when each of these threads eventually acquire
-        # _fork_lock, they will notice that another thread already called
-        # reset() and they will immediately release _fork_lock and continue on.
+        self._stats = PoolStats()
+        self._reaper = None
+
+        # this must be the last operation in this method. where fork hooks
+        # are unavailable, _checkpid() calls reset() when holding _fork_lock,
+        # while other threads of the child compare self.pid and os.getpid()
+        # without holding any lock (for performance reasons). keeping this
+        # assignment last ensures that those threads also notice a pid
+        # difference and block waiting for the first thread to release
+        # _fork_lock, after which they see that reset() was already called.
         self.pid = os.getpid()
 
     def make_connection(self):
         "Make a fresh connection."
         connection = self.connection_class(**self.connection_kwargs)
+        connection.pool_stats = self._stats
         self._connections.append(connection)
         return connection
 
@@ -1559,8 +2715,11 @@ class BlockingConnectionPool(ConnectionPool):
         create new connections when we need to, i.e.: the actual number of
         connections will only increase in response to demand.
         """
+        start = perf_counter_ns()
         # Make sure we haven't changed process.
         self._checkpid()
+        if self._reaper is None and self._reaping:
+            self._start_reaper()
 
         # Try and get a connection from the pool. If one isn't available within
         # self.timeout then raise a ``ConnectionError``.
@@ -1568,6 +2727,7 @@ class BlockingConnectionPool(ConnectionPool):
         try:
             connection = self.pool.get(block=True, timeout=self.timeout)
         except Empty:
+            self._stats.timed_out()
             # Note that this is not caught by the redis client and will be
             # raised unless handled by application code. If you want never to
             raise ConnectionError("No connection available.")
@@ -1588,6 +2748,7 @@ class BlockingConnectionPool(ConnectionPool):
                 if connection.can_read():
                     raise ConnectionError("Connection has data")
             except (ConnectionError, OSError):
+                connection._reconnect_cause = "stale"
                 connection.disconnect()
                 connection.connect()
                 if connection.can_read():
@@ -1597,6 +2758,7 @@ class BlockingConnectionPool(ConnectionPool):
             self.release(connection)
             raise
 
+        self._stats.checked_out(perf_counter_ns() - start)
         return connection
 
     def release(self, connection):
@@ -1613,6 +2775,7 @@ class BlockingConnectionPool(ConnectionPool):
             return
 
         # Put the connection back into the pool.
+        connection.released_at = monotonic()
         try:
             self.pool.put_nowait(connection)
         except Full:
@@ -1623,5 +2786,710 @@ class BlockingConnectionPool(ConnectionPool):
     def disconnect(self):
         "Disconnects all connections in the pool."
         self._checkpid()
+        self._stop_reaper()
         for connection in self._connections:
             connection.disconnect()
+
+    def reap(self):
+        self._checkpid()
+        now = monotonic()
+        queue = self.pool
+        with queue.mutex:
+            placeholders = 0
+            connections = []
+            for connection in queue.queue:
+                if connection is None:
+                    placeholders += 1
+                else:
+                    connections.append(connection)
+            idle, expired = self._expire(connections, now)
+            placeholders += len(expired)
+            missing = max(min(self.min_idle - len(idle), placeholders), 0)
+            # placeholders go first, to hand out the connections there are
+            # before making new ones
+            queue.queue.clear()
+            queue.queue.extend([None] * (placeholders - missing) + idle)
+            for connection in expired:
+                self._connections.remove(connection)
+            warming = [self.make_connection() for _ in range(missing)]
+        for connection in expired:
+            connection.disconnect()
+        connected = _connect_all(warming)
+        for connection in warming:
+            if connection in connected:
+                connection.released_at = now
+                queue.put_nowait(connection)
+            else:
+                self._connections.remove(connection)
+                queue.put_nowait(None)
+
+    def _take_due(self, deadline):
+        queue = self.pool
+        with queue.mutex:
+            due = [
+                connection
+                for connection in queue.queue
+                if connection is not None
+                and self._health_check_due(connection, deadline)
+            ]
+            for connection in due:
+                queue.queue.remove(connection)
+        return due
+
+    def _return_probed(self, connection, healthy):
+        if healthy:
+            self.pool.put_nowait(connection)
+            return
+        self._connections.remove(connection)
+        queue = self.pool
+        with queue.mutex:
+            # placeholders go first, to hand out the idle connections before
+            # making new ones
+            queue.queue.insert(0, None)
+            queue.not_empty.notify()
+
+    def stats(self):
+        self._checkpid()
+        with self.pool.mutex:
+            idle = sum(connection is not None for connection in self.pool.queue)
+        return self._make_stats(len(self._connections) - idle, idle)
+
+
+class _PriorityClass:
+    "The connections in use and the threads waiting of a priority class"
+
+    __slots__ = "name", "reserved", "in_use", "waiters", "stats"
+
+    def __init__(self, name, reserved):
+        self.name = name
+        self.reserved = reserved
+        self.in_use = 0
+        self.waiters = deque()
+        self.stats = PoolStats()
+
+
+class _Waiter:
+    __slots__ = "event", "connection"
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.connection = None
+
+
+class FairConnectionPool(BlockingConnectionPool):
+    """
+    A :py:class:`~redis.BlockingConnectionPool` which hands connections out
+    to the threads waiting for one in the order they started waiting, so
+    that none of them starves under load. Released connections go straight
+    to the longest waiting thread, without threads arriving meanwhile
+    taking them first.
+
+    Threads may wait in priority classes, given as ``priorities``: a list
+    of (name, reserved) tuples, from the highest priority to the lowest.
+    Waiting threads of a class get connections before those of the classes
+    after it, and ``reserved`` connections are kept for the commands of a
+    class, which the other classes can't take. Threads use the
+    ``default_priority`` class, or the one set by ``priority()``::
+
+        >>> pool = FairConnectionPool(
+        ...     max_connections=20,
+        ...     priorities=[("critical", 4), ("default", 0), ("bulk", 0)],
+        ... )
+        >>> with pool.priority("critical"):
+        ...     client.get("foo")
+
+    ``stats()`` reports the checkouts, timeouts and waits of every class.
+    """
+
+    def __init__(
+        self,
+        max_connections=50,
+        timeout=20,
+        connection_class=Connection,
+        priorities=None,
+        default_priority="default",
+        **connection_kwargs,
+    ):
+        priorities = list(priorities or [("default", 0)])
+        names = [name for name, _ in priorities]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate priority classes")
+        if default_priority not in names:
+            raise ValueError(f"Unknown default priority {default_priority!r}")
+        self.priorities = priorities
+        self.default_priority = default_priority
+        self._local = threading.local()
+        super().__init__(
+            max_connections=max_connections,
+            timeout=timeout,
+            connection_class=connection_class,
+            **connection_kwargs,
+        )
+        if sum(reserved for _, reserved in priorities) > self.max_connections:
+            raise ValueError(
+                "More connections reserved than allowed by max_connections"
+            )
+
+    def reset(self):
+        self._mutex = threading.Lock()
+        # the classes by priority, highest first
+        self._classes = [
+            _PriorityClass(name, reserved) for name, reserved in self.priorities
+        ]
+        self._classes_by_name = {cls.name: cls for cls in self._classes}
+        # the connections released to the pool, the last released on top
+        self._idle = []
+        # how many more connections may be created
+        self._free_slots = self.max_connections
+        # the class of every connection in use
+        self._checked_out = {}
+        self._connections = []
+        self._stats = PoolStats()
+        self._reaper = None
+
+        # this must be the last operation in this method. see
+        # ConnectionPool.reset()
+        self.pid = os.getpid()
+
+    @contextmanager
+    def priority(self, name):
+        """
+        Get the connections of the current thread in the priority class
+        ``name`` in the ``with`` block
+        """
+        if name not in self._classes_by_name:
+            raise ValueError(f"Unknown priority {name!r}")
+        previous = getattr(self._local, "priority", None)
+        self._local.priority = name
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def _available_to(self, cls):
+        "Whether ``cls`` may take an idle connection or make a new one"
+        available = len(self._idle) + self._free_slots
+        for other in self._classes:
+            if other is not cls and other.in_use < other.reserved:
+                available -= other.reserved - other.in_use
+        return available > 0
+
+    def _take(self, cls):
+        "Check an idle or a new connection out for ``cls``"
+        if self._idle:
+            connection = self._idle.pop()
+        else:
+            self._free_slots -= 1
+            connection = self.make_connection()
+        cls.in_use += 1
+        self._checked_out[connection] = cls
+        return connection
+
+    def _dispatch(self):
+        "Hand the connections available to the waiting threads"
+        for cls in self._classes:
+            waiters = cls.waiters
+            while waiters and self._available_to(cls):
+                waiter = waiters.popleft()
+                waiter.connection = self._take(cls)
+                waiter.event.set()
+
+    def get_connection(self, command_name, *keys, **options):
+        """
+        Get a connection, waiting for ``self.timeout`` after the threads
+        which started waiting earlier, or are of a higher priority class,
+        for one they could take too
+        """
+        start = perf_counter_ns()
+        self._checkpid()
+        if self._reaper is None and self._reaping:
+            self._start_reaper()
+        cls = self._classes_by_name[
+            getattr(self._local, "priority", None) or self.default_priority
+        ]
+
+        waiter = None
+        with self._mutex:
+            # the threads of the same or a higher class waiting come first,
+            # those still waiting once served couldn't take the connections
+            # available to cls, e.g. those reserved for it
+            self._dispatch()
+            if self._available_to(cls):
+                connection = self._take(cls)
+            else:
+                waiter = _Waiter()
+                cls.waiters.append(waiter)
+
+        if waiter is not None:
+            waiter.event.wait(self.timeout)
+            with self._mutex:
+                connection = waiter.connection
+                if connection is None:
+                    cls.waiters.remove(waiter)
+            if connection is None:
+                cls.stats.timed_out()
+                self._stats.timed_out()
+                raise ConnectionError("No connection available.")
+
+        try:
+            # ensure this connection is connected to Redis
+            connection.connect()
+            # connections that the pool provides should be ready to send
+            # a command. if not, the connection was either returned to the
+            # pool before all data has been read or the socket has been
+            # closed. either way, reconnect and verify everything is good.
+            try:
+                if connection.can_read():
+                    raise ConnectionError("Connection has data")
+            except (ConnectionError, OSError):
+                connection._reconnect_cause = "stale"
+                connection.disconnect()
+                connection.connect()
+                if connection.can_read():
+                    raise ConnectionError("Connection not ready")
+        except BaseException:
+            # release the connection back to the pool so that we don't leak it
+            self.release(connection)
+            raise
+
+        waited = perf_counter_ns() - start
+        cls.stats.checked_out(waited)
+        self._stats.checked_out(waited)
+        return connection
+
+    def release(self, connection):
+        "Releases the connection back to the pool."
+        self._checkpid()
+        owned = self.owns_connection(connection)
+        with self._mutex:
+            cls = self._checked_out.pop(connection, None)
+            if cls is None:
+                # checked out before the pool was reset() after a fork
+                owned = False
+            else:
+                cls.in_use -= 1
+                if owned:
+                    connection.released_at = monotonic()
+                    self._idle.append(connection)
+                else:
+                    self._connections.remove(connection)
+                    self._free_slots += 1
+                self._dispatch()
+        if not owned:
+            connection.disconnect()
+
+    def reap(self):
+        self._checkpid()
+        now = monotonic()
+        with self._mutex:
+            idle, expired = self._expire(self._idle, now)
+            self._idle = idle
+            for connection in expired:
+                self._connections.remove(connection)
+            self._free_slots += len(expired)
+            missing = max(min(self.min_idle - len(idle), self._free_slots), 0)
+            self._free_slots -= missing
+            warming = [self.make_connection() for _ in range(missing)]
+        for connection in expired:
+            connection.disconnect()
+        connected = _connect_all(warming)
+        with self._mutex:
+            for connection in warming:
+                if connection in connected:
+                    connection.released_at = now
+                    self._idle.insert(0, connection)
+                else:
+                    self._connections.remove(connection)
+                    self._free_slots += 1
+            self._dispatch()
+
+    def _take_due(self, deadline):
+        with self._mutex:
+            due = [
+                connection
+                for connection in self._idle
+                if self._health_check_due(connection, deadline)
+            ]
+            self._idle = [
+                connection for connection in self._idle if connection not in due
+            ]
+        return due
+
+    def _return_probed(self, connection, healthy):
+        with self._mutex:
+            if healthy:
+                self._idle.insert(0, connection)
+            else:
+                self._connections.remove(connection)
+                self._free_slots += 1
+            self._dispatch()
+
+    def stats(self):
+        """
+        Return a snapshot of the use of the pool, like
+        :py:meth:`ConnectionPool.stats`, with the number of ``waiting``
+        threads, and the ``priorities`` classes, each with its
+        ``reserved`` connections, the connections ``in_use`` and the threads
+        ``waiting``, and its ``checkouts``, ``timeouts`` and ``checkout_wait``
+        """
+        self._checkpid()
+        with self._mutex:
+            idle = len(self._idle)
+            classes = [(cls, cls.in_use, len(cls.waiters)) for cls in self._classes]
+        stats = self._make_stats(sum(in_use for _, in_use, _ in classes), idle)
+        stats["waiting"] = sum(waiting for _, _, waiting in classes)
+        stats["priorities"] = {}
+        for cls, in_use, waiting in classes:
+            snapshot = cls.stats.snapshot()
+            stats["priorities"][cls.name] = {
+                "reserved": cls.reserved,
+                "in_use": in_use,
+                "waiting": waiting,
+                "checkouts": snapshot["checkouts"],
+                "timeouts": snapshot["timeouts"],
+                "checkout_wait": snapshot["checkout_wait"],
+            }
+        return stats
+
+
+class MultiplexedConnection:
+    """
+    A connection shared by many threads, which pipelines the commands they
+    send concurrently.
+
+    Commands are queued by the sending threads. A writer thread sends all
+    the commands queued so far with a single ``sendall`` and a reader thread
+    reads the replies, handing each one to the thread that sent the matching
+    command, in FIFO order. Replies are read undecoded by the reader thread
+    and decoded by the thread they belong to.
+
+    If the connection fails, every command still waiting for its reply fails
+    with the error and the next command opens a new connection.
+    """
+
+    def __init__(self, connection_class=Connection, **connection_kwargs):
+        self.connection_class = connection_class
+        self.connection_kwargs = connection_kwargs
+        # used to pack commands and decode replies, it is never connected
+        self.template = connection_class(**connection_kwargs)
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._connection = None
+        # bumped whenever the connection is lost, so that a thread still
+        # using an old connection doesn't fail the commands of the new one
+        self._generation = 0
+        self._queue = []
+        self._waiting = deque()
+        self._closed = False
+        self._writer = None
+        self._reader = None
+        # the threads only refer to the connection weakly while waiting: once
+        # it is garbage collected without close(), they wake up to stop
+        weakref.finalize(self, _notify_all, self._cond)
+
+    def __repr__(self):
+        return f"{type(self).__name__}<{self.template!r}>"
+
+    def submit(self, command):
+        """
+        Queue an already packed command, returns the `PendingReply` its
+        reply is delivered to.
+        """
+        reply = PendingReply()
+        with self._cond:
+            if self._closed:
+                raise ConnectionError("Connection closed")
+            if self._writer is None:
+                self._start()
+            self._queue.append((command, reply))
+            self._cond.notify_all()
+        return reply
+
+    def close(self):
+        "Stop the writer and reader threads and disconnect"
+        error = ConnectionError("Connection closed")
+        with self._cond:
+            self._closed = True
+            queued = self._queue
+            self._queue = []
+            generation = self._generation
+            self._cond.notify_all()
+        for _, reply in queued:
+            reply.set_exception(error)
+        self._fail(generation, error)
+
+    def _start(self):
+        ref = weakref.ref(self)
+        self._writer = threading.Thread(
+            target=_run_multiplexed,
+            args=(ref, self._cond, type(self)._can_write, type(self)._write),
+            name="redis-py-multiplexed-writer",
+            daemon=True,
+        )
+        self._reader = threading.Thread(
+            target=_run_multiplexed,
+            args=(ref, self._cond, type(self)._can_read, type(self)._read),
+            name="redis-py-multiplexed-reader",
+            daemon=True,
+        )
+        self._writer.start()
+        self._reader.start()
+
+    def _can_write(self):
+        return self._queue or self._closed
+
+    def _write(self):
+        "Send the commands queued so far"
+        with self._cond:
+            if self._closed or not self._queue:
+                return
+            batch = self._queue
+            self._queue = []
+            generation = self._generation
+            connection = self._connection
+        try:
+            if connection is None:
+                connection = self.connection_class(**self.connection_kwargs)
+                connection.connect()
+                with self._cond:
+                    self._connection = connection
+        except BaseException as e:
+            for _, reply in batch:
+                reply.set_exception(e)
+            return
+        data = [chunk for command, _ in batch for chunk in command]
+        if not connection._vectored_send:
+            data = SYM_EMPTY.join(data)
+        with self._cond:
+            if generation != self._generation:
+                # the reader lost the connection meanwhile, nothing was
+                # sent yet so the commands go to the next one
+                self._queue[:0] = batch
+                return
+            self._waiting.extend(reply for _, reply in batch)
+            self._cond.notify_all()
+        try:
+            connection.send_packed_command(data, check_health=False)
+        except BaseException as e:
+            self._fail(generation, e)
+        with self._cond:
+            stale = generation != self._generation
+        if stale:
+            # sending might have reconnected a connection that was lost
+            connection.disconnect()
+
+    def _can_read(self):
+        return (self._waiting and self._connection) or self._closed
+
+    def _read(self):
+        "Read the next reply awaited"
+        with self._cond:
+            if self._closed or not (self._waiting and self._connection):
+                return
+            generation = self._generation
+            connection = self._connection
+        try:
+            response = connection.read_response(disable_decoding=True)
+        except ResponseError as e:
+            response = e
+        except BaseException as e:
+            self._fail(generation, e)
+            return
+        with self._cond:
+            if generation != self._generation:
+                return
+            reply = self._waiting.popleft()
+        if isinstance(response, ResponseError):
+            reply.set_exception(response)
+        else:
+            reply.set_result(response)
+
+    def _fail(self, generation, error):
+        with self._cond:
+            if generation != self._generation:
+                return
+            self._generation += 1
+            connection = self._connection
+            self._connection = None
+            waiting = list(self._waiting)
+            self._waiting.clear()
+            self._cond.notify_all()
+        if connection is not None:
+            connection.disconnect()
+        for reply in waiting:
+            reply.set_exception(error)
+
+
+def _run_multiplexed(ref, cond, ready, step):
+    """
+    Run ``step``, the writing or the reading of the `MultiplexedConnection`
+    referenced by ``ref``, whenever it is ``ready``, until it is closed or
+    garbage collected. While waiting on its condition ``cond``, the
+    connection is only referenced weakly.
+    """
+    while True:
+        with cond:
+            connection = ref()
+            while connection is not None and not ready(connection):
+                del connection
+                if ref() is not None:
+                    cond.wait()
+                connection = ref()
+            if connection is None or connection._closed:
+                return
+        step(connection)
+        del connection
+
+
+def _notify_all(cond):
+    with cond:
+        cond.notify_all()
+
+
+class PendingReply:
+    "The reply to a command sent through a `MultiplexedConnection`"
+
+    __slots__ = ("_event", "_result", "_exception")
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def set_result(self, result):
+        self._result = result
+        self._event.set()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._event.set()
+
+    def result(self):
+        "Wait for the reply and return it, or raise the error it failed with"
+        self._event.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class MultiplexedConnectionHandle:
+    """
+    What `MultiplexedConnectionPool.get_connection` hands out: a
+    `Connection` look-alike that sends its commands through a shared
+    `MultiplexedConnection` and waits for their replies.
+    """
+
+    def __init__(self, multiplexed_connection):
+        self.multiplexed_connection = multiplexed_connection
+        template = multiplexed_connection.template
+        self.pid = multiplexed_connection.pid
+        self.encoder = template.encoder
+        self.retry = template.retry
+        self.retry_on_error = template.retry_on_error
+        self._pending = deque()
+
+    def __repr__(self):
+        return f"{type(self).__name__}<{self.multiplexed_connection.template!r}>"
+
+    def connect(self):
+        pass
+
+    def disconnect(self, *args):
+        # the multiplexed connection drops its socket on errors by itself
+        pass
+
+    def pack_command(self, *args):
+        return self.multiplexed_connection.template.pack_command(*args)
+
+    def send_packed_command(self, command, check_health=True):
+        if isinstance(command, (bytes, str)):
+            command = [command]
+        self._pending.append(self.multiplexed_connection.submit(command))
+
+    def send_command(self, *args, **kwargs):
+        self.send_packed_command(self.pack_command(*args))
+
+    def can_read(self, timeout=0):
+        return bool(self._pending)
+
+    def read_response(self, disable_decoding=False, sink=None):
+        if not self._pending:
+            raise ConnectionError("No command was sent")
+        response = self._pending.popleft().result()
+        if sink is not None and isinstance(response, bytes):
+            sink.begin(len(response))
+            sink.write(response)
+            return len(response)
+        if disable_decoding or not self.encoder.decode_responses:
+            return response
+        return _decode_response(self.encoder, response)
+
+
+def _decode_response(encoder, response):
+    if isinstance(response, bytes):
+        return encoder.decode(response)
+    if isinstance(response, list):
+        return [_decode_response(encoder, item) for item in response]
+    if isinstance(response, dict):
+        return {
+            _decode_response(encoder, key): _decode_response(encoder, value)
+            for key, value in response.items()
+        }
+    if isinstance(response, set):
+        return {_decode_response(encoder, item) for item in response}
+    return response
+
+
+class MultiplexedConnectionPool(ConnectionPool):
+    """
+    A connection pool whose threads share one `MultiplexedConnection`,
+    instead of holding a connection each.
+
+    Commands that block or change the state of their connection, listed in
+    ``DEDICATED_CONNECTION_COMMANDS``, as well as pipelines, transactions,
+    PubSub, Monitor and single connection clients get a connection of their
+    own, created and limited by ``max_connections`` like in
+    :class:`ConnectionPool`.
+
+        >>> pool = MultiplexedConnectionPool(host="localhost")
+        >>> client = redis.Redis(connection_pool=pool)
+    """
+
+    def reset(self):
+        super().reset()
+        self._multiplexed_connection = None
+
+    def get_connection(self, command_name, *keys, **options):
+        "Get a connection from the pool"
+        if command_name in ("_", "pubsub") or (
+            command_name.upper() in DEDICATED_CONNECTION_COMMANDS
+        ):
+            return super().get_connection(command_name, *keys, **options)
+        self._checkpid()
+        multiplexed_connection = self._multiplexed_connection
+        if multiplexed_connection is None:
+            with self._lock:
+                if self._multiplexed_connection is None:
+                    self._multiplexed_connection = MultiplexedConnection(
+                        self.connection_class, **self.connection_kwargs
+                    )
+                multiplexed_connection = self._multiplexed_connection
+        return MultiplexedConnectionHandle(multiplexed_connection)
+
+    def release(self, connection):
+        "Releases the connection back to the pool"
+        if isinstance(connection, MultiplexedConnectionHandle):
+            return
+        super().release(connection)
+
+    def disconnect(self, inuse_connections=True):
+        """
+        Disconnects connections in the pool, including the multiplexed
+        connection
+        """
+        super().disconnect(inuse_connections)
+        with self._lock:
+            multiplexed_connection = self._multiplexed_connection
+            self._multiplexed_connection = None
+        if multiplexed_connection is not None:
+            multiplexed_connection.close()
@@ -0,0 +1,571 @@
+"""
+Instrumentation of the commands run by clients.
+
+An :class:`Instrumentation` passed as ``instrumentation`` to a client (or to
+a connection pool) has its hooks called before and after every command and
+pipeline the client runs, with a :class:`CommandEvent` describing it: its
+name, the node it ran on, whether it failed, how long it took and how that
+time splits into phases, and the number of bytes sent and received.
+
+:class:`CommandStats` is an instrumentation aggregating the events into
+latency histograms per command and node, and per phase:
+
+    stats = CommandStats()
+    r = redis.Redis(instrumentation=stats)
+    r.get("foo")
+    stats.histogram("GET").percentile(0.99)
+
+The phases of a command are:
+
+- ``checkout``: getting a connection from the pool, connecting included
+- ``pack``: encoding the command
+- ``send``: writing it to the socket
+- ``wait``: waiting for the reply to arrive
+- ``parse``: parsing the reply
+- ``callback``: everything else, mostly running the response callback
+
+Connections only measure the phases and count bytes when created with an
+``instrumentation``, which otherwise costs a single attribute lookup per
+command. Commands served from the client side cache, by an auto-pipeliner
+or by a multiplexed connection, as well as cluster commands, are only
+timed as a whole.
+
+Connection pools count the connections they open, close and hand out in a
+:class:`PoolStats`, returned by their ``stats()`` method along with how many
+connections are in use and idle, to size ``max_connections`` from data:
+
+    r.connection_pool.stats()["checkout_wait"]["p99_ns"]
+"""
+import math
+import threading
+import time
+
+try:
+    from time import perf_counter_ns
+except ImportError:  # Python 3.6
+
+    def perf_counter_ns():
+        return int(time.perf_counter() * 1e9)
+
+
+PHASES = ("checkout", "pack", "send", "wait", "parse", "callback")
+
+
+class ConnectionMeter:
+    """
+    The counters of an instrumented connection: bytes sent and received and
+    nanoseconds spent packing commands, sending them, waiting for replies and
+    reading them, waits included
+    """
+
+    __slots__ = (
+        "bytes_sent",
+        "bytes_received",
+        "pack_ns",
+        "send_ns",
+        "wait_ns",
+        "read_ns",
+    )
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.pack_ns = 0
+        self.send_ns = 0
+        self.wait_ns = 0
+        self.read_ns = 0
+
+    def snapshot(self):
+        return (
+            self.bytes_sent,
+            self.bytes_received,
+            self.pack_ns,
+            self.send_ns,
+            self.wait_ns,
+            self.read_ns,
+        )
+
+
+class MeteredSocket:
+    "Wraps a socket to time and count what is sent and received with it"
+
+    def __init__(self, sock, meter):
+        self._sock = sock
+        self._meter = meter
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def sendall(self, data, *args):
+        start = perf_counter_ns()
+        try:
+            self._sock.sendall(data, *args)
+        finally:
+            self._meter.send_ns += perf_counter_ns() - start
+        self._meter.bytes_sent += memoryview(data).nbytes
+
+    def sendmsg(self, buffers, *args):
+        start = perf_counter_ns()
+        try:
+            sent = self._sock.sendmsg(buffers, *args)
+        finally:
+            self._meter.send_ns += perf_counter_ns() - start
+        self._meter.bytes_sent += sent
+        return sent
+
+    def recv(self, *args):
+        start = perf_counter_ns()
+        try:
+            data = self._sock.recv(*args)
+        finally:
+            self._meter.wait_ns += perf_counter_ns() - start
+        self._meter.bytes_received += len(data)
+        return data
+
+    def recv_into(self, *args):
+        start = perf_counter_ns()
+        try:
+            received = self._sock.recv_into(*args)
+        finally:
+            self._meter.wait_ns += perf_counter_ns() - start
+        self._meter.bytes_received += received
+        return received
+
+
+class MeteredStreamReader:
+    "Wraps an asyncio.StreamReader to time and count what is read from it"
+
+    def __init__(self, reader, meter):
+        self._reader = reader
+        self._meter = meter
+
+    def __getattr__(self, name):
+        return getattr(self._reader, name)
+
+    async def _read(self, read, *args):
+        start = perf_counter_ns()
+        try:
+            data = await read(*args)
+        finally:
+            self._meter.wait_ns += perf_counter_ns() - start
+        self._meter.bytes_received += len(data)
+        return data
+
+    async def read(self, *args):
+        return await self._read(self._reader.read, *args)
+
+    async def readexactly(self, *args):
+        return await self._read(self._reader.readexactly, *args)
+
+    async def readline(self):
+        return await self._read(self._reader.readline)
+
+    async def readuntil(self, *args):
+        return await self._read(self._reader.readuntil, *args)
+
+
+class MeteredProtocol:
+    """
+    Wraps an asyncio.Protocol to count the data it receives and time its
+    parsing, which happens as the data arrives rather than while replies are
+    read. `ProtocolConnection` counts the rest of the time spent reading
+    replies as waiting.
+    """
+
+    def __init__(self, protocol, meter):
+        self._protocol = protocol
+        self._meter = meter
+
+    def __getattr__(self, name):
+        return getattr(self._protocol, name)
+
+    def data_received(self, data):
+        start = perf_counter_ns()
+        try:
+            self._protocol.data_received(data)
+        finally:
+            self._meter.read_ns += perf_counter_ns() - start
+        self._meter.bytes_received += len(data)
+
+
+def node_name(connection):
+    "The ``host:port`` or socket path ``connection`` is connected to, if any"
+    path = getattr(connection, "path", None)
+    if path:
+        return path
+    host = getattr(connection, "host", None)
+    if host is None:
+        return None
+    return f"{host}:{connection.port}"
+
+
+class CommandEvent:
+    """
+    A command, or a pipeline of ``commands`` commands, being run. Times are
+    in nanoseconds, as returned by ``perf_counter_ns()``. ``phases`` maps the
+    names of the phases that were measured to their duration.
+    """
+
+    __slots__ = (
+        "command",
+        "commands",
+        "node",
+        "start",
+        "end",
+        "phases",
+        "bytes_sent",
+        "bytes_received",
+        "error",
+        "_acquired",
+        "_meter",
+        "_snapshot",
+    )
+
+    def __init__(self, command, commands=1, node=None):
+        self.command = command
+        self.commands = commands
+        self.node = node
+        self.phases = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error = None
+        self.end = None
+        self._meter = None
+        self.start = perf_counter_ns()
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}<command={self.command},node={self.node},"
+            f"duration_ns={self.duration_ns}>"
+        )
+
+    @property
+    def duration_ns(self):
+        "How long the command took, once finished"
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def connection_acquired(self, connection):
+        "Called once the connection the command runs on is checked out"
+        self._acquired = perf_counter_ns()
+        self.phases["checkout"] = self._acquired - self.start
+        if self.node is None:
+            self.node = node_name(connection)
+        self._meter = getattr(connection, "meter", None)
+        if self._meter is not None:
+            self._snapshot = self._meter.snapshot()
+
+    def connection_released(self, connection):
+        "Called once done with the connection, before it's released"
+        if self._meter is None:
+            return
+        elapsed = perf_counter_ns() - self._acquired
+        sent, received, pack, send, wait, read = (
+            after - before
+            for after, before in zip(self._meter.snapshot(), self._snapshot)
+        )
+        self.bytes_sent += sent
+        self.bytes_received += received
+        phases = self.phases
+        phases["pack"] = pack
+        phases["send"] = send
+        phases["wait"] = wait
+        phases["parse"] = max(read - wait, 0)
+        phases["callback"] = max(elapsed - pack - send - read, 0)
+
+    def finish(self, error=None):
+        "Called once the command is done, failed with ``error`` or not"
+        self.end = perf_counter_ns()
+        self.error = error
+
+
+class Instrumentation:
+    """
+    The interface of instrumentations, whose hooks do nothing by default.
+
+    The hooks are called from the thread or task running the command, and
+    must be quick and never raise. The same event is passed to the before
+    and after hooks, which may keep their own data in a dict keyed by it.
+    """
+
+    def __deepcopy__(self, memo):
+        # shared, not copied: see NodesManager.initialize()
+        return self
+
+    def before_command(self, event):
+        pass
+
+    def after_command(self, event):
+        pass
+
+    def before_pipeline(self, event):
+        pass
+
+    def after_pipeline(self, event):
+        pass
+
+
+class LatencyHistogram:
+    """
+    A histogram of durations in nanoseconds, or any other non-negative
+    integers, in the manner of HdrHistogram: values below
+    ``2 ** (precision + 1)`` are counted exactly, and larger ones in buckets
+    whose width grows with them, so that percentiles are accurate to within
+    ``2 ** -precision`` (under 1% with the default precision of 7) while
+    recording takes constant time and the histogram takes little space.
+
+    Histograms aren't thread-safe, `CommandStats` records to them under a
+    lock.
+    """
+
+    def __init__(self, precision=7):
+        self.precision = precision
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}<count={self.count},"
+            f"p50={self.percentile(0.5)},max={self.max}>"
+        )
+
+    def _index(self, value):
+        shift = value.bit_length() - self.precision - 1
+        if shift <= 0:
+            return value
+        return (shift << self.precision) + (value >> shift)
+
+    def _value(self, index):
+        "The middle of the bucket ``index``"
+        shift = (index >> self.precision) - 1
+        if shift <= 0:
+            return index
+        low = (index - (shift << self.precision)) << shift
+        return low + (1 << shift) // 2
+
+    def record(self, value, count=1):
+        "Record ``value``, ``count`` times"
+        value = max(int(value), 0)
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        "Add the values recorded by ``other``, of the same precision, to these"
+        if other.precision != self.precision:
+            raise ValueError("Can't merge histograms of different precisions")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, fraction):
+        """
+        The nearest-rank percentile ``fraction``, between 0 and 1, of the
+        values recorded, or None if there are none
+        """
+        if not self.count:
+            return None
+        rank = min(max(math.ceil(fraction * self.count), 1), self.count)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ns": self.mean(),
+            "min_ns": self.min,
+            "p50_ns": self.percentile(0.5),
+            "p99_ns": self.percentile(0.99),
+            "p999_ns": self.percentile(0.999),
+            "max_ns": self.max,
+        }
+
+
+class CommandStats(Instrumentation):
+    """
+    Aggregates the events of finished commands and pipelines into latency
+    histograms keyed by command name and node, and per phase, and counts
+    the bytes sent and received and the errors per command and node.
+    Pipelines are keyed as PIPELINE, or MULTI for transactions.
+
+    May be shared by any number of clients, sync or asyncio, from any
+    thread.
+    """
+
+    def __init__(self, precision=7):
+        self.precision = precision
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        "Forget everything recorded so far"
+        with self._lock:
+            # (command, node) -> LatencyHistogram
+            self.latencies = {}
+            # phase -> LatencyHistogram
+            self.phases = {}
+            # (command, node) -> number of failures
+            self.errors = {}
+            self.bytes_sent = 0
+            self.bytes_received = 0
+
+    def after_command(self, event):
+        self.record(event)
+
+    def after_pipeline(self, event):
+        self.record(event)
+
+    def record(self, event):
+        "Add a finished ``event`` to the statistics"
+        key = (event.command, event.node)
+        with self._lock:
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = LatencyHistogram(self.precision)
+            histogram.record(event.duration_ns)
+            for phase, duration in event.phases.items():
+                histogram = self.phases.get(phase)
+                if histogram is None:
+                    histogram = LatencyHistogram(self.precision)
+                    self.phases[phase] = histogram
+                histogram.record(duration)
+            if event.error is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            self.bytes_sent += event.bytes_sent
+            self.bytes_received += event.bytes_received
+
+    def histogram(self, command=None, node=None):
+        """
+        The latencies of ``command`` on ``node``, or on every node when not
+        given, or of every command when ``command`` isn't given either
+        """
+        merged = LatencyHistogram(self.precision)
+        with self._lock:
+            for (name, name_node), histogram in self.latencies.items():
+                if command is not None and name != command:
+                    continue
+                if node is not None and name_node != node:
+                    continue
+                merged.merge(histogram)
+        return merged
+
+    def summary(self):
+        """
+        Return a dict mapping (command, node) tuples to the count, mean,
+        percentiles and extremes of their latencies and their errors, and
+        ("phase", name) tuples to those of every phase
+        """
+        with self._lock:
+            summary = {}
+            for key, histogram in self.latencies.items():
+                summary[key] = histogram.summary()
+                summary[key]["errors"] = self.errors.get(key, 0)
+            for phase in PHASES:
+                if phase in self.phases:
+                    summary[("phase", phase)] = self.phases[phase].summary()
+            return summary
+
+
+# what a pooled connection was disconnected by, when it reconnects
+RECONNECT_CAUSES = ("error", "health_check", "stale")
+
+
+class PoolStats:
+    """
+    The counters of a connection pool, which its connections report to
+    through their ``pool_stats`` attribute: the sockets they opened and
+    closed, why they reconnected, the checkouts of connections from the pool
+    with the time they waited for one, the checkouts which timed out, and
+    the background health checks of idle connections, with their latency,
+    and those which failed, and the connections which went on using their
+    socket after a timeout, once the replies left unread were drained, and
+    those which couldn't.
+
+    Reconnects are counted by cause: ``error`` when the connection was
+    dropped after failing to send or read, ``health_check`` when a health
+    check failed, and ``stale`` when the pool found the server closed it
+    while idle. Reconnecting after an explicit ``disconnect()`` isn't counted.
+    """
+
+    def __init__(self, precision=7):
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_destroyed = 0
+        self.reconnects = dict.fromkeys(RECONNECT_CAUSES, 0)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_wait = LatencyHistogram(precision)
+        self.health_checks = LatencyHistogram(precision)
+        self.health_check_failures = 0
+        self.drains = 0
+        self.drain_failures = 0
+
+    def connection_opened(self, reconnect_cause=None):
+        with self._lock:
+            self.connections_created += 1
+            if reconnect_cause in self.reconnects:
+                self.reconnects[reconnect_cause] += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.connections_destroyed += 1
+
+    def checked_out(self, wait_ns):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait.record(wait_ns)
+
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def health_checked(self, duration_ns):
+        with self._lock:
+            self.health_checks.record(duration_ns)
+
+    def health_check_failed(self):
+        with self._lock:
+            self.health_check_failures += 1
+
+    def connection_drained(self):
+        with self._lock:
+            self.drains += 1
+
+    def drain_failed(self):
+        with self._lock:
+            self.drain_failures += 1
+
+    def snapshot(self):
+        "Return the counters as a dict, the latencies summarized"
+        with self._lock:
+            return {
+                "connections_created": self.connections_created,
+                "connections_destroyed": self.connections_destroyed,
+                "reconnects": dict(self.reconnects),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "checkout_wait": self.checkout_wait.summary(),
+                "health_checks": self.health_checks.summary(),
+                "health_check_failures": self.health_check_failures,
+                "drains": self.drains,
+                "drain_failures": self.drain_failures,
+            }
@@ -14,6 +14,8 @@ from redis.connection import parse_url
 from redis.exceptions import RedisClusterException
 from redis.retry import Retry
 
+from .stand_in_server import StandInServer
+
 REDIS_INFO = {}
 default_redis_url = "redis://localhost:6379/9"
 default_redismod_url = "redis://localhost:36379"
@@ -443,6 +445,20 @@ def unstable_r(request):
         yield client
 
 
+@pytest.fixture()
+def stand_in_server(request):
+    """
+    A StandInServer listening on TCP and on a unix socket. Test classes can
+    set the options of the server in ``server_options``, and tests can pass
+    them as the parameter of the fixture, with indirect parametrization.
+    """
+    options = {"unix_socket_path": True}
+    options.update(getattr(request.cls, "server_options", {}))
+    options.update(getattr(request, "param", {}))
+    with StandInServer(**options) as server:
+        yield server
+
+
 def wait_for_command(client, monitor, command, key=None):
     # issue a command with a key name that's local to this process.
     # if we find a command with our key before the command we're waiting
@@ -0,0 +1,654 @@
+"""
+An in-process stand-in for a Redis server, to run benchmarks and
+performance tests where no Redis server is available.
+
+StandInServer speaks RESP2 over TCP and unix sockets from a background
+thread, answering a small subset of the Redis commands from an in-memory
+dict. StandInCluster runs several of them as the nodes of a cluster, which
+redirect commands with MOVED and ASK errors like Redis Cluster does.
+
+    with StandInServer() as server:
+        r = redis.Redis(port=server.port)
+        r.set("foo", "bar")
+
+The stand-in only implements what clients need to be measured: replies are
+canned where Redis would do some work, command options are ignored, and
+there are no expiries, persistence or replication.
+"""
+import os
+import selectors
+import socket
+import tempfile
+import threading
+import time
+
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS, key_slot
+
+CRLF = b"\r\n"
+
+
+class ReplyError(Exception):
+    "An error reply, such as ReplyError('ERR no such key')"
+
+
+class Replies(list):
+    "Several replies sent for a single command, like SUBSCRIBE does"
+
+
+def encode_reply(reply):
+    """
+    Encode a reply: bytes are bulk strings, str are simple strings, ints
+    are integers, None is the null bulk string, lists and tuples are arrays
+    and ReplyError instances are errors
+    """
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, bool):
+        return b":%d\r\n" % int(reply)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, (list, tuple)):
+        return b"*%d\r\n%s" % (len(reply), b"".join(map(encode_reply, reply)))
+    if isinstance(reply, ReplyError):
+        return b"-%s\r\n" % str(reply).encode()
+    raise TypeError(f"Can't encode a {type(reply).__name__} reply")
+
+
+def parse_command(buffer, pos=0):
+    """
+    Parse the command starting at ``pos`` in ``buffer``. Return its
+    arguments and the position following it, or None if the command is
+    still incomplete.
+    """
+    if buffer[pos : pos + 1] != b"*":
+        raise ReplyError("ERR Protocol error: expected '*'")
+    end = buffer.find(CRLF, pos)
+    if end == -1:
+        return None
+    argc = int(buffer[pos + 1 : end])
+    pos = end + 2
+    args = []
+    for _ in range(argc):
+        end = buffer.find(CRLF, pos)
+        if end == -1:
+            return None
+        start = end + 2
+        stop = start + int(buffer[pos + 1 : end])
+        if len(buffer) < stop + 2:
+            return None
+        args.append(bytes(buffer[start:stop]))
+        pos = stop + 2
+    return args, pos
+
+
+# the arity, flags and key positions of the commands answered, as returned
+# by the COMMAND command
+COMMANDS = {
+    "ASKING": (1, ["fast"], 0, 0, 0),
+    "CLIENT": (-2, ["admin", "noscript", "loading", "stale"], 0, 0, 0),
+    "CLUSTER": (-2, ["admin", "random", "stale"], 0, 0, 0),
+    "COMMAND": (-1, ["random", "loading", "stale"], 0, 0, 0),
+    "DBSIZE": (1, ["readonly", "fast"], 0, 0, 0),
+    "DEL": (-2, ["write"], 1, -1, 1),
+    "DISCARD": (1, ["noscript", "loading", "stale", "fast"], 0, 0, 0),
+    "ECHO": (2, ["fast"], 0, 0, 0),
+    "EXEC": (1, ["noscript", "loading", "stale", "skip_slowlog"], 0, 0, 0),
+    "EXISTS": (-2, ["readonly", "fast"], 1, -1, 1),
+    "FLUSHALL": (-1, ["write"], 0, 0, 0),
+    "FLUSHDB": (-1, ["write"], 0, 0, 0),
+    "GET": (2, ["readonly", "fast"], 1, 1, 1),
+    "HGET": (3, ["readonly", "fast"], 1, 1, 1),
+    "HGETALL": (2, ["readonly", "random"], 1, 1, 1),
+    "HSET": (-4, ["write", "denyoom", "fast"], 1, 1, 1),
+    "INCR": (2, ["write", "denyoom", "fast"], 1, 1, 1),
+    "INCRBY": (3, ["write", "denyoom", "fast"], 1, 1, 1),
+    "INFO": (-1, ["random", "loading", "stale"], 0, 0, 0),
+    "LPUSH": (-3, ["write", "denyoom", "fast"], 1, 1, 1),
+    "LRANGE": (4, ["readonly"], 1, 1, 1),
+    "MGET": (-2, ["readonly", "fast"], 1, -1, 1),
+    "MSET": (-3, ["write", "denyoom"], 1, -1, 2),
+    "MULTI": (1, ["noscript", "loading", "stale", "fast"], 0, 0, 0),
+    "PING": (-1, ["stale", "fast"], 0, 0, 0),
+    "PUBLISH": (3, ["pubsub", "loading", "stale", "fast"], 0, 0, 0),
+    "READONLY": (1, ["fast"], 0, 0, 0),
+    "RPUSH": (-3, ["write", "denyoom", "fast"], 1, 1, 1),
+    "SELECT": (2, ["loading", "stale", "fast"], 0, 0, 0),
+    "SET": (-3, ["write", "denyoom"], 1, 1, 1),
+    "SUBSCRIBE": (-2, ["pubsub", "noscript", "loading", "stale"], 0, 0, 0),
+    "UNSUBSCRIBE": (-1, ["pubsub", "noscript", "loading", "stale"], 0, 0, 0),
+    "UNWATCH": (1, ["noscript", "fast"], 0, 0, 0),
+    "WATCH": (-2, ["noscript", "fast"], 1, -1, 1),
+}
+
+# commands run as soon as they are received in a MULTI block
+TRANSACTION_COMMANDS = {"DISCARD", "EXEC", "MULTI", "WATCH"}
+
+
+class _Client:
+    "The state of a connection to the stand-in"
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.input = bytearray()
+        self.output = bytearray()
+        self.transaction = None
+        self.asking = False
+        self.channels = set()
+        # the output is held back until then
+        self.send_at = 0
+
+
+class StandInServer:
+    """
+    A RESP2 server answering a subset of the Redis commands (see COMMANDS)
+    from a background thread.
+
+    It listens on ``host``:``port``, a free port by default, and on a unix
+    socket when ``unix_socket_path`` is set (``True`` picks a temporary
+    path). ``commands`` restricts the commands answered to the given names,
+    any other one gets an "unknown command" error. ``replies`` maps command
+    names to canned replies (see ``encode_reply()``), or to callables
+    returning the reply for the command's arguments, which are answered
+    instead of running the commands. Large values can be served by filling
+    ``data`` directly. ``delays`` maps command names to the seconds their
+    replies are held back, with those to the commands sent after them, like
+    a slow server would.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        unix_socket_path=None,
+        commands=None,
+        replies=None,
+        delays=None,
+    ):
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.commands = None
+        if commands is not None:
+            self.commands = {name.upper() for name in commands}
+        self.replies = {name.upper(): r for name, r in (replies or {}).items()}
+        self.delays = {name.upper(): d for name, d in (delays or {}).items()}
+        self.data = {}
+        # channel -> subscribed clients
+        self.channels = {}
+        self.commands_processed = 0
+        self.node_id = os.urandom(20).hex()
+        self.cluster = None
+        # held while running commands, shared by the nodes of a cluster
+        self.lock = threading.Lock()
+        self._selector = None
+        self._thread = None
+        self._listeners = []
+        self._waker = None
+        self._stopping = False
+        # clients with output held back
+        self._held = set()
+
+    def __repr__(self):
+        return f"{type(self).__name__}<{self.host}:{self.port}>"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        "Start listening and answering commands in a background thread"
+        self._selector = selectors.DefaultSelector()
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen()
+        self.port = listener.getsockname()[1]
+        self._listeners.append(listener)
+        if self.unix_socket_path is not None:
+            if self.unix_socket_path is True:
+                self.unix_socket_path = os.path.join(
+                    tempfile.mkdtemp(), f"stand-in-{self.port}.sock"
+                )
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.unix_socket_path)
+            listener.listen()
+            self._listeners.append(listener)
+        for listener in self._listeners:
+            listener.setblocking(False)
+            self._selector.register(listener, selectors.EVENT_READ, "accept")
+        self._waker, waker = socket.socketpair()
+        self._selector.register(waker, selectors.EVENT_READ, "wake")
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._serve, args=(waker,), name=repr(self), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        "Stop the server and close its connections"
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._waker.send(b"x")
+        self._thread.join()
+        self._thread = None
+        self._waker.close()
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+        self._listeners = []
+        if self.unix_socket_path is not None:
+            try:
+                os.unlink(self.unix_socket_path)
+            except FileNotFoundError:
+                pass
+
+    def _serve(self, waker):
+        selector = self._selector
+        while not self._stopping:
+            timeout = None
+            if self._held:
+                next_send = min(client.send_at for client in self._held)
+                timeout = max(next_send - time.monotonic(), 0)
+            for key, events in selector.select(timeout):
+                if key.data == "accept":
+                    self._accept(key.fileobj)
+                elif key.data == "wake":
+                    waker.recv(1)
+                else:
+                    self._handle(key.data, events)
+            now = time.monotonic()
+            for client in [c for c in self._held if c.send_at <= now]:
+                self._held.discard(client)
+                self._handle(client, 0)
+
+    def _accept(self, listener):
+        try:
+            sock, _ = listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        if sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._selector.register(sock, selectors.EVENT_READ, _Client(sock))
+
+    def _handle(self, client, events):
+        try:
+            if events & selectors.EVENT_READ:
+                data = client.sock.recv(65536)
+                if not data:
+                    self._close(client)
+                    return
+                client.input += data
+                self._process(client)
+            self._flush(client)
+        except (ConnectionError, ReplyError):
+            self._close(client)
+
+    def _process(self, client):
+        pos = 0
+        while pos < len(client.input):
+            try:
+                parsed = parse_command(client.input, pos)
+            except ReplyError as e:
+                client.output += encode_reply(e)
+                raise
+            if parsed is None:
+                break
+            args, pos = parsed
+            delay = self.delays.get(args[0].upper().decode())
+            if delay:
+                client.send_at = time.monotonic() + delay
+            with self.lock:
+                reply = self.execute(client, args)
+            if isinstance(reply, Replies):
+                client.output += b"".join(map(encode_reply, reply))
+            else:
+                client.output += encode_reply(reply)
+        del client.input[:pos]
+
+    def _flush(self, client):
+        held = client.send_at > time.monotonic()
+        if held:
+            self._held.add(client)
+        elif client.output:
+            sent = client.sock.send(client.output)
+            del client.output[:sent]
+        events = selectors.EVENT_READ
+        if client.output and not held:
+            events |= selectors.EVENT_WRITE
+        self._selector.modify(client.sock, events, client)
+
+    def _close(self, client):
+        self._held.discard(client)
+        self._selector.unregister(client.sock)
+        client.sock.close()
+        with self.lock:
+            self._unsubscribe(client, [b"UNSUBSCRIBE"])
+
+    def execute(self, client, args):
+        "Return the reply to the command ``args`` sent by ``client``"
+        self.commands_processed += 1
+        name = args[0].upper().decode()
+        asking = client.asking
+        client.asking = False
+        if name in self.replies:
+            reply = self.replies[name]
+            return reply(args) if callable(reply) else reply
+        if name not in COMMANDS or (
+            self.commands is not None and name not in self.commands
+        ):
+            return ReplyError(f"ERR unknown command '{args[0].decode()}'")
+        arity = COMMANDS[name][0]
+        if len(args) != arity if arity > 0 else len(args) < -arity:
+            return ReplyError(
+                f"ERR wrong number of arguments for '{name.lower()}' command"
+            )
+        if self.cluster is not None:
+            error = self.cluster.redirect(self, name, args, asking)
+            if error is not None:
+                return error
+        if client.transaction is not None and name not in TRANSACTION_COMMANDS:
+            client.transaction.append(args)
+            return "QUEUED"
+        try:
+            return getattr(self, f"_{name.lower()}")(client, args)
+        except ReplyError as e:
+            return e
+
+    def _asking(self, client, args):
+        client.asking = True
+        return "OK"
+
+    def _client(self, client, args):
+        if args[1].upper() == b"ID":
+            return id(client)
+        return "OK"
+
+    def _cluster(self, client, args):
+        if self.cluster is None:
+            raise ReplyError("ERR This instance has cluster support disabled")
+        subcommand = args[1].upper()
+        if subcommand == b"SLOTS":
+            return self.cluster.slots()
+        if subcommand == b"KEYSLOT":
+            return key_slot(args[2])
+        if subcommand == b"INFO":
+            return b"cluster_state:ok\r\ncluster_slots_assigned:16384\r\n"
+        raise ReplyError(f"ERR unknown subcommand '{args[1].decode()}'")
+
+    def _command(self, client, args):
+        return [
+            [name.lower().encode(), arity, flags, first, last, step]
+            for name, (arity, flags, first, last, step) in COMMANDS.items()
+        ]
+
+    def _dbsize(self, client, args):
+        return len(self.data)
+
+    def _del(self, client, args):
+        return sum(self.data.pop(key, None) is not None for key in args[1:])
+
+    def _discard(self, client, args):
+        if client.transaction is None:
+            raise ReplyError("ERR DISCARD without MULTI")
+        client.transaction = None
+        return "OK"
+
+    def _echo(self, client, args):
+        return args[1]
+
+    def _exec(self, client, args):
+        if client.transaction is None:
+            raise ReplyError("ERR EXEC without MULTI")
+        commands, client.transaction = client.transaction, None
+        return [self.execute(client, command) for command in commands]
+
+    def _exists(self, client, args):
+        return sum(key in self.data for key in args[1:])
+
+    def _flushall(self, client, args):
+        self.data.clear()
+        return "OK"
+
+    _flushdb = _flushall
+
+    def _get(self, client, args):
+        return self._get_value(args[1], bytes)
+
+    def _hget(self, client, args):
+        return self._get_value(args[1], dict, {}).get(args[2])
+
+    def _hgetall(self, client, args):
+        hash = self._get_value(args[1], dict, {})
+        return [item for pair in hash.items() for item in pair]
+
+    def _hset(self, client, args):
+        if len(args) % 2:
+            raise ReplyError("ERR wrong number of arguments for 'hset' command")
+        hash = self._get_value(args[1], dict, {})
+        added = sum(field not in hash for field in args[2::2])
+        hash.update(zip(args[2::2], args[3::2]))
+        self.data[args[1]] = hash
+        return added
+
+    def _incr(self, client, args):
+        return self._incrby(client, [*args, b"1"])
+
+    def _incrby(self, client, args):
+        try:
+            value = int(self._get_value(args[1], bytes, b"0")) + int(args[2])
+        except ValueError:
+            raise ReplyError("ERR value is not an integer or out of range")
+        self.data[args[1]] = b"%d" % value
+        return value
+
+    def _info(self, client, args):
+        return (
+            b"# Server\r\nredis_version:7.0.0\r\nredis_mode:%s\r\n"
+            b"# Cluster\r\ncluster_enabled:%d\r\n"
+            % (
+                b"standalone" if self.cluster is None else b"cluster",
+                self.cluster is not None,
+            )
+        )
+
+    def _lpush(self, client, args):
+        items = self._get_value(args[1], list, [])
+        items[:0] = reversed(args[2:])
+        self.data[args[1]] = items
+        return len(items)
+
+    def _lrange(self, client, args):
+        items = self._get_value(args[1], list, [])
+        start, stop = int(args[2]), int(args[3])
+        if stop == -1:
+            return items[start:]
+        return items[start : stop + 1]
+
+    def _mget(self, client, args):
+        return [
+            value if isinstance(value, bytes) else None
+            for value in map(self.data.get, args[1:])
+        ]
+
+    def _mset(self, client, args):
+        if len(args) % 2 == 0:
+            raise ReplyError("ERR wrong number of arguments for 'mset' command")
+        self.data.update(zip(args[1::2], args[2::2]))
+        return "OK"
+
+    def _multi(self, client, args):
+        if client.transaction is not None:
+            raise ReplyError("ERR MULTI calls can not be nested")
+        client.transaction = []
+        return "OK"
+
+    def _ping(self, client, args):
+        return args[1] if len(args) > 1 else "PONG"
+
+    def _publish(self, client, args):
+        message = encode_reply([b"message", args[1], args[2]])
+        subscribers = self.channels.get(args[1], ())
+        for subscriber in subscribers:
+            subscriber.output += message
+            # sent once the subscriber's socket is writable
+            self._selector.modify(
+                subscriber.sock,
+                selectors.EVENT_READ | selectors.EVENT_WRITE,
+                subscriber,
+            )
+        return len(subscribers)
+
+    def _readonly(self, client, args):
+        return "OK"
+
+    def _rpush(self, client, args):
+        items = self._get_value(args[1], list, [])
+        items.extend(args[2:])
+        self.data[args[1]] = items
+        return len(items)
+
+    def _select(self, client, args):
+        return "OK"
+
+    def _set(self, client, args):
+        self.data[args[1]] = args[2]
+        return "OK"
+
+    def _subscribe(self, client, args):
+        replies = Replies()
+        for channel in args[1:]:
+            client.channels.add(channel)
+            self.channels.setdefault(channel, set()).add(client)
+            replies.append([b"subscribe", channel, len(client.channels)])
+        return replies
+
+    def _unsubscribe(self, client, args):
+        replies = Replies()
+        for channel in args[1:] or sorted(client.channels):
+            client.channels.discard(channel)
+            subscribers = self.channels.get(channel, set())
+            subscribers.discard(client)
+            if not subscribers:
+                self.channels.pop(channel, None)
+            replies.append([b"unsubscribe", channel, len(client.channels)])
+        if not replies:
+            replies.append([b"unsubscribe", None, 0])
+        return replies
+
+    def _unwatch(self, client, args):
+        return "OK"
+
+    _watch = _unwatch
+
+    def _get_value(self, key, type, default=None):
+        value = self.data.get(key, default)
+        if value is not None and not isinstance(value, type):
+            raise ReplyError(
+                "WRONGTYPE Operation against a key holding the wrong kind of value"
+            )
+        return value
+
+
+class StandInCluster:
+    """
+    ``nodes`` StandInServer instances sharing the hash slots of a cluster,
+    evenly split between them.
+
+    Commands sent to a node for keys of a slot it doesn't own get a MOVED
+    error pointing at the owner. While a slot is being migrated with
+    migrate_slot(), its owner answers commands for keys it doesn't hold with
+    an ASK error pointing at the node importing the slot, which only serves
+    them after ASKING. move_slot() completes the migration. Messages are
+    only delivered to the clients subscribed to the node they were published
+    on.
+    """
+
+    def __init__(self, nodes=3, host="127.0.0.1", **kwargs):
+        self.nodes = [StandInServer(host=host, **kwargs) for _ in range(nodes)]
+        self.lock = threading.Lock()
+        for node in self.nodes:
+            node.cluster = self
+            node.lock = self.lock
+        per_node = -(-REDIS_CLUSTER_HASH_SLOTS // nodes)
+        self.owners = [
+            self.nodes[slot // per_node] for slot in range(REDIS_CLUSTER_HASH_SLOTS)
+        ]
+        # slot -> node importing it
+        self.migrating = {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        for node in self.nodes:
+            node.start()
+        return self
+
+    def stop(self):
+        for node in self.nodes:
+            node.stop()
+
+    @property
+    def startup_nodes(self):
+        "The (host, port) pairs of the nodes"
+        return [(node.host, node.port) for node in self.nodes]
+
+    def slots(self):
+        "The reply to CLUSTER SLOTS"
+        ranges = []
+        for slot, node in enumerate(self.owners):
+            if ranges and ranges[-1][2] is node and ranges[-1][1] == slot - 1:
+                ranges[-1][1] = slot
+            else:
+                ranges.append([slot, slot, node])
+        return [
+            [start, end, [node.host.encode(), node.port, node.node_id.encode()]]
+            for start, end, node in ranges
+        ]
+
+    def migrate_slot(self, slot, node):
+        "Start migrating ``slot`` to ``node``, redirecting with ASK errors"
+        with self.lock:
+            self.migrating[slot] = node
+
+    def move_slot(self, slot, node):
+        "Give ``slot`` and its keys to ``node``, redirecting with MOVED errors"
+        with self.lock:
+            owner = self.owners[slot]
+            for key in [key for key in owner.data if key_slot(key) == slot]:
+                node.data[key] = owner.data.pop(key)
+            self.owners[slot] = node
+            self.migrating.pop(slot, None)
+
+    def redirect(self, node, name, args, asking):
+        "Return the error redirecting a command sent to ``node``, if any"
+        arity, flags, first, last, step = COMMANDS[name]
+        if not first:
+            return None
+        stop = len(args) + last + 1 if last < 0 else last + 1
+        keys = args[first:stop:step]
+        slots = {key_slot(key) for key in keys}
+        if len(slots) > 1:
+            return ReplyError("CROSSSLOT Keys in request don't hash to the same slot")
+        slot = slots.pop()
+        owner = self.owners[slot]
+        importing = self.migrating.get(slot)
+        if owner is not node:
+            if asking and importing is node:
+                return None
+            return ReplyError(f"MOVED {slot} {owner.host}:{owner.port}")
+        if importing is not None and not all(key in node.data for key in keys):
+            return ReplyError(f"ASK {slot} {importing.host}:{importing.port}")
+        return None
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+import redis.asyncio as redis
+from redis.asyncio.connection import ProtocolConnection
+from redis.capture import (
+    CONNECT,
+    DISCONNECT,
+    RECEIVE,
+    SEND,
+    TrafficRecorder,
+    read_capture,
+)
+from tests.stand_in_server import StandInServer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.parametrize("connection_class", [redis.Connection, ProtocolConnection])
+async def test_record_traffic(connection_class):
+    file = io.BytesIO()
+    with StandInServer() as server, TrafficRecorder(file) as recorder:
+        pool = redis.ConnectionPool(
+            connection_class=connection_class, port=server.port, recorder=recorder
+        )
+        r = redis.Redis(connection_pool=pool)
+        await r.set("a", "1")
+        assert await r.get("a") == b"1"
+        await pool.disconnect()
+    file.seek(0)
+    records = list(read_capture(file))
+    assert [record.kind for record in records if record.kind != RECEIVE] == [
+        CONNECT,
+        SEND,
+        SEND,
+        DISCONNECT,
+    ]
+    assert b"".join(r.data for r in records if r.kind == RECEIVE) == (
+        b"+OK\r\n$1\r\n1\r\n"
+    )
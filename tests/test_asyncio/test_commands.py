@@ -3,6 +3,7 @@ Tests async overrides of commands from their mixins
 """
 import binascii
 import datetime
+import io
 import re
 import sys
 import time
@@ -822,6 +823,32 @@ class TestRedisCommands:
         assert await r.get("integer") == str(integer).encode()
         assert (await r.get("unicode_string")).decode("utf-8") == unicode_string
 
+    async def test_get_into_and_stream_get(self, r: redis.Redis):
+        value = bytes(range(256)) * 1000
+        await r.set("a", value)
+        buffer = bytearray(len(value))
+        assert await r.get_into("a", buffer) == len(value)
+        assert buffer == value
+        with pytest.raises(redis.DataError):
+            await r.get_into("a", bytearray(10))
+        f = io.BytesIO()
+        assert await r.stream_get("a", f, chunk_size=1000) == len(value)
+        assert f.getvalue() == value
+        assert await r.stream_get("missing", f) is None
+
+    @pytest.mark.onlynoncluster
+    @pytest.mark.parametrize("transaction", [True, False])
+    async def test_get_into_pipeline(self, r: redis.Redis, transaction):
+        await r.set("a", "foo")
+        buffer = bytearray(3)
+        f = io.BytesIO()
+        pipe = r.pipeline(transaction=transaction)
+        pipe.get_into("a", buffer).stream_get("a", f).get("a")
+        pipe.get_into("missing", buffer)
+        assert await pipe.execute() == [3, 3, b"foo", None]
+        assert buffer == b"foo"
+        assert f.getvalue() == b"foo"
+
     async def test_get_set_bit(self, r: redis.Redis):
         # no value
         assert not await r.getbit("a", 5)
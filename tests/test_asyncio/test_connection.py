@@ -1,10 +1,22 @@
 import asyncio
+import io
 import types
 
 import pytest
 
-from redis.asyncio.connection import PythonParser, UnixDomainSocketConnection
-from redis.exceptions import InvalidResponse
+from redis.asyncio.connection import (
+    BytearraySocketBuffer,
+    Connection,
+    Encoder,
+    ProtocolParser,
+    PythonParser,
+    PythonReader,
+    SocketBuffer,
+    TransportProtocol,
+    UnixDomainSocketConnection,
+)
+from redis.connection import BufferSink, FileSink
+from redis.exceptions import ConnectionError, DataError, InvalidResponse, ResponseError
 from redis.utils import HIREDIS_AVAILABLE
 from tests.conftest import skip_if_server_version_lt
 
@@ -60,3 +72,163 @@ async def test_socket_param_regression(r):
 async def test_can_run_concurrent_commands(r):
     assert await r.ping() is True
     assert all(await asyncio.gather(*(r.ping() for _ in range(10))))
+
+
+async def test_bytearray_socket_buffer():
+    class BytearrayPythonParser(PythonParser):
+        socket_buffer_class = BytearraySocketBuffer
+
+    stream = asyncio.StreamReader()
+    stream.feed_data(b"*2\r\n$5\r\nhello\r\n:7\r")
+    stream.feed_data(b"\n$600\r\n" + b"x" * 600 + b"\r\n")
+    connection = mock.Mock(
+        _reader=stream, socket_timeout=None, encoder=Encoder("utf-8", "strict", False)
+    )
+    parser = BytearrayPythonParser(socket_read_size=8)
+    parser.on_connect(connection)
+    assert await parser.read_response() == [b"hello", 7]
+    assert await parser.read_response() == b"x" * 600
+    assert parser._buffer.length == 0
+
+
+@pytest.mark.parametrize("buffer_class", [SocketBuffer, BytearraySocketBuffer])
+async def test_python_parser_read_response_into(buffer_class):
+    class Parser(PythonParser):
+        socket_buffer_class = buffer_class
+
+    value = bytes(range(100))
+    stream = asyncio.StreamReader()
+    stream.feed_data(b"$100\r\n" + value[:10])
+    stream.feed_data(value[10:] + b"\r\n$-1\r\n+OK\r\n")
+    connection = mock.Mock(
+        _reader=stream, socket_timeout=None, encoder=Encoder("utf-8", "strict", True)
+    )
+    parser = Parser(socket_read_size=16)
+    parser.on_connect(connection)
+    f = io.BytesIO()
+    assert await parser.read_response_into(FileSink(f, chunk_size=7)) == 100
+    assert f.getvalue() == value
+    sink = BufferSink(bytearray(10))
+    assert await parser.read_response_into(sink) is None
+    assert await parser.read_response() == "OK"
+
+
+@pytest.mark.parametrize("buffer_class", [SocketBuffer, BytearraySocketBuffer])
+async def test_python_parser_nested_multi_bulk(buffer_class):
+    class Parser(PythonParser):
+        socket_buffer_class = buffer_class
+
+    depth = 2000
+    stream = asyncio.StreamReader()
+    stream.feed_data(b"*1\r\n" * depth + b"*3\r\n-ERR bad\r\n*-1\r\n$1\r\n")
+    stream.feed_data(b"x\r\n")
+    connection = mock.Mock(
+        _reader=stream, socket_timeout=None, encoder=Encoder("utf-8", "strict", True)
+    )
+    parser = Parser(socket_read_size=65536)
+    parser.on_connect(connection)
+    response = await parser.read_response()
+    for _ in range(depth):
+        response = response[0]
+    assert isinstance(response[0], ResponseError)
+    assert response[1:] == [None, "x"]
+
+
+async def test_python_parser_resp3():
+    stream = asyncio.StreamReader()
+    stream.feed_data(
+        b"%2\r\n+a\r\n,1.5\r\n+b\r\n~1\r\n#t\r\n"
+        b">2\r\n$10\r\ninvalidate\r\n_\r\n=7\r\ntxt:foo\r\n"
+    )
+    connection = mock.Mock(
+        _reader=stream, socket_timeout=None, encoder=Encoder("utf-8", "strict", True)
+    )
+    parser = PythonParser(socket_read_size=65536)
+    parser.on_connect(connection)
+    pushes = []
+    parser.set_push_handler(pushes.append)
+    assert await parser.read_response() == {"a": 1.5, "b": {True}}
+    assert await parser.read_response() == "foo"
+    assert pushes == [["invalidate", None]]
+
+
+def test_python_reader_incremental():
+    data = (
+        b"*3\r\n$3\r\nfoo\r\n*2\r\n:1\r\n-ERR bad\r\n%1\r\n+k\r\n_\r\n"
+        b"$-1\r\n+OK\r\n"
+    )
+    reader = PythonReader()
+    replies = []
+    for i in range(len(data)):
+        reader.feed(data[i : i + 1])
+        reply = reader.gets()
+        while reply is not False:
+            replies.append(reply)
+            reply = reader.gets()
+    first, second, third = replies
+    assert first[:2] == [b"foo", [1, mock.ANY]]
+    assert isinstance(first[1][1], ResponseError)
+    assert first[2] == {b"k": None}
+    assert second is None
+    assert third == b"OK"
+
+
+def test_invalid_protocol():
+    with pytest.raises(DataError):
+        Connection(protocol=4)
+    with pytest.raises(DataError):
+        UnixDomainSocketConnection(protocol=1)
+
+
+def test_python_reader_protocol_error():
+    reader = PythonReader()
+    reader.feed(b"x\r\n")
+    with pytest.raises(InvalidResponse):
+        reader.gets()
+
+
+async def test_protocol_parser_delivers_replies_in_order():
+    parser = ProtocolParser(socket_read_size=65536)
+    parser.on_connect(mock.Mock(protocol=2, encoder=Encoder("utf-8", "strict", True)))
+    parser.connection_made(mock.Mock())
+    first = asyncio.ensure_future(parser.read_response())
+    second = asyncio.ensure_future(parser.read_response(disable_decoding=True))
+    await asyncio.sleep(0)
+    parser.data_received(b"$3\r\nfoo\r\n$3\r")
+    assert await first == "foo"
+    assert not second.done()
+    parser.data_received(b"\nbar\r\n+OK\r\n")
+    assert await second == b"bar"
+    assert await parser.can_read(0)
+    assert await parser.read_response() == "OK"
+
+
+async def test_protocol_parser_connection_lost():
+    parser = ProtocolParser(socket_read_size=65536)
+    parser.connection_made(mock.Mock())
+    pending = asyncio.ensure_future(parser.read_response())
+    await asyncio.sleep(0)
+    parser.connection_lost(None)
+    with pytest.raises(ConnectionError):
+        await pending
+    with pytest.raises(ConnectionError):
+        await parser.read_response()
+
+
+async def test_protocol_parser_ignores_old_transports():
+    parser = ProtocolParser(socket_read_size=65536)
+    old = TransportProtocol(parser, parser)
+    old.connection_made(mock.Mock())
+    parser.on_disconnect()
+    new = TransportProtocol(parser, parser)
+    transport = mock.Mock()
+    new.connection_made(transport)
+    pending = asyncio.ensure_future(parser.read_response())
+    await asyncio.sleep(0)
+    # the callbacks of the closed transport come late
+    old.data_received(b"+OLD\r\n")
+    old.connection_lost(None)
+    assert parser.transport is transport
+    assert not parser.lost
+    new.data_received(b"+NEW\r\n")
+    assert await pending == b"NEW"
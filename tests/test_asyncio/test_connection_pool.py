@@ -1,4 +1,5 @@
 import asyncio
+import multiprocessing
 import os
 import re
 import sys
@@ -11,7 +12,7 @@ else:
     import pytest_asyncio
 
 import redis.asyncio as redis
-from redis.asyncio.connection import Connection, to_bool
+from redis.asyncio.connection import FORK_HOOKS, Connection, to_bool
 from tests.conftest import skip_if_redis_enterprise, skip_if_server_version_lt
 
 from .compat import mock
@@ -106,7 +107,7 @@ class DummyConnection(Connection):
     async def connect(self):
         pass
 
-    async def disconnect(self):
+    async def disconnect(self, error=None):
         pass
 
     async def can_read(self, timeout: float = 0):
@@ -295,6 +296,272 @@ class TestBlockingConnectionPool:
         assert repr(pool) == expected
 
 
+async def wait_for(predicate, timeout=2):
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture(params=[redis.ConnectionPool, redis.BlockingConnectionPool])
+def pool_class(request):
+    return request.param
+
+
+class TestConnectionPoolReaper:
+    async def test_min_idle(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port, max_connections=10, min_idle=2)
+        connection = await pool.get_connection("_")
+        assert connection.connected_at is not None
+        await wait_for(lambda: pool.stats()["idle"] == 2)
+        assert pool.stats()["connections"] == 3
+        await pool.release(connection)
+        await pool.disconnect()
+
+    async def test_max_idle_time(self, stand_in_server, pool_class):
+        pool = pool_class(
+            port=stand_in_server.port,
+            max_connections=10,
+            min_idle=1,
+            max_idle_time=60,
+            reaper_interval=3600,
+        )
+        connections = [await pool.get_connection("_") for _ in range(3)]
+        for connection in connections:
+            await pool.release(connection)
+        await pool.reap()
+        assert pool.stats()["idle"] == 3
+        for connection in connections:
+            connection.released_at -= 120
+        await pool.reap()
+        stats = pool.stats()
+        assert (stats["connections"], stats["idle"]) == (1, 1)
+        assert stats["connections_destroyed"] == 2
+        # the most recently used one is kept
+        assert connections[-1].is_connected
+        await pool.disconnect()
+
+    async def test_max_connection_age(self, stand_in_server, pool_class):
+        pool = pool_class(
+            port=stand_in_server.port, max_connection_age=60, reaper_interval=3600
+        )
+        connection = await pool.get_connection("_")
+        in_use = await pool.get_connection("_")
+        await pool.release(connection)
+        connection.connected_at -= 120
+        in_use.connected_at -= 120
+        await pool.reap()
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"]) == (1, 0)
+        assert not connection.is_connected
+        assert in_use.is_connected
+        await pool.release(in_use)
+        await pool.disconnect()
+
+    async def test_reaper_stops_when_disconnected(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port, max_idle_time=60)
+        assert pool._reaper is None
+        await pool.release(await pool.get_connection("_"))
+        reaper = pool._reaper
+        assert not reaper.done()
+        await pool.disconnect()
+        assert pool._reaper is None
+        await asyncio.sleep(0)
+        assert reaper.cancelled()
+
+
+@pytest.mark.skipif(not FORK_HOOKS, reason="needs os.register_at_fork()")
+class TestForkHooks:
+    async def test_pool_reset_in_child(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port, min_idle=1)
+        r = redis.Redis(connection_pool=pool)
+        await r.ping()
+        await wait_for(lambda: pool.stats()["idle"] >= 1)
+
+        def target(pool):
+            assert pool.pid == os.getpid()
+            assert pool.stats()["connections"] == 0
+
+            async def use():
+                assert await redis.Redis(connection_pool=pool).ping()
+                await wait_for(lambda: pool.stats()["idle"] >= 1)
+                await pool.disconnect()
+
+            asyncio.run(use())
+
+        proc = multiprocessing.get_context("fork").Process(target=target, args=(pool,))
+        proc.start()
+        proc.join(5)
+        assert proc.exitcode == 0
+        assert await r.ping()
+        await pool.disconnect()
+
+
+class TestBackgroundHealthChecks:
+    def get_pool(self, stand_in_server, pool_class, **kwargs):
+        kwargs.setdefault("reaper_interval", 3600)
+        return pool_class(
+            port=stand_in_server.port,
+            max_connections=10,
+            health_check_interval=7200,
+            background_health_checks=True,
+            **kwargs,
+        )
+
+    async def test_idle_connections_checked(self, stand_in_server, pool_class):
+        pool = self.get_pool(stand_in_server, pool_class)
+        due = await pool.get_connection("_")
+        recent = await pool.get_connection("_")
+        await recent.send_command("PING")
+        await recent.read_response()
+        due.next_health_check = -1
+        await pool.release(due)
+        await pool.release(recent)
+        await pool.check_health()
+        stats = pool.stats()
+        assert stats["health_checks"]["count"] == 1
+        assert stats["idle"] == 2
+        await pool.check_health()
+        assert pool.stats()["health_checks"]["count"] == 1
+        connection = await pool.get_connection("_")
+        with mock.patch.object(connection, "_send_ping") as send_ping:
+            await connection.send_command("GET", "foo")
+            await connection.read_response()
+        send_ping.assert_not_called()
+        await pool.release(connection)
+        await pool.disconnect()
+
+    async def test_dead_connections_evicted(self, stand_in_server, pool_class):
+        pool = self.get_pool(stand_in_server, pool_class)
+        connections = [await pool.get_connection("_") for _ in range(2)]
+        for connection in connections:
+            connection.next_health_check = -1
+            await pool.release(connection)
+        connections[0]._writer.transport.abort()
+        await asyncio.sleep(0)
+        await pool.check_health()
+        stats = pool.stats()
+        assert (stats["connections"], stats["idle"]) == (1, 1)
+        assert stats["health_check_failures"] == 1
+        assert stats["health_checks"]["count"] == 1
+        assert not connections[0].is_connected
+        assert await pool.get_connection("_") is connections[1]
+        await pool.disconnect()
+
+    async def test_fifo_queue_hands_out_connections_first(self, stand_in_server):
+        pool = self.get_pool(
+            stand_in_server, redis.BlockingConnectionPool, queue_class=asyncio.Queue
+        )
+        connections = [await pool.get_connection("_") for _ in range(2)]
+        for connection in connections:
+            connection.next_health_check = -1
+            await pool.release(connection)
+        connections[0]._writer.transport.abort()
+        await asyncio.sleep(0)
+        await pool.check_health()
+        assert pool.stats()["idle"] == 1
+        # before the placeholders of the connections not made yet
+        assert await pool.get_connection("_") is connections[1]
+        await pool.disconnect()
+
+    async def test_checked_by_reaper(self, stand_in_server, pool_class):
+        pool = self.get_pool(
+            stand_in_server, pool_class, min_idle=2, reaper_interval=0.05
+        )
+        await pool.release(await pool.get_connection("_"))
+        await wait_for(lambda: pool.stats()["health_checks"]["count"] >= 2)
+        assert pool.stats()["idle"] >= 2
+        await pool.disconnect()
+
+    def test_requires_health_check_interval(self, pool_class):
+        with pytest.raises(ValueError):
+            pool_class(background_health_checks=True)
+
+
+class TestReplyDrains:
+    # replies to GET come late, after the reads time out
+    server_options = {"delays": {"GET": 0.2}}
+
+    def get_client(self, stand_in_server, pool_class, **kwargs):
+        kwargs.setdefault("socket_timeout", 0.05)
+        kwargs.setdefault("drain_timeout", 1)
+        pool = pool_class(port=stand_in_server.port, **kwargs)
+        return redis.Redis(connection_pool=pool)
+
+    async def test_timeout_drained(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class)
+        await r.set("a", "1")
+        with pytest.raises(redis.TimeoutError):
+            await r.get("a")
+        # waits for the late reply, on the same connection
+        assert await r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert stats["connections_created"] == 1
+        assert (stats["drains"], stats["drain_failures"]) == (1, 0)
+        await r.connection_pool.disconnect()
+
+    async def test_cancellation_drained(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class, socket_timeout=None)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(r.get("a"), 0.05)
+        assert await r.incr("b") == 1
+        pipe = r.pipeline(transaction=False).incr("b").get("a").incr("b")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pipe.execute(), 0.05)
+        # the replies left unread aren't read as those of the next commands
+        assert await r.incr("b") == 4
+        stats = r.connection_pool.stats()
+        assert stats["connections_created"] == 1
+        assert stats["drains"] == 2
+        await r.connection_pool.disconnect()
+
+    async def test_drain_timeout_reconnects(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class, drain_timeout=0.05)
+        with pytest.raises(redis.TimeoutError):
+            await r.get("a")
+        assert await r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert (stats["drains"], stats["drain_failures"]) == (0, 1)
+        assert stats["connections_created"] == 2
+        assert stats["reconnects"]["error"] == 1
+        await r.connection_pool.disconnect()
+
+    # the late reply to BLPOP may hold an element popped meanwhile
+    @pytest.mark.parametrize(
+        "stand_in_server",
+        [{"replies": {"BLPOP": None}, "delays": {"BLPOP": 0.2}}],
+        indirect=True,
+    )
+    async def test_blocking_command_reconnects(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class)
+        with pytest.raises(redis.TimeoutError):
+            await r.blpop("a", timeout=1)
+        assert await r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert stats["connections_created"] == 2
+        assert (stats["drains"], stats["drain_failures"]) == (0, 0)
+        await r.connection_pool.disconnect()
+
+    async def test_closed_when_disconnected(self, stand_in_server, pool_class):
+        connection = redis.Connection(
+            port=stand_in_server.port, socket_timeout=0.05, drain_timeout=1
+        )
+        await connection.send_command("GET", "a")
+        with pytest.raises(redis.TimeoutError):
+            await connection.read_response()
+        assert not connection.is_connected
+        await connection.disconnect()
+        assert connection._drain is None
+        await connection.send_command("PING")
+        assert await connection.read_response() == b"PONG"
+        await connection.disconnect()
+
+    def test_protocol_connection_unsupported(self, pool_class):
+        with pytest.raises(redis.RedisError):
+            redis.ProtocolConnection(drain_timeout=1)
+
+
 class TestConnectionPoolURLParsing:
     def test_hostname(self):
         pool = redis.ConnectionPool.from_url("redis://my.host")
@@ -646,7 +913,7 @@ class TestConnection:
 @pytest.mark.onlynoncluster
 class TestMultiConnectionClient:
     @pytest_asyncio.fixture()
-    async def r(self, create_redis, server):
+    async def r(self, create_redis, stand_in_server):
         redis = await create_redis(single_connection_client=False)
         yield redis
         await redis.flushall()
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import redis.asyncio as redis
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.asyncio.connection import ProtocolConnection
+from redis.instrumentation import PHASES, CommandStats
+from tests.stand_in_server import StandInCluster, StandInServer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.mark.parametrize("connection_class", [redis.Connection, ProtocolConnection])
+async def test_command_stats(connection_class):
+    stats = CommandStats()
+    with StandInServer() as server:
+        pool = redis.ConnectionPool(
+            connection_class=connection_class,
+            port=server.port,
+            instrumentation=stats,
+        )
+        r = redis.Redis(connection_pool=pool)
+        await r.set("a", "1")
+        assert await r.get("a") == b"1"
+        with pytest.raises(redis.ResponseError):
+            await r.execute_command("NOSUCHCOMMAND")
+        await r.pipeline().set("b", "2").get("b").execute()
+        await pool.disconnect()
+    node = f"localhost:{server.port}"
+    summary = stats.summary()
+    assert summary[("GET", node)]["count"] == 1
+    assert summary[("NOSUCHCOMMAND", node)]["errors"] == 1
+    assert summary[("MULTI", node)]["count"] == 1
+    assert all(summary[("phase", phase)]["count"] == 4 for phase in PHASES)
+    assert stats.bytes_received == len(
+        b"+OK\r\n$1\r\n1\r\n-ERR unknown command 'NOSUCHCOMMAND'\r\n"
+        b"+OK\r\n+QUEUED\r\n+QUEUED\r\n*2\r\n+OK\r\n$1\r\n2\r\n"
+    )
+
+
+async def test_auto_pipelined_commands():
+    stats = CommandStats()
+    with StandInServer() as server:
+        r = redis.Redis(port=server.port, auto_pipeline=True, instrumentation=stats)
+        await r.set("a", "1")
+        assert await r.get("a") == b"1"
+        await r.close()
+    assert stats.histogram("GET").count == 1
+    assert "wait" not in stats.phases
+
+
+@pytest.mark.parametrize("connection_class", [redis.Connection, ProtocolConnection])
+async def test_pool_stats(connection_class):
+    with StandInServer() as server:
+        pool = redis.ConnectionPool(connection_class=connection_class, port=server.port)
+        r = redis.Redis(connection_pool=pool)
+        connection = await pool.get_connection("_")
+        for _ in range(3):
+            await r.ping()
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"]) == (1, 1)
+        assert stats["checkouts"] == 4
+        assert stats["checkout_wait"]["count"] == 4
+        # dropped by the server while idle in the pool
+        await pool.release(connection)
+        connection = await pool.get_connection("_")
+        await pool.release(connection)
+        if connection_class is ProtocolConnection:
+            connection._parser.transport.abort()
+        else:
+            connection._writer.transport.abort()
+        await asyncio.sleep(0)
+        await r.ping()
+        await r.ping()
+        await pool.disconnect()
+        stats = pool.stats()
+    assert stats["reconnects"]["stale"] == 1
+    assert stats["connections_created"] == 3
+    assert stats["connections_destroyed"] == 3
+
+
+async def test_blocking_pool_stats():
+    with StandInServer() as server:
+        pool = redis.BlockingConnectionPool(
+            port=server.port, max_connections=1, timeout=0.01
+        )
+        connection = await pool.get_connection("_")
+        with pytest.raises(redis.ConnectionError):
+            await pool.get_connection("_")
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"]) == (1, 0)
+        assert stats["timeouts"] == 1
+        await pool.release(connection)
+        assert pool.stats()["idle"] == 1
+        await pool.disconnect()
+
+
+async def test_cluster_pool_stats():
+    with StandInCluster() as cluster:
+        nodes = [ClusterNode(*node) for node in cluster.startup_nodes]
+        rc = RedisCluster(startup_nodes=nodes)
+        for key in ("a", "b", "c"):
+            await rc.set(key, "1")
+        stats = rc.pool_stats()
+        await rc.close()
+    assert len(stats) == len(cluster.startup_nodes)
+    assert all(node["in_use"] == 0 for node in stats.values())
+    assert sum(node["connections_created"] for node in stats.values()) >= 1
@@ -1,6 +1,12 @@
+import asyncio
+from unittest import mock
+
 import pytest
 
 import redis
+from redis.asyncio import Redis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
 from tests.conftest import skip_if_server_version_lt
 
 from .conftest import wait_for_command
@@ -405,3 +411,68 @@ class TestPipeline:
             response = await pipe.execute()
         assert response[0]
         assert await r.get("foo") == b"bar"
+
+
+class TestAutoPipeline:
+    def get_client(self, *responses):
+        connection = mock.Mock(
+            send_command=mock.AsyncMock(),
+            send_packed_command=mock.AsyncMock(),
+            read_response=mock.AsyncMock(side_effect=responses),
+            disconnect=mock.AsyncMock(),
+        )
+        pool = mock.Mock(
+            connection_kwargs={},
+            get_connection=mock.AsyncMock(return_value=connection),
+            release=mock.AsyncMock(),
+        )
+        return Redis(connection_pool=pool, auto_pipeline=True), connection
+
+    async def test_concurrent_commands_share_a_write(self):
+        client, connection = self.get_client(b"OK", b"1", 2)
+        results = await asyncio.gather(
+            client.set("a", "1"), client.get("a"), client.incr("b")
+        )
+        assert results == [True, b"1", 2]
+        connection.pack_commands.assert_called_once_with(
+            [("SET", "a", "1"), ("GET", "a"), ("INCRBY", "b", 1)]
+        )
+        connection.send_packed_command.assert_awaited_once()
+
+    async def test_response_errors_stay_with_their_command(self):
+        error = redis.ResponseError("WRONGTYPE")
+        client, connection = self.get_client(b"OK", error, 2)
+        results = await asyncio.gather(
+            client.set("a", "1"),
+            client.incr("a"),
+            client.incr("b"),
+            return_exceptions=True,
+        )
+        assert results == [True, error, 2]
+        connection.disconnect.assert_not_awaited()
+
+    async def test_connection_error_fails_unread_commands(self):
+        client, connection = self.get_client(b"OK", redis.ConnectionError())
+        results = await asyncio.gather(
+            client.set("a", "1"),
+            client.get("a"),
+            client.get("b"),
+            return_exceptions=True,
+        )
+        assert results[0] is True
+        assert all(isinstance(r, redis.ConnectionError) for r in results[1:])
+        connection.disconnect.assert_awaited_once()
+
+    async def test_blocking_commands_are_not_batched(self):
+        client, connection = self.get_client([b"list", b"item"])
+        connection.retry = Retry(NoBackoff(), 0)
+        assert await client.blpop("list", timeout=1) == (b"list", b"item")
+        connection.send_packed_command.assert_not_awaited()
+        connection.send_command.assert_awaited_once()
+
+    @pytest.mark.onlynoncluster
+    async def test_auto_pipeline(self, r):
+        client = Redis(connection_pool=r.connection_pool, auto_pipeline=True)
+        await asyncio.gather(*(client.set(f"key{i}", i) for i in range(100)))
+        values = await asyncio.gather(*(client.get(f"key{i}") for i in range(100)))
+        assert values == [str(i).encode() for i in range(100)]
@@ -0,0 +1,177 @@
+import time
+from unittest import mock
+
+import pytest
+
+import redis
+from redis.cache import LocalCache
+from redis.exceptions import DataError
+
+from .conftest import _get_client, skip_if_server_version_lt
+
+
+class TestLocalCache:
+    def track(self, cache, connection=None):
+        "Return ``connection``, or a new one, tracking keys for ``cache``"
+        connection = connection or mock.Mock()
+        connection.read_response.return_value = b"OK"
+
+        def get_redirect_id():
+            cache._redirect_id = 1
+            return 1
+
+        with mock.patch.object(cache, "_get_redirect_id", get_redirect_id):
+            cache.enable_tracking(connection)
+        return connection
+
+    def fill(self, cache, command, response, connection=None):
+        assert cache.get(command, "miss") == "miss"
+        cache.set(command, response, self.track(cache, connection))
+
+    def test_get_and_set(self):
+        cache = LocalCache()
+        self.fill(cache, ("GET", "foo"), b"bar")
+        assert cache.get(("GET", "foo")) == b"bar"
+        assert cache.stats() == {
+            "hits": 1,
+            "misses": 1,
+            "evictions": 0,
+            "invalidations": 0,
+            "size": 1,
+        }
+
+    def test_set_without_miss_is_ignored(self):
+        cache = LocalCache()
+        cache.set(("GET", "foo"), b"bar", mock.Mock())
+        assert len(cache) == 0
+
+    def test_replies_are_copied(self):
+        cache = LocalCache()
+        self.fill(cache, ("LRANGE", "list", 0, -1), [b"a"])
+        cache.get(("LRANGE", "list", 0, -1)).append(b"b")
+        assert cache.get(("LRANGE", "list", 0, -1)) == [b"a"]
+
+    def test_lru_eviction(self):
+        cache = LocalCache(max_size=2)
+        self.fill(cache, ("GET", "a"), b"1")
+        self.fill(cache, ("GET", "b"), b"2")
+        cache.get(("GET", "a"))
+        self.fill(cache, ("GET", "c"), b"3")
+        assert cache.get(("GET", "b"), "miss") == "miss"
+        assert cache.get(("GET", "a")) == b"1"
+        assert cache.evictions == 1
+
+    def test_ttl(self):
+        cache = LocalCache(ttl=0.01)
+        self.fill(cache, ("GET", "a"), b"1")
+        time.sleep(0.02)
+        assert cache.get(("GET", "a"), "miss") == "miss"
+
+    def test_invalidate(self):
+        cache = LocalCache()
+        self.fill(cache, ("GET", "a"), b"1")
+        self.fill(cache, ("HGETALL", "h"), {b"f": b"v"})
+        self.fill(cache, ("MGET", "a", "b"), [b"1", None])
+        cache.invalidate([b"a"])
+        assert cache.get(("GET", "a"), "miss") == "miss"
+        assert cache.get(("MGET", "a", "b"), "miss") == "miss"
+        assert cache.get(("HGETALL", "h")) == {b"f": b"v"}
+
+    def test_invalidation_while_fetching(self):
+        cache = LocalCache()
+        assert cache.get(("GET", "a"), "miss") == "miss"
+        cache.invalidate([b"a"])
+        cache.set(("GET", "a"), b"stale", mock.Mock())
+        assert len(cache) == 0
+
+    def test_not_cached_after_reset(self):
+        cache = LocalCache()
+        connection = self.track(cache)
+        cache.close()
+        assert cache.get(("GET", "a"), "miss") == "miss"
+        # tracking can't be enabled again without a pool
+        cache.set(("GET", "a"), b"1", connection)
+        assert len(cache) == 0
+        assert cache.get(("GET", "a"), "miss") == "miss"
+
+    def test_connection_lost(self):
+        cache = LocalCache()
+        first, second = mock.Mock(), mock.Mock()
+        self.fill(cache, ("GET", "a"), b"1", first)
+        self.fill(cache, ("GET", "b"), b"2", second)
+        cache.connection_lost(first)
+        assert cache.get(("GET", "a"), "miss") == "miss"
+        assert cache.get(("GET", "b")) == b"2"
+
+    def test_handle_invalidation_messages(self):
+        cache = LocalCache()
+        self.fill(cache, ("GET", "a"), b"1")
+        self.fill(cache, ("GET", "b"), b"2")
+        cache._handle_invalidation([b"message", b"__redis__:invalidate", [b"a"]])
+        assert len(cache) == 1
+        cache._handle_invalidation([b"invalidate", None])
+        assert len(cache) == 0
+
+    def test_is_cacheable(self):
+        cache = LocalCache()
+        assert cache.is_cacheable(("GET", "a"))
+        assert cache.is_cacheable(("hgetall", "a"))
+        assert not cache.is_cacheable(("SET", "a", "b"))
+
+    def test_single_pool(self):
+        cache = LocalCache()
+        cache.attach(redis.ConnectionPool())
+        with pytest.raises(DataError):
+            cache.attach(redis.ConnectionPool())
+
+
+@pytest.mark.onlynoncluster
+@skip_if_server_version_lt("6.0.0")
+@pytest.mark.parametrize("protocol", [2, 3])
+class TestClientSideCaching:
+    @pytest.fixture()
+    def cached(self, request, protocol):
+        return _get_client(
+            redis.Redis,
+            request,
+            single_connection_client=False,
+            protocol=protocol,
+            client_cache=LocalCache(),
+        )
+
+    def wait_for_invalidation(self, cache, size):
+        for _ in range(100):
+            cache._process_invalidations()
+            if len(cache) == size:
+                return
+            time.sleep(0.01)
+
+    def test_get_is_cached(self, cached, r, protocol):
+        cached.set("a", "1")
+        assert cached.get("a") == b"1"
+        assert cached.get("a") == b"1"
+        assert cached.client_cache.hits == 1
+        r.set("a", "2")
+        self.wait_for_invalidation(cached.client_cache, 0)
+        assert cached.get("a") == b"2"
+
+    def test_mget_members(self, cached, r, protocol):
+        r.mset({"a": "1", "b": "2"})
+        assert cached.get("a") == b"1"
+        assert cached.mget("a", "b", "c") == [b"1", b"2", None]
+        assert cached.client_cache.hits == 1
+        assert cached.mget("b", "c") == [b"2", None]
+        assert cached.client_cache.hits == 3
+
+    def test_callbacks_run_on_hits(self, cached, protocol):
+        cached.hset("h", mapping={"f": "v"})
+        assert cached.hgetall("h") == {b"f": b"v"}
+        assert cached.hgetall("h") == {b"f": b"v"}
+        assert cached.client_cache.hits == 1
+
+    def test_flushall(self, cached, r, protocol):
+        cached.set("a", "1")
+        cached.get("a")
+        r.flushall()
+        self.wait_for_invalidation(cached.client_cache, 0)
+        assert cached.get("a") is None
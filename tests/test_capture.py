@@ -0,0 +1,110 @@
+import io
+
+import pytest
+
+import redis
+from redis.capture import (
+    CONNECT,
+    DISCONNECT,
+    RECEIVE,
+    SEND,
+    TrafficRecorder,
+    read_capture,
+    split_records,
+)
+from redis.exceptions import DataError
+
+
+def received(records):
+    return b"".join(r.data for r in records if r.kind == RECEIVE)
+
+
+class TestTrafficRecorder:
+    def test_read_capture(self):
+        file = io.BytesIO()
+        ticks = iter(range(10))
+        with TrafficRecorder(file, clock=lambda: next(ticks)) as recorder:
+            recorder.record(SEND, 1, [b"*1\r\n", b"$4\r\nPING\r\n"])
+            recorder.record(RECEIVE, 1, memoryview(b"+PONG\r\n"))
+            recorder.connection_closed(1)
+        file.seek(0)
+        assert list(read_capture(file)) == [
+            (SEND, 1, 1.0, b"*1\r\n$4\r\nPING\r\n"),
+            (RECEIVE, 1, 2.0, b"+PONG\r\n"),
+            (DISCONNECT, 1, 3.0, b""),
+        ]
+
+    def test_invalid_capture(self):
+        with pytest.raises(DataError):
+            list(read_capture(io.BytesIO(b"nope")))
+        file = io.BytesIO()
+        with TrafficRecorder(file) as recorder:
+            recorder.record(SEND, 1, b"*1\r\n$4\r\nPING\r\n")
+        with pytest.raises(DataError, match="Truncated"):
+            list(read_capture(io.BytesIO(file.getvalue()[:-1])))
+
+    def test_commands(self, stand_in_server, tmp_path):
+        path = tmp_path / "traffic.cap"
+        with TrafficRecorder(path) as recorder:
+            r = redis.Redis(port=stand_in_server.port, recorder=recorder)
+            r.set("a", "1")
+            assert r.get("a") == b"1"
+            r.pipeline().set("b", "2").get("b").execute()
+            r.connection_pool.disconnect()
+        connections = split_records(read_capture(path))
+        assert list(connections) == [1]
+        description, records = connections[1]
+        assert description == {
+            "host": "localhost",
+            "port": stand_in_server.port,
+            "db": 0,
+        }
+        sent = [r.data for r in records if r.kind == SEND]
+        assert sent == [
+            b"*3\r\n$3\r\nSET\r\n$1\r\na\r\n$1\r\n1\r\n",
+            b"*2\r\n$3\r\nGET\r\n$1\r\na\r\n",
+            b"*1\r\n$5\r\nMULTI\r\n*3\r\n$3\r\nSET\r\n$1\r\nb\r\n$1\r\n2\r\n"
+            b"*2\r\n$3\r\nGET\r\n$1\r\nb\r\n*1\r\n$4\r\nEXEC\r\n",
+        ]
+        assert received(records) == (
+            b"+OK\r\n$1\r\n1\r\n+OK\r\n+QUEUED\r\n+QUEUED\r\n*2\r\n+OK\r\n$1\r\n2\r\n"
+        )
+        assert records[-1].kind == DISCONNECT
+        timestamps = [r.timestamp for r in records]
+        assert timestamps == sorted(timestamps)
+
+    def test_pubsub(self, stand_in_server):
+        file = io.BytesIO()
+        with TrafficRecorder(file) as recorder:
+            r = redis.Redis(
+                unix_socket_path=stand_in_server.unix_socket_path, recorder=recorder
+            )
+            p = r.pubsub()
+            p.subscribe("channel")
+            assert p.get_message(timeout=1)["type"] == "subscribe"
+            r.publish("channel", "hello")
+            assert p.get_message(timeout=1)["data"] == b"hello"
+            p.close()
+        file.seek(0)
+        connections = split_records(read_capture(file))
+        description = {"path": stand_in_server.unix_socket_path, "db": 0}
+        assert [c[0] for c in connections.values()] == [description] * 2
+        subscriber = connections[1][1]
+        assert received(subscriber).endswith(
+            b"*3\r\n$7\r\nmessage\r\n$7\r\nchannel\r\n$5\r\nhello\r\n"
+        )
+
+    def test_closed_recorder(self, stand_in_server):
+        file = io.BytesIO()
+        recorder = TrafficRecorder(file)
+        r = redis.Redis(port=stand_in_server.port, recorder=recorder)
+        r.ping()
+        recorder.close()
+        # connections outliving the recording are no longer recorded
+        assert r.ping()
+        file.seek(0)
+        assert [record.kind for record in read_capture(file)] == [
+            CONNECT,
+            SEND,
+            RECEIVE,
+        ]
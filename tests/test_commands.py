@@ -1,5 +1,6 @@
 import binascii
 import datetime
+import io
 import re
 import time
 from string import ascii_letters
@@ -1105,6 +1106,18 @@ class TestRedisCommands:
         r.restore("a", 0, dumped)
         assert r["a"] == b"foo"
 
+    @skip_if_server_version_lt("2.6.0")
+    def test_dump_into_and_stream_dump(self, r):
+        r["a"] = "foo"
+        dumped = r.dump("a")
+        buffer = bytearray(100)
+        assert r.dump_into("a", buffer) == len(dumped)
+        assert buffer[: len(dumped)] == dumped
+        f = io.BytesIO()
+        assert r.stream_dump("a", f, chunk_size=4) == len(dumped)
+        assert f.getvalue() == dumped
+        assert r.dump_into("b", buffer) is None
+
     @skip_if_server_version_lt("3.0.0")
     def test_dump_and_restore_and_replace(self, r):
         r["a"] = "bar"
@@ -1245,6 +1258,49 @@ class TestRedisCommands:
         assert r.get("integer") == str(integer).encode()
         assert r.get("unicode_string").decode("utf-8") == unicode_string
 
+    def test_get_into(self, r):
+        value = bytes(range(256)) * 1000
+        r.set("a", value)
+        buffer = bytearray(len(value) + 10)
+        assert r.get_into("a", buffer) == len(value)
+        assert buffer[: len(value)] == value
+        assert r.get_into("missing", buffer) is None
+        with pytest.raises(redis.DataError):
+            r.get_into("a", bytearray(10))
+        # the connection is still usable
+        assert r.get("a") == value
+
+    def test_stream_get(self, r):
+        value = b"x" * 100000
+        r.set("a", value)
+        f = io.BytesIO()
+        assert r.stream_get("a", f, chunk_size=1000) == len(value)
+        assert f.getvalue() == value
+        assert r.stream_get("missing", f) is None
+
+    @pytest.mark.onlynoncluster
+    @pytest.mark.parametrize("transaction", [True, False])
+    def test_get_into_pipeline(self, r, transaction):
+        r.set("a", "foo")
+        buffer = bytearray(3)
+        f = io.BytesIO()
+        pipe = r.pipeline(transaction=transaction)
+        pipe.get_into("a", buffer).stream_get("a", f).get("a")
+        pipe.get_into("missing", buffer)
+        assert pipe.execute() == [3, 3, b"foo", None]
+        assert buffer == b"foo"
+        assert f.getvalue() == b"foo"
+
+    @pytest.mark.onlynoncluster
+    def test_get_into_transaction_decodes_other_replies(self, request):
+        with _get_client(redis.Redis, request, decode_responses=True) as r:
+            r.set("a", "foo")
+            buffer = bytearray(3)
+            pipe = r.pipeline()
+            pipe.get_into("a", buffer).get("a").incr("b")
+            assert pipe.execute() == [3, "foo", 1]
+            assert buffer == b"foo"
+
     @skip_if_server_version_lt("6.2.0")
     def test_getdel(self, r):
         assert r.getdel("a") is None
@@ -1301,6 +1357,15 @@ class TestRedisCommands:
         assert r.getrange("a", 0, 2) == b"foo"
         assert r.getrange("a", 3, 4) == b""
 
+    def test_getrange_into_and_stream_getrange(self, r):
+        r["a"] = "foobar"
+        buffer = bytearray(10)
+        assert r.getrange_into("a", 1, 3, buffer) == 3
+        assert buffer[:3] == b"oob"
+        f = io.BytesIO()
+        assert r.stream_getrange("a", 3, -1, f) == 3
+        assert f.getvalue() == b"bar"
+
     def test_getset(self, r):
         assert r.getset("a", "foo") is None
         assert r.getset("a", "bar") == b"foo"
@@ -1,3 +1,4 @@
+import io
 import socket
 import types
 from unittest import mock
@@ -5,9 +6,32 @@ from unittest.mock import patch
 
 import pytest
 
+import redis
 from redis.backoff import NoBackoff
-from redis.connection import Connection
-from redis.exceptions import ConnectionError, InvalidResponse, TimeoutError
+from redis.client import (
+    ResponseCallbacks,
+    decode_response,
+    pairs_to_dict,
+    parse_config_get,
+    zset_score_pairs,
+)
+from redis.connection import (
+    BufferSink,
+    BytearraySocketBuffer,
+    Connection,
+    Encoder,
+    FileSink,
+    PythonParser,
+    SocketBuffer,
+    UnixDomainSocketConnection,
+)
+from redis.exceptions import (
+    ConnectionError,
+    DataError,
+    InvalidResponse,
+    ResponseError,
+    TimeoutError,
+)
 from redis.retry import Retry
 from redis.utils import HIREDIS_AVAILABLE
 
@@ -122,3 +146,458 @@ class TestConnection:
         assert conn._connect.call_count == 1
         assert str(e.value) == "Timeout connecting to server"
         self.clear(conn)
+
+
+class FakeSocket:
+    """Hands out ``data`` in chunks of at most ``chunk_size`` bytes"""
+
+    def __init__(self, data, chunk_size=7):
+        self.data = data
+        self.chunk_size = chunk_size
+
+    def recv(self, bufsize):
+        size = min(bufsize, self.chunk_size)
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def recv_into(self, buffer, nbytes=0):
+        size = min(nbytes or len(buffer), len(buffer), self.chunk_size)
+        chunk, self.data = self.data[:size], self.data[size:]
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+    def settimeout(self, timeout):
+        pass
+
+
+class SendmsgSocket:
+    """Records what sendmsg() sends, at most ``chunk_size`` bytes a call"""
+
+    def __init__(self, chunk_size=5):
+        self.chunk_size = chunk_size
+        self.sent = bytearray()
+        self.calls = []
+
+    def sendmsg(self, buffers):
+        self.calls.append(len(buffers))
+        size = 0
+        for buffer in buffers:
+            chunk = bytes(buffer[: self.chunk_size - size])
+            self.sent += chunk
+            size += len(chunk)
+            if size == self.chunk_size:
+                break
+        return size
+
+
+class TestVectoredSend:
+    def test_partial_sends(self):
+        conn = Connection()
+        conn._sock = SendmsgSocket()
+        value = b"v" * 10000
+        command = conn.pack_command("SET", "foo", value)
+        assert len(command) == 3 and command[1] is value
+        conn.send_packed_command(command, check_health=False)
+        assert conn._sock.sent == b"".join(command)
+        assert conn._sock.calls[0] == 3
+
+    def test_memoryviews_are_sent_without_copies(self):
+        conn = Connection()
+        conn._sock = SendmsgSocket(chunk_size=64)
+        array = memoryview(bytearray(range(16))).cast("I")
+        command = conn.pack_command("SET", "foo", array, "EX", 10)
+        assert command[0].endswith(b"$16\r\n")
+        assert command[1] is array
+        conn.send_packed_command(command, check_health=False)
+        assert conn._sock.sent == (
+            b"*5\r\n$3\r\nSET\r\n$3\r\nfoo\r\n$16\r\n"
+            + bytes(range(16))
+            + b"\r\n$2\r\nEX\r\n$2\r\n10\r\n"
+        )
+
+    def test_pack_commands_joins_small_pieces(self):
+        conn = Connection()
+        commands = [("SET", f"key:{i}", "value") for i in range(1000)]
+        packed = conn.pack_commands(commands)
+        assert all(len(chunk) < 2 * conn._buffer_cutoff for chunk in packed)
+        assert b"".join(packed) == b"".join(
+            b"".join(conn.pack_command(*command)) for command in commands
+        )
+
+
+class TestBytearraySocketBuffer:
+    def get_parser(self, data, socket_read_size=16, chunk_size=7):
+        class BytearrayPythonParser(PythonParser):
+            socket_buffer_class = BytearraySocketBuffer
+
+        connection = mock.Mock(
+            _sock=FakeSocket(data, chunk_size=chunk_size),
+            socket_timeout=None,
+            encoder=Encoder("utf-8", "strict", False),
+        )
+        parser = BytearrayPythonParser(socket_read_size=socket_read_size)
+        parser.on_connect(connection)
+        return parser
+
+    def test_readline_split_across_reads(self):
+        buffer = BytearraySocketBuffer(FakeSocket(b"+hello world\r\n:1\r"), 4, None)
+        assert buffer.readline() == b"+hello world"
+        buffer._sock.data += b"\n"
+        assert buffer.readline() == b":1"
+        assert buffer.length == 0
+
+    def test_large_bulk_string_grows_and_shrinks_buffer(self):
+        value = b"x" * 1000
+        parser = self.get_parser(b"$1000\r\n" + value + b"\r\n+OK\r\n")
+        assert parser.read_response() == value
+        assert parser.read_response() == b"OK"
+        assert len(parser._buffer._buffer) == 16
+
+    def test_multi_bulk_response(self):
+        parser = self.get_parser(b"*3\r\n$3\r\nfoo\r\n:42\r\n*1\r\n$-1\r\n")
+        assert parser.read_response() == [b"foo", 42, [None]]
+
+    def test_closed_socket(self):
+        parser = self.get_parser(b"$10\r\nabc")
+        with pytest.raises(ConnectionError):
+            parser.read_response()
+
+
+@pytest.mark.parametrize("buffer_class", [SocketBuffer, BytearraySocketBuffer])
+class TestStreamingBulkStrings:
+    def get_parser(self, data, buffer_class):
+        class StreamingParser(PythonParser):
+            socket_buffer_class = buffer_class
+
+        connection = mock.Mock(
+            _sock=FakeSocket(data, chunk_size=10),
+            socket_timeout=None,
+            encoder=Encoder("utf-8", "strict", True),
+        )
+        parser = StreamingParser(socket_read_size=16)
+        parser.on_connect(connection)
+        return parser
+
+    def test_read_into_buffer(self, buffer_class):
+        value = bytes(range(100))
+        parser = self.get_parser(b"$100\r\n" + value + b"\r\n+OK\r\n", buffer_class)
+        array = bytearray(128)
+        sink = BufferSink(array)
+        assert sink.finish(parser.read_response_into(sink)) == 100
+        assert array[:100] == value
+        assert parser.read_response() == "OK"
+
+    def test_read_into_file(self, buffer_class):
+        value = b"v" * 1000
+        parser = self.get_parser(b"$1000\r\n" + value + b"\r\n$-1\r\n", buffer_class)
+        f = io.BytesIO()
+        sink = FileSink(f, chunk_size=64)
+        assert parser.read_response_into(sink) == 1000
+        assert f.getvalue() == value
+        assert parser.read_response_into(sink) is None
+
+    def test_value_too_large(self, buffer_class):
+        parser = self.get_parser(b"$20\r\n" + b"x" * 20 + b"\r\n:1\r\n", buffer_class)
+        sink = BufferSink(bytearray(10))
+        response = parser.read_response_into(sink)
+        with pytest.raises(DataError):
+            sink.finish(response)
+        assert parser.read_response() == 1
+
+    def test_errors_are_returned(self, buffer_class):
+        parser = self.get_parser(b"-WRONGTYPE bad\r\n", buffer_class)
+        response = parser.read_response_into(BufferSink(bytearray(10)))
+        assert isinstance(response, ResponseError)
+
+    def test_read_only_buffer(self, buffer_class):
+        with pytest.raises(DataError):
+            BufferSink(b"read-only")
+
+
+class TestPythonParser:
+    def get_parser(self, data):
+        connection = mock.Mock(
+            _sock=FakeSocket(data, chunk_size=4096),
+            socket_timeout=None,
+            encoder=Encoder("utf-8", "strict", True),
+        )
+        parser = PythonParser(socket_read_size=4096)
+        parser.on_connect(connection)
+        return parser
+
+    def test_deeply_nested_multi_bulk(self):
+        depth = 5000
+        parser = self.get_parser(b"*1\r\n" * depth + b"+OK\r\n")
+        response = parser.read_response()
+        for _ in range(depth):
+            assert len(response) == 1
+            response = response[0]
+        assert response == "OK"
+
+    def test_large_multi_bulk(self):
+        data = b"*100000\r\n" + b"$3\r\nfoo\r\n" * 100000
+        parser = self.get_parser(data)
+        assert parser.read_response() == ["foo"] * 100000
+
+    def test_nested_errors_and_empty_replies(self):
+        parser = self.get_parser(
+            b"*4\r\n-ERR bad\r\n*0\r\n*-1\r\n*2\r\n:1\r\n$0\r\n\r\n+after\r\n"
+        )
+        error, empty, null, nested = parser.read_response(disable_decoding=True)
+        assert isinstance(error, ResponseError)
+        assert str(error) == "bad"
+        assert (empty, null, nested) == ([], None, [1, b""])
+        assert parser.read_response() == "after"
+
+    def test_resp3_scalar_types(self):
+        parser = self.get_parser(
+            b"_\r\n,3.5\r\n#t\r\n#f\r\n(3492890328409238509324850943\r\n"
+            b"=15\r\ntxt:Some string\r\n!9\r\nERR blob!\r\n"
+        )
+        assert parser.read_response() is None
+        assert parser.read_response() == 3.5
+        assert parser.read_response() is True
+        assert parser.read_response() is False
+        assert parser.read_response() == 3492890328409238509324850943
+        assert parser.read_response() == "Some string"
+        error = parser.read_response()
+        assert isinstance(error, ResponseError)
+        assert str(error) == "blob!"
+
+    def test_resp3_aggregate_types(self):
+        parser = self.get_parser(
+            b"%2\r\n+first\r\n:1\r\n+second\r\n*2\r\n:2\r\n:3\r\n"
+            b"~3\r\n+a\r\n+b\r\n+a\r\n"
+            b"|1\r\n+ttl\r\n:3600\r\n$3\r\nfoo\r\n"
+        )
+        assert parser.read_response() == {"first": 1, "second": [2, 3]}
+        assert parser.read_response() == {"a", "b"}
+        assert parser.read_response() == "foo"
+
+    def test_resp3_map_with_aggregate_keys(self):
+        parser = self.get_parser(b"%1\r\n*2\r\n:1\r\n:2\r\n+value\r\n")
+        assert parser.read_response() == {(1, 2): "value"}
+
+    def test_resp3_push_handler(self):
+        push = b">2\r\n$10\r\ninvalidate\r\n*1\r\n$3\r\nfoo\r\n"
+        parser = self.get_parser(push + push + b"+OK\r\n")
+        # without a handler pushes are returned like any other reply
+        assert parser.read_response() == ["invalidate", ["foo"]]
+        pushes = []
+        parser.set_push_handler(pushes.append)
+        assert parser.read_response() == "OK"
+        assert pushes == [["invalidate", ["foo"]]]
+
+
+class TestResponseCallbacks:
+    def test_pairs_to_dict(self):
+        assert pairs_to_dict([b"a", b"1", b"b", b"2"]) == {b"a": b"1", b"b": b"2"}
+        assert pairs_to_dict({b"a": b"1"}, decode_keys=True) == {"a": b"1"}
+
+    def test_zset_score_pairs(self):
+        expected = [(b"a", 1.0), (b"b", 2.5)]
+        resp2 = [b"a", b"1", b"b", b"2.5"]
+        resp3 = [[b"a", 1.0], [b"b", 2.5]]
+        assert zset_score_pairs(resp2, withscores=True) == expected
+        assert zset_score_pairs(resp3, withscores=True) == expected
+        assert zset_score_pairs([b"a", b"b"]) == [b"a", b"b"]
+
+    def test_parse_config_get(self):
+        assert parse_config_get([b"maxmemory", b"0"]) == {"maxmemory": "0"}
+        assert parse_config_get({b"maxmemory": b"0"}) == {"maxmemory": "0"}
+
+
+class TestResponseDecoding:
+    encoder = Encoder("utf-8", "strict", False)
+
+    def test_decode_all(self):
+        response = [b"a", {b"k": [b"v", 1]}, None]
+        assert decode_response(response, self.encoder, "GET", True) == [
+            "a",
+            {"k": ["v", 1]},
+            None,
+        ]
+        assert decode_response(b"a", self.encoder, "GET", False) == b"a"
+
+    def test_decode_pair_fields(self):
+        resp2 = [b"f1", b"v1", b"f2", b"v2"]
+        assert decode_response(resp2, self.encoder, "hgetall", "fields") == [
+            "f1",
+            b"v1",
+            "f2",
+            b"v2",
+        ]
+        resp3 = {b"f1": b"v1"}
+        assert decode_response(resp3, self.encoder, "HGETALL", "fields") == {
+            "f1": b"v1"
+        }
+
+    def test_decode_stream_fields(self):
+        entries = [[b"1-0", [b"f", b"v"]], [b"2-0", None]]
+        assert decode_response(entries, self.encoder, "XRANGE", "fields") == [
+            ["1-0", ["f", b"v"]],
+            ["2-0", None],
+        ]
+        reads = [[b"s", [[b"1-0", [b"f", b"v"]]]]]
+        assert decode_response(reads, self.encoder, "XREAD", "fields") == [
+            ["s", [["1-0", ["f", b"v"]]]]
+        ]
+        autoclaim = [b"0-0", [[b"1-0", [b"f", b"v"]]], []]
+        assert decode_response(autoclaim, self.encoder, "XAUTOCLAIM", "fields") == [
+            "0-0",
+            [["1-0", ["f", b"v"]]],
+            [],
+        ]
+
+    def test_set_response_decoding(self):
+        r = redis.Redis()
+        r.set_response_decoding("hgetall", "fields")
+        assert r.response_decoding["HGETALL"] == "fields"
+        assert r.pipeline().response_decoding["HGETALL"] == "fields"
+        r.set_response_decoding("HGETALL", None)
+        assert "HGETALL" not in r.response_decoding
+        with pytest.raises(DataError):
+            r.set_response_decoding("GET", "fields")
+        with pytest.raises(DataError):
+            r.set_response_decoding("GET", "yes")
+
+    def test_pipelines_have_their_own_response_decoding(self):
+        r = redis.Redis()
+        r.set_response_decoding("HGETALL", "fields")
+        pipe = r.pipeline()
+        pipe.set_response_decoding("HGET", True)
+        assert pipe.response_decoding["HGETALL"] == "fields"
+        assert "HGET" not in r.response_decoding
+        assert "HGET" not in r.pipeline().response_decoding
+
+
+class TestResponseCallbackTable:
+    def test_lookups(self):
+        callbacks = ResponseCallbacks({"del": int, "CONFIG GET": dict})
+        assert callbacks["DEL"] is callbacks["del"] is int
+        assert callbacks.get("config get") is dict
+        assert "Del" in callbacks
+        assert "GET" not in callbacks
+        assert callbacks.get("get", "default") == "default"
+        with pytest.raises(KeyError):
+            callbacks["get"]
+        assert sorted(callbacks) == ["CONFIG GET", "DEL"]
+
+    def test_shared_until_changed(self):
+        r1, r2 = redis.Redis(), redis.Redis()
+        assert r1.response_callbacks._callbacks is r2.response_callbacks._callbacks
+        assert r1.response_callbacks == redis.Redis.RESPONSE_CALLBACKS
+        r1.set_response_callback("get", str)
+        assert r1.response_callbacks["GET"] is str
+        assert "GET" not in r2.response_callbacks
+        assert "GET" not in redis.Redis.response_callback_table()
+        del r1.response_callbacks["Get"]
+        assert "GET" not in r1.response_callbacks
+
+    def test_class_callbacks_changed_in_place(self, monkeypatch):
+        redis.Redis()
+        monkeypatch.setitem(redis.Redis.RESPONSE_CALLBACKS, "FOO", int)
+        assert redis.Redis().response_callbacks["FOO"] is int
+        monkeypatch.undo()
+        assert "FOO" not in redis.Redis().response_callbacks
+
+    def test_copy(self):
+        callbacks = ResponseCallbacks({"DEL": int})
+        copy = callbacks.copy()
+        callbacks["GET"] = str
+        copy["DEL"] = bool
+        assert dict(callbacks) == {"DEL": int, "GET": str}
+        assert dict(copy) == {"DEL": bool}
+
+    def test_recompiled_for_subclasses(self):
+        class MyRedis(redis.Redis):
+            RESPONSE_CALLBACKS = {"get": str}
+
+        assert dict(MyRedis.response_callback_table()) == {"GET": str}
+        assert "GET" not in redis.Redis.response_callback_table()
+
+
+class TestRawResponses:
+    def connection(self, *responses):
+        conn = mock.Mock()
+        conn.read_response.side_effect = list(responses)
+        return conn
+
+    def test_execute_command_raw(self):
+        r = redis.Redis()
+        conn = self.connection([b"f", b"v"], [b"f", b"v"])
+        assert r.parse_response(conn, "HGETALL") == {b"f": b"v"}
+        assert r.parse_response(conn, "HGETALL", raw=True) == [b"f", b"v"]
+        conn.read_response.assert_called_with(disable_decoding=True)
+
+    def test_raw_pipeline(self):
+        pipe = redis.Redis().pipeline(transaction=False, raw=True)
+        pipe.hgetall("h").exists("a")
+        conn = self.connection([b"f", b"v"], 1)
+        assert pipe._execute_pipeline(conn, pipe.command_stack, True) == [
+            [b"f", b"v"],
+            1,
+        ]
+        assert redis.Redis().pipeline().raw is False
+
+    def test_raw_transaction(self):
+        pipe = redis.Redis().pipeline(raw=True)
+        pipe.hgetall("h").exists("a")
+        conn = self.connection(b"OK", b"QUEUED", b"QUEUED", [[b"f", b"v"], 1])
+        assert pipe._execute_transaction(conn, pipe.command_stack, True) == [
+            [b"f", b"v"],
+            1,
+        ]
+
+    @pytest.mark.parametrize(
+        "shape,resp2,resp3",
+        [
+            ("raw", [b"f", b"v"], {b"f": b"v"}),
+            ("list", [b"f", b"v"], [b"f", b"v"]),
+            ("pairs", [(b"f", b"v")], [(b"f", b"v")]),
+            ("dict", {b"f": b"v"}, {b"f": b"v"}),
+        ],
+    )
+    def test_set_response_shape(self, shape, resp2, resp3):
+        r = redis.Redis()
+        r.set_response_shape("hgetall", shape)
+        conn = self.connection([b"f", b"v"], {b"f": b"v"})
+        assert r.parse_response(conn, "HGETALL") == resp2
+        assert r.parse_response(conn, "HGETALL") == resp3
+        pipe = r.pipeline()
+        assert pipe.response_callbacks is r.response_callbacks
+
+    def test_reset_response_shape(self):
+        r = redis.Redis()
+        r.set_response_shape("HGETALL", "raw")
+        assert "HGETALL" not in r.response_callbacks
+        r.set_response_shape("HGETALL", None)
+        assert r.response_callbacks["HGETALL"] is r.RESPONSE_CALLBACKS["HGETALL"]
+        with pytest.raises(DataError):
+            r.set_response_shape("HGETALL", "tuple")
+
+
+class TestProtocolOption:
+    def test_invalid_protocol(self):
+        with pytest.raises(DataError):
+            Connection(protocol=4)
+        with pytest.raises(DataError):
+            UnixDomainSocketConnection(protocol=1)
+
+    def test_resp3_handshake(self):
+        conn = Connection(protocol=3, password="secret")
+        conn._parser = mock.Mock()
+        conn.send_command = mock.Mock()
+        conn.read_response = mock.Mock(return_value={b"proto": 3})
+        conn.on_connect()
+        conn.send_command.assert_any_call(
+            "HELLO", 3, "AUTH", "default", "secret", check_health=False
+        )
+
+    def test_resp3_handshake_rejected(self):
+        conn = Connection(protocol=3)
+        conn._parser = mock.Mock()
+        conn.send_command = mock.Mock()
+        conn.read_response = mock.Mock(return_value={b"proto": 2})
+        with pytest.raises(ConnectionError):
+            conn.on_connect()
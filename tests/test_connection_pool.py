@@ -1,7 +1,10 @@
+import gc
 import os
+import queue
 import re
+import socket
 import time
-from threading import Thread
+from threading import Event, Thread
 from unittest import mock
 
 import pytest
@@ -198,6 +201,478 @@ class TestBlockingConnectionPool:
         assert repr(pool) == expected
 
 
+class TestFairConnectionPool:
+    def get_pool(self, max_connections=1, timeout=5, **kwargs):
+        return redis.FairConnectionPool(
+            connection_class=DummyConnection,
+            max_connections=max_connections,
+            timeout=timeout,
+            **kwargs,
+        )
+
+    def start_waiting(self, pool, order, name, priority="default"):
+        "Start a thread which records ``name`` once it gets a connection"
+        waiting = pool.stats()["waiting"]
+
+        def target():
+            with pool.priority(priority):
+                connection = pool.get_connection("_")
+            order.append(name)
+            pool.release(connection)
+
+        thread = Thread(target=target)
+        thread.start()
+        wait_for(lambda: pool.stats()["waiting"] == waiting + 1)
+        return thread
+
+    def test_first_come_first_served(self):
+        pool = self.get_pool()
+        connection = pool.get_connection("_")
+        order = []
+        threads = [self.start_waiting(pool, order, i) for i in range(5)]
+        pool.release(connection)
+        for thread in threads:
+            thread.join()
+        assert order == list(range(5))
+        assert pool.stats()["checkouts"] == 6
+
+    def test_released_connections_go_to_waiters(self):
+        pool = self.get_pool(timeout=0.05)
+        connection = pool.get_connection("_")
+        got = []
+        done = Event()
+
+        def target():
+            got.append(pool.get_connection("_"))
+            done.wait()
+
+        thread = Thread(target=target)
+        thread.start()
+        wait_for(lambda: pool.stats()["waiting"] == 1)
+        pool.release(connection)
+        # handed to the waiting thread, not to the one arriving
+        with pytest.raises(redis.ConnectionError):
+            pool.get_connection("_")
+        done.set()
+        thread.join()
+        assert got == [connection]
+        assert pool.stats()["timeouts"] == 1
+
+    def test_priorities(self):
+        pool = self.get_pool(priorities=[("critical", 0), ("default", 0), ("bulk", 0)])
+        connection = pool.get_connection("_")
+        order = []
+        threads = [
+            self.start_waiting(pool, order, name, priority)
+            for name, priority in [
+                ("bulk 1", "bulk"),
+                ("default 1", "default"),
+                ("bulk 2", "bulk"),
+                ("critical", "critical"),
+                ("default 2", "default"),
+            ]
+        ]
+        pool.release(connection)
+        for thread in threads:
+            thread.join()
+        assert order == ["critical", "default 1", "default 2", "bulk 1", "bulk 2"]
+
+    def test_reserved_connections(self):
+        pool = self.get_pool(
+            max_connections=2,
+            timeout=0.01,
+            priorities=[("critical", 1), ("default", 0)],
+        )
+        connection = pool.get_connection("_")
+        with pytest.raises(redis.ConnectionError):
+            pool.get_connection("_")
+        with pool.priority("critical"):
+            reserved = pool.get_connection("_")
+        stats = pool.stats()
+        assert (stats["in_use"], stats["waiting"]) == (2, 0)
+        critical = stats["priorities"]["critical"]
+        assert (critical["reserved"], critical["in_use"]) == (1, 1)
+        assert critical["checkouts"] == 1
+        default = stats["priorities"]["default"]
+        assert default["in_use"] == 1
+        assert (default["checkouts"], default["timeouts"]) == (1, 1)
+        assert default["checkout_wait"]["count"] == 1
+        pool.release(connection)
+        pool.release(reserved)
+        assert pool.stats()["idle"] == 2
+
+    def test_reserved_connections_not_held_by_waiters(self):
+        pool = self.get_pool(
+            max_connections=2, priorities=[("default", 0), ("bulk", 1)]
+        )
+        connection = pool.get_connection("_")
+        order = []
+        thread = self.start_waiting(pool, order, "default")
+        # the waiting thread of a higher class can't take the connection
+        # reserved for bulk, which doesn't wait behind it
+        with pool.priority("bulk"):
+            reserved = pool.get_connection("_")
+        assert pool.stats()["waiting"] == 1
+        pool.release(reserved)
+        pool.release(connection)
+        thread.join()
+        assert order == ["default"]
+
+    def test_invalid_priorities(self):
+        with pytest.raises(ValueError):
+            self.get_pool(priorities=[("critical", 0), ("critical", 0)])
+        with pytest.raises(ValueError):
+            self.get_pool(priorities=[("critical", 0)])
+        with pytest.raises(ValueError):
+            self.get_pool(priorities=[("critical", 2), ("default", 0)])
+        with pytest.raises(ValueError):
+            with self.get_pool().priority("critical"):
+                pass
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture(
+    params=[
+        redis.ConnectionPool,
+        redis.BlockingConnectionPool,
+        redis.FairConnectionPool,
+    ]
+)
+def pool_class(request):
+    return request.param
+
+
+class TestConnectionPoolReaper:
+    def test_min_idle(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port, max_connections=10, min_idle=2)
+        wait_for(lambda: pool.stats()["idle"] == 2)
+        connection = pool.get_connection("_")
+        assert connection.connected_at is not None
+        # replaced in the background
+        wait_for(lambda: pool.stats()["idle"] == 2)
+        assert pool.stats()["connections"] == 3
+        pool.release(connection)
+        pool.disconnect()
+
+    def test_max_idle_time(self, stand_in_server, pool_class):
+        pool = pool_class(
+            port=stand_in_server.port,
+            max_connections=10,
+            min_idle=1,
+            max_idle_time=60,
+            reaper_interval=3600,
+        )
+        connections = [pool.get_connection("_") for _ in range(3)]
+        for connection in connections:
+            pool.release(connection)
+        pool.reap()
+        assert pool.stats()["idle"] == 3
+        for connection in connections:
+            connection.released_at -= 120
+        pool.reap()
+        stats = pool.stats()
+        assert (stats["connections"], stats["idle"]) == (1, 1)
+        assert stats["connections_destroyed"] == 2
+        # the most recently used one is kept
+        assert connections[-1]._sock is not None
+        pool.disconnect()
+
+    def test_max_connection_age(self, stand_in_server, pool_class):
+        pool = pool_class(
+            port=stand_in_server.port, max_connection_age=60, reaper_interval=3600
+        )
+        connection = pool.get_connection("_")
+        in_use = pool.get_connection("_")
+        pool.release(connection)
+        connection.connected_at -= 120
+        in_use.connected_at -= 120
+        pool.reap()
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"]) == (1, 0)
+        assert connection._sock is None
+        assert in_use._sock is not None
+        pool.release(in_use)
+        pool.disconnect()
+
+    def test_reaper_stops_when_disconnected(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port, max_idle_time=60)
+        thread, stopped = pool._reaper
+        assert thread.is_alive()
+        pool.disconnect()
+        assert pool._reaper is None
+        thread.join(1)
+        assert not thread.is_alive()
+        pool.release(pool.get_connection("_"))
+        assert pool._reaper is not None
+        pool.disconnect()
+
+    def test_no_reaper_by_default(self, pool_class):
+        assert pool_class()._reaper is None
+
+
+class TestBackgroundHealthChecks:
+    def get_pool(self, stand_in_server, pool_class, **kwargs):
+        kwargs.setdefault("reaper_interval", 3600)
+        return pool_class(
+            port=stand_in_server.port,
+            max_connections=10,
+            health_check_interval=7200,
+            background_health_checks=True,
+            **kwargs,
+        )
+
+    def test_idle_connections_checked(self, stand_in_server, pool_class):
+        pool = self.get_pool(stand_in_server, pool_class)
+        due, recent = pool.get_connection("_"), pool.get_connection("_")
+        recent.send_command("PING")
+        recent.read_response()
+        pool.release(due)
+        pool.release(recent)
+        pool.check_health()
+        stats = pool.stats()
+        assert stats["health_checks"]["count"] == 1
+        assert stats["health_checks"]["max_ns"] > 0
+        assert stats["idle"] == 2
+        # not checked again before it's due
+        assert due.next_health_check > time.time()
+        pool.check_health()
+        assert pool.stats()["health_checks"]["count"] == 1
+        # the next command doesn't check the health of the connection
+        connection = pool.get_connection("_")
+        with mock.patch.object(connection, "_send_ping") as send_ping:
+            connection.send_command("GET", "foo")
+            connection.read_response()
+        send_ping.assert_not_called()
+        pool.release(connection)
+        pool.disconnect()
+
+    def test_dead_connections_evicted(self, stand_in_server, pool_class):
+        pool = self.get_pool(stand_in_server, pool_class)
+        connections = [pool.get_connection("_") for _ in range(2)]
+        for connection in connections:
+            pool.release(connection)
+        connections[0]._sock.shutdown(socket.SHUT_RDWR)
+        pool.check_health()
+        stats = pool.stats()
+        assert (stats["connections"], stats["idle"]) == (1, 1)
+        assert stats["health_check_failures"] == 1
+        assert stats["health_checks"]["count"] == 1
+        assert connections[0]._sock is None
+        assert pool.get_connection("_") is connections[1]
+        pool.disconnect()
+
+    def test_checked_by_reaper(self, stand_in_server, pool_class):
+        pool = self.get_pool(
+            stand_in_server, pool_class, min_idle=2, reaper_interval=0.05
+        )
+        wait_for(lambda: pool.stats()["health_checks"]["count"] >= 2)
+        assert pool.stats()["idle"] == 2
+        pool.disconnect()
+
+    def test_requires_health_check_interval(self, pool_class):
+        with pytest.raises(ValueError):
+            pool_class(background_health_checks=True)
+
+
+class TestReplyDrains:
+    # replies to GET come late, after the reads time out
+    server_options = {"delays": {"GET": 0.2}}
+
+    def get_client(self, stand_in_server, pool_class, **kwargs):
+        kwargs.setdefault("socket_timeout", 0.05)
+        kwargs.setdefault("drain_timeout", 1)
+        pool = pool_class(port=stand_in_server.port, **kwargs)
+        return redis.Redis(connection_pool=pool)
+
+    def test_timeout_drained(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class)
+        r.set("a", "1")
+        with pytest.raises(redis.TimeoutError):
+            r.get("a")
+        # waits for the late reply, on the same socket
+        assert r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert stats["connections_created"] == 1
+        assert (stats["drains"], stats["drain_failures"]) == (1, 0)
+        r.connection_pool.disconnect()
+
+    def test_pipeline_timeout_drained(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class)
+        pipe = r.pipeline(transaction=False).incr("b").get("a").incr("b")
+        with pytest.raises(redis.TimeoutError):
+            pipe.execute()
+        # the replies left unread aren't read as those of the next commands
+        assert r.incr("b") == 3
+        assert r.connection_pool.stats()["drains"] == 1
+        r.connection_pool.disconnect()
+
+    def test_drain_timeout_reconnects(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class, drain_timeout=0.05)
+        with pytest.raises(redis.TimeoutError):
+            r.get("a")
+        assert r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert (stats["drains"], stats["drain_failures"]) == (0, 1)
+        assert stats["connections_created"] == 2
+        assert stats["reconnects"]["error"] == 1
+        r.connection_pool.disconnect()
+
+    def test_reconnects_without_drain_timeout(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class, drain_timeout=None)
+        with pytest.raises(redis.TimeoutError):
+            r.get("a")
+        assert r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert stats["connections_created"] == 2
+        assert stats["drains"] == 0
+
+    # the late reply to BLPOP may hold an element popped meanwhile
+    @pytest.mark.parametrize(
+        "stand_in_server",
+        [{"replies": {"BLPOP": None}, "delays": {"BLPOP": 0.2}}],
+        indirect=True,
+    )
+    def test_blocking_command_reconnects(self, stand_in_server, pool_class):
+        r = self.get_client(stand_in_server, pool_class)
+        with pytest.raises(redis.TimeoutError):
+            r.blpop("a", timeout=1)
+        assert r.incr("b") == 1
+        stats = r.connection_pool.stats()
+        assert stats["connections_created"] == 2
+        assert (stats["drains"], stats["drain_failures"]) == (0, 0)
+        r.connection_pool.disconnect()
+
+    def test_drained_on_connect(self, stand_in_server, pool_class):
+        connection = redis.Connection(
+            port=stand_in_server.port, socket_timeout=0.05, drain_timeout=1
+        )
+        connection.send_command("GET", "a")
+        sock = connection._sock
+        with pytest.raises(redis.TimeoutError):
+            connection.read_response()
+        assert connection._sock is None
+        connection.connect()
+        assert connection._sock is sock
+        connection.send_command("PING")
+        assert connection.read_response() == b"PONG"
+        # closed rather than drained when disconnected later on
+        connection.send_command("GET", "a")
+        with pytest.raises(redis.TimeoutError):
+            connection.read_response()
+        connection.disconnect()
+        assert connection._drain is None
+        connection.connect()
+        assert connection._sock is not sock
+        connection.send_command("PING")
+        assert connection.read_response() == b"PONG"
+        connection.disconnect()
+
+
+class EchoConnection(redis.Connection):
+    "Answers every command with its last argument, without a server"
+
+    sent = []
+
+    def connect(self):
+        self._replies = queue.Queue()
+
+    def disconnect(self, *args):
+        pass
+
+    def send_packed_command(self, command, check_health=True):
+        if isinstance(command, list):
+            command = b"".join(command)
+        self.sent.append(command)
+        # "*<argc>", then "$<length>" and the value for every argument
+        tokens = command.split(b"\r\n")
+        i = 0
+        while i < len(tokens) - 1:
+            argc = int(tokens[i][1:])
+            i += 1 + 2 * argc
+            self._replies.put(tokens[i - 1])
+
+    def read_response(self, disable_decoding=False):
+        response = self._replies.get(timeout=5)
+        if response == b"error":
+            raise redis.ResponseError("bad")
+        return response
+
+
+class TestMultiplexedConnectionPool:
+    def get_client(self, **kwargs):
+        EchoConnection.sent = []
+        pool = redis.MultiplexedConnectionPool(
+            connection_class=EchoConnection, **kwargs
+        )
+        return redis.Redis(connection_pool=pool)
+
+    def test_threads_share_a_connection(self):
+        client = self.get_client()
+        results = {}
+
+        def target(i):
+            results[i] = [client.echo(f"{i}-{j}") for j in range(50)]
+
+        threads = [Thread(target=target, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(20):
+            assert results[i] == [f"{i}-{j}".encode() for j in range(50)]
+        assert client.connection_pool._created_connections == 0
+        assert len(EchoConnection.sent) <= 1000
+        client.connection_pool.disconnect()
+
+    def test_decode_responses(self):
+        client = self.get_client(decode_responses=True)
+        assert client.echo("foo") == "foo"
+        client.connection_pool.disconnect()
+
+    def test_response_error(self):
+        client = self.get_client()
+        with pytest.raises(redis.ResponseError):
+            client.echo("error")
+        assert client.echo("foo") == b"foo"
+        client.connection_pool.disconnect()
+
+    def test_dedicated_connections(self):
+        pool = redis.MultiplexedConnectionPool(connection_class=EchoConnection)
+        for command_name in ("BLPOP", "WATCH", "SUBSCRIBE", "MULTI", "pubsub", "_"):
+            connection = pool.get_connection(command_name)
+            assert isinstance(connection, EchoConnection)
+            pool.release(connection)
+        assert isinstance(
+            pool.get_connection("GET"), redis.connection.MultiplexedConnectionHandle
+        )
+
+    def test_closed(self):
+        client = self.get_client()
+        assert client.echo("foo") == b"foo"
+        multiplexed_connection = client.connection_pool._multiplexed_connection
+        client.connection_pool.disconnect()
+        with pytest.raises(redis.ConnectionError):
+            multiplexed_connection.submit([b"*1\r\n$4\r\nPING\r\n"])
+
+    def test_threads_stop_when_collected(self):
+        client = self.get_client()
+        assert client.echo("foo") == b"foo"
+        multiplexed_connection = client.connection_pool._multiplexed_connection
+        threads = [multiplexed_connection._writer, multiplexed_connection._reader]
+        # neither the pool nor the client are disconnected
+        del client, multiplexed_connection
+        gc.collect()
+        for thread in threads:
+            thread.join(5)
+            assert not thread.is_alive()
+
+
 class TestConnectionPoolURLParsing:
     def test_hostname(self):
         pool = redis.ConnectionPool.from_url("redis://my.host")
@@ -275,6 +750,7 @@ class TestConnectionPoolURLParsing:
         pool = redis.ConnectionPool.from_url(
             "redis://localhost/2?socket_timeout=20&socket_connect_timeout=10"
             "&socket_keepalive=&retry_on_timeout=Yes&max_connections=10"
+            "&drain_timeout=0.5"
         )
 
         assert pool.connection_class == redis.Connection
@@ -284,9 +760,25 @@ class TestConnectionPoolURLParsing:
             "socket_timeout": 20.0,
             "socket_connect_timeout": 10.0,
             "retry_on_timeout": True,
+            "drain_timeout": 0.5,
         }
         assert pool.max_connections == 10
 
+    def test_reaper_querystring_options(self):
+        pool = redis.ConnectionPool.from_url(
+            "redis://localhost?max_idle_time=30&max_connection_age=3600"
+            "&reaper_interval=0.5&health_check_interval=30"
+            "&background_health_checks=yes"
+        )
+        assert pool.connection_kwargs == {
+            "host": "localhost",
+            "health_check_interval": 30,
+        }
+        assert (pool.max_idle_time, pool.max_connection_age) == (30.0, 3600.0)
+        assert pool.reaper_interval == 0.5
+        assert pool.background_health_checks is True
+        pool.disconnect()
+
     def test_boolean_parsing(self):
         for expected, value in (
             (None, None),
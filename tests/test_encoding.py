@@ -1,7 +1,7 @@
 import pytest
 
 import redis
-from redis.connection import Connection
+from redis.connection import COMMAND_HEADERS, Connection, Encoder
 
 from .conftest import _get_client
 
@@ -87,6 +87,45 @@ class TestMemoryviewsAreNotPacked:
         assert cmds[3] is arg
 
 
+class TestCommandPacking:
+    def test_command_headers_are_cached(self):
+        c = Connection()
+        assert c.pack_command("CONFIG GET", "maxmemory") == [
+            b"*3\r\n$6\r\nCONFIG\r\n$3\r\nGET\r\n$9\r\nmaxmemory\r\n"
+        ]
+        assert COMMAND_HEADERS["CONFIG GET", 1] == (
+            b"*3\r\n$6\r\nCONFIG\r\n$3\r\nGET\r\n"
+        )
+        assert c.pack_command(b"CONFIG GET", "a", "b") == [
+            b"*4\r\n$6\r\nCONFIG\r\n$3\r\nGET\r\n$1\r\na\r\n$1\r\nb\r\n"
+        ]
+
+    def test_unhashable_command_name(self):
+        c = Connection()
+        assert c.pack_command(bytearray(b"GET"), "a") == [
+            b"*2\r\n$3\r\nGET\r\n$1\r\na\r\n"
+        ]
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            (0, b"0"),
+            (-1, b"-1"),
+            (1023, b"1023"),
+            (-12345, b"-12345"),
+            (2**70, b"1180591620717411303424"),
+            (1.5, b"1.5"),
+            ("\u00e9", b"\xc3\xa9"),
+        ],
+    )
+    def test_encode(self, value, expected):
+        assert Encoder("utf-8", "strict", False).encode(value) == expected
+
+    def test_encode_bool_fails(self):
+        with pytest.raises(redis.DataError):
+            Encoder("utf-8", "strict", False).encode(True)
+
+
 class TestCommandsAreNotEncoded:
     @pytest.fixture()
     def r(self, request):
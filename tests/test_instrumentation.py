@@ -0,0 +1,276 @@
+import socket
+
+import pytest
+
+import redis
+from redis.cluster import ClusterNode, RedisCluster
+from redis.instrumentation import (
+    PHASES,
+    CommandEvent,
+    CommandStats,
+    Instrumentation,
+    LatencyHistogram,
+    PoolStats,
+)
+
+from .stand_in_server import StandInCluster
+
+
+class EventLog(Instrumentation):
+    def __init__(self):
+        self.events = []
+
+    def before_command(self, event):
+        self.events.append(("before_command", event.command, event.end))
+
+    def after_command(self, event):
+        self.events.append(("after_command", event))
+
+    def before_pipeline(self, event):
+        self.events.append(("before_pipeline", event.command, event.commands))
+
+    def after_pipeline(self, event):
+        self.events.append(("after_pipeline", event))
+
+
+class TestLatencyHistogram:
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram(precision=3)
+        for value in range(16):
+            histogram.record(value)
+        assert histogram.count == 16
+        assert histogram.percentile(0.5) == 7
+        assert histogram.percentile(1) == 15
+        assert histogram.percentile(0) == 0
+        assert histogram.mean() == 7.5
+
+    def test_relative_error(self):
+        histogram = LatencyHistogram()
+        values = [int(1.3**i) for i in range(80)]
+        for value in values:
+            histogram.record(value)
+        for i, value in enumerate(sorted(values)):
+            estimate = histogram.percentile((i + 1) / len(values))
+            assert abs(estimate - value) <= value / 2**7
+        assert histogram.min == values[0]
+        assert histogram.max == values[-1]
+        assert len(histogram.counts) < len(values)
+
+    def test_merge(self):
+        first = LatencyHistogram()
+        second = LatencyHistogram()
+        first.record(10)
+        second.record(1000, count=3)
+        first.merge(second)
+        assert first.count == 4
+        assert (first.min, first.max) == (10, 1000)
+        assert first.percentile(0.25) == 10
+        assert first.percentile(0.5) == 1000
+        with pytest.raises(ValueError):
+            first.merge(LatencyHistogram(precision=3))
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        assert histogram.percentile(0.99) is None
+        assert histogram.mean() is None
+
+
+class TestInstrumentation:
+    def test_commands(self, stand_in_server):
+        log = EventLog()
+        r = redis.Redis(port=stand_in_server.port, instrumentation=log)
+        r.set("a", "1")
+        assert r.get("a") == b"1"
+        assert [e[0] for e in log.events] == [
+            "before_command",
+            "after_command",
+            "before_command",
+            "after_command",
+        ]
+        assert log.events[0] == ("before_command", "SET", None)
+        event = log.events[3][1]
+        assert event.command == "GET"
+        assert event.node == f"localhost:{stand_in_server.port}"
+        assert event.error is None
+        assert set(event.phases) == set(PHASES)
+        assert sum(event.phases.values()) <= event.duration_ns
+        assert event.bytes_sent == len(b"*2\r\n$3\r\nGET\r\n$1\r\na\r\n")
+        assert event.bytes_received == len(b"$1\r\n1\r\n")
+
+    def test_errors(self, stand_in_server):
+        log = EventLog()
+        r = redis.Redis(port=stand_in_server.port, instrumentation=log)
+        with pytest.raises(redis.ResponseError):
+            r.execute_command("NOSUCHCOMMAND")
+        event = log.events[-1][1]
+        assert isinstance(event.error, redis.ResponseError)
+        assert event.duration_ns > 0
+
+    def test_pipelines(self, stand_in_server):
+        log = EventLog()
+        r = redis.Redis(
+            unix_socket_path=stand_in_server.unix_socket_path, instrumentation=log
+        )
+        r.pipeline(transaction=False).set("a", "1").get("a").execute()
+        r.pipeline().set("b", "2").get("b").incr("c").execute()
+        assert [e[:3] for e in log.events[::2]] == [
+            ("before_pipeline", "PIPELINE", 2),
+            ("before_pipeline", "MULTI", 3),
+        ]
+        pipeline, transaction = log.events[1][1], log.events[3][1]
+        assert pipeline.node == stand_in_server.unix_socket_path
+        assert pipeline.bytes_received == len(b"+OK\r\n$1\r\n1\r\n")
+        assert transaction.commands == 3
+        assert transaction.bytes_received == len(
+            b"+OK\r\n+QUEUED\r\n+QUEUED\r\n+QUEUED\r\n*3\r\n+OK\r\n$1\r\n2\r\n:1\r\n"
+        )
+
+    def test_not_instrumented(self, stand_in_server):
+        r = redis.Redis(port=stand_in_server.port)
+        r.ping()
+        assert r.instrumentation is None
+        assert r.connection_pool.get_connection("_").meter is None
+
+
+class TestCommandStats:
+    def test_stats(self, stand_in_server):
+        stats = CommandStats()
+        r = redis.Redis(port=stand_in_server.port, instrumentation=stats)
+        for i in range(10):
+            r.set("a", i)
+            r.get("a")
+        with pytest.raises(redis.ResponseError):
+            r.execute_command("NOSUCHCOMMAND")
+        node = f"localhost:{stand_in_server.port}"
+        assert stats.histogram("GET").count == 10
+        assert stats.histogram("GET", node).count == 10
+        assert stats.histogram("GET", "elsewhere:6379").count == 0
+        assert stats.histogram().count == 21
+        summary = stats.summary()
+        assert summary[("SET", node)]["count"] == 10
+        assert summary[("SET", node)]["errors"] == 0
+        assert summary[("NOSUCHCOMMAND", node)]["errors"] == 1
+        assert summary[("phase", "wait")]["count"] == 21
+        assert stats.bytes_received > 0
+        stats.reset()
+        assert stats.summary() == {}
+
+    def test_record(self):
+        stats = CommandStats()
+        event = CommandEvent("GET", node="localhost:6379")
+        event.finish()
+        stats.record(event)
+        assert stats.histogram("GET").count == 1
+        assert stats.summary()[("GET", "localhost:6379")]["count"] == 1
+
+    def test_cluster(self):
+        stats = CommandStats()
+        with StandInCluster() as cluster:
+            nodes = [ClusterNode(*node) for node in cluster.startup_nodes]
+            rc = RedisCluster(startup_nodes=nodes, instrumentation=stats)
+            for key in ("a", "b", "c"):
+                rc.set(key, "1")
+            rc.close()
+        node_names = {f"{host}:{port}" for host, port in cluster.startup_nodes}
+        nodes_used = {node for command, node in stats.latencies if command == "SET"}
+        assert nodes_used <= node_names
+        assert stats.histogram("SET").count == 3
+
+
+class TestPoolStats:
+    def test_checkouts(self, stand_in_server):
+        pool = redis.ConnectionPool(port=stand_in_server.port)
+        r = redis.Redis(connection_pool=pool)
+        connection = pool.get_connection("_")
+        for _ in range(3):
+            r.ping()
+        stats = pool.stats()
+        assert stats["connections"] == 2
+        assert (stats["in_use"], stats["idle"]) == (1, 1)
+        assert stats["connections_created"] == 2
+        assert stats["checkouts"] == 4
+        assert stats["checkout_wait"]["count"] == 4
+        assert stats["checkout_wait"]["max_ns"] > 0
+        pool.release(connection)
+        pool.disconnect()
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"]) == (0, 2)
+        assert stats["connections_destroyed"] == 2
+        assert stats["reconnects"] == {"error": 0, "health_check": 0, "stale": 0}
+
+    def test_blocking_pool_timeouts(self, stand_in_server):
+        pool = redis.BlockingConnectionPool(
+            port=stand_in_server.port, max_connections=1, timeout=0.01
+        )
+        connection = pool.get_connection("_")
+        with pytest.raises(redis.ConnectionError):
+            pool.get_connection("_")
+        stats = pool.stats()
+        assert stats["max_connections"] == 1
+        assert (stats["in_use"], stats["idle"]) == (1, 0)
+        assert stats["timeouts"] == 1
+        assert stats["checkouts"] == 1
+        pool.release(connection)
+        assert pool.stats()["idle"] == 1
+
+    @pytest.mark.parametrize(
+        "pool_class", [redis.ConnectionPool, redis.BlockingConnectionPool]
+    )
+    def test_reconnects(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port, health_check_interval=30)
+        r = redis.Redis(connection_pool=pool)
+        r.ping()
+        connection = pool.get_connection("_")
+        # dropped by the stand_in_server while idle in the pool
+        connection._sock.shutdown(socket.SHUT_RDWR)
+        pool.release(connection)
+        r.ping()
+        connection = pool.get_connection("_")
+        # a failed health check
+        connection._sock.shutdown(socket.SHUT_RDWR)
+        connection.next_health_check = 0
+        with pytest.raises(redis.ConnectionError):
+            connection.send_command("PING")
+        connection.connect()
+        # an error sending a command
+        connection._sock.shutdown(socket.SHUT_RDWR)
+        with pytest.raises(redis.ConnectionError):
+            connection.send_command("PING", check_health=False)
+        connection.connect()
+        pool.release(connection)
+        stats = pool.stats()
+        assert stats["reconnects"] == {"error": 1, "health_check": 1, "stale": 1}
+        assert stats["connections_created"] == 4
+        assert stats["connections_destroyed"] == 3
+
+    def test_cluster(self):
+        with StandInCluster() as cluster:
+            nodes = [ClusterNode(*node) for node in cluster.startup_nodes]
+            rc = RedisCluster(startup_nodes=nodes)
+            for key in ("a", "b", "c"):
+                rc.set(key, "1")
+            stats = rc.pool_stats()
+            rc.close()
+        assert set(stats) == {f"{host}:{port}" for host, port in cluster.startup_nodes}
+        assert sum(node["checkouts"] for node in stats.values()) >= 3
+        assert all(node["in_use"] == 0 for node in stats.values())
+
+    def test_snapshot(self):
+        stats = PoolStats()
+        stats.connection_opened()
+        stats.connection_closed()
+        stats.connection_opened("stale")
+        stats.connection_opened("closed")
+        stats.checked_out(1000)
+        stats.health_checked(2000)
+        stats.health_check_failed()
+        stats.connection_drained()
+        stats.drain_failed()
+        snapshot = stats.snapshot()
+        assert snapshot["connections_created"] == 3
+        assert snapshot["connections_destroyed"] == 1
+        assert snapshot["reconnects"]["stale"] == 1
+        assert snapshot["checkout_wait"]["p50_ns"] == 1000
+        assert snapshot["health_checks"]["p50_ns"] == 2000
+        assert snapshot["health_check_failures"] == 1
+        assert (snapshot["drains"], snapshot["drain_failures"]) == (1, 1)
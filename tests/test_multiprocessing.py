@@ -1,10 +1,12 @@
 import contextlib
 import multiprocessing
+import os
+import time
 
 import pytest
 
 import redis
-from redis.connection import Connection, ConnectionPool
+from redis.connection import FORK_HOOKS, Connection, ConnectionPool
 from redis.exceptions import ConnectionError
 
 from .conftest import _get_client
@@ -166,3 +168,67 @@ class TestMultiprocessing:
         assert proc.exitcode == 0
 
         assert r.ping() is True
+
+
+@pytest.mark.skipif(not FORK_HOOKS, reason="needs os.register_at_fork()")
+class TestForkHooks:
+    def run_in_child(self, target, *args):
+        proc = multiprocessing.get_context("fork").Process(target=target, args=args)
+        proc.start()
+        proc.join(5)
+        assert proc.exitcode == 0
+
+    @pytest.mark.parametrize(
+        "pool_class",
+        [ConnectionPool, redis.BlockingConnectionPool, redis.FairConnectionPool],
+    )
+    def test_pool_reset_in_child(self, stand_in_server, pool_class):
+        pool = pool_class(port=stand_in_server.port)
+        r = redis.Redis(connection_pool=pool)
+        r.ping()
+        parent_connection = pool.get_connection("_")
+
+        def target(pool):
+            # reset before the child uses the pool
+            assert pool.pid == os.getpid()
+            assert pool.stats()["connections"] == 0
+            connection = pool.get_connection("_")
+            assert connection is not parent_connection
+            assert connection.pid == os.getpid()
+            pool.release(connection)
+            assert redis.Redis(connection_pool=pool).ping()
+
+        self.run_in_child(target, pool)
+        # the connections of the parent weren't shut down by the child
+        assert pool.stats()["connections"] == 1
+        parent_connection.send_command("PING")
+        assert parent_connection.read_response() == b"PONG"
+        pool.release(parent_connection)
+        pool.disconnect()
+
+    def test_checkout_does_not_get_pid(self, stand_in_server, monkeypatch):
+        pool = ConnectionPool(port=stand_in_server.port)
+        r = redis.Redis(connection_pool=pool)
+        r.ping()
+
+        def getpid():
+            raise AssertionError("os.getpid() called")
+
+        monkeypatch.setattr(os, "getpid", getpid)
+        assert r.ping()
+        monkeypatch.undo()
+        pool.disconnect()
+
+    def test_child_prewarms(self, stand_in_server):
+        pool = ConnectionPool(port=stand_in_server.port, min_idle=2)
+        # forked with no connections, as preforking servers should be
+        pool.disconnect()
+
+        def target(pool):
+            deadline = time.monotonic() + 2
+            while pool.stats()["idle"] < 2:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            assert all(c._sock for c in pool._available_connections)
+
+        self.run_in_child(target, pool)
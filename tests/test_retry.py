@@ -122,6 +122,12 @@ class TestRetry:
         assert self.actual_attempts == 5
         assert self.actual_failures == 5
 
+    def test_supported_errors(self):
+        retry = Retry(BackoffMock(), 1, supported_errors=(ConnectionError,))
+        assert retry.get_supported_errors() == (ConnectionError,)
+        retry.update_supported_errors([ReadOnlyError])
+        assert set(retry.get_supported_errors()) == {ConnectionError, ReadOnlyError}
+
 
 @pytest.mark.onlynoncluster
 class TestRedisClientRetry:
@@ -203,3 +209,55 @@ class TestRedisClientRetry:
                     r.get("foo")
                 finally:
                     assert parse_response.call_count == retries + 1
+
+
+class TestRedisClientFastPath:
+    "Test commands bypassing call_with_retry() when they aren't retried"
+
+    def get_client(self, **kwargs):
+        r = Redis(**kwargs)
+        conn = r.connection_pool.make_connection()
+        r.connection_pool.get_connection = lambda *args, **options: conn
+        r.connection_pool.release = lambda connection: None
+        return r, conn
+
+    def test_fast_path(self):
+        r, conn = self.get_client()
+        with patch.object(conn, "send_command") as send_command, patch.object(
+            Redis, "parse_response", return_value=b"bar"
+        ) as parse_response, patch.object(Retry, "call_with_retry") as retry:
+            assert r.get("foo") == b"bar"
+            send_command.assert_called_once_with("GET", "foo")
+            parse_response.assert_called_once_with(conn, "GET")
+            assert not retry.called
+
+    @pytest.mark.parametrize("error", [ConnectionError, TimeoutError])
+    def test_fast_path_error_disconnects(self, error):
+        r, conn = self.get_client()
+        with patch.object(conn, "send_command"), patch.object(
+            conn, "disconnect"
+        ) as disconnect, patch.object(Redis, "parse_response", side_effect=error):
+            with pytest.raises(error):
+                r.get("foo")
+            assert disconnect.call_count == 1
+
+    def test_response_error_keeps_connection(self):
+        r, conn = self.get_client()
+        with patch.object(conn, "send_command"), patch.object(
+            conn, "disconnect"
+        ) as disconnect, patch.object(
+            Redis, "parse_response", side_effect=ReadOnlyError()
+        ):
+            with pytest.raises(ReadOnlyError):
+                r.get("foo")
+            assert not disconnect.called
+
+    def test_options_and_retries_use_call_with_retry(self):
+        r, conn = self.get_client()
+        with patch.object(Retry, "call_with_retry") as retry:
+            r.zrange("a", 0, 1, withscores=True)
+            assert retry.call_count == 1
+        r, conn = self.get_client(retry_on_timeout=True)
+        with patch.object(Retry, "call_with_retry") as retry:
+            r.get("foo")
+            assert retry.call_count == 1
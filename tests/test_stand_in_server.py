@@ -0,0 +1,154 @@
+import time
+
+import pytest
+
+import redis
+from redis.cluster import ClusterNode, RedisCluster
+from redis.crc import key_slot
+
+from .stand_in_server import (
+    ReplyError,
+    StandInCluster,
+    StandInServer,
+    encode_reply,
+    parse_command,
+)
+
+
+class TestStandInProtocol:
+    def test_encode_reply(self):
+        assert encode_reply(b"a") == b"$1\r\na\r\n"
+        assert encode_reply("OK") == b"+OK\r\n"
+        assert encode_reply(3) == b":3\r\n"
+        assert encode_reply(None) == b"$-1\r\n"
+        assert encode_reply([b"a", [1]]) == b"*2\r\n$1\r\na\r\n*1\r\n:1\r\n"
+        assert encode_reply(ReplyError("ERR x")) == b"-ERR x\r\n"
+
+    def test_parse_command(self):
+        data = b"*2\r\n$3\r\nGET\r\n$1\r\na\r\n*1\r\n$4\r\nPI"
+        args, pos = parse_command(data)
+        assert args == [b"GET", b"a"]
+        assert parse_command(data, pos) is None
+        with pytest.raises(ReplyError):
+            parse_command(b"PING\r\n")
+
+
+class TestStandInServer:
+    def test_commands(self, stand_in_server):
+        r = redis.Redis(port=stand_in_server.port)
+        assert r.ping()
+        assert r.set("a", "1")
+        assert r.get("a") == b"1"
+        assert r.incr("a", 2) == 3
+        assert r.mget("a", "b") == [b"3", None]
+        r.hset("h", mapping={"f": "v"})
+        assert r.hgetall("h") == {b"f": b"v"}
+        r.rpush("l", 1, 2)
+        r.lpush("l", 0)
+        assert r.lrange("l", 0, -1) == [b"0", b"1", b"2"]
+        with pytest.raises(redis.ResponseError, match="WRONGTYPE"):
+            r.get("h")
+        with pytest.raises(redis.ResponseError, match="unknown command"):
+            r.execute_command("NOPE")
+
+    def test_unix_socket(self, stand_in_server):
+        stand_in_server.data[b"a"] = b"1"
+        r = redis.Redis(unix_socket_path=stand_in_server.unix_socket_path)
+        assert r.get("a") == b"1"
+
+    @pytest.mark.parametrize("transaction", [True, False])
+    def test_pipeline(self, stand_in_server, transaction):
+        r = redis.Redis(port=stand_in_server.port)
+        pipe = r.pipeline(transaction=transaction)
+        pipe.set("a", 1).incr("a").get("a").hget("a", "f")
+        result = pipe.execute(raise_on_error=False)
+        assert result[:3] == [True, 2, b"2"]
+        assert isinstance(result[3], redis.ResponseError)
+
+    def test_pubsub(self, stand_in_server):
+        r = redis.Redis(port=stand_in_server.port)
+        p = r.pubsub()
+        p.subscribe("a", "b")
+        assert [p.get_message(timeout=1)["data"] for _ in range(2)] == [1, 2]
+        assert r.publish("a", "hello") == 1
+        assert p.get_message(timeout=1)["data"] == b"hello"
+        p.unsubscribe()
+        assert [p.get_message(timeout=1)["data"] for _ in range(2)] == [1, 0]
+        assert r.publish("a", "hello") == 0
+        assert stand_in_server.channels == {}
+
+    def test_commands_and_replies(self):
+        replies = {"BIG": b"x" * 1000000, "CALL": lambda args: args[1:]}
+        with StandInServer(commands=["GET"], replies=replies) as server:
+            r = redis.Redis(port=server.port)
+            assert r.execute_command("BIG") == replies["BIG"]
+            assert r.execute_command("CALL", "a", 1) == [b"a", b"1"]
+            assert r.get("a") is None
+            with pytest.raises(redis.ResponseError):
+                r.set("a", "1")
+
+    @pytest.mark.parametrize(
+        "stand_in_server", [{"delays": {"GET": 0.2}}], indirect=True
+    )
+    def test_delays(self, stand_in_server):
+        port = stand_in_server.port
+        r = redis.Redis(port=port)
+        start = time.monotonic()
+        pipe = r.pipeline(transaction=False).get("a").ping()
+        assert pipe.execute() == [None, True]
+        assert time.monotonic() - start >= 0.2
+        with pytest.raises(redis.TimeoutError):
+            redis.Redis(port=port, socket_timeout=0.05).get("a")
+
+
+class TestStandInCluster:
+    @pytest.fixture()
+    def cluster(self):
+        with StandInCluster(3) as cluster:
+            yield cluster
+
+    @pytest.fixture()
+    def rc(self, cluster):
+        nodes = [ClusterNode(host, port) for host, port in cluster.startup_nodes]
+        rc = RedisCluster(startup_nodes=nodes)
+        yield rc
+        rc.close()
+
+    def test_slots(self, cluster, rc):
+        for i in range(30):
+            rc.set(f"key:{i}", i)
+        assert [rc.get(f"key:{i}") for i in range(3)] == [b"0", b"1", b"2"]
+        assert all(node.data for node in cluster.nodes)
+        for node in cluster.nodes:
+            assert all(cluster.owners[key_slot(key)] is node for key in node.data)
+
+    def test_moved(self, cluster, rc):
+        rc.set("a", "1")
+        slot = key_slot(b"a")
+        owner = cluster.owners[slot]
+        target = next(node for node in cluster.nodes if node is not owner)
+        cluster.move_slot(slot, target)
+        assert target.data == {b"a": b"1"}
+        with pytest.raises(redis.ResponseError, match="MOVED"):
+            redis.Redis(port=owner.port).get("a")
+        assert rc.get("a") == b"1"
+        assert rc.get_node_from_key("a").port == target.port
+
+    def test_ask(self, cluster, rc):
+        rc.set("a", "1")
+        slot = key_slot(b"a")
+        owner = cluster.owners[slot]
+        target = next(node for node in cluster.nodes if node is not owner)
+        cluster.migrate_slot(slot, target)
+        assert rc.get("a") == b"1"
+        target.data[b"a"] = owner.data.pop(b"a")
+        with pytest.raises(redis.ResponseError, match="ASK"):
+            redis.Redis(port=owner.port).get("a")
+        assert rc.get("a") == b"1"
+        # only served after ASKING
+        assert rc.get_node_from_key("a").port == owner.port
+
+    def test_crossslot(self, cluster):
+        r = redis.Redis(port=cluster.nodes[0].port)
+        with pytest.raises(redis.ResponseError, match="CROSSSLOT"):
+            r.mget("a", "b")